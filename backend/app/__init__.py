@@ -4,22 +4,43 @@ Application factory.
 Wires together all layers. CORS handled here without external library.
 """
 
+import hmac
 import logging
 import os
 import secrets
+import time
 from pathlib import Path
 
-from flask import Flask, jsonify
+from flask import Flask, g, jsonify, request
 
-from app.database import init_db
+from app.backups import BackupManager
+from app.commands import register_commands
+from app.database import DatabaseMaintenance, init_db
+from app.repositories.analytics_repository import AnalyticsRepository
 from app.repositories.book_repository import BookRepository
+from app.repositories.cache import CachedBookRepository, CachedUserRepository, LibraryCache
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.progress_repository import ProgressRepository
+from app.repositories.rate_limit_repository import RateLimitRepository
+from app.repositories.recommendation_repository import RecommendationRepository
 from app.repositories.user_repository import UserRepository
+from app.repositories.work_repository import WorkRepository
+from app.repositories.write_queue import WriteQueue
 from app.routes.auth import auth_bp
 from app.routes.books import books_bp
 from app.routes.search import search_bp
+from app.services.analytics_service import AnalyticsService
 from app.services.auth_service import AuthService
 from app.services.book_service import BookService
+from app.services.catalog_service import CatalogService
+from app.services.idempotency_service import IdempotencyService
+from app.services.progress_service import ProgressService
+from app.services.recommendation_service import RecommendationService
+from app.utils.event_bus import EventBus
 from app.utils.jwt_utils import init_jwt
+from app.utils.load_shedding import DEFAULT_CLASSES, LoadShedder
+from app.utils.periodic import PeriodicTask
+from app.utils.rate_limit import MemoryBuckets, RateLimiter, parse_limit
 
 
 def create_app(config: dict | None = None) -> Flask:
@@ -30,6 +51,83 @@ def create_app(config: dict | None = None) -> Flask:
     app.config["JWT_SECRET"] = os.getenv("JWT_SECRET", secrets.token_hex(32))
     app.config["DEBUG"] = os.getenv("FLASK_DEBUG", "false").lower() == "true"
     app.config["FRONTEND_ORIGIN"] = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")
+    app.config["OPEN_LIBRARY_URL"] = os.getenv("OPEN_LIBRARY_URL", "https://openlibrary.org")
+    app.config["SSE_MAX_CONNECTIONS"] = int(os.getenv("SSE_MAX_CONNECTIONS", "100"))
+    app.config["SSE_MAX_PER_USER"] = int(os.getenv("SSE_MAX_PER_USER", "5"))
+    app.config["SSE_HEARTBEAT_SECONDS"] = 15
+    app.config["SSE_MAX_DURATION_SECONDS"] = 300
+    app.config["SSE_RETRY_MS"] = 3000
+    app.config["BATCH_MAX_OPERATIONS"] = int(os.getenv("BATCH_MAX_OPERATIONS", "100"))
+    # 0 disables the per-user read cache.
+    app.config["LIBRARY_CACHE_MAX_BYTES"] = int(os.getenv("LIBRARY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    app.config["LIBRARY_CACHE_USER_TTL_SECONDS"] = 60
+    # GET /api/metrics answers only `Authorization: Bearer <METRICS_TOKEN>`;
+    # unset, the endpoint is off (404).
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN", "")
+    app.config["IDEMPOTENCY_TTL_SECONDS"] = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    app.config["IDEMPOTENCY_WAIT_SECONDS"] = 10
+    app.config["IDEMPOTENCY_PURGE_INTERVAL_SECONDS"] = 600
+    # Raw progress events are kept this long, then folded into daily rows.
+    app.config["PROGRESS_RETENTION_DAYS"] = int(os.getenv("PROGRESS_RETENTION_DAYS", "7"))
+    app.config["PROGRESS_COMPACT_INTERVAL_SECONDS"] = 3600
+    # Deletion tombstones are kept this long for delta sync; clients that
+    # last synced before the newest purged one reload the whole library.
+    app.config["TOMBSTONE_RETENTION_DAYS"] = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+    app.config["TOMBSTONE_PURGE_INTERVAL_SECONDS"] = 3600
+    # Number of SQLite files user data is split across; change it with
+    # `flask shard-rebalance --shards N` while the app is stopped.
+    app.config["SHARD_COUNT"] = int(os.getenv("SHARD_COUNT", "1"))
+    # Group commit: single-row writes are queued to one writer thread per
+    # database file and committed together (see repositories/write_queue.py).
+    app.config["WRITE_QUEUE_ENABLED"] = os.getenv("WRITE_QUEUE_ENABLED", "false").lower() == "true"
+    app.config["WRITE_QUEUE_MAX_DELAY_MS"] = float(os.getenv("WRITE_QUEUE_MAX_DELAY_MS", "0"))
+    app.config["WRITE_QUEUE_MAX_BATCH"] = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+    # Co-reading recommendations, rebuilt by `flask rebuild-recommendations`.
+    # 0 workers = one per CPU.
+    app.config["RECOMMENDATIONS_TOP_K"] = int(os.getenv("RECOMMENDATIONS_TOP_K", "20"))
+    app.config["RECOMMENDATIONS_MIN_SUPPORT"] = int(os.getenv("RECOMMENDATIONS_MIN_SUPPORT", "2"))
+    app.config["RECOMMENDATIONS_WORKERS"] = int(os.getenv("RECOMMENDATIONS_WORKERS", "0"))
+
+    # Token buckets per route group, "N/second|minute|hour|day" (see
+    # utils/rate_limit.py). Storage "memory" is per process; "sqlite" shares
+    # buckets between workers through RATE_LIMIT_DB_PATH (default: next to DB_PATH).
+    app.config["RATE_LIMIT_ENABLED"] = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    app.config["RATE_LIMIT_SEARCH"] = os.getenv("RATE_LIMIT_SEARCH", "30/minute")
+    app.config["RATE_LIMIT_LOGIN"] = os.getenv("RATE_LIMIT_LOGIN", "10/minute")
+    app.config["RATE_LIMIT_STORAGE"] = os.getenv("RATE_LIMIT_STORAGE", "memory")
+    app.config["RATE_LIMIT_DB_PATH"] = os.getenv("RATE_LIMIT_DB_PATH", "")
+    app.config["RATE_LIMIT_MAX_KEYS"] = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    app.config["RATE_LIMIT_PURGE_INTERVAL_SECONDS"] = 600
+
+    # Adaptive concurrency limits per endpoint class (search, auth, reads,
+    # writes; see utils/load_shedding.py). Requests past the limit wait up
+    # to LOAD_SHEDDING_QUEUE_TIMEOUT_MS for a slot, then get 503.
+    app.config["LOAD_SHEDDING_ENABLED"] = os.getenv("LOAD_SHEDDING_ENABLED", "true").lower() == "true"
+    app.config["LOAD_SHEDDING_QUEUE_TIMEOUT_MS"] = int(os.getenv("LOAD_SHEDDING_QUEUE_TIMEOUT_MS", "500"))
+    app.config["LOAD_SHEDDING_CLASSES"] = DEFAULT_CLASSES
+
+    # Purges, compaction, maintenance and scheduled backups run on daemon
+    # threads in the serving process only; see "Background jobs" below.
+    app.config["BACKGROUND_JOBS_ENABLED"] = os.getenv("BACKGROUND_JOBS_ENABLED", "false").lower() == "true"
+
+    # Online snapshots (app/backups.py) into BACKUP_DIR (default: backups/
+    # next to DB_PATH). BACKUP_INTERVAL_SECONDS 0 disables the in-app
+    # schedule; `flask backup` takes one on demand.
+    app.config["BACKUP_DIR"] = os.getenv("BACKUP_DIR", "")
+    app.config["BACKUP_INTERVAL_SECONDS"] = int(os.getenv("BACKUP_INTERVAL_SECONDS", "0"))
+    app.config["BACKUP_RETAIN"] = int(os.getenv("BACKUP_RETAIN", "7"))
+    app.config["BACKUP_PAGES_PER_STEP"] = int(os.getenv("BACKUP_PAGES_PER_STEP", "1024"))
+    app.config["BACKUP_STEP_SLEEP_MS"] = int(os.getenv("BACKUP_STEP_SLEEP_MS", "5"))
+
+    # Background PRAGMA optimize / ANALYZE / WAL checkpoints / incremental
+    # vacuum (DatabaseMaintenance in database.py). Heavier steps wait until
+    # no request has arrived for DB_MAINTENANCE_IDLE_SECONDS.
+    app.config["DB_MAINTENANCE_ENABLED"] = os.getenv("DB_MAINTENANCE_ENABLED", "true").lower() == "true"
+    app.config["DB_MAINTENANCE_INTERVAL_SECONDS"] = int(os.getenv("DB_MAINTENANCE_INTERVAL_SECONDS", "60"))
+    app.config["DB_MAINTENANCE_IDLE_SECONDS"] = float(os.getenv("DB_MAINTENANCE_IDLE_SECONDS", "5"))
+    app.config["DB_ANALYZE_INTERVAL_SECONDS"] = int(os.getenv("DB_ANALYZE_INTERVAL_SECONDS", "86400"))
+    app.config["DB_WAL_CHECKPOINT_MB"] = int(os.getenv("DB_WAL_CHECKPOINT_MB", "16"))
+    app.config["DB_WAL_TRUNCATE_MB"] = int(os.getenv("DB_WAL_TRUNCATE_MB", "64"))
 
     if config:
         app.config.update(config)
@@ -44,29 +142,190 @@ def create_app(config: dict | None = None) -> Flask:
     init_jwt(app.config["JWT_SECRET"])
 
     # ── Database ────────────────────────────────────────────────────
-    init_db(app.config["DB_PATH"])
+    router = init_db(app.config["DB_PATH"], app.config["SHARD_COUNT"])
+    app.extensions["shard_router"] = router
+    maintenance = DatabaseMaintenance(
+        router,
+        analyze_interval=app.config["DB_ANALYZE_INTERVAL_SECONDS"],
+        wal_checkpoint_bytes=app.config["DB_WAL_CHECKPOINT_MB"] << 20,
+        wal_truncate_bytes=app.config["DB_WAL_TRUNCATE_MB"] << 20,
+        idle_seconds=app.config["DB_MAINTENANCE_IDLE_SECONDS"],
+    )
+    app.extensions["db_maintenance"] = maintenance
 
     # ── Dependency wiring ───────────────────────────────────────────
-    user_repo = UserRepository(db_path=app.config["DB_PATH"])
-    book_repo = BookRepository(db_path=app.config["DB_PATH"])
+    # Metric name -> zero-argument callable, reported by GET /api/metrics.
+    app.extensions["metrics"] = {}
+    app.extensions["metrics"]["db_maintenance"] = maintenance.stats
+    write_queue = None
+    if app.config["WRITE_QUEUE_ENABLED"]:
+        write_queue = WriteQueue(
+            max_delay=app.config["WRITE_QUEUE_MAX_DELAY_MS"] / 1000,
+            max_batch=app.config["WRITE_QUEUE_MAX_BATCH"],
+        )
+        app.extensions["write_queue"] = write_queue
+        app.extensions["metrics"]["write_queue"] = write_queue.stats
+    if app.config["LIBRARY_CACHE_MAX_BYTES"] > 0:
+        cache = LibraryCache(
+            max_bytes=app.config["LIBRARY_CACHE_MAX_BYTES"],
+            user_ttl=app.config["LIBRARY_CACHE_USER_TTL_SECONDS"],
+        )
+        app.extensions["library_cache"] = cache
+        app.extensions["metrics"]["library_cache"] = cache.stats
+        user_repo = CachedUserRepository(db_path=router, cache=cache, write_queue=write_queue)
+        book_repo = CachedBookRepository(db_path=router, cache=cache, write_queue=write_queue)
+    else:
+        user_repo = UserRepository(db_path=router, write_queue=write_queue)
+        book_repo = BookRepository(db_path=router, write_queue=write_queue)
 
     app.extensions["user_repository"] = user_repo
     app.extensions["auth_service"] = AuthService(repository=user_repo)
-    app.extensions["book_service"] = BookService(repository=book_repo)
+    event_bus = EventBus(
+        max_connections=app.config["SSE_MAX_CONNECTIONS"],
+        max_per_user=app.config["SSE_MAX_PER_USER"],
+    )
+    app.extensions["event_bus"] = event_bus
+    book_service = BookService(
+        repository=book_repo,
+        events=event_bus,
+        tombstone_retention_days=app.config["TOMBSTONE_RETENTION_DAYS"],
+    )
+    app.extensions["book_service"] = book_service
+    app.extensions["analytics_service"] = AnalyticsService(repository=AnalyticsRepository(db_path=router))
+    progress = ProgressService(
+        repository=ProgressRepository(db_path=router),
+        retention_days=app.config["PROGRESS_RETENTION_DAYS"],
+    )
+    app.extensions["progress_service"] = progress
+    app.extensions["recommendation_service"] = RecommendationService(
+        repository=RecommendationRepository(db_path=router),
+        books=book_repo,
+        top_k=app.config["RECOMMENDATIONS_TOP_K"],
+        min_support=app.config["RECOMMENDATIONS_MIN_SUPPORT"],
+        workers=app.config["RECOMMENDATIONS_WORKERS"] or None,
+    )
+    app.extensions["catalog_service"] = CatalogService(repository=WorkRepository(db_path=router))
+    idempotency = IdempotencyService(
+        repository=IdempotencyRepository(db_path=router),
+        ttl_seconds=app.config["IDEMPOTENCY_TTL_SECONDS"],
+        wait_seconds=app.config["IDEMPOTENCY_WAIT_SECONDS"],
+    )
+    app.extensions["idempotency_service"] = idempotency
+
+    rate_limit_store = None
+    if app.config["RATE_LIMIT_ENABLED"]:
+        limits = {
+            "search": parse_limit(app.config["RATE_LIMIT_SEARCH"]),
+            "login": parse_limit(app.config["RATE_LIMIT_LOGIN"]),
+        }
+        if app.config["RATE_LIMIT_STORAGE"] == "sqlite":
+            db_path = Path(app.config["DB_PATH"])
+            rate_limit_store = RateLimitRepository(
+                app.config["RATE_LIMIT_DB_PATH"] or str(db_path.with_name(f"{db_path.stem}.ratelimit{db_path.suffix}"))
+            )
+            limiter = RateLimiter(limits, rate_limit_store)
+        else:
+            limiter = RateLimiter(limits, MemoryBuckets(max_keys=app.config["RATE_LIMIT_MAX_KEYS"]))
+        app.extensions["rate_limiter"] = limiter
+        app.extensions["metrics"]["rate_limit"] = limiter.stats
+
+    backups = BackupManager(
+        router,
+        app.config["BACKUP_DIR"] or Path(app.config["DB_PATH"]).parent / "backups",
+        retain=app.config["BACKUP_RETAIN"],
+        pages_per_step=app.config["BACKUP_PAGES_PER_STEP"],
+        step_sleep=app.config["BACKUP_STEP_SLEEP_MS"] / 1000,
+    )
+    app.extensions["backups"] = backups
+    app.extensions["metrics"]["backups"] = backups.stats
+
+    # ── Background jobs ─────────────────────────────────────────────
+    # Built here, started only by the serving process: with
+    # BACKGROUND_JOBS_ENABLED (set it for gunicorn) or start_background_jobs()
+    # (run.py's dev server), so CLI commands, tests and bench scripts don't
+    # spawn them. `flask purge-idempotency-keys`, `flask purge-tombstones`,
+    # `flask compact-progress`, `flask backup` and `flask db-maintenance`
+    # run the same jobs on demand.
+    jobs = {
+        "idempotency_purge": PeriodicTask(
+            "idempotency-purge", app.config["IDEMPOTENCY_PURGE_INTERVAL_SECONDS"], idempotency.purge_expired
+        ),
+        "tombstone_purge": PeriodicTask(
+            "tombstone-purge", app.config["TOMBSTONE_PURGE_INTERVAL_SECONDS"], book_service.purge_tombstones
+        ),
+        "progress_compaction": PeriodicTask(
+            "progress-compaction", app.config["PROGRESS_COMPACT_INTERVAL_SECONDS"], progress.compact
+        ),
+    }
+    if rate_limit_store is not None:
+        longest = max(limit.period for limit in limiter.limits.values())
+        jobs["rate_limit_purge"] = PeriodicTask(
+            "rate-limit-purge", app.config["RATE_LIMIT_PURGE_INTERVAL_SECONDS"],
+            lambda: rate_limit_store.purge(time.time(), longest),
+        )
+    if app.config["DB_MAINTENANCE_ENABLED"]:
+        jobs["db_maintenance"] = PeriodicTask(
+            "db-maintenance", app.config["DB_MAINTENANCE_INTERVAL_SECONDS"], maintenance.run
+        )
+    if app.config["BACKUP_INTERVAL_SECONDS"] > 0:
+        jobs["backup"] = PeriodicTask("backup", app.config["BACKUP_INTERVAL_SECONDS"], backups.snapshot)
+    app.extensions["background_jobs"] = jobs
+    if app.config["BACKGROUND_JOBS_ENABLED"]:
+        start_background_jobs(app)
 
     # ── Blueprints ──────────────────────────────────────────────────
     app.register_blueprint(auth_bp)
     app.register_blueprint(books_bp)
     app.register_blueprint(search_bp)
 
+    # Every request postpones the heavier maintenance steps (see DatabaseMaintenance).
+    @app.before_request
+    def note_activity():
+        maintenance.touch()
+
+    # ── Load shedding ───────────────────────────────────────────────
+    if app.config["LOAD_SHEDDING_ENABLED"]:
+        shedder = LoadShedder(
+            app.config["LOAD_SHEDDING_CLASSES"], app.config["LOAD_SHEDDING_QUEUE_TIMEOUT_MS"] / 1000
+        )
+        app.extensions["load_shedder"] = shedder
+        app.extensions["metrics"]["load_shedding"] = shedder.stats
+
+        @app.before_request
+        def admit_request():
+            limiter = shedder.limiter_for(request.endpoint, request.method)
+            if limiter is None:
+                return None
+            if not limiter.acquire():
+                response = jsonify({"error": "Server is busy. Try again shortly."})
+                response.status_code = 503
+                response.headers["Retry-After"] = str(limiter.retry_after())
+                return response
+            g.load_slot = (limiter, time.perf_counter())
+            return None
+
+        @app.teardown_request
+        def release_slot(exc):
+            slot = g.pop("load_slot", None)
+            if slot is not None:
+                limiter, started = slot
+                limiter.release(time.perf_counter() - started)
+
+    # ── CLI ─────────────────────────────────────────────────────────
+    register_commands(app)
+
     # ── CORS ────────────────────────────────────────────────────────
     # Manual CORS — no flask-cors dependency needed.
     @app.after_request
     def add_cors_headers(response):
         origin = app.config["FRONTEND_ORIGIN"]
         response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, Last-Event-ID, Idempotency-Key"
         response.headers["Access-Control-Allow-Methods"] = "GET, POST, PATCH, DELETE, OPTIONS"
+        response.headers["Access-Control-Expose-Headers"] = (
+            "X-Library-Version, Idempotent-Replayed, ETag, "
+            "RateLimit-Limit, RateLimit-Remaining, RateLimit-Reset, Retry-After"
+        )
         return response
 
     @app.route("/api/<path:path>", methods=["OPTIONS"])
@@ -78,6 +337,16 @@ def create_app(config: dict | None = None) -> Flask:
     def health():
         return jsonify({"status": "ok"}), 200
 
+    @app.route("/api/metrics")
+    def metrics():
+        """Process-local counters (each worker reports its own), for operators only."""
+        token = app.config["METRICS_TOKEN"]
+        if not token:
+            return jsonify({"error": "Resource not found."}), 404
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return jsonify({"error": "Missing or invalid metrics token."}), 401
+        return jsonify({name: read() for name, read in app.extensions["metrics"].items()}), 200
+
     # ── Error handlers ──────────────────────────────────────────────
     @app.errorhandler(404)
     def not_found(e):
@@ -93,3 +362,12 @@ def create_app(config: dict | None = None) -> Flask:
         return jsonify({"error": "Internal server error."}), 500
 
     return app
+
+
+def start_background_jobs(app: Flask) -> None:
+    """Start the app's periodic jobs (once; later calls do nothing)."""
+    if app.extensions.get("background_jobs_started"):
+        return
+    app.extensions["background_jobs_started"] = True
+    for task in app.extensions["background_jobs"].values():
+        task.start()
@@ -0,0 +1,353 @@
+"""
+Online snapshots of the database files, taken while the app is running.
+
+Copying booklog.db with cp is unsafe under WAL: committed pages may still
+be in booklog.db-wal, and a copy taken mid-checkpoint is torn. Snapshots
+use SQLite's online backup API instead. It copies pages_per_step pages
+per step, each step a short read transaction, and sleeps between steps
+so request threads get the CPU. In WAL mode readers never block writers,
+so a snapshot only delays checkpoints. A write from another connection
+makes SQLite restart the copy. After max_restarts the rest is taken in a
+single step, which is still only a read transaction.
+
+Compression, not the copy, is most of a snapshot's CPU time, so it runs
+at gzip level 1 (barely larger than level 6, under half the time) and
+also sleeps between 1 MiB chunks.
+
+A snapshot is a directory <stem>-<UTC time>/ under the backup dir with
+one gzipped file per shard and a manifest.json (checksums, page counts,
+schema version, timings). It is assembled under a dot-prefixed name and
+renamed when complete, so a crash never leaves a snapshot that looks
+whole. Each shard file is consistent on its own, and a user's rows all
+live in one file. Only the newest `retain` snapshots are kept.
+
+Restoring is offline: `flask restore-backup NAME --to PATH` unpacks into
+files that don't exist yet. `flask verify-backup` restores into a temp
+dir and checks checksums, PRAGMA integrity_check and foreign keys.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from app import migrations
+from app.database import ShardRouter, get_db
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+_LOCK = ".snapshot-in-progress"
+# A lock left by a process that died mid-snapshot is ignored after this long.
+_STALE_LOCK_SECONDS = 3600
+_CHUNK = 1 << 20
+
+
+class BackupError(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy_online(source: str, target: str, pages_per_step: int, step_sleep: float, max_restarts: int) -> int:
+    """Backup-API copy of source into a new file at target. Returns the number of restarts."""
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    src = get_db(source)
+    dst = sqlite3.connect(target)
+    try:
+        try:
+            src.backup(dst, pages=pages_per_step, progress=progress)
+        except _TooManyRestarts:
+            # Writers dirty pages faster than we copy them; finish in one step.
+            src.backup(dst, pages=-1)
+        # The copy is read from a single file, so leave it out of WAL mode.
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        src.close()
+        dst.close()
+    return restarts
+
+
+def _compress(source: Path, target: Path, level: int, chunk_sleep: float) -> tuple[str, int]:
+    """gzip source into target; (sha256 of the uncompressed bytes, uncompressed size)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(source, "rb") as raw, gzip.open(target, "wb", compresslevel=level) as out:
+        while chunk := raw.read(_CHUNK):
+            digest.update(chunk)
+            size += len(chunk)
+            out.write(chunk)
+            if chunk_sleep:
+                time.sleep(chunk_sleep)
+    return digest.hexdigest(), size
+
+
+def _decompress(source: Path, target: Path) -> str:
+    """gunzip source into target; returns the sha256 of what was written."""
+    digest = hashlib.sha256()
+    with gzip.open(source, "rb") as packed, open(target, "wb") as out:
+        while chunk := packed.read(_CHUNK):
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(snapshot: str | Path) -> dict:
+    path = Path(snapshot) / MANIFEST
+    if not path.is_file():
+        raise BackupError(f"{snapshot} is not a snapshot (no {MANIFEST}).")
+    return json.loads(path.read_text())
+
+
+class BackupManager:
+    def __init__(
+        self,
+        router: ShardRouter,
+        backup_dir: str | Path,
+        retain: int = 7,
+        pages_per_step: int = 1024,
+        step_sleep: float = 0.005,
+        max_restarts: int = 3,
+        compress_level: int = 1,
+    ):
+        self._router = router
+        self.backup_dir = Path(backup_dir)
+        self.retain = retain
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._failures = 0
+
+    def snapshots(self) -> list[Path]:
+        """Complete snapshots, oldest first."""
+        if not self.backup_dir.is_dir():
+            return []
+        found = [
+            p for p in self.backup_dir.iterdir()
+            if p.is_dir() and not p.name.startswith(".") and (p / MANIFEST).is_file()
+        ]
+        return sorted(found, key=lambda p: (read_manifest(p)["created_at"], p.name))
+
+    def resolve(self, name: Optional[str] = None) -> Path:
+        """A snapshot by directory name (or path); the newest one if name is None."""
+        if name is None:
+            snapshots = self.snapshots()
+            if not snapshots:
+                raise BackupError(f"No snapshots in {self.backup_dir}.")
+            return snapshots[-1]
+        path = Path(name) if Path(name).is_dir() else self.backup_dir / name
+        read_manifest(path)
+        return path
+
+    def _claim(self) -> Optional[Path]:
+        """Take the cross-process snapshot lock (a directory: mkdir is atomic). None if it's held."""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        lock = self.backup_dir / _LOCK
+        try:
+            lock.mkdir()
+        except FileExistsError:
+            if time.time() - lock.stat().st_mtime < _STALE_LOCK_SECONDS:
+                return None
+            logger.warning("Removing stale snapshot lock %s", lock)
+            shutil.rmtree(lock, ignore_errors=True)
+            try:
+                lock.mkdir()
+            except FileExistsError:
+                return None
+        return lock
+
+    def snapshot(self) -> Optional[dict]:
+        """
+        Take a snapshot of every shard file and prune old ones. Returns the
+        manifest, or None if another process is already taking one.
+        """
+        with self._lock:
+            lock = self._claim()
+            if lock is None:
+                logger.info("Snapshot skipped: another one is in progress in %s", self.backup_dir)
+                return None
+            try:
+                manifest = self._snapshot(lock)
+            except Exception:
+                self._failures += 1
+                raise
+            finally:
+                shutil.rmtree(lock, ignore_errors=True)
+        self.prune()
+        return manifest
+
+    def _snapshot(self, work: Path) -> dict:
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        stem = Path(self._router.db_path).stem
+        name = f"{stem}-{now.strftime('%Y%m%dT%H%M%SZ')}"
+        suffix = 0
+        while (self.backup_dir / name).exists():
+            suffix += 1
+            name = f"{stem}-{now.strftime('%Y%m%dT%H%M%SZ')}-{suffix}"
+
+        files = []
+        for shard, source in enumerate(self._router.shard_paths()):
+            copy_started = time.perf_counter()
+            raw = work / Path(source).name
+            restarts = _copy_online(source, str(raw), self.pages_per_step, self.step_sleep, self.max_restarts)
+            copied = time.perf_counter() - copy_started
+            conn = sqlite3.connect(raw)
+            try:
+                pages = conn.execute("PRAGMA page_count").fetchone()[0]
+                page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            finally:
+                conn.close()
+            version = migrations.current_version(raw)
+            packed = work / f"{raw.name}.gz"
+            sha256, size = _compress(raw, packed, self.compress_level, self.step_sleep)
+            raw.unlink()
+            files.append({
+                "shard": shard,
+                "file": packed.name,
+                "sha256": sha256,
+                "bytes": size,
+                "compressed_bytes": packed.stat().st_size,
+                "pages": pages,
+                "page_size": page_size,
+                "schema_version": version,
+                "copy_seconds": round(copied, 3),
+                "compress_seconds": round(time.perf_counter() - copy_started - copied, 3),
+                "restarts": restarts,
+            })
+
+        manifest = {
+            "name": name,
+            "created_at": now.isoformat(timespec="seconds"),
+            "source": self._router.db_path,
+            "shard_count": self._router.shard_count,
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "files": files,
+        }
+        (work / MANIFEST).write_text(json.dumps(manifest, indent=2))
+        # The lock directory is the work directory: renaming it publishes
+        # the snapshot and releases the lock in one step.
+        work.rename(self.backup_dir / name)
+        logger.info(
+            "Snapshot %s: %d file(s), %d bytes (%d compressed) in %.2fs",
+            name, len(files), sum(f["bytes"] for f in files),
+            sum(f["compressed_bytes"] for f in files), manifest["duration_seconds"],
+        )
+        return manifest
+
+    def prune(self) -> list[str]:
+        """Delete all but the newest `retain` snapshots. Returns the names removed."""
+        snapshots = self.snapshots()
+        doomed = snapshots[:-self.retain] if self.retain > 0 else []
+        for path in doomed:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.info("Removed old snapshot %s", path.name)
+        return [p.name for p in doomed]
+
+    def stats(self) -> dict:
+        snapshots = self.snapshots()
+        stats = {"snapshots": len(snapshots), "failures": self._failures, "last": None}
+        if snapshots:
+            last = read_manifest(snapshots[-1])
+            created = datetime.fromisoformat(last["created_at"])
+            stats["last"] = {
+                "name": last["name"],
+                "age_seconds": int((datetime.now(timezone.utc) - created).total_seconds()),
+                "duration_seconds": last["duration_seconds"],
+                "bytes": sum(f["bytes"] for f in last["files"]),
+                "compressed_bytes": sum(f["compressed_bytes"] for f in last["files"]),
+            }
+        return stats
+
+
+def restore_snapshot(snapshot: str | Path, db_path: str | Path) -> list[str]:
+    """
+    Unpack a snapshot as a database at db_path (its shards alongside, named
+    as ShardRouter expects). Refuses to overwrite anything; run it with
+    the app stopped and point DB_PATH at the result. Returns the files written.
+    """
+    snapshot = Path(snapshot)
+    manifest = read_manifest(snapshot)
+    router = ShardRouter(db_path, manifest["shard_count"])
+    targets = [Path(router.shard_path(f["shard"])) for f in manifest["files"]]
+    existing = [str(t) for t in targets if t.exists() or Path(f"{t}-wal").exists()]
+    if existing:
+        raise BackupError(f"Refusing to overwrite {', '.join(existing)}.")
+
+    written = []
+    try:
+        for entry, target in zip(manifest["files"], targets):
+            target.parent.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(f".{target.name}.restoring")
+            if _decompress(snapshot / entry["file"], partial) != entry["sha256"]:
+                partial.unlink()
+                raise BackupError(f"{entry['file']} does not match its checksum.")
+            partial.rename(target)
+            written.append(str(target))
+    except Exception:
+        for path in written:
+            os.unlink(path)
+        raise
+    return written
+
+
+def verify_snapshot(snapshot: str | Path) -> dict:
+    """
+    Restore a snapshot into a temp dir and check it: checksums, PRAGMA
+    integrity_check, foreign keys, and the schema version in the manifest.
+    Returns {"name", "ok", "files": [{"file", "ok", "problems", "users", "books"}]}.
+    """
+    snapshot = Path(snapshot)
+    manifest = read_manifest(snapshot)
+    report = {"name": manifest["name"], "ok": True, "files": []}
+    with tempfile.TemporaryDirectory() as scratch:
+        for entry in manifest["files"]:
+            result = {"file": entry["file"], "ok": True, "problems": [], "users": None, "books": None}
+            restored = Path(scratch) / entry["file"].removesuffix(".gz")
+            try:
+                if _decompress(snapshot / entry["file"], restored) != entry["sha256"]:
+                    result["problems"].append("checksum mismatch")
+                conn = sqlite3.connect(restored)
+                try:
+                    integrity = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+                    if integrity != ["ok"]:
+                        result["problems"].extend(integrity)
+                    if conn.execute("PRAGMA foreign_key_check").fetchone():
+                        result["problems"].append("foreign key violations")
+                    result["users"] = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+                    result["books"] = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+                finally:
+                    conn.close()
+                if migrations.current_version(restored) != entry["schema_version"]:
+                    result["problems"].append("schema version differs from the manifest")
+            except (OSError, EOFError, sqlite3.DatabaseError) as e:
+                result["problems"].append(str(e))
+            result["ok"] = not result["problems"]
+            report["ok"] = report["ok"] and result["ok"]
+            report["files"].append(result)
+    return report
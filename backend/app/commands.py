@@ -0,0 +1,156 @@
+"""
+Operational CLI commands, registered on the Flask CLI.
+
+Usage (from backend/):
+    flask --app run db-status
+    flask --app run db-maintenance [--enable-incremental-vacuum]
+    flask --app run purge-idempotency-keys
+    flask --app run purge-tombstones
+    flask --app run rebuild-analytics [--user-id N]
+    flask --app run compact-progress
+    flask --app run rebuild-recommendations [--workers N]
+    flask --app run shard-status
+    flask --app run shard-rebalance --shards 4
+    flask --app run backup
+    flask --app run list-backups
+    flask --app run verify-backup [NAME]
+    flask --app run restore-backup NAME --to PATH
+"""
+
+import click
+from flask import Flask
+
+from app import backups, database, migrations, sharding
+
+
+def register_commands(app: Flask) -> None:
+    @app.cli.command("db-status")
+    def db_status():
+        """Show applied and pending schema migrations."""
+        for m in migrations.status(app.config["DB_PATH"]):
+            state = m["applied_at"] or "pending"
+            if m["backfill_pending"]:
+                state += " (backfill pending)"
+            click.echo(f"{m['version']:>4}  {m['name']:<32} {state}")
+
+    @app.cli.command("db-maintenance")
+    @click.option("--enable-incremental-vacuum", is_flag=True,
+                  help="First rebuild files that lack auto_vacuum=INCREMENTAL (full VACUUM; stop the app).")
+    def db_maintenance(enable_incremental_vacuum):
+        """Run one maintenance pass now: ANALYZE, WAL checkpoint, incremental vacuum."""
+        maintenance = app.extensions["db_maintenance"]
+        if enable_incremental_vacuum:
+            for path in app.extensions["shard_router"].shard_paths():
+                database.enable_incremental_vacuum(path)
+                click.echo(f"Rebuilt {path} with auto_vacuum=INCREMENTAL.")
+        report = maintenance.run(force=True)
+        for s in report["shards"]:
+            checkpoint = s["checkpoint"]["mode"].lower() if s["checkpoint"] else "no"
+            click.echo(
+                f"{s['path']}: {'analyzed' if s['analyzed'] else 'optimized'}, {checkpoint} checkpoint "
+                f"(wal {s['wal_bytes']} -> {s['wal_bytes_after']} bytes), vacuumed {s['vacuumed_pages']} pages, "
+                f"{s['freelist_pages']} free, auto_vacuum {s['auto_vacuum']}"
+                + (f", error: {s['error']}" if s["error"] else "")
+            )
+
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys():
+        """Delete expired Idempotency-Key records."""
+        deleted = app.extensions["idempotency_service"].purge_expired()
+        click.echo(f"Deleted {deleted} expired idempotency keys.")
+
+    @app.cli.command("purge-tombstones")
+    def purge_tombstones():
+        """Delete sync tombstones older than TOMBSTONE_RETENTION_DAYS."""
+        deleted = app.extensions["book_service"].purge_tombstones()
+        click.echo(f"Deleted {deleted} tombstones.")
+
+    @app.cli.command("rebuild-analytics")
+    @click.option("--user-id", type=int, default=None, help="Only this user (default: everyone).")
+    def rebuild_analytics(user_id):
+        """Recompute the reading-analytics rollups from books."""
+        rebuilt = app.extensions["analytics_service"].rebuild(user_id)
+        click.echo(f"Rebuilt analytics for {rebuilt} users.")
+
+    @app.cli.command("compact-progress")
+    def compact_progress():
+        """Fold progress events older than PROGRESS_RETENTION_DAYS into daily rows."""
+        result = app.extensions["progress_service"].compact()
+        click.echo(f"Folded {result['folded']} progress events; dropped {result['dropped']} for deleted books.")
+
+    @app.cli.command("rebuild-recommendations")
+    @click.option("--workers", type=int, default=None, help="Worker processes (default: RECOMMENDATIONS_WORKERS).")
+    def rebuild_recommendations(workers):
+        """Recompute the co-reading neighbors behind GET /api/books/<id>/recommendations."""
+        result = app.extensions["recommendation_service"].rebuild(workers)
+        click.echo(
+            f"{result['library_entries']} library entries, {result['isbns']} ISBNs; "
+            f"stored {result['rows']} neighbors for {result['isbns_with_neighbors']} ISBNs "
+            f"(load {result['load_seconds']}s, similarity {result['similarity_seconds']}s, "
+            f"store {result['store_seconds']}s)."
+        )
+
+    @app.cli.command("shard-status")
+    def shard_status():
+        """Show users and books per shard file."""
+        for s in sharding.shard_status(app.config["DB_PATH"]):
+            click.echo(f"{s['shard']:>3}  {s['users']:>8} users  {s['books']:>10} books  {s['path']}")
+
+    @app.cli.command("shard-rebalance")
+    @click.option("--shards", type=int, required=True, help="New number of shards (1 = unsharded).")
+    def shard_rebalance(shards):
+        """Move users so each lives on shard user_id % SHARDS. Stop the app first and run with SHARD_COUNT set to the current layout."""
+        if shards < 1:
+            raise click.BadParameter("must be at least 1", param_hint="--shards")
+        result = sharding.rebalance(app.config["DB_PATH"], shards)
+        click.echo(f"Rebalanced from {result['from']} to {result['to']} shards; moved {result['moved']} users.")
+        click.echo(f"Set SHARD_COUNT={shards} before starting the app.")
+
+    @app.cli.command("backup")
+    def backup():
+        """Take an online snapshot of the database now (safe while the app is running)."""
+        manifest = app.extensions["backups"].snapshot()
+        if manifest is None:
+            raise click.ClickException("Another snapshot is in progress.")
+        for f in manifest["files"]:
+            click.echo(
+                f"{f['file']:<32} {f['bytes']:>12} bytes -> {f['compressed_bytes']:>10} "
+                f"(copy {f['copy_seconds']}s, {f['restarts']} restarts; compress {f['compress_seconds']}s)"
+            )
+        click.echo(f"Snapshot {manifest['name']} in {manifest['duration_seconds']}s.")
+
+    @app.cli.command("list-backups")
+    def list_backups():
+        """List snapshots in BACKUP_DIR, oldest first."""
+        for path in app.extensions["backups"].snapshots():
+            m = backups.read_manifest(path)
+            size = sum(f["compressed_bytes"] for f in m["files"])
+            click.echo(f"{m['name']:<40} {m['created_at']}  {len(m['files'])} file(s)  {size:>12} bytes")
+
+    @app.cli.command("verify-backup")
+    @click.argument("name", required=False)
+    def verify_backup(name):
+        """Restore a snapshot (default: the newest) into a temp dir and check it."""
+        try:
+            path = app.extensions["backups"].resolve(name)
+        except backups.BackupError as e:
+            raise click.ClickException(str(e))
+        report = backups.verify_snapshot(path)
+        for f in report["files"]:
+            state = "ok" if f["ok"] else "FAILED: " + "; ".join(f["problems"])
+            click.echo(f"{f['file']:<32} {f['users']} users, {f['books']} books  {state}")
+        if not report["ok"]:
+            raise click.ClickException(f"Snapshot {report['name']} failed verification.")
+        click.echo(f"Snapshot {report['name']} verified.")
+
+    @app.cli.command("restore-backup")
+    @click.argument("name")
+    @click.option("--to", "target", required=True, help="New database path (must not exist).")
+    def restore_backup(name, target):
+        """Unpack a snapshot as a new database. Stop the app, then point DB_PATH at it."""
+        try:
+            written = backups.restore_snapshot(app.extensions["backups"].resolve(name), target)
+        except backups.BackupError as e:
+            raise click.ClickException(str(e))
+        for path in written:
+            click.echo(f"Restored {path}")
@@ -1,56 +1,226 @@
 """
 Database bootstrap.
 
-All schema definitions live here.
+Schema definitions live in app/migrations/, applied in order by init_db().
 Only repositories import get_db() — no other layer touches the DB.
+
+Storage can be split across several SQLite files (shards) to get one
+writer per file instead of one writer overall; see ShardRouter.
+DatabaseMaintenance keeps the files healthy in the background.
 """
 
+import logging
+import os
 import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
+
+from app.migrations import migrate
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_DB_PATH = Path(__file__).parent.parent / "booklog.db"
 
-_SCHEMA = """
-CREATE TABLE IF NOT EXISTS users (
-    id            INTEGER PRIMARY KEY AUTOINCREMENT,
-    email         TEXT    NOT NULL UNIQUE,
-    name          TEXT,
-    password_hash TEXT    NOT NULL,
-    created_at    TEXT    NOT NULL
-);
+# Each shard hands out book ids from its own block so ids stay unique
+# across shards and a user can be moved without renumbering. 2**40 ids per
+# shard; ids stay below 2**53 (exact in JavaScript) for up to 8192 shards.
+SHARD_ID_BLOCK = 2 ** 40
 
-CREATE TABLE IF NOT EXISTS books (
-    id            INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id       INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-    title         TEXT    NOT NULL,
-    author        TEXT    NOT NULL,
-    isbn          TEXT,
-    status        TEXT    NOT NULL,
-    rating        INTEGER,
-    page_count    INTEGER,
-    notes         TEXT,
-    cover_url     TEXT,
-    date_added    TEXT    NOT NULL,
-    date_finished TEXT,
-    UNIQUE(user_id, isbn)
+_DIRECTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_directory (
+    id    INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT    NOT NULL UNIQUE,
+    shard INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS directory_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
 );
-
-CREATE INDEX IF NOT EXISTS idx_books_user   ON books(user_id);
-CREATE INDEX IF NOT EXISTS idx_books_status ON books(user_id, status);
-CREATE INDEX IF NOT EXISTS idx_users_email  ON users(email);
 """
 
 
-def init_db(db_path: str | Path = DEFAULT_DB_PATH) -> None:
-    """Create tables if they don't exist. Safe to call on every startup."""
-    conn = sqlite3.connect(str(db_path))
+class ShardConfigError(Exception):
+    pass
+
+
+class ShardRouter:
+    """
+    Maps a user_id to the SQLite file that holds that user's rows.
+
+    shard_count 1 (the default): everything lives in db_path, exactly as
+    an unsharded install.
+
+    shard_count N: shard 0 is db_path and shards 1..N-1 sit next to it as
+    <name>.shard<i>.db. Every shard has the full schema. db_path also holds
+    the directory (user_directory: email -> id -> shard), which allocates
+    user ids and serves login lookups. A user's shard is read from the
+    directory once per process and then cached; moves are done offline
+    with `flask shard-rebalance` (see app/sharding.py).
+    """
+
+    def __init__(self, db_path: str | Path, shard_count: int = 1):
+        if shard_count < 1:
+            raise ShardConfigError("shard_count must be at least 1.")
+        self.db_path = str(db_path)
+        self.shard_count = shard_count
+        self._shard_of: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_count > 1
+
+    @property
+    def directory_path(self) -> str:
+        return self.db_path
+
+    def shard_path(self, shard: int) -> str:
+        if shard == 0:
+            return self.db_path
+        path = Path(self.db_path)
+        return str(path.with_name(f"{path.stem}.shard{shard}{path.suffix}"))
+
+    def shard_paths(self) -> list[str]:
+        return [self.shard_path(i) for i in range(self.shard_count)]
+
+    def shard_for(self, user_id: int) -> int:
+        if not self.sharded:
+            return 0
+        shard = self._shard_of.get(user_id)
+        if shard is None:
+            conn = get_db(self.directory_path)
+            try:
+                row = conn.execute("SELECT shard FROM user_directory WHERE id = ?", (user_id,)).fetchone()
+            finally:
+                conn.close()
+            if row is None:
+                return user_id % self.shard_count  # unknown user: any shard finds nothing
+            shard = row["shard"]
+            with self._lock:
+                self._shard_of[user_id] = shard
+        return shard
+
+    def path_for(self, user_id: int) -> str:
+        return self.shard_path(self.shard_for(user_id))
+
+    def assign(self, user_id: int, shard: int) -> None:
+        """Record where a user lives (after registration or a move)."""
+        with self._lock:
+            self._shard_of[user_id] = shard
+
+    def forget(self, user_id: int) -> None:
+        with self._lock:
+            self._shard_of.pop(user_id, None)
+
+    def init_shards(self) -> None:
+        """Migrate every shard file (creating it if needed) and reserve its id block."""
+        for shard, path in enumerate(self.shard_paths()):
+            _create_file(path)
+            migrate(path)
+            _reserve_id_block(path, shard)
+
+    def init(self) -> None:
+        """init_shards(), then check the layout on disk matches shard_count."""
+        self.init_shards()
+
+        if not self.sharded:
+            stored = stored_shard_count(self.db_path)
+            if stored > 1:
+                raise ShardConfigError(
+                    f"Database is split into {stored} shards; set SHARD_COUNT or "
+                    f"run `flask shard-rebalance --shards 1`."
+                )
+            return
+        conn = get_db(self.directory_path)
+        try:
+            create_directory(conn)
+            stored = conn.execute("SELECT value FROM directory_meta WHERE key = 'shard_count'").fetchone()
+            if stored is None:
+                users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+                if users:
+                    raise ShardConfigError(
+                        f"{self.db_path} holds {users} unsharded users; "
+                        f"run `flask shard-rebalance --shards {self.shard_count}` first."
+                    )
+                conn.execute("INSERT INTO directory_meta (key, value) VALUES ('shard_count', ?)", (str(self.shard_count),))
+            elif int(stored["value"]) != self.shard_count:
+                raise ShardConfigError(
+                    f"Database is split into {stored['value']} shards but SHARD_COUNT is {self.shard_count}; "
+                    f"run `flask shard-rebalance --shards {self.shard_count}`."
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def create_directory(conn: sqlite3.Connection) -> None:
+    for statement in _DIRECTORY_SCHEMA.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def stored_shard_count(db_path: str | Path) -> int:
+    """Shard count recorded in the directory; 1 for an unsharded database."""
+    conn = get_db(db_path)
     try:
-        conn.executescript(_SCHEMA)
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'directory_meta'").fetchone():
+            return 1
+        row = conn.execute("SELECT value FROM directory_meta WHERE key = 'shard_count'").fetchone()
+        return int(row["value"]) if row else 1
+    finally:
+        conn.close()
+
+
+def as_router(db: "str | Path | ShardRouter") -> ShardRouter:
+    """Repositories accept a plain path (single file) or a ShardRouter."""
+    return db if isinstance(db, ShardRouter) else ShardRouter(db)
+
+
+def _create_file(path: str) -> None:
+    """
+    New files get auto_vacuum=INCREMENTAL so maintenance can hand freed
+    pages back to the OS. It only takes effect before the file has any
+    tables or is switched to WAL; older files need enable_incremental_vacuum().
+    """
+    if os.path.exists(path):
+        return
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+
+
+def _reserve_id_block(path: str, shard: int) -> None:
+    if shard == 0:
+        return
+    conn = get_db(path)
+    try:
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'books', ? "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'books')",
+            (shard * SHARD_ID_BLOCK,),
+        )
         conn.commit()
     finally:
         conn.close()
 
 
+def init_db(db_path: str | Path = DEFAULT_DB_PATH, shard_count: int = 1) -> ShardRouter:
+    """
+    Apply any pending schema migrations (to every shard). Safe to call on
+    every startup: when the schema is current this is a single version
+    lookup per file. Returns the router for the layout.
+    """
+    router = ShardRouter(db_path, shard_count)
+    router.init()
+    return router
+
+
 def get_db(db_path: str | Path = DEFAULT_DB_PATH) -> sqlite3.Connection:
     """
     Return a configured sqlite3 connection.
@@ -61,3 +231,195 @@ def get_db(db_path: str | Path = DEFAULT_DB_PATH) -> sqlite3.Connection:
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA journal_mode = WAL")
     return conn
+
+
+_AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+# (table, leading column) of every index, primary keys of WITHOUT ROWID
+# tables included; see DatabaseMaintenance.
+_INDEXED_COLUMNS = """
+    SELECT DISTINCT m.name, ii.name FROM sqlite_schema m
+    JOIN pragma_index_list(m.name) il JOIN pragma_index_info(il.name) ii
+    WHERE m.type = 'table' AND ii.seqno = 0 AND ii.name IS NOT NULL
+"""
+
+
+def enable_incremental_vacuum(db_path: str | Path) -> None:
+    """
+    Switch an existing file to auto_vacuum=INCREMENTAL. This needs a full
+    VACUUM, which rewrites the file and locks it throughout, so run it
+    with the app stopped (`flask db-maintenance --enable-incremental-vacuum`).
+    """
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+class DatabaseMaintenance:
+    """
+    Housekeeping for every shard file, run from a PeriodicTask:
+
+    - PRAGMA optimize on each run without a full ANALYZE: SQLite analyzes
+      tables that have no statistics or have grown about 25x since their
+      last analysis, so it is cheap and keeps plans from drifting. Before
+      3.46 it only looks at tables this connection has planned queries
+      against, so the run first plans (EXPLAIN QUERY PLAN, reading no
+      rows) a lookup on the leading column of every index.
+    - A full ANALYZE every analyze_interval seconds. analysis_limit caps
+      the rows sampled per index, so its cost doesn't grow with the table.
+    - A PASSIVE WAL checkpoint once the -wal file passes wal_checkpoint_bytes.
+      It copies what it can without waiting for readers or blocking writers.
+      Past wal_truncate_bytes, an idle run uses TRUNCATE instead, which
+      also shrinks the file back to zero.
+    - In idle periods, PRAGMA incremental_vacuum returns free pages to the
+      OS, vacuum_step pages at a time (files created with auto_vacuum=INCREMENTAL).
+
+    "Idle" means no request for idle_seconds (the app calls touch() on
+    every request). ANALYZE, TRUNCATE and vacuuming wait for an idle run,
+    and vacuuming stops as soon as a request arrives. The maintenance
+    connection uses a short busy_timeout, so a locked file skips a step
+    rather than holding up writers. Each worker runs its own copy, and
+    every step is safe to repeat.
+    """
+
+    def __init__(
+        self,
+        router: "ShardRouter",
+        analyze_interval: float = 86400,
+        wal_checkpoint_bytes: int = 16 << 20,
+        wal_truncate_bytes: int = 64 << 20,
+        idle_seconds: float = 5.0,
+        vacuum_step: int = 256,
+        step_sleep: float = 0.01,
+        analysis_limit: int = 1000,
+        busy_timeout_ms: int = 100,
+        clock=time.monotonic,
+    ):
+        self._router = router
+        self.analyze_interval = analyze_interval
+        self.wal_checkpoint_bytes = wal_checkpoint_bytes
+        self.wal_truncate_bytes = wal_truncate_bytes
+        self.idle_seconds = idle_seconds
+        self.vacuum_step = vacuum_step
+        self.step_sleep = step_sleep
+        self.analysis_limit = analysis_limit
+        self.busy_timeout_ms = busy_timeout_ms
+        self._clock = clock
+        self._last_request = float("-inf")
+        self._last_analyze: dict[str, float] = {}
+        self._run_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._totals = {"runs": 0, "analyzes": 0, "checkpoints": 0, "vacuumed_pages": 0, "errors": 0}
+        self._last: Optional[dict] = None
+
+    def touch(self) -> None:
+        """Note request activity; heavier steps wait until it has been quiet for idle_seconds."""
+        self._last_request = self._clock()
+
+    def idle(self) -> bool:
+        return self._clock() - self._last_request >= self.idle_seconds
+
+    def run(self, force: bool = False) -> dict:
+        """
+        One pass over every shard file. Returns (and logs) what was done.
+        force (for the CLI) runs every step now: a full ANALYZE, a TRUNCATE
+        checkpoint of any WAL, and vacuuming regardless of traffic.
+        """
+        with self._run_lock:
+            started = time.perf_counter()
+            idle = force or self.idle()
+            shards = [self._maintain(path, idle, force) for path in self._router.shard_paths()]
+            report = {
+                "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "idle": idle,
+                "duration_seconds": round(time.perf_counter() - started, 3),
+                "shards": shards,
+            }
+        with self._stats_lock:
+            self._totals["runs"] += 1
+            self._totals["analyzes"] += sum(s["analyzed"] for s in shards)
+            self._totals["checkpoints"] += sum(s["checkpoint"] is not None for s in shards)
+            self._totals["vacuumed_pages"] += sum(s["vacuumed_pages"] for s in shards)
+            self._totals["errors"] += sum(s["error"] is not None for s in shards)
+            self._last = report
+        logger.info(
+            "DB maintenance (%s) in %.3fs: %s",
+            "idle" if idle else "busy", report["duration_seconds"],
+            "; ".join(
+                f"{Path(s['path']).name}: wal {s['wal_bytes']} -> {s['wal_bytes_after']} bytes"
+                f"{', analyzed' if s['analyzed'] else ''}"
+                f"{', checkpoint ' + s['checkpoint']['mode'] if s['checkpoint'] else ''}"
+                f"{', vacuumed %d pages' % s['vacuumed_pages'] if s['vacuumed_pages'] else ''}"
+                f"{', error: ' + s['error'] if s['error'] else ''}"
+                for s in shards
+            ),
+        )
+        return report
+
+    def _wal_bytes(self, path: str) -> int:
+        try:
+            return os.path.getsize(f"{path}-wal")
+        except OSError:
+            return 0
+
+    def _maintain(self, path: str, idle: bool, force: bool) -> dict:
+        result = {
+            "path": path, "analyzed": False, "checkpoint": None, "vacuumed_pages": 0,
+            "wal_bytes": self._wal_bytes(path), "wal_bytes_after": None,
+            "freelist_pages": None, "auto_vacuum": None, "error": None,
+        }
+        conn = sqlite3.connect(path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+        try:
+            conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+            conn.execute(f"PRAGMA analysis_limit = {self.analysis_limit}")
+            now = self._clock()
+            last = self._last_analyze.get(path)
+            if force or (idle and (last is None or now - last >= self.analyze_interval)):
+                conn.execute("ANALYZE")
+                self._last_analyze[path] = now
+                result["analyzed"] = True
+            else:
+                for table, column in conn.execute(_INDEXED_COLUMNS).fetchall():
+                    conn.execute(f'EXPLAIN QUERY PLAN SELECT 1 FROM "{table}" WHERE "{column}" = ?', (None,)).fetchall()
+                conn.execute("PRAGMA optimize")
+
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            result["auto_vacuum"] = _AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum))
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if auto_vacuum == 2:
+                while free and (force or (idle and self.idle())):
+                    # executescript steps the pragma to completion; execute() frees one page.
+                    conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_step})")
+                    remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                    result["vacuumed_pages"] += free - remaining
+                    if remaining >= free:
+                        break
+                    free = remaining
+                    time.sleep(self.step_sleep)
+            result["freelist_pages"] = free
+
+            # Last, so the pages ANALYZE and vacuuming wrote are checkpointed too.
+            wal = self._wal_bytes(path)
+            mode = None
+            if (force and wal) or (wal >= self.wal_truncate_bytes and idle):
+                mode = "TRUNCATE"
+            elif wal >= self.wal_checkpoint_bytes:
+                mode = "PASSIVE"
+            if mode:
+                busy, log, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+                result["checkpoint"] = {"mode": mode, "busy": bool(busy), "log_pages": log, "checkpointed_pages": checkpointed}
+        except sqlite3.OperationalError as e:
+            # Usually "database is locked": the next run tries again.
+            result["error"] = str(e)
+            logger.warning("DB maintenance of %s stopped: %s", path, e)
+        finally:
+            conn.close()
+        result["wal_bytes_after"] = self._wal_bytes(path)
+        return result
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {**self._totals, "last": self._last}
@@ -0,0 +1,299 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module in this package named vNNNN_<slug>.py:
+
+    VERSION is taken from NNNN; the module docstring is its description.
+    SQL = "..."                      # DDL run inside the migration transaction
+    def upgrade(conn): ...           # or arbitrary Python, same transaction
+    def backfill(batches): ...       # optional, runs after the DDL commits
+
+Rules:
+- Versions are contiguous and never renumbered. Shipped migrations are
+  never edited — add a new one.
+- upgrade/SQL runs in one BEGIN IMMEDIATE transaction together with the
+  schema_version bookkeeping, so a failure leaves the DB untouched.
+- Backfills run in short batches (see Backfill) so the write lock is only
+  held for one batch at a time. They must be resumable: select only rows
+  that still need the change. A backfill interrupted by a crash is
+  resumed on the next startup.
+- SQLite builds an index while holding the write lock, so keep each
+  migration small; split heavy index builds on large tables into
+  separate migrations. Concurrent writers wait on busy_timeout rather
+  than fail.
+
+When schema_version already matches the newest migration and no backfill
+is pending, migrate() costs one query and returns.
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MODULE_RE = re.compile(r"^v(\d{4})_\w+$")
+
+_BOOKKEEPING = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version       INTEGER PRIMARY KEY,
+    name          TEXT    NOT NULL,
+    applied_at    TEXT    NOT NULL,
+    backfill_done INTEGER NOT NULL DEFAULT 1
+)
+"""
+
+BUSY_TIMEOUT_MS = 30_000
+
+
+class MigrationError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    description: str
+    upgrade: Callable[[sqlite3.Connection], None]
+    backfill: Optional[Callable[["Backfill"], None]] = None
+
+
+def execute_script(conn: sqlite3.Connection, sql: str) -> None:
+    """
+    Run a multi-statement script inside the caller's transaction.
+
+    sqlite3.executescript() COMMITs first, which would break the
+    all-or-nothing guarantee, so statements are split and run one by one.
+    """
+    buffer = ""
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                conn.execute(buffer)
+            buffer = ""
+    if buffer.strip():
+        raise MigrationError(f"Incomplete SQL statement: {buffer.strip()[:80]}")
+
+
+def _from_module(module: ModuleType, version: int, name: str) -> Migration:
+    upgrade = getattr(module, "upgrade", None)
+    sql = getattr(module, "SQL", None)
+    if upgrade is None and sql is None:
+        raise MigrationError(f"Migration {name} defines neither SQL nor upgrade().")
+    if upgrade is None:
+        upgrade = lambda conn: execute_script(conn, sql)  # noqa: E731
+    description = (module.__doc__ or name).strip().splitlines()[0]
+    return Migration(
+        version=version,
+        name=name,
+        description=description,
+        upgrade=upgrade,
+        backfill=getattr(module, "backfill", None),
+    )
+
+
+def discover() -> list[Migration]:
+    """Load every vNNNN_* module in this package, ordered by version."""
+    migrations = []
+    for info in pkgutil.iter_modules([str(Path(__file__).parent)]):
+        match = _MODULE_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        migrations.append(_from_module(module, int(match.group(1)), info.name))
+
+    migrations.sort(key=lambda m: m.version)
+    for expected, m in enumerate(migrations, start=1):
+        if m.version != expected:
+            raise MigrationError(f"Migration versions must be contiguous; expected {expected}, got {m.name}.")
+    return migrations
+
+
+class Backfill:
+    """
+    Batched data migration helper handed to a migration's backfill().
+
+    run() pages through rows with keyset pagination on the first selected
+    column. Each batch is its own BEGIN IMMEDIATE ... COMMIT, so writers
+    from the running app interleave between batches instead of waiting for
+    the whole table.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = 500, pause_s: float = 0.0):
+        self._conn = conn
+        self.batch_size = batch_size
+        self.pause_s = pause_s
+        self.rows_done = 0
+
+    def run(
+        self,
+        select_sql: str,
+        apply: Callable[[sqlite3.Connection, list[sqlite3.Row]], None],
+    ) -> int:
+        """
+        select_sql must take two parameters — the last key seen and the
+        batch size — e.g. "SELECT id, author FROM books WHERE id > ? AND
+        author_key IS NULL ORDER BY id LIMIT ?". Returns rows processed.
+        """
+        conn = self._conn
+        last_key = -1
+        processed = 0
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(select_sql, (last_key, self.batch_size)).fetchall()
+                if rows:
+                    apply(conn, rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if not rows:
+                break
+            processed += len(rows)
+            last_key = rows[-1][0]
+            if self.pause_s:
+                time.sleep(self.pause_s)
+        self.rows_done += processed
+        return processed
+
+
+def _connect(db_path: str | Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path), isolation_level=None, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _state(conn: sqlite3.Connection) -> tuple[int, list[int]]:
+    """Return (current version, versions with a pending backfill)."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0, []
+    rows = conn.execute("SELECT version, backfill_done FROM schema_version").fetchall()
+    current = max((r["version"] for r in rows), default=0)
+    pending = [r["version"] for r in rows if not r["backfill_done"]]
+    return current, sorted(pending)
+
+
+def current_version(db_path: str | Path) -> int:
+    conn = _connect(db_path)
+    try:
+        return _state(conn)[0]
+    finally:
+        conn.close()
+
+
+def status(db_path: str | Path) -> list[dict]:
+    """Applied/pending state of every known migration, for the CLI."""
+    conn = _connect(db_path)
+    try:
+        current, pending = _state(conn)
+        applied = {}
+        if current:
+            applied = {
+                r["version"]: r["applied_at"]
+                for r in conn.execute("SELECT version, applied_at FROM schema_version")
+            }
+    finally:
+        conn.close()
+    return [
+        {
+            "version": m.version,
+            "name": m.name,
+            "description": m.description,
+            "applied_at": applied.get(m.version),
+            "backfill_pending": m.version in pending,
+        }
+        for m in discover()
+    ]
+
+
+def _apply(conn: sqlite3.Connection, migration: Migration) -> bool:
+    """Apply one migration transactionally. False if another process beat us to it."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(_BOOKKEEPING)
+        if _state(conn)[0] >= migration.version:
+            conn.execute("ROLLBACK")
+            return False
+        migration.upgrade(conn)
+        conn.execute(
+            "INSERT INTO schema_version (version, name, applied_at, backfill_done) VALUES (?, ?, ?, ?)",
+            (
+                migration.version,
+                migration.name,
+                datetime.now(timezone.utc).isoformat(),
+                0 if migration.backfill else 1,
+            ),
+        )
+        conn.execute("COMMIT")
+        return True
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        raise MigrationError(f"Migration {migration.name} failed: {e}") from e
+
+
+def _run_backfill(conn: sqlite3.Connection, migration: Migration, batch_size: int) -> None:
+    started = time.perf_counter()
+    batches = Backfill(conn, batch_size=batch_size)
+    migration.backfill(batches)
+    conn.execute("UPDATE schema_version SET backfill_done = 1 WHERE version = ?", (migration.version,))
+    logger.info(
+        "Backfill for %s done: %d rows in %.0f ms",
+        migration.name, batches.rows_done, (time.perf_counter() - started) * 1000,
+    )
+
+
+def migrate(
+    db_path: str | Path,
+    migrations: Optional[list[Migration]] = None,
+    batch_size: int = 500,
+) -> int:
+    """
+    Bring the database up to the newest migration. Returns how many
+    migrations were applied by this call. Safe to run concurrently from
+    several processes: BEGIN IMMEDIATE serialises them and each re-checks
+    the version once it holds the lock.
+    """
+    migrations = discover() if migrations is None else migrations
+    latest = migrations[-1].version if migrations else 0
+
+    conn = _connect(db_path)
+    try:
+        current, pending = _state(conn)
+        if current >= latest and not pending:
+            return 0
+
+        applied = 0
+        for m in migrations:
+            if m.version <= current:
+                continue
+            started = time.perf_counter()
+            if _apply(conn, m):
+                applied += 1
+                logger.info(
+                    "Applied migration %s (%s) in %.0f ms",
+                    m.name, m.description, (time.perf_counter() - started) * 1000,
+                )
+
+        by_version = {m.version: m for m in migrations}
+        for version in _state(conn)[1]:
+            if version in by_version:
+                _run_backfill(conn, by_version[version], batch_size)
+        return applied
+    finally:
+        conn.close()
@@ -0,0 +1,31 @@
+"""Initial schema: users, books and their indexes."""
+
+SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    email         TEXT    NOT NULL UNIQUE,
+    name          TEXT,
+    password_hash TEXT    NOT NULL,
+    created_at    TEXT    NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS books (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id       INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title         TEXT    NOT NULL,
+    author        TEXT    NOT NULL,
+    isbn          TEXT,
+    status        TEXT    NOT NULL,
+    rating        INTEGER,
+    page_count    INTEGER,
+    notes         TEXT,
+    cover_url     TEXT,
+    date_added    TEXT    NOT NULL,
+    date_finished TEXT,
+    UNIQUE(user_id, isbn)
+);
+
+CREATE INDEX IF NOT EXISTS idx_books_user   ON books(user_id);
+CREATE INDEX IF NOT EXISTS idx_books_status ON books(user_id, status);
+CREATE INDEX IF NOT EXISTS idx_users_email  ON users(email);
+"""
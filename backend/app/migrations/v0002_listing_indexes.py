@@ -0,0 +1,17 @@
+"""Composite (user_id, sort column) indexes for sorted and range-filtered listings."""
+
+# Each ORDER BY supported by BookRepository.get_all walks one of these
+# indexes, so listings never need a temp B-tree sort. The index on
+# (user_id, status, date_added) serves the default status-tab view and
+# supersedes the old (user_id, status) and (user_id) indexes.
+SQL = """
+CREATE INDEX IF NOT EXISTS idx_books_user_added    ON books(user_id, date_added);
+CREATE INDEX IF NOT EXISTS idx_books_user_title    ON books(user_id, title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_books_user_author   ON books(user_id, author COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_books_user_rating   ON books(user_id, rating);
+CREATE INDEX IF NOT EXISTS idx_books_user_finished ON books(user_id, date_finished);
+CREATE INDEX IF NOT EXISTS idx_books_status_added  ON books(user_id, status, date_added);
+
+DROP INDEX IF EXISTS idx_books_status;
+DROP INDEX IF EXISTS idx_books_user;
+"""
@@ -0,0 +1,39 @@
+"""Per-user change sequence, books.updated_at and deletion tombstones for delta sync."""
+
+# users.change_seq is the per-user high-water mark. Every book write bumps
+# it in the same transaction and stamps the new value on the row (or on a
+# tombstone for deletes), so "what changed since N" is an index range scan.
+SQL = """
+ALTER TABLE users ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE books ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE books ADD COLUMN updated_at TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_books_user_seq ON books(user_id, change_seq);
+
+CREATE TABLE IF NOT EXISTS book_tombstones (
+    user_id    INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    change_seq INTEGER NOT NULL,
+    book_id    INTEGER NOT NULL,
+    deleted_at TEXT    NOT NULL,
+    PRIMARY KEY (user_id, change_seq)
+) WITHOUT ROWID;
+"""
+
+
+def backfill(batches):
+    """Give pre-existing books a sequence number (their id) and raise each owner's high-water mark to match."""
+
+    def apply(conn, rows):
+        for row in rows:
+            conn.execute(
+                "UPDATE books SET change_seq = id, updated_at = date_added "
+                "WHERE user_id = ? AND change_seq = 0",
+                (row["id"],),
+            )
+            conn.execute(
+                "UPDATE users SET change_seq = MAX(change_seq, "
+                "(SELECT COALESCE(MAX(change_seq), 0) FROM books WHERE user_id = ?)) WHERE id = ?",
+                (row["id"], row["id"]),
+            )
+
+    batches.run("SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?", apply)
@@ -0,0 +1,21 @@
+"""Stored responses for Idempotency-Key replays."""
+
+# One row per (user, key). status is NULL while the first request is still
+# running, which is how concurrent duplicates find out they must wait.
+# fingerprint is a SHA-256 of method, path and body, so a key reused for a
+# different request is rejected. Times are Unix seconds to keep rows small;
+# idx_idempotency_expiry lets the purge job delete expired rows without a
+# table scan.
+SQL = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id     INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    key         TEXT    NOT NULL,
+    fingerprint BLOB    NOT NULL,
+    status      INTEGER,
+    body        TEXT,
+    expires_at  INTEGER NOT NULL,
+    PRIMARY KEY (user_id, key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_expiry ON idempotency_keys(expires_at);
+"""
@@ -0,0 +1,57 @@
+"""Shared works catalog: canonical cover_url/page_count per ISBN, referenced by books.work_id."""
+
+# books keeps title and author (the (user_id, title/author) listing indexes
+# need them in the row, and users often edit them). cover_url and
+# page_count become per-user overrides: NULL means "use the work's value".
+# First-seen values win; later sources only fill gaps. ol_work_id is the
+# Open Library work key, shared by every edition (ISBN) of a work.
+SQL = """
+CREATE TABLE IF NOT EXISTS works (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    isbn       TEXT    NOT NULL UNIQUE,
+    ol_work_id TEXT,
+    title      TEXT    NOT NULL,
+    author     TEXT    NOT NULL,
+    cover_url  TEXT,
+    page_count INTEGER,
+    updated_at TEXT    NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_works_ol_work ON works(ol_work_id);
+
+ALTER TABLE books ADD COLUMN work_id INTEGER REFERENCES works(id);
+
+CREATE INDEX IF NOT EXISTS idx_books_work ON books(work_id);
+"""
+
+_UPSERT = """
+    INSERT INTO works (isbn, title, author, cover_url, page_count, updated_at)
+    VALUES (?, ?, ?, ?, ?, datetime('now'))
+    ON CONFLICT(isbn) DO UPDATE SET
+        cover_url  = COALESCE(works.cover_url, excluded.cover_url),
+        page_count = COALESCE(works.page_count, excluded.page_count)
+    RETURNING id, cover_url, page_count
+"""
+
+
+def backfill(batches):
+    """Link every book with an ISBN to its work and drop copies of the canonical cover/page count."""
+
+    def apply(conn, rows):
+        for row in rows:
+            work = conn.execute(
+                _UPSERT, (row["isbn"], row["title"], row["author"], row["cover_url"], row["page_count"])
+            ).fetchone()
+            conn.execute(
+                "UPDATE books SET work_id = ?, "
+                "cover_url = CASE WHEN cover_url IS ? THEN NULL ELSE cover_url END, "
+                "page_count = CASE WHEN page_count IS ? THEN NULL ELSE page_count END "
+                "WHERE id = ?",
+                (work["id"], work["cover_url"], work["page_count"], row["id"]),
+            )
+
+    batches.run(
+        "SELECT id, isbn, title, author, cover_url, page_count FROM books "
+        "WHERE id > ? AND isbn IS NOT NULL AND work_id IS NULL ORDER BY id LIMIT ?",
+        apply,
+    )
@@ -0,0 +1,64 @@
+"""Reading analytics: per-user rollups of finished books by month/year and by author."""
+
+# Rows hold sums, not averages, so a write can add or subtract one book's
+# contribution without rereading the others. A book counts once its
+# status is 'finished'; it appears in the month/year series only if it
+# also has a date_finished. Pages use the effective page count (the
+# user's override, else the works catalog's).
+SQL = """
+CREATE TABLE IF NOT EXISTS reading_rollups (
+    user_id        INTEGER NOT NULL REFERENCES users(id),
+    granularity    TEXT    NOT NULL CHECK (granularity IN ('month', 'year')),
+    period         TEXT    NOT NULL,
+    books_finished INTEGER NOT NULL DEFAULT 0,
+    pages_finished INTEGER NOT NULL DEFAULT 0,
+    rating_sum     INTEGER NOT NULL DEFAULT 0,
+    rating_count   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, granularity, period)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS author_rollups (
+    user_id        INTEGER NOT NULL REFERENCES users(id),
+    author_key     TEXT    NOT NULL,
+    author         TEXT    NOT NULL,
+    books_finished INTEGER NOT NULL DEFAULT 0,
+    pages_finished INTEGER NOT NULL DEFAULT 0,
+    rating_sum     INTEGER NOT NULL DEFAULT 0,
+    rating_count   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, author_key)
+) WITHOUT ROWID;
+"""
+
+_FINISHED = """
+    FROM books b LEFT JOIN works w ON w.id = b.work_id
+    WHERE b.user_id = ? AND b.status = 'finished'
+"""
+
+
+def backfill(batches):
+    """Build every user's rollups from scratch (idempotent, so safe to resume)."""
+
+    def apply(conn, rows):
+        for row in rows:
+            user_id = row["id"]
+            conn.execute("DELETE FROM reading_rollups WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM author_rollups WHERE user_id = ?", (user_id,))
+            for granularity, length in (("month", 7), ("year", 4)):
+                conn.execute(
+                    "INSERT INTO reading_rollups "
+                    "(user_id, granularity, period, books_finished, pages_finished, rating_sum, rating_count) "
+                    f"SELECT ?, ?, substr(b.date_finished, 1, {length}) AS period, COUNT(*), "
+                    "SUM(COALESCE(b.page_count, w.page_count, 0)), SUM(COALESCE(b.rating, 0)), COUNT(b.rating) "
+                    + _FINISHED + " AND b.date_finished IS NOT NULL GROUP BY period",
+                    (user_id, granularity, user_id),
+                )
+            conn.execute(
+                "INSERT INTO author_rollups "
+                "(user_id, author_key, author, books_finished, pages_finished, rating_sum, rating_count) "
+                "SELECT ?, lower(trim(b.author)) AS author_key, MIN(trim(b.author)), COUNT(*), "
+                "SUM(COALESCE(b.page_count, w.page_count, 0)), SUM(COALESCE(b.rating, 0)), COUNT(b.rating) "
+                + _FINISHED + " GROUP BY author_key",
+                (user_id, user_id),
+            )
+
+    batches.run("SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?", apply)
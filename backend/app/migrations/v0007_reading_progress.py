@@ -0,0 +1,32 @@
+"""Reading progress: append-only progress events, daily aggregates, books.current_page."""
+
+# progress_events is the hot, narrow, append-only log: integer columns
+# only, no secondary index and no foreign key, so an append is one rowid
+# insert. Reads never scan it — the latest page is denormalized onto
+# books.current_page in the same transaction. The compaction job folds
+# events older than the retention window into reading_progress_daily
+# (one row per book per UTC day) and deletes them. Events of deleted
+# books are dropped by compaction rather than by an indexed delete.
+SQL = """
+CREATE TABLE IF NOT EXISTS progress_events (
+    id          INTEGER PRIMARY KEY,
+    user_id     INTEGER NOT NULL,
+    book_id     INTEGER NOT NULL,
+    page        INTEGER NOT NULL,
+    recorded_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reading_progress_daily (
+    book_id    INTEGER NOT NULL,
+    day        TEXT    NOT NULL,
+    user_id    INTEGER NOT NULL,
+    start_page INTEGER NOT NULL,
+    end_page   INTEGER NOT NULL,
+    updates    INTEGER NOT NULL,
+    PRIMARY KEY (book_id, day)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_progress_daily_user ON reading_progress_daily(user_id);
+
+ALTER TABLE books ADD COLUMN current_page INTEGER;
+"""
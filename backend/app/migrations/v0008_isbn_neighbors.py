@@ -0,0 +1,22 @@
+"""Co-reading recommendations: top-K neighbor ISBNs per ISBN."""
+
+# Written wholesale by the recommendations rebuild job and read with one
+# primary-key range scan. Like works, it is global (no user data): only
+# ISBNs, scores and the neighbor's public title/author/cover, copied in
+# so a lookup needs no join. Sharded installs keep a copy per shard.
+#
+# "Which of these does the user already own" is answered by the
+# UNIQUE(user_id, isbn) index books already has.
+SQL = """
+CREATE TABLE IF NOT EXISTS isbn_neighbors (
+    isbn          TEXT    NOT NULL,
+    rank          INTEGER NOT NULL,
+    neighbor_isbn TEXT    NOT NULL,
+    score         REAL    NOT NULL,
+    co_readers    INTEGER NOT NULL,
+    title         TEXT    NOT NULL,
+    author        TEXT    NOT NULL,
+    cover_url     TEXT,
+    PRIMARY KEY (isbn, rank)
+) WITHOUT ROWID;
+"""
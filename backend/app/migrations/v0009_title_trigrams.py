@@ -0,0 +1,46 @@
+"""Fuzzy duplicate detection: per-user trigram index over normalized book titles."""
+
+# title_trigrams is an inverted index, (user, trigram) -> book ids, kept
+# current by BookRepository in each write's transaction. title_trigram_counts
+# holds each posting list's length, so a lookup can probe the user's
+# rarest trigrams first and skip the long lists (see utils/trigrams.py).
+# Trigrams come from app.utils.trigrams; changing how it normalizes
+# titles needs a migration that reindexes.
+SQL = """
+CREATE TABLE IF NOT EXISTS title_trigrams (
+    user_id INTEGER NOT NULL,
+    trigram TEXT    NOT NULL,
+    book_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, trigram, book_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS title_trigram_counts (
+    user_id INTEGER NOT NULL,
+    trigram TEXT    NOT NULL,
+    books   INTEGER NOT NULL,
+    PRIMARY KEY (user_id, trigram)
+) WITHOUT ROWID;
+"""
+
+
+def backfill(batches):
+    """Index existing titles, then recount each user's posting lists (both idempotent)."""
+    from app.utils.trigrams import title_trigrams
+
+    def index_books(conn, rows):
+        conn.executemany(
+            "INSERT OR IGNORE INTO title_trigrams (user_id, trigram, book_id) VALUES (?, ?, ?)",
+            [(row["user_id"], g, row["id"]) for row in rows for g in title_trigrams(row["title"])],
+        )
+
+    def count_users(conn, rows):
+        for row in rows:
+            conn.execute("DELETE FROM title_trigram_counts WHERE user_id = ?", (row["id"],))
+            conn.execute(
+                "INSERT INTO title_trigram_counts (user_id, trigram, books) "
+                "SELECT user_id, trigram, COUNT(*) FROM title_trigrams WHERE user_id = ? GROUP BY trigram",
+                (row["id"],),
+            )
+
+    batches.run("SELECT id, user_id, title FROM books WHERE id > ? ORDER BY id LIMIT ?", index_books)
+    batches.run("SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?", count_users)
@@ -0,0 +1,53 @@
+"""Normalized author index: one row per (user, author, book), plus per-author book counts."""
+
+# A book's free-text author field is split into individual authors
+# (app.utils.authors) and each is keyed by its normalized name, so exact
+# and prefix author filters are (user_id, author_key) range scans and
+# GET /api/books/authors reads author_counts, one row per author.
+# BookRepository keeps both current in each write's transaction.
+# Changing how app.utils.authors splits or keys names needs a migration
+# that reindexes.
+SQL = """
+CREATE TABLE IF NOT EXISTS book_authors (
+    user_id    INTEGER NOT NULL,
+    author_key TEXT    NOT NULL,
+    book_id    INTEGER NOT NULL,
+    PRIMARY KEY (user_id, author_key, book_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS author_counts (
+    user_id    INTEGER NOT NULL,
+    author_key TEXT    NOT NULL,
+    name       TEXT    NOT NULL,
+    books      INTEGER NOT NULL,
+    PRIMARY KEY (user_id, author_key)
+) WITHOUT ROWID;
+"""
+
+
+def backfill(batches):
+    """Index existing books, then recount each user's authors (both idempotent)."""
+    from app.utils.authors import split_authors
+
+    def index_books(conn, rows):
+        conn.executemany(
+            "INSERT OR IGNORE INTO book_authors (user_id, author_key, book_id) VALUES (?, ?, ?)",
+            [(row["user_id"], key, row["id"]) for row in rows for key in split_authors(row["author"])],
+        )
+
+    def count_users(conn, rows):
+        for row in rows:
+            names: dict[str, str] = {}
+            for book in conn.execute("SELECT author FROM books WHERE user_id = ?", (row["id"],)):
+                for key, name in split_authors(book["author"]).items():
+                    names[key] = min(names.get(key, name), name)
+            conn.execute("DELETE FROM author_counts WHERE user_id = ?", (row["id"],))
+            conn.executemany(
+                "INSERT INTO author_counts (user_id, author_key, name, books) "
+                "SELECT user_id, author_key, ?, COUNT(*) FROM book_authors "
+                "WHERE user_id = ? AND author_key = ? GROUP BY user_id, author_key",
+                [(name, row["id"], key) for key, name in names.items()],
+            )
+
+    batches.run("SELECT id, user_id, author FROM books WHERE id > ? ORDER BY id LIMIT ?", index_books)
+    batches.run("SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?", count_users)
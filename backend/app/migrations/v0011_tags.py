@@ -0,0 +1,27 @@
+"""User-defined tags (shelves): a book/tag join table and per-tag book counts."""
+
+# Tags are keyed by their normalized name (tag_key) rather than a
+# surrogate id, so a user's rows move between shards unchanged. The
+# primary key (user_id, tag_key, book_id) makes each tag's books one
+# sorted index range: ?tags=a,b intersects (or unions) those ranges.
+# idx_book_tags_book serves "tags of this book" for listings and deletes.
+# tags.books is kept current by every tag/untag/delete, and a tag goes
+# away with its last book.
+SQL = """
+CREATE TABLE IF NOT EXISTS tags (
+    user_id INTEGER NOT NULL,
+    tag_key TEXT    NOT NULL,
+    name    TEXT    NOT NULL,
+    books   INTEGER NOT NULL,
+    PRIMARY KEY (user_id, tag_key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS book_tags (
+    user_id INTEGER NOT NULL,
+    tag_key TEXT    NOT NULL,
+    book_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, tag_key, book_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_book_tags_book ON book_tags(book_id, tag_key);
+"""
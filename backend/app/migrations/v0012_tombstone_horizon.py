@@ -0,0 +1,12 @@
+"""Retention horizon for deletion tombstones."""
+
+# Tombstones older than TOMBSTONE_RETENTION_DAYS are purged. Before a
+# batch is deleted, each owner's users.tombstones_purged_seq is raised to
+# the newest purged change_seq: a client whose `since` is below it may
+# have missed a delete, so the delta feed answers it with a full reset.
+# idx_tombstones_deleted_at lets the purge find old rows without a scan.
+SQL = """
+ALTER TABLE users ADD COLUMN tombstones_purged_seq INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_tombstones_deleted_at ON book_tombstones(deleted_at);
+"""
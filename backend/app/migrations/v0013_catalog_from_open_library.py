@@ -0,0 +1,38 @@
+"""Drop works that were seeded from users' own book data."""
+
+# Until now a book written with an ISBN created its work from whatever
+# the user typed, so the first user's cover and page count showed up for
+# everyone with that ISBN. Only Open Library search results write works
+# now. Works without an Open Library key came from a book write: the
+# backfill copies the values each linked book currently shows into its
+# own row (a user's cleared field stays cleared), unlinks it, and deletes
+# the work once no book references it. What every user sees is unchanged;
+# they just stop sharing. Unreferenced ones are deleted here.
+SQL = """
+DELETE FROM works
+WHERE ol_work_id IS NULL AND NOT EXISTS (SELECT 1 FROM books WHERE books.work_id = works.id);
+"""
+
+
+def backfill(batches):
+    """Copy user-seeded works' values into the books that use them, then drop those works."""
+
+    def apply(conn, rows):
+        for row in rows:
+            conn.execute(
+                "UPDATE books SET "
+                "cover_url = COALESCE(cover_url, (SELECT cover_url FROM works WHERE id = ?)), "
+                "page_count = COALESCE(page_count, (SELECT page_count FROM works WHERE id = ?)), "
+                "work_id = NULL WHERE id = ?",
+                (row["work_id"], row["work_id"], row["id"]),
+            )
+        conn.executemany(
+            "DELETE FROM works WHERE id = ? AND NOT EXISTS (SELECT 1 FROM books WHERE work_id = ?)",
+            [(work_id, work_id) for work_id in {row["work_id"] for row in rows}],
+        )
+
+    batches.run(
+        "SELECT b.id, b.work_id FROM books b JOIN works w ON w.id = b.work_id "
+        "WHERE b.id > ? AND w.ol_work_id IS NULL ORDER BY b.id LIMIT ?",
+        apply,
+    )
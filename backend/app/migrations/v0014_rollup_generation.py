@@ -0,0 +1,8 @@
+"""Per-user rollup generation, part of the analytics ETag."""
+
+# `flask rebuild-analytics` can change the rollups without a book write,
+# so the library version alone would let clients keep a stale 304. Each
+# rebuild of a user bumps users.rollup_generation in the same transaction.
+SQL = """
+ALTER TABLE users ADD COLUMN rollup_generation INTEGER NOT NULL DEFAULT 0;
+"""
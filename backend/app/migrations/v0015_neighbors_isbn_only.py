@@ -0,0 +1,12 @@
+"""isbn_neighbors keeps only ISBNs and scores; display fields come from works."""
+
+# The rebuild used to copy each neighbor's title, author and cover into
+# this global table, falling back to what some user had typed when the
+# catalog had no entry, which showed one user's data to everyone. Titles,
+# authors and covers are now joined from works (Open Library data only)
+# when a request reads its neighbors.
+SQL = """
+ALTER TABLE isbn_neighbors DROP COLUMN title;
+ALTER TABLE isbn_neighbors DROP COLUMN author;
+ALTER TABLE isbn_neighbors DROP COLUMN cover_url;
+"""
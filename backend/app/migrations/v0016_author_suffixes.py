@@ -0,0 +1,32 @@
+"""Author prefix filters match any name: one row per (user, author key suffix, book)."""
+
+# ?author= used to be a prefix of the whole key, which puts given names
+# first, so a surname alone ("herbert") found nothing. book_author_suffixes
+# holds every tail of each key that starts at a word ("frank herbert",
+# "herbert"), so a prefix filter is still one range of the primary key.
+# Exact filters and author_counts keep using the full keys in v0010's tables.
+SQL = """
+CREATE TABLE IF NOT EXISTS book_author_suffixes (
+    user_id INTEGER NOT NULL,
+    suffix  TEXT    NOT NULL,
+    book_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, suffix, book_id)
+) WITHOUT ROWID;
+"""
+
+
+def backfill(batches):
+    """Index the suffixes of existing books' author keys (idempotent)."""
+    from app.utils.authors import key_suffixes, split_authors
+
+    def index_books(conn, rows):
+        conn.executemany(
+            "INSERT OR IGNORE INTO book_author_suffixes (user_id, suffix, book_id) VALUES (?, ?, ?)",
+            [
+                (row["user_id"], suffix, row["id"])
+                for row in rows
+                for suffix in {s for key in split_authors(row["author"]) for s in key_suffixes(key)}
+            ],
+        )
+
+    batches.run("SELECT id, user_id, author FROM books WHERE id > ? ORDER BY id LIMIT ?", index_books)
@@ -1,4 +1,5 @@
 from .book import Book, ReadingStatus, RATABLE_STATUSES, RATING_MIN, RATING_MAX
 from .user import User
+from .work import Work
 
-__all__ = ["Book", "ReadingStatus", "RATABLE_STATUSES", "RATING_MIN", "RATING_MAX", "User"]
+__all__ = ["Book", "ReadingStatus", "RATABLE_STATUSES", "RATING_MIN", "RATING_MAX", "User", "Work"]
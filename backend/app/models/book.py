@@ -5,7 +5,7 @@ Pure data — no database, no HTTP, no validation logic.
 This is the canonical definition of what a Book IS in this system.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
 from enum import Enum
 from typing import Optional
@@ -27,6 +27,12 @@ RATING_MIN = 1
 RATING_MAX = 5
 
 
+def percent_complete(current_page: Optional[int], page_count: Optional[int]) -> Optional[float]:
+    if current_page is None or not page_count:
+        return None
+    return min(100.0, round(100 * current_page / page_count, 1))
+
+
 @dataclass
 class Book:
     title: str
@@ -41,9 +47,24 @@ class Book:
     cover_url: Optional[str] = None
     date_added: Optional[date] = None
     date_finished: Optional[date] = None
+    # Owner's change sequence at this row's last write (delta sync / SSE ids).
+    change_seq: Optional[int] = None
+    # Shared catalog entry (works table) for books with an ISBN.
+    work_id: Optional[int] = None
+    # Latest reported page (denormalized from progress_events).
+    current_page: Optional[int] = None
+    # User-defined tags (shelves), sorted by name.
+    tags: list[str] = field(default_factory=list)
+    # Not stored: likely duplicates already in the library, set by
+    # BookService.add_book as a warning on the response.
+    possible_duplicates: Optional[list] = None
+
+    @property
+    def percent_complete(self) -> Optional[float]:
+        return percent_complete(self.current_page, self.page_count)
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             "id": self.id,
             "title": self.title,
             "author": self.author,
@@ -53,8 +74,15 @@ class Book:
             "page_count": self.page_count,
             "notes": self.notes,
             "cover_url": self.cover_url,
+            "work_id": self.work_id,
+            "current_page": self.current_page,
+            "percent_complete": self.percent_complete,
+            "tags": list(self.tags),
             "date_added": self.date_added.isoformat() if self.date_added else None,
             "date_finished": (
                 self.date_finished.isoformat() if self.date_finished else None
             ),
         }
+        if self.possible_duplicates is not None:
+            data["possible_duplicates"] = self.possible_duplicates
+        return data
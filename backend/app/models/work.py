@@ -0,0 +1,31 @@
+"""
+Work domain model — one entry in the shared catalog.
+
+A work is the canonical metadata for an ISBN, shared by every user who
+logs it. Pure data, like Book.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Work:
+    isbn: str
+    title: str
+    author: str
+    id: Optional[int] = None
+    ol_work_id: Optional[str] = None
+    cover_url: Optional[str] = None
+    page_count: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "isbn": self.isbn,
+            "ol_work_id": self.ol_work_id,
+            "title": self.title,
+            "author": self.author,
+            "cover_url": self.cover_url,
+            "page_count": self.page_count,
+        }
@@ -1,4 +1,23 @@
 from .book_repository import BookRepository
 from .user_repository import UserRepository
+from .work_repository import WorkRepository
+from .idempotency_repository import IdempotencyRepository
+from .analytics_repository import AnalyticsRepository
+from .progress_repository import ProgressRepository
+from .recommendation_repository import RecommendationRepository
+from .cache import CachedBookRepository, CachedUserRepository, LibraryCache
+from .write_queue import WriteQueue
 
-__all__ = ["BookRepository", "UserRepository"]
+__all__ = [
+    "BookRepository",
+    "UserRepository",
+    "WorkRepository",
+    "IdempotencyRepository",
+    "AnalyticsRepository",
+    "ProgressRepository",
+    "RecommendationRepository",
+    "CachedBookRepository",
+    "CachedUserRepository",
+    "LibraryCache",
+    "WriteQueue",
+]
@@ -0,0 +1,179 @@
+"""
+AnalyticsRepository — all SQL for the reading rollups (migration v0006).
+
+reading_rollups holds, per user and month/year, the number of books
+finished, their pages and the sum/count of their ratings; author_rollups
+holds the same per author. BookRepository keeps both current inside each
+write's transaction via apply_book_change(): the book's old contribution
+is subtracted and the new one added, so a write touches at most four
+rollup rows and reads never scan books.
+
+One thing can drift: a book inheriting its page count from the works
+catalog gains pages when the catalog fills that gap later. rebuild()
+recomputes from books (`flask --app run rebuild-analytics`).
+"""
+
+from typing import Optional
+
+from app.database import ShardRouter, as_router, get_db
+
+GRANULARITIES = ("month", "year")
+_PERIOD_LENGTH = {"month": 7, "year": 4}  # prefix of the ISO date_finished
+
+_BUMP_PERIOD = """
+    INSERT INTO reading_rollups
+        (user_id, granularity, period, books_finished, pages_finished, rating_sum, rating_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, granularity, period) DO UPDATE SET
+        books_finished = books_finished + excluded.books_finished,
+        pages_finished = pages_finished + excluded.pages_finished,
+        rating_sum     = rating_sum + excluded.rating_sum,
+        rating_count   = rating_count + excluded.rating_count
+"""
+
+# author_key is computed in SQL and the spelling shown is the smallest one
+# seen, as in rebuild(), so both paths agree.
+_BUMP_AUTHOR = """
+    INSERT INTO author_rollups
+        (user_id, author_key, author, books_finished, pages_finished, rating_sum, rating_count)
+    VALUES (?, lower(trim(?)), trim(?), ?, ?, ?, ?)
+    ON CONFLICT (user_id, author_key) DO UPDATE SET
+        author         = min(author, excluded.author),
+        books_finished = books_finished + excluded.books_finished,
+        pages_finished = pages_finished + excluded.pages_finished,
+        rating_sum     = rating_sum + excluded.rating_sum,
+        rating_count   = rating_count + excluded.rating_count
+"""
+
+_FINISHED = """
+    FROM books b LEFT JOIN works w ON w.id = b.work_id
+    WHERE b.user_id = ? AND b.status = 'finished'
+"""
+
+
+def _contribution(row) -> Optional[tuple]:
+    """What one book adds to the rollups, or None if it adds nothing."""
+    if row is None or row["status"] != "finished":
+        return None
+    return (row["date_finished"], row["page_count"] or 0, row["rating"], row["author"])
+
+
+def apply_book_change(conn, user_id: int, before, after) -> None:
+    """
+    Move one book's contribution from `before` to `after` (SELECT_BOOKS
+    rows read inside the write transaction; None for create/delete).
+    Must run on the caller's connection so it commits with the write.
+    """
+    old, new = _contribution(before), _contribution(after)
+    if old == new:
+        return
+    for contribution, sign in ((old, -1), (new, 1)):
+        if contribution is None:
+            continue
+        date_finished, pages, rating, author = contribution
+        deltas = (sign, sign * pages, sign * (rating or 0), sign * (rating is not None))
+        if date_finished:
+            for granularity in GRANULARITIES:
+                period = date_finished[:_PERIOD_LENGTH[granularity]]
+                conn.execute(_BUMP_PERIOD, (user_id, granularity, period, *deltas))
+        conn.execute(_BUMP_AUTHOR, (user_id, author, author, *deltas))
+    if old is not None:
+        conn.execute("DELETE FROM reading_rollups WHERE user_id = ? AND books_finished <= 0", (user_id,))
+        conn.execute("DELETE FROM author_rollups WHERE user_id = ? AND books_finished <= 0", (user_id,))
+
+
+def _average(row) -> Optional[float]:
+    return round(row["rating_sum"] / row["rating_count"], 2) if row["rating_count"] else None
+
+
+class AnalyticsRepository:
+    def __init__(self, db_path: "str | ShardRouter"):
+        self._router = as_router(db_path)
+
+    def periods(self, user_id: int, granularity: str) -> list[dict]:
+        with get_db(self._router.path_for(user_id)) as conn:
+            rows = conn.execute(
+                "SELECT period, books_finished, pages_finished, rating_sum, rating_count "
+                "FROM reading_rollups WHERE user_id = ? AND granularity = ? ORDER BY period",
+                (user_id, granularity),
+            ).fetchall()
+        return [
+            {
+                "period": r["period"],
+                "books_finished": r["books_finished"],
+                "pages_finished": r["pages_finished"],
+                "avg_rating": _average(r),
+            }
+            for r in rows
+        ]
+
+    def authors(self, user_id: int, limit: int) -> list[dict]:
+        """Authors with the most finished books (pages, then name, break ties)."""
+        with get_db(self._router.path_for(user_id)) as conn:
+            rows = conn.execute(
+                "SELECT author, books_finished, pages_finished, rating_sum, rating_count "
+                "FROM author_rollups WHERE user_id = ? "
+                "ORDER BY books_finished DESC, pages_finished DESC, author_key LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+        return [
+            {
+                "author": r["author"],
+                "books_finished": r["books_finished"],
+                "pages_finished": r["pages_finished"],
+                "avg_rating": _average(r),
+            }
+            for r in rows
+        ]
+
+    def versions(self, user_id: int) -> tuple[int, int]:
+        """(library version, rollup generation): the rollups change only when one of them does."""
+        with get_db(self._router.path_for(user_id)) as conn:
+            row = conn.execute(
+                "SELECT change_seq, rollup_generation FROM users WHERE id = ?", (user_id,)
+            ).fetchone()
+        return (row["change_seq"], row["rollup_generation"]) if row else (0, 0)
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        """
+        Recompute rollups from books for one user, or every user on every
+        shard. One short transaction per user. Returns users rebuilt.
+        """
+        if user_id is not None:
+            targets = [(self._router.path_for(user_id), [user_id])]
+        else:
+            targets = []
+            for path in self._router.shard_paths():
+                with get_db(path) as conn:
+                    targets.append((path, [r["id"] for r in conn.execute("SELECT id FROM users ORDER BY id")]))
+        rebuilt = 0
+        for path, user_ids in targets:
+            for uid in user_ids:
+                with get_db(path) as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    self._rebuild_user(conn, uid)
+                    conn.commit()
+                rebuilt += 1
+        return rebuilt
+
+    def _rebuild_user(self, conn, user_id: int) -> None:
+        conn.execute("UPDATE users SET rollup_generation = rollup_generation + 1 WHERE id = ?", (user_id,))
+        conn.execute("DELETE FROM reading_rollups WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM author_rollups WHERE user_id = ?", (user_id,))
+        for granularity in GRANULARITIES:
+            conn.execute(
+                "INSERT INTO reading_rollups "
+                "(user_id, granularity, period, books_finished, pages_finished, rating_sum, rating_count) "
+                f"SELECT ?, ?, substr(b.date_finished, 1, {_PERIOD_LENGTH[granularity]}) AS period, COUNT(*), "
+                "SUM(COALESCE(b.page_count, w.page_count, 0)), SUM(COALESCE(b.rating, 0)), COUNT(b.rating) "
+                + _FINISHED + " AND b.date_finished IS NOT NULL GROUP BY period",
+                (user_id, granularity, user_id),
+            )
+        conn.execute(
+            "INSERT INTO author_rollups "
+            "(user_id, author_key, author, books_finished, pages_finished, rating_sum, rating_count) "
+            "SELECT ?, lower(trim(b.author)) AS author_key, MIN(trim(b.author)), COUNT(*), "
+            "SUM(COALESCE(b.page_count, w.page_count, 0)), SUM(COALESCE(b.rating, 0)), COUNT(b.rating) "
+            + _FINISHED + " GROUP BY author_key",
+            (user_id, user_id),
+        )
@@ -0,0 +1,80 @@
+"""
+SQL for the normalized author index (migrations v0010 and v0016).
+
+BookRepository calls index_authors() inside each write's transaction and
+uses author_filter() for the listing's author filters.
+"""
+
+from typing import Optional
+
+from app.utils.authors import author_key, key_suffixes, split_authors
+
+
+def _suffixes(authors: dict[str, str]) -> set[str]:
+    return {suffix for key in authors for suffix in key_suffixes(key)}
+
+
+def index_authors(conn, user_id: int, book_id: int, old_author: Optional[str], new_author: Optional[str]) -> None:
+    """Move a book's index rows from old_author to new_author (None for create/delete)."""
+    old = split_authors(old_author) if old_author else {}
+    new = split_authors(new_author) if new_author else {}
+    removed = [key for key in old if key not in new]
+    added = [(key, name) for key, name in new.items() if key not in old]
+    if removed:
+        conn.executemany(
+            "DELETE FROM book_authors WHERE user_id = ? AND author_key = ? AND book_id = ?",
+            [(user_id, key, book_id) for key in removed],
+        )
+        conn.executemany(
+            "UPDATE author_counts SET books = books - 1 WHERE user_id = ? AND author_key = ?",
+            [(user_id, key) for key in removed],
+        )
+        conn.execute("DELETE FROM author_counts WHERE user_id = ? AND books <= 0", (user_id,))
+    if added:
+        conn.executemany(
+            "INSERT INTO book_authors (user_id, author_key, book_id) VALUES (?, ?, ?)",
+            [(user_id, key, book_id) for key, _ in added],
+        )
+        # The spelling shown is the smallest one seen, as in the backfill.
+        conn.executemany(
+            "INSERT INTO author_counts (user_id, author_key, name, books) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (user_id, author_key) DO UPDATE SET "
+            "books = books + 1, name = min(name, excluded.name)",
+            [(user_id, key, name) for key, name in added],
+        )
+    # Co-authors can share a suffix ("frank herbert", "brian herbert"), so
+    # suffix rows move by set difference rather than per author.
+    old_suffixes, new_suffixes = _suffixes(old), _suffixes(new)
+    conn.executemany(
+        "DELETE FROM book_author_suffixes WHERE user_id = ? AND suffix = ? AND book_id = ?",
+        [(user_id, suffix, book_id) for suffix in old_suffixes - new_suffixes],
+    )
+    conn.executemany(
+        "INSERT INTO book_author_suffixes (user_id, suffix, book_id) VALUES (?, ?, ?)",
+        [(user_id, suffix, book_id) for suffix in new_suffixes - old_suffixes],
+    )
+
+
+def key_range(prefix: str) -> tuple[str, str]:
+    """[low, high) bounds of the keys starting with prefix, for an index range scan."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def author_filter(user_id: int, author: str, match: str) -> tuple[str, list]:
+    """
+    WHERE fragment (on books b) for the user's books by an author whose
+    key equals author's key, or has a name starting with it ("herbert"
+    finds "frank herbert"). The subquery is one range of the primary key
+    of book_authors (exact) or book_author_suffixes (prefix), evaluated once.
+    """
+    key = author_key(author)
+    if match == "exact":
+        return (
+            " AND b.id IN (SELECT book_id FROM book_authors WHERE user_id = ? AND author_key = ?)",
+            [user_id, key],
+        )
+    low, high = key_range(key)
+    return (
+        " AND b.id IN (SELECT book_id FROM book_author_suffixes WHERE user_id = ? AND suffix >= ? AND suffix < ?)",
+        [user_id, low, high],
+    )
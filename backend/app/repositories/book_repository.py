@@ -6,18 +6,241 @@ A user can never read or modify another user's books.
 This is enforced at the SQL level, not just application logic.
 """
 
-from datetime import date
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Callable, Iterator, Optional, TypeVar
 
-from app.database import get_db
-from app.models.book import Book, ReadingStatus
+from app.database import ShardRouter, as_router, get_db
+from app.models.book import Book, ReadingStatus, percent_complete
+from app.models.work import Work
+from app.repositories.analytics_repository import apply_book_change
+from app.repositories.author_index import author_filter, index_authors
+from app.repositories.title_index import candidate_ids, index_title
+from app.repositories.work_repository import find_work
+from app.repositories.write_queue import WriteQueue
+
+T = TypeVar("T")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _override(value, work: Optional[Work], field: str, clear: bool = False):
+    """
+    What books stores for a work-backed field: NULL when the value is the
+    catalog's (so it isn't copied into every user's row), the cleared
+    marker when the user removes a value the catalog would supply (an
+    empty string, or None with clear=True), else the user's own value.
+    """
+    if work is None or getattr(work, field) is None:
+        return value
+    if value == "" or (value is None and clear):
+        return _CLEARED[field]
+    if value == getattr(work, field):
+        return None
+    return value
+
+
+# Sort key -> ORDER BY expression. Must match the index definitions in
+# migrations/v0002_listing_indexes.py, including collation.
+_SORT_COLUMNS = {
+    "title": "b.title COLLATE NOCASE",
+    "author": "b.author COLLATE NOCASE",
+    "rating": "b.rating",
+    "date_finished": "b.date_finished",
+    "date_added": "b.date_added",
+}
+
+# Every book read goes through this: cover_url and page_count are the
+# user's override if set, else the shared catalog value (migration v0005),
+# and the cleared markers ('' and 0, see _CLEARED) read back as NULL.
+# Tags are not in the row: _to_books reads them for a whole result in one
+# query per IN_CHUNK ids rather than running a subquery per row.
+SELECT_BOOKS = """
+    SELECT b.id, b.user_id, b.title, b.author, b.isbn, b.status, b.rating,
+           NULLIF(COALESCE(b.page_count, w.page_count), 0) AS page_count, b.notes,
+           NULLIF(COALESCE(b.cover_url, w.cover_url), '') AS cover_url,
+           b.date_added, b.date_finished, b.change_seq, b.work_id, b.current_page
+    FROM books b LEFT JOIN works w ON w.id = b.work_id
+"""
+
+# The columnar listing (GET /api/books?format=columnar): one list per
+# field. Status is a code into STATUS_DICTIONARY and dates are days since
+# DATE_EPOCH, both computed by SQLite, so the rows are transposed as they
+# come without building a Book or a dict per row. Tags are read for the
+# returned ids only (_tags_of) rather than with a subquery per row.
+STATUS_DICTIONARY = tuple(s.value for s in ReadingStatus)
+DATE_EPOCH = "1970-01-01"
+COLUMNS = (
+    "id", "title", "author", "isbn", "status", "rating", "page_count", "notes", "cover_url",
+    "work_id", "current_page", "date_added", "date_finished",
+)
+_STATUS_CODE = "CASE b.status " + " ".join(
+    f"WHEN '{value}' THEN {code}" for code, value in enumerate(STATUS_DICTIONARY)
+) + " END"
+SELECT_BOOK_COLUMNS = f"""
+    SELECT b.id, b.title, b.author, b.isbn, {_STATUS_CODE}, b.rating,
+           NULLIF(COALESCE(b.page_count, w.page_count), 0), b.notes,
+           NULLIF(COALESCE(b.cover_url, w.cover_url), ''),
+           b.work_id, b.current_page,
+           CAST(julianday(b.date_added) - julianday('{DATE_EPOCH}') AS INTEGER),
+           CAST(julianday(b.date_finished) - julianday('{DATE_EPOCH}') AS INTEGER)
+    FROM books b LEFT JOIN works w ON w.id = b.work_id
+"""
+
+# Ids per "id IN (...)" query, keeping the bound parameters under the 999
+# that SQLite builds before 3.32 allow by default.
+IN_CHUNK = 900
+
+# Columns stored as "override or NULL to inherit from the work".
+_WORK_FIELDS = ("cover_url", "page_count")
+# Stored instead of NULL when the user clears a work-backed field, so the
+# catalog's value doesn't show through. Neither is a valid value.
+_CLEARED = {"cover_url": "", "page_count": 0}
+
+
+def tag_key(name: str) -> str:
+    """Tags differing only in case or spacing are the same tag."""
+    return " ".join(name.split()).casefold()
+
+
+def _tag_filter(user_id: int, tags: tuple, match: str) -> tuple[str, list]:
+    """
+    WHERE fragment for books carrying all (or any) of tags. Each tag's
+    books are one (user_id, tag_key) range of the book_tags primary key,
+    read once into a list subquery: "all" intersects one such set per tag,
+    "any" reads the tags' ranges into a single set.
+    """
+    keys = list(dict.fromkeys(tag_key(t) for t in tags))
+    branch = "b.id IN (SELECT book_id FROM book_tags WHERE user_id = ? AND tag_key {})"
+    if match == "any":
+        clause = branch.format(f"IN ({', '.join('?' for _ in keys)})")
+        return f" AND {clause}", [user_id, *keys]
+    return "".join(f" AND {branch.format('= ?')}" for _ in keys), [p for key in keys for p in (user_id, key)]
+
+
+# Fields that change what a book contributes to the reading rollups.
+_ROLLUP_FIELDS = {"status", "date_finished", "rating", "page_count", "author", "isbn"}
 
 
 class BookRepository:
-    def __init__(self, db_path: str):
-        self._db_path = db_path
+    def __init__(self, db_path: "str | ShardRouter", write_queue: Optional[WriteQueue] = None):
+        self._router = as_router(db_path)
+        # Single-row writes go through the group-commit queue when set.
+        self._write_queue = write_queue
+        # Connection of the transaction open on this thread, if any.
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self, user_id: int) -> Iterator[None]:
+        """
+        Run several repository calls for one user as one SQLite transaction
+        (on that user's shard).
+
+        BEGIN IMMEDIATE takes the write lock up front so the batch can't
+        fail half-way on a lock upgrade. Every call made on this thread
+        inside the block shares the connection; commits on success, rolls
+        back on any exception. Nested use joins the outer transaction.
+        """
+        if getattr(self._local, "conn", None) is not None:
+            yield
+            return
+        conn = get_db(self._router.path_for(user_id))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.conn = conn
+            try:
+                yield
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        finally:
+            self._local.conn = None
+            conn.close()
+
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """Undo just the enclosed calls on exception, keeping the outer transaction."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            raise RuntimeError("savepoint() requires an open transaction().")
+        conn.execute("SAVEPOINT op")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK TO op")
+            conn.execute("RELEASE op")
+            raise
+        conn.execute("RELEASE op")
+
+    @contextmanager
+    def _snapshot(self, user_id: int) -> Iterator:
+        """Connection whose reads all see one consistent snapshot."""
+        if getattr(self._local, "conn", None) is not None:
+            yield self._local.conn
+            return
+        conn = get_db(self._router.path_for(user_id))
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        finally:
+            conn.rollback()
+            conn.close()
+
+    @contextmanager
+    def _connect(self, user_id: int) -> Iterator:
+        """
+        Connection for one repository call: the thread's open transaction
+        if there is one, otherwise a fresh connection to the user's shard
+        that commits (or rolls back) and closes when the call is done.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = get_db(self._router.path_for(user_id))
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _write(self, user_id: int, job: Callable[..., T]) -> T:
+        """
+        Run job(conn) as one write: inside the thread's open transaction,
+        else as part of a group commit if a write queue is configured,
+        else in its own transaction.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None and self._write_queue is not None:
+            return self._write_queue.run(self._router.path_for(user_id), job)
+        with self._connect(user_id) as conn:
+            return job(conn)
 
-    def _row_to_book(self, row) -> Book:
+    def _to_books(self, conn, user_id: int, rows) -> list[Book]:
+        """Books for SELECT_BOOKS rows, with their tags read on conn."""
+        tagged = self._tags_of(conn, user_id, [row["id"] for row in rows])
+        return [self._row_to_book(row, tagged.get(row["id"], [])) for row in rows]
+
+    def _tags_of(self, conn, user_id: int, ids: list[int]) -> dict[int, list[str]]:
+        """Tag names by book id for ids (untagged books absent), via idx_book_tags_book."""
+        tagged: dict[int, list[str]] = {}
+        for start in range(0, len(ids), IN_CHUNK):
+            chunk = ids[start:start + IN_CHUNK]
+            for book_id, name in conn.execute(
+                "SELECT bt.book_id, t.name FROM book_tags bt "
+                "JOIN tags t ON t.user_id = bt.user_id AND t.tag_key = bt.tag_key "
+                f"WHERE bt.user_id = ? AND bt.book_id IN ({', '.join('?' for _ in chunk)}) "
+                "ORDER BY bt.book_id, bt.tag_key",
+                (user_id, *chunk),
+            ):
+                tagged.setdefault(book_id, []).append(name)
+        return tagged
+
+    def _row_to_book(self, row, tags: list[str]) -> Book:
         return Book(
             id=row["id"],
             user_id=row["user_id"],
@@ -37,46 +260,269 @@ class BookRepository:
                 if row["date_finished"]
                 else None
             ),
+            change_seq=row["change_seq"],
+            work_id=row["work_id"],
+            current_page=row["current_page"],
+            tags=tags,
         )
 
-    def get_all(
+    def _list_query(
         self,
         user_id: int,
         status: Optional[str] = None,
         author: Optional[str] = None,
-    ) -> list[Book]:
-        query = "SELECT * FROM books WHERE user_id = ?"
+        author_match: str = "prefix",
+        sort: str = "date_added",
+        order: str = "desc",
+        finished_after: Optional[str] = None,
+        finished_before: Optional[str] = None,
+        min_rating: Optional[int] = None,
+        tags: Optional[tuple] = None,
+        tags_match: str = "all",
+        select: str = SELECT_BOOKS,
+    ) -> tuple[str, list]:
+        """
+        Build the listing query. Every sort key walks a (user_id, column)
+        index (see migration v0002), so no temp B-tree sort is needed; id
+        breaks ties in the same direction, which the index also provides.
+
+        An author filter reads one primary-key range of book_authors or
+        book_author_suffixes into a set once; the walk then tests ids against it
+        instead of running LOWER() ... LIKE on every row. A tag filter does
+        the same with one set per tag ("all") or one for all its tags ("any").
+        """
+        if sort not in _SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort key: {sort}")
+        direction = "ASC" if order == "asc" else "DESC"
+
+        query = select + " WHERE b.user_id = ?"
         params: list = [user_id]
 
         if status:
-            query += " AND status = ?"
+            query += " AND b.status = ?"
             params.append(status)
         if author:
-            query += " AND LOWER(author) LIKE ?"
-            params.append(f"%{author.lower()}%")
+            clause, clause_params = author_filter(user_id, author, author_match)
+            query += clause
+            params.extend(clause_params)
+        if finished_after:
+            query += " AND b.date_finished >= ?"
+            params.append(finished_after)
+        if finished_before:
+            query += " AND b.date_finished <= ?"
+            params.append(finished_before)
+        if min_rating is not None:
+            query += " AND b.rating >= ?"
+            params.append(min_rating)
+        if tags:
+            clause, clause_params = _tag_filter(user_id, tags, tags_match)
+            query += clause
+            params.extend(clause_params)
+
+        query += f" ORDER BY {_SORT_COLUMNS[sort]} {direction}, b.id {direction}"
+        return query, params
+
+    def get_all(self, user_id: int, **filters) -> list[Book]:
+        """
+        filters: status, author, author_match, sort, order, finished_after,
+        finished_before, min_rating, tags, tags_match.
+        """
+        query, params = self._list_query(user_id, **filters)
+        with self._connect(user_id) as conn:
+            return self._to_books(conn, user_id, conn.execute(query, params).fetchall())
 
-        query += " ORDER BY date_added DESC"
+    def get_columns(self, user_id: int, **filters) -> dict:
+        """
+        The get_all listing as {"count", "columns": {field: [values]},
+        "dictionaries", "date_epoch"}; see SELECT_BOOK_COLUMNS.
+        """
+        query, params = self._list_query(user_id, select=SELECT_BOOK_COLUMNS, **filters)
+        with self._connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # plain tuples, transposed below
+            rows = cursor.execute(query, params).fetchall()
+            tagged = self._tags_of(conn, user_id, [row[0] for row in rows])
+        values = dict(zip(COLUMNS, map(list, zip(*rows)))) if rows else {name: [] for name in COLUMNS}
+        values["tags"] = [tagged.get(book_id, []) for book_id in values["id"]]
+        values["percent_complete"] = list(map(percent_complete, values["current_page"], values["page_count"]))
+        return {
+            "count": len(rows),
+            "columns": values,
+            "dictionaries": {"status": list(STATUS_DICTIONARY)},
+            "date_epoch": DATE_EPOCH,
+        }
+
+    def get_many(self, user_id: int, book_ids: list[int]) -> dict[int, Book]:
+        """The user's books among book_ids, by id (ids of other users' books are simply absent)."""
+        with self._snapshot(user_id) as conn:
+            return self._fetch_many(conn, user_id, book_ids)
 
-        with get_db(self._db_path) as conn:
-            rows = conn.execute(query, params).fetchall()
-        return [self._row_to_book(r) for r in rows]
+    def _fetch_many(self, conn, user_id: int, book_ids: list[int]) -> dict[int, Book]:
+        ids = list(dict.fromkeys(book_ids))
+        books: dict[int, Book] = {}
+        for start in range(0, len(ids), IN_CHUNK):
+            chunk = ids[start:start + IN_CHUNK]
+            rows = conn.execute(
+                SELECT_BOOKS + f" WHERE b.user_id = ? AND b.id IN ({', '.join('?' for _ in chunk)})",
+                (user_id, *chunk),
+            ).fetchall()
+            for book in self._to_books(conn, user_id, rows):
+                books[book.id] = book
+        return books
 
     def get_by_id(self, book_id: int, user_id: int) -> Optional[Book]:
         """Fetch by id AND user_id — prevents cross-user access."""
-        with get_db(self._db_path) as conn:
-            row = conn.execute(
-                "SELECT * FROM books WHERE id = ? AND user_id = ?",
+        return self._load(book_id, user_id)
+
+    def _load(self, book_id: int, user_id: int) -> Optional[Book]:
+        """Uncached read used by the write paths (subclasses may cache get_by_id)."""
+        with self._connect(user_id) as conn:
+            rows = conn.execute(
+                SELECT_BOOKS + " WHERE b.id = ? AND b.user_id = ?",
                 (book_id, user_id),
-            ).fetchone()
-        return self._row_to_book(row) if row else None
+            ).fetchall()
+            return next(iter(self._to_books(conn, user_id, rows)), None)
+
+    def _row(self, conn, book_id: int, user_id: int):
+        """A book's effective row, read on the caller's connection (inside a write)."""
+        return conn.execute(
+            SELECT_BOOKS + " WHERE b.id = ? AND b.user_id = ?", (book_id, user_id)
+        ).fetchone()
 
     def get_by_isbn(self, isbn: str, user_id: int) -> Optional[Book]:
-        with get_db(self._db_path) as conn:
-            row = conn.execute(
-                "SELECT * FROM books WHERE isbn = ? AND user_id = ?",
+        with self._connect(user_id) as conn:
+            rows = conn.execute(
+                SELECT_BOOKS + " WHERE b.isbn = ? AND b.user_id = ?",
                 (isbn, user_id),
-            ).fetchone()
-        return self._row_to_book(row) if row else None
+            ).fetchall()
+            return next(iter(self._to_books(conn, user_id, rows)), None)
+
+    def authors(self, user_id: int, prefix: Optional[str], limit: int) -> list[dict]:
+        """
+        The user's authors with book counts, by key. prefix (an author_key)
+        matches the start of any name in the key, as ?author= does, so
+        "herbert" finds "frank herbert". That is a test per author row on
+        the user's author_counts range, which holds one row per author.
+        """
+        query = "SELECT name, author_key, books FROM author_counts WHERE user_id = ?"
+        params: list = [user_id]
+        if prefix:
+            query += " AND instr(' ' || author_key, ' ' || ?) > 0"
+            params.append(prefix)
+        query += " ORDER BY author_key LIMIT ?"
+        with self._connect(user_id) as conn:
+            rows = conn.execute(query, (*params, limit)).fetchall()
+        return [{"name": r["name"], "key": r["author_key"], "books": r["books"]} for r in rows]
+
+    def similar_titles(self, user_id: int, title: str, min_dice: float) -> list[Book]:
+        """
+        Books whose title could be at least min_dice similar to title, from
+        the trigram index. A superset: the caller scores them. Sees the
+        thread's open transaction, so a batch import checks against books
+        it added earlier in the batch.
+        """
+        with self._connect(user_id) as conn:
+            books = self._fetch_many(conn, user_id, candidate_ids(conn, user_id, title, min_dice, IN_CHUNK))
+        return [books[book_id] for book_id in sorted(books)]
+
+    def _next_change_seq(self, conn, user_id: int, count: int = 1) -> int:
+        """
+        Bump and return the user's change sequence (by count, reserving
+        that many numbers, the last of which is returned). Must run inside
+        the write transaction it versions, so the sequence and the change
+        commit (or roll back) together. Call it only once the write is
+        known to have touched a row, so misses don't burn numbers.
+        """
+        row = conn.execute(
+            "UPDATE users SET change_seq = change_seq + ? WHERE id = ? RETURNING change_seq",
+            (count, user_id),
+        ).fetchone()
+        return row[0]
+
+    # ── Tags ──────────────────────────────────────────────────────
+
+    def tags(self, user_id: int) -> list[dict]:
+        """The user's tags with their book counts, by name."""
+        with self._connect(user_id) as conn:
+            rows = conn.execute(
+                "SELECT name, books FROM tags WHERE user_id = ? ORDER BY tag_key", (user_id,)
+            ).fetchall()
+        return [{"name": r["name"], "books": r["books"]} for r in rows]
+
+    def _count_tags(self, conn, user_id: int, changes: list[tuple[str, Optional[str]]], sign: int) -> None:
+        """Adjust tags.books by sign per (tag_key, name) change; drop tags left without books."""
+        counts: dict[str, int] = {}
+        names: dict[str, Optional[str]] = {}
+        for key, name in changes:
+            counts[key] = counts.get(key, 0) + 1
+            names.setdefault(key, name)
+        if not counts:
+            return
+        if sign > 0:
+            conn.executemany(
+                "INSERT INTO tags (user_id, tag_key, name, books) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, tag_key) DO UPDATE SET books = books + excluded.books",
+                [(user_id, key, names[key], n) for key, n in counts.items()],
+            )
+        else:
+            conn.executemany(
+                "UPDATE tags SET books = books - ? WHERE user_id = ? AND tag_key = ?",
+                [(n, user_id, key) for key, n in counts.items()],
+            )
+            conn.execute("DELETE FROM tags WHERE user_id = ? AND books <= 0", (user_id,))
+
+    def set_tags(self, user_id: int, tags: list[str], book_ids: list[int], add: bool) -> tuple[list[Book], list[int]]:
+        """
+        Add (or remove) tags on many books as one write: one INSERT ... SELECT
+        (or DELETE) per tag covers every book. Each book that changed gets
+        its own change sequence number. Returns (changed books, ids not found).
+        """
+        names = {}
+        for t in tags:
+            names.setdefault(tag_key(t), t.strip())
+        ids = list(dict.fromkeys(book_ids))
+        id_list = ", ".join("?" for _ in ids)
+
+        def apply(conn) -> tuple[list[int], list[int]]:
+            found = {r[0] for r in conn.execute(
+                f"SELECT id FROM books WHERE user_id = ? AND id IN ({id_list})", (user_id, *ids)
+            )}
+            changes = []
+            for key, name in names.items():
+                if add:
+                    rows = conn.execute(
+                        "INSERT OR IGNORE INTO book_tags (user_id, tag_key, book_id) "
+                        f"SELECT user_id, ?, id FROM books WHERE user_id = ? AND id IN ({id_list}) RETURNING book_id",
+                        (key, user_id, *ids),
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        f"DELETE FROM book_tags WHERE user_id = ? AND tag_key = ? AND book_id IN ({id_list}) "
+                        "RETURNING book_id",
+                        (user_id, key, *ids),
+                    ).fetchall()
+                changes.extend((key, name, r[0]) for r in rows)
+            self._count_tags(conn, user_id, [(key, name) for key, name, _ in changes], 1 if add else -1)
+
+            changed = sorted({book_id for _, _, book_id in changes})
+            if changed:
+                last = self._next_change_seq(conn, user_id, len(changed))
+                now = _now()
+                conn.executemany(
+                    "UPDATE books SET change_seq = ?, updated_at = ? WHERE id = ? AND user_id = ?",
+                    [(last - len(changed) + i, now, book_id, user_id) for i, book_id in enumerate(changed, start=1)],
+                )
+            return changed, [i for i in ids if i not in found]
+
+        changed, missing = self._write(user_id, apply)
+        if not changed:
+            return [], missing
+        with self._connect(user_id) as conn:
+            rows = conn.execute(
+                SELECT_BOOKS + f" WHERE b.user_id = ? AND b.id IN ({', '.join('?' for _ in changed)}) ORDER BY b.id",
+                (user_id, *changed),
+            ).fetchall()
+            return self._to_books(conn, user_id, rows), missing
 
     def create(self, book: Book) -> Book:
         if book.isbn and self.get_by_isbn(book.isbn, book.user_id):
@@ -85,29 +531,38 @@ class BookRepository:
         sql = """
             INSERT INTO books
                 (user_id, title, author, isbn, status, rating, page_count,
-                 notes, cover_url, date_added, date_finished)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        params = (
-            book.user_id,
-            book.title,
-            book.author,
-            book.isbn,
-            book.status.value,
-            book.rating,
-            book.page_count,
-            book.notes,
-            book.cover_url,
-            book.date_added.isoformat() if book.date_added else None,
-            book.date_finished.isoformat() if book.date_finished else None,
-        )
+                 notes, cover_url, date_added, date_finished, change_seq, updated_at, work_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
 
-        with get_db(self._db_path) as conn:
-            cursor = conn.execute(sql, params)
-            conn.commit()
-            new_id = cursor.lastrowid
+        def insert(conn) -> int:
+            work = find_work(conn, book.isbn) if book.isbn else None
+            seq = self._next_change_seq(conn, book.user_id)
+            params = (
+                book.user_id,
+                book.title,
+                book.author,
+                book.isbn,
+                book.status.value,
+                book.rating,
+                _override(book.page_count, work, "page_count"),
+                book.notes,
+                _override(book.cover_url, work, "cover_url"),
+                book.date_added.isoformat() if book.date_added else None,
+                book.date_finished.isoformat() if book.date_finished else None,
+                seq,
+                _now(),
+                work.id if work else None,
+            )
+            new_id = conn.execute(sql, params).lastrowid
+            index_title(conn, book.user_id, new_id, None, book.title)
+            index_authors(conn, book.user_id, new_id, None, book.author)
+            if book.status == ReadingStatus.FINISHED:
+                apply_book_change(conn, book.user_id, None, self._row(conn, new_id, book.user_id))
+            return new_id
 
-        return self.get_by_id(new_id, book.user_id)
+        new_id = self._write(book.user_id, insert)
+        return self._load(new_id, book.user_id)
 
     def update(self, book_id: int, user_id: int, fields: dict) -> Optional[Book]:
         allowed = {
@@ -117,7 +572,7 @@ class BookRepository:
         safe_fields = {k: v for k, v in fields.items() if k in allowed}
 
         if not safe_fields:
-            return self.get_by_id(book_id, user_id)
+            return self._load(book_id, user_id)
 
         if "isbn" in safe_fields and safe_fields["isbn"] is not None:
             existing = self.get_by_isbn(safe_fields["isbn"], user_id)
@@ -128,24 +583,205 @@ class BookRepository:
             v = safe_fields["status"]
             safe_fields["status"] = v.value if isinstance(v, ReadingStatus) else v
 
-        set_clause = ", ".join(f"{k} = ?" for k in safe_fields)
-        params = list(safe_fields.values()) + [book_id, user_id]
-        sql = f"UPDATE books SET {set_clause} WHERE id = ? AND user_id = ?"
+        tracks_rollups = not _ROLLUP_FIELDS.isdisjoint(safe_fields)
 
-        with get_db(self._db_path) as conn:
-            conn.execute(sql, params)
-            conn.commit()
+        def apply(conn) -> None:
+            reindex = {"title", "author"} & safe_fields.keys()
+            before = self._row(conn, book_id, user_id) if tracks_rollups or reindex else None
+            work = self._work_for_update(conn, book_id, user_id, safe_fields)
+            if "isbn" in safe_fields:
+                safe_fields["work_id"] = work.id if work else None
+            for field in _WORK_FIELDS:
+                if field in safe_fields:
+                    safe_fields[field] = _override(safe_fields[field], work, field, clear=True)
 
-        return self.get_by_id(book_id, user_id)
+            set_clause = ", ".join(f"{k} = ?" for k in safe_fields)
+            sql = (
+                f"UPDATE books SET {set_clause}, updated_at = ?, "
+                f"change_seq = (SELECT change_seq + 1 FROM users WHERE id = ?) "
+                f"WHERE id = ? AND user_id = ?"
+            )
+            # The row takes the next sequence value; the counter is only
+            # bumped if the book exists, all inside the same transaction.
+            params = list(safe_fields.values()) + [_now(), user_id, book_id, user_id]
+            cursor = conn.execute(sql, params)
+            if cursor.rowcount:
+                self._next_change_seq(conn, user_id)
+                if tracks_rollups:
+                    apply_book_change(conn, user_id, before, self._row(conn, book_id, user_id))
+                if "title" in safe_fields:
+                    index_title(conn, user_id, book_id, before["title"], safe_fields["title"])
+                if "author" in safe_fields:
+                    index_authors(conn, user_id, book_id, before["author"], safe_fields["author"])
 
-    def delete(self, book_id: int, user_id: int) -> bool:
-        with get_db(self._db_path) as conn:
-            cursor = conn.execute(
+        self._write(user_id, apply)
+        return self._load(book_id, user_id)
+
+    def _work_for_update(self, conn, book_id: int, user_id: int, fields: dict) -> Optional[Work]:
+        """
+        The catalog entry the updated row will reference: re-linked when
+        the ISBN changes, else the current one if a work-backed field is
+        being written.
+        """
+        if "isbn" in fields:
+            return find_work(conn, fields["isbn"]) if fields["isbn"] else None
+        if not any(field in fields for field in _WORK_FIELDS):
+            return None
+        row = conn.execute(
+            "SELECT w.id, w.isbn, w.ol_work_id, w.title, w.author, w.cover_url, w.page_count "
+            "FROM books b JOIN works w ON w.id = b.work_id WHERE b.id = ? AND b.user_id = ?",
+            (book_id, user_id),
+        ).fetchone()
+        return Work(**dict(row)) if row else None
+
+    def delete(self, book_id: int, user_id: int) -> Optional[int]:
+        """Delete a book. Returns the deletion's change sequence, or None if not found."""
+        def remove(conn) -> Optional[int]:
+            before = self._row(conn, book_id, user_id)
+            if before is None:
+                return None
+            conn.execute(
                 "DELETE FROM books WHERE id = ? AND user_id = ?",
                 (book_id, user_id),
             )
-            conn.commit()
-        return cursor.rowcount > 0
+            apply_book_change(conn, user_id, before, None)
+            index_title(conn, user_id, book_id, before["title"], None)
+            index_authors(conn, user_id, book_id, before["author"], None)
+            removed = conn.execute(
+                "DELETE FROM book_tags WHERE book_id = ? AND user_id = ? RETURNING tag_key", (book_id, user_id)
+            ).fetchall()
+            self._count_tags(conn, user_id, [(r[0], None) for r in removed], -1)
+            conn.execute(
+                "DELETE FROM reading_progress_daily WHERE book_id = ? AND user_id = ?", (book_id, user_id)
+            )
+            seq = self._next_change_seq(conn, user_id)
+            conn.execute(
+                "INSERT INTO book_tombstones (user_id, change_seq, book_id, deleted_at) VALUES (?, ?, ?, ?)",
+                (user_id, seq, book_id, _now()),
+            )
+            return seq
+
+        return self._write(user_id, remove)
+
+    def record_progress(
+        self, book_id: int, user_id: int, page: int, recorded_at: int
+    ) -> tuple[Optional[Book], bool]:
+        """
+        Append a progress event and move books.current_page to it, as one
+        write that bumps the change sequence. The rules (status reading,
+        page within the effective page_count) are conditions of the UPDATE,
+        so a concurrent edit can't slip in between check and write.
+        Returns (book, recorded): book is None if not found; if recorded
+        is False a rule refused the page and book is the row as it stood.
+        """
+        def append(conn) -> tuple[bool, Optional[Book]]:
+            cursor = conn.execute(
+                "UPDATE books SET current_page = ?, updated_at = ?, "
+                "change_seq = (SELECT change_seq + 1 FROM users WHERE id = ?) "
+                "WHERE id = ? AND user_id = ? AND status = 'reading' "
+                # No page count (NULL or cleared) means no upper bound.
+                "AND ? <= COALESCE(NULLIF(COALESCE(page_count, "
+                "(SELECT w.page_count FROM works w WHERE w.id = books.work_id)), 0), ?)",
+                (page, _now(), user_id, book_id, user_id, page, page),
+            )
+            if cursor.rowcount == 0:
+                row = self._row(conn, book_id, user_id)
+                return False, self._to_books(conn, user_id, [row])[0] if row else None
+            self._next_change_seq(conn, user_id)
+            conn.execute(
+                "INSERT INTO progress_events (user_id, book_id, page, recorded_at) VALUES (?, ?, ?, ?)",
+                (user_id, book_id, page, recorded_at),
+            )
+            return True, None
+
+        recorded, book = self._write(user_id, append)
+        if recorded:
+            book = self._load(book_id, user_id)
+        return book, recorded
+
+    def purge_tombstones(self, before: str, batch_size: int = 1000) -> int:
+        """
+        Delete tombstones older than `before` (an ISO timestamp) in short
+        batches, raising each owner's tombstones_purged_seq past them in
+        the same transaction. Returns rows deleted.
+        """
+        deleted = 0
+        for path in self._router.shard_paths():
+            while True:
+                with get_db(path) as conn:
+                    rows = conn.execute(
+                        "DELETE FROM book_tombstones WHERE (user_id, change_seq) IN ("
+                        "SELECT user_id, change_seq FROM book_tombstones WHERE deleted_at < ? LIMIT ?) "
+                        "RETURNING user_id, change_seq",
+                        (before, batch_size),
+                    ).fetchall()
+                    horizons: dict[int, int] = {}
+                    for row in rows:
+                        horizons[row["user_id"]] = max(horizons.get(row["user_id"], 0), row["change_seq"])
+                    conn.executemany(
+                        "UPDATE users SET tombstones_purged_seq = MAX(tombstones_purged_seq, ?) WHERE id = ?",
+                        [(seq, user_id) for user_id, seq in horizons.items()],
+                    )
+                    conn.commit()
+                deleted += len(rows)
+                if len(rows) < batch_size:
+                    break
+        return deleted
+
+    def library_version(self, user_id: int) -> int:
+        """The user's current change sequence (0 for an untouched library)."""
+        with self._connect(user_id) as conn:
+            row = conn.execute("SELECT change_seq FROM users WHERE id = ?", (user_id,)).fetchone()
+        return row["change_seq"] if row else 0
+
+    def changes_since(self, user_id: int, since: int, limit: int) -> dict:
+        """
+        Books written and ids deleted after sequence `since`, oldest first,
+        capped at `limit` changes. All reads share one snapshot, so the
+        returned version is consistent with the rows.
+
+        version is the sequence to pass as `since` next time. If a client
+        presents a sequence newer than the server's (e.g. after a restore),
+        or one older than the newest purged tombstone (it may have missed
+        a delete), reset is set and everything is returned.
+        """
+        with self._snapshot(user_id) as conn:
+            row = conn.execute(
+                "SELECT change_seq, tombstones_purged_seq FROM users WHERE id = ?", (user_id,)
+            ).fetchone()
+            high_water = row["change_seq"] if row else 0
+            purged = row["tombstones_purged_seq"] if row else 0
+            reset = since > high_water or 0 < since < purged
+            if reset:
+                since = 0
+
+            books = self._to_books(conn, user_id, conn.execute(
+                SELECT_BOOKS + " WHERE b.user_id = ? AND b.change_seq > ? ORDER BY b.change_seq LIMIT ?",
+                (user_id, since, limit + 1),
+            ).fetchall())
+            tombstones = conn.execute(
+                "SELECT change_seq, book_id FROM book_tombstones "
+                "WHERE user_id = ? AND change_seq > ? ORDER BY change_seq LIMIT ?",
+                (user_id, since, limit + 1),
+            ).fetchall()
+
+        merged = sorted(
+            [(b.change_seq, "upsert", b) for b in books]
+            + [(r["change_seq"], "delete", r) for r in tombstones],
+            key=lambda change: change[0],
+        )
+        has_more = len(merged) > limit
+        merged = merged[:limit]
+        version = merged[-1][0] if has_more else high_water
+
+        return {
+            "since": since,
+            "version": version,
+            "has_more": has_more,
+            "reset": reset,
+            "upserted": [b for _, kind, b in merged if kind == "upsert"],
+            "deleted": [r["book_id"] for _, kind, r in merged if kind == "delete"],
+        }
 
     def stats(self, user_id: int) -> dict:
         sql = """
@@ -156,10 +792,10 @@ class BookRepository:
                 COUNT(CASE WHEN status='want_to_read' THEN 1 END)  AS want_to_read,
                 COUNT(CASE WHEN status='abandoned'    THEN 1 END)  AS abandoned,
                 ROUND(AVG(CASE WHEN rating IS NOT NULL THEN rating END), 2) AS avg_rating,
-                SUM(COALESCE(page_count, 0))                       AS total_pages
-            FROM books
-            WHERE user_id = ?
+                SUM(COALESCE(b.page_count, w.page_count, 0))       AS total_pages
+            FROM books b LEFT JOIN works w ON w.id = b.work_id
+            WHERE b.user_id = ?
         """
-        with get_db(self._db_path) as conn:
+        with self._connect(user_id) as conn:
             row = conn.execute(sql, (user_id,)).fetchone()
         return dict(row)
@@ -0,0 +1,349 @@
+"""
+Read-through cache for BookRepository and UserRepository.
+
+One entry per user, evicted least-recently-used first once the estimated
+size passes max_bytes. An entry holds:
+
+    version  the user's change_seq the cached books were read at
+    books    by-id map of Book objects
+    lists    get_all results per filter combination, as tuples of ids
+    user     the User row, trusted for user_ttl seconds (users don't bump
+             change_seq, so a row deleted or replaced elsewhere ages out)
+
+Every book write bumps users.change_seq in its own transaction, and all
+processes share that row. A cached read first fetches the current value
+(one primary-key lookup) and only trusts the entry if it matches, so a
+write made by another process is seen on the very next read. Lists and
+books are read in the same snapshot as the version they are tagged with.
+
+Writes made through the cached repository patch the by-id map and drop
+the lists; inside transaction() the cache is bypassed and the entry is
+dropped, since uncommitted rows must never be served to other requests.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from typing import Optional
+
+from app.database import ShardRouter
+from app.models.book import Book
+from app.models.user import User
+from app.repositories.book_repository import SELECT_BOOKS, BookRepository
+from app.repositories.user_repository import UserRepository
+from app.repositories.write_queue import WriteQueue
+
+_BOOK_OVERHEAD = 600  # Book instance, its __dict__, date and enum references
+_ENTRY_OVERHEAD = 400
+_LIST_SLOT = 8
+
+
+def _book_size(book: Book) -> int:
+    size = _BOOK_OVERHEAD
+    for f in fields(book):
+        value = getattr(book, f.name)
+        if isinstance(value, str):
+            size += sys.getsizeof(value)
+    return size
+
+
+@dataclass
+class _Entry:
+    version: Optional[int] = None
+    books: dict = field(default_factory=dict)
+    lists: dict = field(default_factory=dict)
+    user: Optional[User] = None
+    user_cached_at: float = 0.0
+    size: int = _ENTRY_OVERHEAD
+
+
+class LibraryCache:
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, user_ttl: float = 60.0, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.user_ttl = user_ttl
+        self._clock = clock
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # ── Internal (call with self._lock held) ──────────────────────
+
+    def _entry(self, user_id: int) -> _Entry:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            entry = self._entries[user_id] = _Entry()
+            self._bytes += entry.size
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def _resize(self, entry: _Entry, delta: int) -> None:
+        entry.size += delta
+        self._bytes += delta
+
+    def _reset_books(self, entry: _Entry, version: Optional[int]) -> None:
+        freed = sum(_book_size(b) for b in entry.books.values())
+        freed += sum(_LIST_SLOT * len(ids) for ids in entry.lists.values())
+        entry.books.clear()
+        entry.lists.clear()
+        entry.version = version
+        self._resize(entry, -freed)
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    # ── Books ─────────────────────────────────────────────────────
+
+    def get_list(self, user_id: int, version: int, key: tuple) -> Optional[list[Book]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            ids = entry.lists.get(key) if entry is not None and entry.version == version else None
+            self._count(ids is not None)
+            if ids is None:
+                return None
+            self._entries.move_to_end(user_id)
+            return [entry.books[i] for i in ids]
+
+    def put_list(self, user_id: int, version: int, key: tuple, books: list[Book]) -> None:
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry.version != version:
+                self._reset_books(entry, version)
+            for book in books:
+                if book.id not in entry.books:
+                    self._resize(entry, _book_size(book))
+                entry.books[book.id] = book
+            if key not in entry.lists:
+                entry.lists[key] = tuple(b.id for b in books)
+                self._resize(entry, _LIST_SLOT * len(books))
+            self._evict()
+
+    def get_book(self, user_id: int, version: int, book_id: int) -> Optional[Book]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            book = entry.books.get(book_id) if entry is not None and entry.version == version else None
+            self._count(book is not None)
+            if book is not None:
+                self._entries.move_to_end(user_id)
+            return book
+
+    def put_book(self, user_id: int, version: int, book: Book) -> None:
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry.version != version:
+                self._reset_books(entry, version)
+            if book.id not in entry.books:
+                self._resize(entry, _book_size(book))
+            entry.books[book.id] = book
+            self._evict()
+
+    def apply_write(self, user_id: int, change_seq: int, book: Optional[Book] = None,
+                    deleted_id: Optional[int] = None) -> None:
+        """
+        Record a committed write. If the entry was current right before it
+        (version == change_seq - 1) the book is patched in and the version
+        advanced; lists are always dropped since order/filters may change.
+        Otherwise someone else wrote in between and the books are dropped.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.version == change_seq:
+                return
+            self.invalidations += 1
+            if entry.version != change_seq - 1:
+                self._reset_books(entry, None)
+                return
+            self._resize(entry, -sum(_LIST_SLOT * len(ids) for ids in entry.lists.values()))
+            entry.lists.clear()
+            entry.version = change_seq
+            old = entry.books.pop(deleted_id if book is None else book.id, None)
+            if old is not None:
+                self._resize(entry, -_book_size(old))
+            if book is not None:
+                entry.books[book.id] = book
+                self._resize(entry, _book_size(book))
+            self._evict()
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self.invalidations += 1
+                self._reset_books(entry, None)
+
+    # ── Users ─────────────────────────────────────────────────────
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            user = entry.user if entry is not None else None
+            if user is not None and self._clock() - entry.user_cached_at >= self.user_ttl:
+                user = None
+            self._count(user is not None)
+            if user is not None:
+                self._entries.move_to_end(user_id)
+            return user
+
+    def put_user(self, user: User) -> None:
+        with self._lock:
+            entry = self._entry(user.id)
+            if entry.user is None:
+                self._resize(entry, sys.getsizeof(user.email) + sys.getsizeof(user.name or "") + 200)
+            entry.user = user
+            entry.user_cached_at = self._clock()
+            self._evict()
+
+    # ── Metrics ───────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class CachedBookRepository(BookRepository):
+    """BookRepository whose reads go through a LibraryCache."""
+
+    def __init__(self, db_path: "str | ShardRouter", cache: LibraryCache,
+                 write_queue: Optional[WriteQueue] = None):
+        super().__init__(db_path, write_queue)
+        self._cache = cache
+
+    def _in_transaction(self) -> bool:
+        return getattr(self._local, "conn", None) is not None
+
+    def get_all(self, user_id: int, **filters) -> list[Book]:
+        if self._in_transaction():
+            return super().get_all(user_id, **filters)
+        key = tuple(sorted(filters.items()))
+        books = self._cache.get_list(user_id, self.library_version(user_id), key)
+        if books is not None:
+            return books
+
+        query, params = self._list_query(user_id, **filters)
+        with self._snapshot(user_id) as conn:
+            version = conn.execute("SELECT change_seq FROM users WHERE id = ?", (user_id,)).fetchone()
+            books = self._to_books(conn, user_id, conn.execute(query, params).fetchall())
+        if version is not None:
+            self._cache.put_list(user_id, version[0], key, books)
+        return list(books)
+
+    def get_by_id(self, book_id: int, user_id: int) -> Optional[Book]:
+        if self._in_transaction():
+            return super().get_by_id(book_id, user_id)
+        book = self._cache.get_book(user_id, self.library_version(user_id), book_id)
+        if book is not None:
+            return book
+
+        with self._snapshot(user_id) as conn:
+            version = conn.execute("SELECT change_seq FROM users WHERE id = ?", (user_id,)).fetchone()
+            rows = conn.execute(
+                SELECT_BOOKS + " WHERE b.id = ? AND b.user_id = ?", (book_id, user_id)
+            ).fetchall()
+            book = next(iter(self._to_books(conn, user_id, rows)), None)
+        if book is None:
+            return None
+        self._cache.put_book(user_id, version[0], book)
+        return book
+
+    def get_many(self, user_id: int, book_ids: list[int]) -> dict[int, Book]:
+        if self._in_transaction():
+            return super().get_many(user_id, book_ids)
+        version = self.library_version(user_id)
+        books: dict[int, Book] = {}
+        missing = []
+        for book_id in dict.fromkeys(book_ids):
+            book = self._cache.get_book(user_id, version, book_id)
+            if book is not None:
+                books[book_id] = book
+            else:
+                missing.append(book_id)
+        if not missing:
+            return books
+
+        with self._snapshot(user_id) as conn:
+            version = conn.execute("SELECT change_seq FROM users WHERE id = ?", (user_id,)).fetchone()
+            fetched = self._fetch_many(conn, user_id, missing)
+        for book in fetched.values():
+            self._cache.put_book(user_id, version[0], book)
+        books.update(fetched)
+        return books
+
+    def create(self, book: Book) -> Book:
+        created = super().create(book)
+        self._after_write(book.user_id, created.change_seq, book=created)
+        return created
+
+    def update(self, book_id: int, user_id: int, fields: dict) -> Optional[Book]:
+        updated = super().update(book_id, user_id, fields)
+        if updated is not None:
+            self._after_write(user_id, updated.change_seq, book=updated)
+        return updated
+
+    def record_progress(
+        self, book_id: int, user_id: int, page: int, recorded_at: int
+    ) -> tuple[Optional[Book], bool]:
+        book, recorded = super().record_progress(book_id, user_id, page, recorded_at)
+        if recorded and book is not None:
+            self._after_write(user_id, book.change_seq, book=book)
+        return book, recorded
+
+    def delete(self, book_id: int, user_id: int) -> Optional[int]:
+        change_seq = super().delete(book_id, user_id)
+        if change_seq is not None:
+            self._after_write(user_id, change_seq, deleted_id=book_id)
+        return change_seq
+
+    def set_tags(self, user_id: int, tags: list[str], book_ids: list[int], add: bool) -> tuple[list[Book], list[int]]:
+        changed, missing = super().set_tags(user_id, tags, book_ids, add)
+        if changed:
+            # Several sequence numbers at once: drop the user's books.
+            self._cache.invalidate(user_id)
+        return changed, missing
+
+    def _after_write(self, user_id: int, change_seq: int, book: Optional[Book] = None,
+                     deleted_id: Optional[int] = None) -> None:
+        if self._in_transaction():
+            self._cache.invalidate(user_id)
+        else:
+            self._cache.apply_write(user_id, change_seq, book=book, deleted_id=deleted_id)
+
+
+class CachedUserRepository(UserRepository):
+    """UserRepository whose get_by_id goes through a LibraryCache."""
+
+    def __init__(self, db_path: "str | ShardRouter", cache: LibraryCache,
+                 write_queue: Optional[WriteQueue] = None):
+        super().__init__(db_path, write_queue)
+        self._cache = cache
+
+    def get_by_id(self, user_id: int) -> Optional[User]:
+        user = self._cache.get_user(user_id)
+        if user is None:
+            user = super().get_by_id(user_id)
+            if user is not None:
+                self._cache.put_user(user)
+        return user
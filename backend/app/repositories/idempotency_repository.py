@@ -0,0 +1,105 @@
+"""
+IdempotencyRepository — all SQL for Idempotency-Key records.
+
+Rows are scoped by user_id like every other table: a key only ever
+replays for the user who sent it.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from app.database import ShardRouter, as_router, get_db
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: bytes
+    status: Optional[int]  # None while the original request is in flight
+    body: Optional[str]
+
+
+class IdempotencyRepository:
+    def __init__(self, db_path: "str | ShardRouter"):
+        self._router = as_router(db_path)
+
+    def claim(
+        self, user_id: int, key: str, fingerprint: bytes, now: int, lease_seconds: int
+    ) -> Optional[StoredResponse]:
+        """
+        Reserve the key for a new request. Returns None if this caller now
+        owns it, otherwise the existing record (finished or in flight).
+        An expired record is replaced, so a crashed request's lease runs out.
+        """
+        conn = get_db(self._router.path_for(user_id))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE user_id = ? AND key = ? AND expires_at <= ?",
+                (user_id, key, now),
+            )
+            cursor = conn.execute(
+                "INSERT INTO idempotency_keys (user_id, key, fingerprint, expires_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING",
+                (user_id, key, fingerprint, now + lease_seconds),
+            )
+            row = None
+            if cursor.rowcount == 0:
+                row = conn.execute(
+                    "SELECT fingerprint, status, body FROM idempotency_keys WHERE user_id = ? AND key = ?",
+                    (user_id, key),
+                ).fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+        return StoredResponse(row["fingerprint"], row["status"], row["body"]) if row else None
+
+    def complete(self, user_id: int, key: str, status: int, body: str, expires_at: int) -> None:
+        with get_db(self._router.path_for(user_id)) as conn:
+            conn.execute(
+                "UPDATE idempotency_keys SET status = ?, body = ?, expires_at = ? WHERE user_id = ? AND key = ?",
+                (status, body, expires_at, user_id, key),
+            )
+            conn.commit()
+
+    def renew(self, claims: list[tuple[int, str]], expires_at: int) -> int:
+        """Push back the expiry of in-flight claims. Returns rows renewed."""
+        by_path: dict[str, list[tuple[int, str]]] = {}
+        for user_id, key in claims:
+            by_path.setdefault(self._router.path_for(user_id), []).append((user_id, key))
+        renewed = 0
+        for path, rows in by_path.items():
+            with get_db(path) as conn:
+                for user_id, key in rows:
+                    renewed += conn.execute(
+                        "UPDATE idempotency_keys SET expires_at = MAX(expires_at, ?) "
+                        "WHERE user_id = ? AND key = ? AND status IS NULL",
+                        (expires_at, user_id, key),
+                    ).rowcount
+                conn.commit()
+        return renewed
+
+    def release(self, user_id: int, key: str) -> None:
+        """Drop an unfinished claim so the client can retry with the same key."""
+        with get_db(self._router.path_for(user_id)) as conn:
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE user_id = ? AND key = ? AND status IS NULL",
+                (user_id, key),
+            )
+            conn.commit()
+
+    def purge_expired(self, now: int, batch_size: int = 1000) -> int:
+        """Delete expired records in short batches. Returns rows deleted."""
+        deleted = 0
+        for path in self._router.shard_paths():
+            while True:
+                with get_db(path) as conn:
+                    cursor = conn.execute(
+                        "DELETE FROM idempotency_keys WHERE (user_id, key) IN ("
+                        "SELECT user_id, key FROM idempotency_keys WHERE expires_at <= ? LIMIT ?)",
+                        (now, batch_size),
+                    )
+                    conn.commit()
+                deleted += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
+        return deleted
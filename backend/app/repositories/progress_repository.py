@@ -0,0 +1,79 @@
+"""
+ProgressRepository — compaction of the reading progress log.
+
+Appending an event is part of a book write (BookRepository.record_progress)
+so it commits together with books.current_page. This module folds old
+events into reading_progress_daily.
+"""
+
+from app.database import ShardRouter, as_router, get_db
+
+_FOLD = """
+    INSERT INTO reading_progress_daily (book_id, day, user_id, start_page, end_page, updates)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (book_id, day) DO UPDATE SET
+        end_page = excluded.end_page,
+        updates  = updates + excluded.updates
+"""
+
+
+class ProgressRepository:
+    def __init__(self, db_path: "str | ShardRouter"):
+        self._router = as_router(db_path)
+
+    def compact(self, before: int, batch_size: int = 5000) -> dict:
+        """
+        Fold events recorded before `before` (unix seconds) into daily
+        rows and delete them, on every shard. Each batch is its own short
+        transaction in event-id order, so a day split across batches (or
+        runs) keeps its first start_page and its latest end_page. Events
+        of books deleted since are discarded.
+        """
+        folded = dropped = 0
+        for path in self._router.shard_paths():
+            while True:
+                f, d = self._compact_batch(path, before, batch_size)
+                folded += f
+                dropped += d
+                if f + d < batch_size:
+                    break
+        return {"folded": folded, "dropped": dropped}
+
+    def _compact_batch(self, path: str, before: int, batch_size: int) -> tuple[int, int]:
+        conn = get_db(path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT e.id, e.user_id, e.book_id, e.page, date(e.recorded_at, 'unixepoch') AS day, "
+                "b.id IS NOT NULL AS live "
+                "FROM progress_events e LEFT JOIN books b ON b.id = e.book_id "
+                "WHERE e.recorded_at < ? ORDER BY e.id LIMIT ?",
+                (before, batch_size),
+            ).fetchall()
+            if not rows:
+                conn.rollback()
+                return 0, 0
+
+            days: dict[tuple, list] = {}  # (book_id, day) -> [user_id, start, end, updates]
+            for r in rows:
+                if not r["live"]:
+                    continue
+                key = (r["book_id"], r["day"])
+                if key in days:
+                    days[key][2] = r["page"]
+                    days[key][3] += 1
+                else:
+                    days[key] = [r["user_id"], r["page"], r["page"], 1]
+            conn.executemany(_FOLD, [(book_id, day, *agg) for (book_id, day), agg in days.items()])
+            conn.execute(
+                "DELETE FROM progress_events WHERE id BETWEEN ? AND ? AND recorded_at < ?",
+                (rows[0]["id"], rows[-1]["id"], before),
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        folded = sum(agg[3] for agg in days.values())
+        return folded, len(rows) - folded
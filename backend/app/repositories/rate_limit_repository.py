@@ -0,0 +1,58 @@
+"""
+RateLimitRepository — token buckets shared by every worker process.
+
+Buckets live in their own SQLite file (RATE_LIMIT_DB_PATH), not in the
+library databases, so a flood of limited requests never competes with
+book writes for the write lock. Each take() is one UPSERT that refills,
+takes a token if there is one and returns the result, so concurrent
+workers can't both spend the last token.
+"""
+
+from app.database import get_db
+from app.utils.rate_limit import Limit
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+        key        TEXT PRIMARY KEY,
+        tokens     REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        taken      INTEGER NOT NULL
+    ) WITHOUT ROWID
+"""
+
+# :refilled is spelled out twice since SQLite can't name an expression.
+_TAKE = """
+    INSERT INTO rate_limit_buckets (key, tokens, updated_at, taken)
+    VALUES (:key, :capacity - 1, :now, 1)
+    ON CONFLICT (key) DO UPDATE SET
+        taken = MIN(:capacity, tokens + MAX(0, :now - updated_at) * :rate) >= 1,
+        tokens = MIN(:capacity, tokens + MAX(0, :now - updated_at) * :rate)
+                 - (MIN(:capacity, tokens + MAX(0, :now - updated_at) * :rate) >= 1),
+        updated_at = :now
+    RETURNING taken, tokens
+"""
+
+
+class RateLimitRepository:
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        with get_db(db_path) as conn:
+            conn.execute(_SCHEMA)
+            conn.commit()
+
+    def take(self, key: str, limit: Limit, now: float) -> tuple[bool, float]:
+        with get_db(self._db_path) as conn:
+            row = conn.execute(
+                _TAKE, {"key": key, "capacity": limit.capacity, "rate": limit.rate, "now": now}
+            ).fetchone()
+            conn.commit()
+        return bool(row["taken"]), row["tokens"]
+
+    def purge(self, now: float, max_period: float) -> int:
+        """Delete buckets idle long enough to have refilled completely (they'd start full anyway)."""
+        with get_db(self._db_path) as conn:
+            deleted = conn.execute(
+                "DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - max_period,)
+            ).rowcount
+            conn.commit()
+        return deleted
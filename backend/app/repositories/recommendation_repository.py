@@ -0,0 +1,58 @@
+"""
+RecommendationRepository — all SQL for co-reading recommendations.
+
+The rebuild job reads every ISBN-keyed book (across all shards) and
+replaces isbn_neighbors wholesale; requests read a handful of rows by
+primary key, drop the ones the user already owns and take title, author
+and cover from the works catalog. No user-entered text is stored.
+"""
+
+from typing import Iterator
+
+from app.database import ShardRouter, as_router, get_db
+
+
+class RecommendationRepository:
+    def __init__(self, db_path: "str | ShardRouter"):
+        self._router = as_router(db_path)
+
+    def iter_library_entries(self) -> Iterator:
+        """(user_id, isbn, status, rating) for every book with an ISBN, streamed shard by shard."""
+        for path in self._router.shard_paths():
+            conn = get_db(path)
+            try:
+                yield from conn.execute(
+                    "SELECT user_id, isbn, status, rating FROM books WHERE isbn IS NOT NULL"
+                )
+            finally:
+                conn.close()
+
+    def replace_neighbors(self, rows: list[tuple]) -> None:
+        """
+        rows: (isbn, rank, neighbor_isbn, score, co_readers). Swapped in
+        with one transaction per shard, so readers see either the old
+        table or the new one.
+        """
+        for path in self._router.shard_paths():
+            with get_db(path) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM isbn_neighbors")
+                conn.executemany("INSERT INTO isbn_neighbors VALUES (?, ?, ?, ?, ?)", rows)
+                conn.commit()
+
+    def neighbors(self, isbn: str, user_id: int, limit: int) -> list[dict]:
+        """
+        Best neighbors of isbn that the user doesn't already have, best
+        first. Title, author and cover are null for ISBNs the catalog
+        has no entry for.
+        """
+        with get_db(self._router.path_for(user_id)) as conn:
+            rows = conn.execute(
+                "SELECT n.neighbor_isbn AS isbn, w.title, w.author, w.cover_url, n.score, n.co_readers "
+                "FROM isbn_neighbors n LEFT JOIN works w ON w.isbn = n.neighbor_isbn "
+                "WHERE n.isbn = ? AND NOT EXISTS ("
+                "SELECT 1 FROM books b WHERE b.user_id = ? AND b.isbn = n.neighbor_isbn) "
+                "ORDER BY n.rank LIMIT ?",
+                (isbn, user_id, limit),
+            ).fetchall()
+        return [{**dict(r), "score": round(r["score"], 4)} for r in rows]
@@ -0,0 +1,77 @@
+"""
+SQL for the per-user title trigram index (migration v0009).
+
+BookRepository calls index_title() inside each write's transaction and
+candidate_ids() for the duplicate check on add; similarity scoring itself
+lives in app/utils/trigrams.py.
+"""
+
+from app.utils.trigrams import min_overlap, prefix_length, title_trigrams
+
+
+def index_title(conn, user_id: int, book_id: int, old_title, new_title) -> None:
+    """Move a book's postings from old_title to new_title (None for create/delete)."""
+    old = title_trigrams(old_title) if old_title else frozenset()
+    new = title_trigrams(new_title) if new_title else frozenset()
+    removed, added = old - new, new - old
+    if removed:
+        conn.executemany(
+            "DELETE FROM title_trigrams WHERE user_id = ? AND trigram = ? AND book_id = ?",
+            [(user_id, g, book_id) for g in removed],
+        )
+        conn.executemany(
+            "UPDATE title_trigram_counts SET books = books - 1 WHERE user_id = ? AND trigram = ?",
+            [(user_id, g) for g in removed],
+        )
+        conn.execute("DELETE FROM title_trigram_counts WHERE user_id = ? AND books <= 0", (user_id,))
+    if added:
+        conn.executemany(
+            "INSERT INTO title_trigrams (user_id, trigram, book_id) VALUES (?, ?, ?)",
+            [(user_id, g, book_id) for g in added],
+        )
+        conn.executemany(
+            "INSERT INTO title_trigram_counts (user_id, trigram, books) VALUES (?, ?, 1) "
+            "ON CONFLICT (user_id, trigram) DO UPDATE SET books = books + 1",
+            [(user_id, g) for g in added],
+        )
+
+
+def candidate_ids(conn, user_id: int, title: str, min_dice: float, chunk: int) -> list[int]:
+    """
+    Ids of the user's books that could have title trigram similarity
+    >= min_dice with title. Only the rarest trigrams' postings are read;
+    the books found there are kept if they share enough of the title's
+    trigrams, counted with one primary-key seek per (trigram, book). The
+    candidates are counted in chunks, binding at most chunk parameters
+    per query (see BookRepository's IN_CHUNK).
+    """
+    grams = title_trigrams(title)
+    if not grams:
+        return []
+    placeholders = ", ".join("?" for _ in grams)
+    counts = dict(conn.execute(
+        f"SELECT trigram, books FROM title_trigram_counts WHERE user_id = ? AND trigram IN ({placeholders})",
+        (user_id, *grams),
+    ).fetchall())
+    ordered = sorted(grams, key=lambda g: (counts.get(g, 0), g))
+    # Trigrams nobody has can't produce candidates; skip their (empty) postings.
+    probe = [g for g in ordered[:prefix_length(len(ordered), min_dice)] if g in counts]
+    if not probe:
+        return []
+    placeholders = ", ".join("?" for _ in probe)
+    ids = [r[0] for r in conn.execute(
+        f"SELECT DISTINCT book_id FROM title_trigrams WHERE user_id = ? AND trigram IN ({placeholders})",
+        (user_id, *probe),
+    )]
+    # Each query also binds the title's trigrams, so leave room for them.
+    step = max(1, chunk - len(grams))
+    found = []
+    for start in range(0, len(ids), step):
+        part = ids[start:start + step]
+        found.extend(r[0] for r in conn.execute(
+            f"SELECT book_id FROM title_trigrams WHERE user_id = ? "
+            f"AND trigram IN ({', '.join('?' for _ in grams)}) AND book_id IN ({', '.join('?' for _ in part)}) "
+            f"GROUP BY book_id HAVING COUNT(*) >= ?",
+            (user_id, *grams, *part, min_overlap(len(grams), min_dice)),
+        ))
+    return found
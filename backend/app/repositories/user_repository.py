@@ -3,6 +3,9 @@ UserRepository — all DB access for users.
 
 Password hashing uses PBKDF2-HMAC-SHA256 (stdlib hashlib).
 No plaintext passwords ever stored or logged.
+
+With sharding on, the directory database allocates user ids and maps
+email -> shard; the users row itself lives on the shard with the books.
 """
 
 import hashlib
@@ -10,8 +13,9 @@ import os
 from datetime import datetime, timezone
 from typing import Optional
 
-from app.database import get_db
+from app.database import ShardRouter, as_router, get_db
 from app.models.user import User
+from app.repositories.write_queue import WriteQueue
 
 
 def _hash_password(password: str, salt: Optional[str] = None) -> str:
@@ -34,21 +38,46 @@ def _verify_password(password: str, stored: str) -> bool:
 
 
 class UserRepository:
-    def __init__(self, db_path: str):
-        self._db_path = db_path
+    def __init__(self, db_path: "str | ShardRouter", write_queue: Optional[WriteQueue] = None):
+        self._router = as_router(db_path)
+        self._write_queue = write_queue
+
+    def _insert(self, db_path: str, sql: str, params: tuple) -> int:
+        """Run one INSERT (through the group-commit queue if configured); returns the rowid."""
+        def insert(conn) -> int:
+            return conn.execute(sql, params).lastrowid
+
+        if self._write_queue is not None:
+            return self._write_queue.run(db_path, insert)
+        with get_db(db_path) as conn:
+            user_id = insert(conn)
+            conn.commit()
+        return user_id
 
     def _row_to_user(self, row) -> User:
         return User(id=row["id"], email=row["email"], name=row["name"])
 
-    def get_by_email(self, email: str) -> Optional[User]:
-        with get_db(self._db_path) as conn:
-            row = conn.execute(
+    def _row_by_email(self, email: str):
+        user_id = None
+        if self._router.sharded:
+            with get_db(self._router.directory_path) as conn:
+                entry = conn.execute(
+                    "SELECT id FROM user_directory WHERE email = ?", (email.lower(),)
+                ).fetchone()
+            if entry is None:
+                return None
+            user_id = entry["id"]
+        with get_db(self._router.path_for(user_id) if user_id else self._router.db_path) as conn:
+            return conn.execute(
                 "SELECT * FROM users WHERE email = ?", (email.lower(),)
             ).fetchone()
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        row = self._row_by_email(email)
         return self._row_to_user(row) if row else None
 
     def get_by_id(self, user_id: int) -> Optional[User]:
-        with get_db(self._db_path) as conn:
+        with get_db(self._router.path_for(user_id)) as conn:
             row = conn.execute(
                 "SELECT * FROM users WHERE id = ?", (user_id,)
             ).fetchone()
@@ -65,22 +94,50 @@ class UserRepository:
         password_hash = _hash_password(password)
         created_at = datetime.now(timezone.utc).isoformat()
 
-        with get_db(self._db_path) as conn:
-            cursor = conn.execute(
-                "INSERT INTO users (email, name, password_hash, created_at) VALUES (?, ?, ?, ?)",
-                (email.lower(), name, password_hash, created_at),
-            )
+        if self._router.sharded:
+            return self._create_sharded(email.lower(), name, password_hash, created_at)
+
+        user_id = self._insert(
+            self._router.db_path,
+            "INSERT INTO users (email, name, password_hash, created_at) VALUES (?, ?, ?, ?)",
+            (email.lower(), name, password_hash, created_at),
+        )
+
+        return self.get_by_id(user_id)
+
+    def _create_sharded(self, email: str, name: Optional[str], password_hash: str, created_at: str) -> User:
+        """
+        Claim the email and an id in the directory, then write the users
+        row on the chosen shard. A directory entry left behind by a crash
+        between the two steps (no users row) is reclaimed on the next try.
+        """
+        with get_db(self._router.directory_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stale = conn.execute("SELECT id, shard FROM user_directory WHERE email = ?", (email,)).fetchone()
+            if stale is not None:
+                with get_db(self._router.shard_path(stale["shard"])) as shard_conn:
+                    if shard_conn.execute("SELECT 1 FROM users WHERE id = ?", (stale["id"],)).fetchone():
+                        conn.rollback()
+                        raise ValueError("An account with this email already exists.")
+                conn.execute("DELETE FROM user_directory WHERE id = ?", (stale["id"],))
+            user_id = conn.execute(
+                "INSERT INTO user_directory (email, shard) VALUES (?, -1) RETURNING id", (email,)
+            ).fetchone()["id"]
+            shard = user_id % self._router.shard_count
+            conn.execute("UPDATE user_directory SET shard = ? WHERE id = ?", (shard, user_id))
             conn.commit()
-            user_id = cursor.lastrowid
 
+        self._insert(
+            self._router.shard_path(shard),
+            "INSERT INTO users (id, email, name, password_hash, created_at) VALUES (?, ?, ?, ?, ?)",
+            (user_id, email, name, password_hash, created_at),
+        )
+        self._router.assign(user_id, shard)
         return self.get_by_id(user_id)
 
     def verify_credentials(self, email: str, password: str) -> Optional[User]:
         """Return User if credentials are valid, None otherwise."""
-        with get_db(self._db_path) as conn:
-            row = conn.execute(
-                "SELECT * FROM users WHERE email = ?", (email.lower(),)
-            ).fetchone()
+        row = self._row_by_email(email)
 
         if row is None:
             # Run hash anyway to prevent timing-based email enumeration
@@ -0,0 +1,127 @@
+"""
+WorkRepository — all SQL for the shared works catalog.
+
+Works are global, not per user: they hold only public bibliographic data
+as Open Library returns it, and only search results write them. What a
+user types stays in their books row, so it never reaches anyone else.
+
+With sharding on, every shard keeps its own copy of the catalog so book
+reads can join it locally; search results are recorded on every shard.
+
+Filling a gap changes what every book inheriting that field shows, so it
+is versioned like a write to those books (see _version_inheriting_books).
+"""
+
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Optional
+
+from app.database import ShardRouter, as_router, get_db
+from app.models.work import Work
+
+# First-seen values win; later results only fill gaps.
+_UPSERT = """
+    INSERT INTO works (isbn, ol_work_id, title, author, cover_url, page_count, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(isbn) DO UPDATE SET
+        ol_work_id = COALESCE(works.ol_work_id, excluded.ol_work_id),
+        cover_url  = COALESCE(works.cover_url, excluded.cover_url),
+        page_count = COALESCE(works.page_count, excluded.page_count),
+        updated_at = excluded.updated_at
+    RETURNING *
+"""
+
+# Fields a book inherits from its work while its own column is NULL.
+_INHERITED = ("cover_url", "page_count")
+
+
+def _row_to_work(row) -> Work:
+    return Work(
+        id=row["id"],
+        isbn=row["isbn"],
+        ol_work_id=row["ol_work_id"],
+        title=row["title"],
+        author=row["author"],
+        cover_url=row["cover_url"],
+        page_count=row["page_count"],
+    )
+
+
+def upsert_work(conn, work: Work) -> Work:
+    """Insert or fill in a catalog entry on the caller's connection/transaction."""
+    before = find_work(conn, work.isbn)
+    row = conn.execute(
+        _UPSERT,
+        (
+            work.isbn,
+            work.ol_work_id,
+            work.title,
+            work.author,
+            work.cover_url,
+            work.page_count,
+            datetime.now(timezone.utc).isoformat(),
+        ),
+    ).fetchone()
+    stored = _row_to_work(row)
+    if before is not None:
+        _version_inheriting_books(conn, before, stored)
+    return stored
+
+
+def _version_inheriting_books(conn, before: Work, after: Work) -> None:
+    """
+    Give each book that now shows a filled-in value a new change_seq, and
+    bump its owner's users.change_seq, so the library cache, delta sync
+    and ETags see the change like any other write to the book.
+    """
+    filled = [f for f in _INHERITED if getattr(before, f) is None and getattr(after, f) is not None]
+    if not filled:
+        return
+    inherits = " OR ".join(f"{field} IS NULL" for field in filled)
+    rows = conn.execute(
+        f"SELECT id, user_id FROM books WHERE work_id = ? AND ({inherits}) ORDER BY user_id, id",
+        (after.id,),
+    ).fetchall()
+    now = datetime.now(timezone.utc).isoformat()
+    for user_id, group in groupby(rows, key=lambda r: r["user_id"]):
+        ids = [r["id"] for r in group]
+        last = conn.execute(
+            "UPDATE users SET change_seq = change_seq + ? WHERE id = ? RETURNING change_seq",
+            (len(ids), user_id),
+        ).fetchone()[0]
+        conn.executemany(
+            "UPDATE books SET change_seq = ?, updated_at = ? WHERE id = ? AND user_id = ?",
+            [(last - len(ids) + i, now, book_id, user_id) for i, book_id in enumerate(ids, start=1)],
+        )
+
+
+def find_work(conn, isbn: str) -> Optional[Work]:
+    """The catalog entry for an ISBN, read on the caller's connection/transaction."""
+    row = conn.execute("SELECT * FROM works WHERE isbn = ?", (isbn,)).fetchone()
+    return _row_to_work(row) if row else None
+
+
+class WorkRepository:
+    def __init__(self, db_path: "str | ShardRouter"):
+        self._router = as_router(db_path)
+
+    def get_by_isbn(self, isbn: str) -> Optional[Work]:
+        for path in self._router.shard_paths():
+            with get_db(path) as conn:
+                row = conn.execute("SELECT * FROM works WHERE isbn = ?", (isbn,)).fetchone()
+            if row:
+                return _row_to_work(row)
+        return None
+
+    def upsert_many(self, works: list[Work]) -> list[Work]:
+        """
+        One transaction per shard for a whole batch (e.g. a page of search
+        results). Returns the entries as stored on the first shard.
+        """
+        stored: list[Work] = []
+        for path in self._router.shard_paths():
+            with get_db(path) as conn:
+                rows = [upsert_work(conn, w) for w in works]
+                conn.commit()
+            stored = stored or rows
+        return stored
@@ -0,0 +1,161 @@
+"""
+Group commit: one writer thread per database file.
+
+Request threads hand write jobs (callables taking a connection) to
+WriteQueue.submit() and wait on the returned Future. The writer takes
+whatever is queued — waiting up to max_delay for more, capped at
+max_batch — and runs the jobs in a single transaction, one SAVEPOINT per
+job, then commits once. A job that raises is rolled back to its savepoint
+and gets its exception; the others still commit. Futures resolve only
+after the COMMIT, so a caller never sees a write that could still be lost.
+
+Under concurrency this replaces N lock handoffs and N fsyncs with one of
+each, and writers stop retrying on "database is locked". With max_delay 0
+a batch is whatever queued up during the previous commit; a small delay
+only pays off when each commit waits on a slow fsync, and a lone writer
+pays up to max_delay extra latency.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from app.database import get_db
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, max_delay: float = 0.0, max_batch: int = 64):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queues: dict[str, queue.Queue] = {}
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.jobs = 0
+        self.failed_batches = 0
+        self.largest_batch = 0
+
+    def submit(self, db_path: str, job: Callable[[Any], Any]) -> Future:
+        """Queue job(conn) for the writer of db_path."""
+        future: Future = Future()
+        self._queue_for(db_path).put((job, future))
+        return future
+
+    def run(self, db_path: str, job: Callable[[Any], Any]) -> Any:
+        """submit() and wait: returns the job's result or raises its exception."""
+        return self.submit(db_path, job).result()
+
+    def close(self) -> None:
+        """Finish queued jobs, then stop every writer thread."""
+        with self._lock:
+            for q in self._queues.values():
+                q.put(_STOP)
+            threads, self._threads, self._queues = self._threads, [], {}
+        for t in threads:
+            t.join()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "writers": len(self._threads),
+                "batches": self.batches,
+                "jobs": self.jobs,
+                "avg_batch": round(self.jobs / self.batches, 2) if self.batches else None,
+                "largest_batch": self.largest_batch,
+                "failed_batches": self.failed_batches,
+            }
+
+    # ── Writer thread ─────────────────────────────────────────────
+
+    def _queue_for(self, db_path: str) -> queue.Queue:
+        with self._lock:
+            q = self._queues.get(db_path)
+            if q is None:
+                q = self._queues[db_path] = queue.Queue()
+                thread = threading.Thread(
+                    target=self._writer, args=(db_path, q), name=f"write-queue:{db_path}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+            return q
+
+    def _collect(self, q: queue.Queue, first) -> tuple[list, bool]:
+        """The first job plus whatever arrives within max_delay, up to max_batch."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _writer(self, db_path: str, q: queue.Queue) -> None:
+        conn = get_db(db_path)
+        try:
+            stopping = False
+            while not stopping:
+                first = q.get()
+                if first is _STOP:
+                    break
+                batch, stopping = self._collect(q, first)
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch: list) -> None:
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((future, job(conn), None))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            # BEGIN or COMMIT itself failed: nothing in the batch is durable.
+            logger.exception("Group commit of %d jobs failed", len(batch))
+            if conn.in_transaction:
+                conn.rollback()
+            with self._stats_lock:
+                self.failed_batches += 1
+            for job, future in batch:
+                if not future.done():
+                    if not future.running():
+                        future.set_running_or_notify_cancel()
+                    future.set_exception(e)
+            return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.jobs += len(outcomes)
+            self.largest_batch = max(self.largest_batch, len(outcomes))
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
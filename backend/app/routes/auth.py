@@ -11,6 +11,7 @@ from flask import Blueprint, current_app, jsonify, request
 from app.schemas import validate_register, validate_login
 from app.services.auth_service import AuthError
 from app.utils.auth_decorator import require_auth
+from app.utils.rate_limit import rate_limit
 
 logger = logging.getLogger(__name__)
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
@@ -44,6 +45,7 @@ def register():
 
 
 @auth_bp.route("/login", methods=["POST"])
+@rate_limit("login", per="ip")
 def login():
     data = request.get_json(silent=True)
     if data is None:
@@ -5,12 +5,32 @@ Every route requires a valid JWT via @require_auth.
 The decorator injects current_user_id as the first argument.
 """
 
+import json
 import logging
-from flask import Blueprint, current_app, jsonify, request
+import time
 
-from app.schemas import validate_create_book, validate_update_book
-from app.services.book_service import BookNotFoundError, BookRuleViolation
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from app.schemas import (
+    validate_analytics_query,
+    validate_authors_query,
+    validate_batch,
+    validate_batch_operations,
+    validate_book_ids,
+    validate_changes_query,
+    validate_create_book,
+    validate_include,
+    validate_list_books,
+    validate_list_format,
+    validate_progress,
+    validate_recommendations_query,
+    validate_tag_books,
+    validate_update_book,
+)
+from app.services.book_service import BatchOutcome, BookNotFoundError, BookRuleViolation
 from app.utils.auth_decorator import require_auth
+from app.utils.event_bus import Event, TooManySubscribers
+from app.utils.idempotency import idempotent
 
 logger = logging.getLogger(__name__)
 books_bp = Blueprint("books", __name__, url_prefix="/api/books")
@@ -20,13 +40,88 @@ def _get_service():
     return current_app.extensions["book_service"]
 
 
+def _write(current_user_id: int, include: dict, write):
+    """
+    Run a service write. With ?include=stats the user's stats are read in
+    the same transaction and returned alongside, saving a GET /stats.
+    """
+    if include["stats"]:
+        return _get_service().with_stats(current_user_id, write)
+    return write(), None
+
+
+def _book_body(book, stats):
+    return book.to_dict() if stats is None else {"book": book.to_dict(), "stats": stats}
+
+
+def _format_sse(event: Event) -> str:
+    lines = []
+    if event.id is not None:
+        lines.append(f"id: {event.id}")
+    lines.append(f"event: {event.type}")
+    lines.append(f"data: {json.dumps(event.data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
 @books_bp.route("", methods=["GET"])
 @require_auth
 def list_books(current_user_id: int):
-    status = request.args.get("status")
-    author = request.args.get("author")
-    books = _get_service().list_books(current_user_id, status=status, author=author)
-    return jsonify([b.to_dict() for b in books]), 200
+    if "ids" in request.args:
+        # A multi-get takes no filters, sort or format; don't ignore them silently.
+        others = sorted(key for key in request.args if key != "ids")
+        if others:
+            return jsonify({"errors": [f"ids cannot be combined with: {', '.join(others)}."]}), 400
+        return _get_many(current_user_id, request.args["ids"])
+
+    filters, errors = validate_list_books(request.args)
+    fmt, format_errors = validate_list_format(request.args)
+    errors += format_errors
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    # Read the version before the list: anything written in between has a
+    # higher sequence, so a delta sync from this version cannot miss it.
+    version = _get_service().library_version(current_user_id)
+    if fmt["format"] == "columnar":
+        response = jsonify(_get_service().list_book_columns(current_user_id, **filters))
+    else:
+        books = _get_service().list_books(current_user_id, **filters)
+        response = jsonify([b.to_dict() for b in books])
+    response.headers["X-Library-Version"] = str(version)
+    return response, 200
+
+
+@books_bp.route("/lookup", methods=["POST"])
+@require_auth
+def lookup_books(current_user_id: int):
+    """POST form of GET /api/books?ids=..., for lists too long for a URL."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object."}), 400
+    if not isinstance(data.get("ids"), list):
+        return jsonify({"errors": ["ids must be a list of positive integers."]}), 400
+    return _get_many(current_user_id, data["ids"])
+
+
+def _get_many(current_user_id: int, ids):
+    """Several books by id in one query: {"books": [...] in the order asked, "not_found": [ids]}."""
+    clean, errors = validate_book_ids(ids)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    books, not_found = _get_service().get_books(current_user_id, clean["ids"])
+    return jsonify({"books": [b.to_dict() for b in books], "not_found": not_found}), 200
+
+
+@books_bp.route("/changes", methods=["GET"])
+@require_auth
+def get_changes(current_user_id: int):
+    params, errors = validate_changes_query(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    changes = _get_service().changes_since(current_user_id, **params)
+    changes["upserted"] = [b.to_dict() for b in changes["upserted"]]
+    return jsonify(changes), 200
 
 
 @books_bp.route("/stats", methods=["GET"])
@@ -35,6 +130,153 @@ def get_stats(current_user_id: int):
     return jsonify(_get_service().get_stats(current_user_id)), 200
 
 
+@books_bp.route("/authors", methods=["GET"])
+@require_auth
+def list_authors(current_user_id: int):
+    params, errors = validate_authors_query(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    return jsonify({"authors": _get_service().list_authors(current_user_id, **params)}), 200
+
+
+@books_bp.route("/tags", methods=["GET"])
+@require_auth
+def list_tags(current_user_id: int):
+    return jsonify({"tags": _get_service().list_tags(current_user_id)}), 200
+
+
+@books_bp.route("/tag", methods=["POST"])
+@require_auth
+def tag_books(current_user_id: int):
+    return _set_tags(current_user_id, _get_service().tag_books)
+
+
+@books_bp.route("/untag", methods=["POST"])
+@require_auth
+def untag_books(current_user_id: int):
+    return _set_tags(current_user_id, _get_service().untag_books)
+
+
+def _set_tags(current_user_id: int, apply):
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({"error": "Request body must be valid JSON."}), 400
+
+    clean, errors = validate_tag_books(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    try:
+        updated, not_found = apply(current_user_id, clean["tags"], clean["book_ids"])
+        return jsonify({"updated": [b.to_dict() for b in updated], "not_found": not_found}), 200
+    except Exception:
+        logger.exception("Unexpected error tagging books")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
+@books_bp.route("/duplicates", methods=["GET"])
+@require_auth
+def get_duplicates(current_user_id: int):
+    return jsonify({"groups": _get_service().find_duplicates(current_user_id)}), 200
+
+
+@books_bp.route("/analytics", methods=["GET"])
+@require_auth
+def get_analytics(current_user_id: int):
+    params, errors = validate_analytics_query(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    # Rollups only change with book writes, which all bump the library
+    # version, or with a rebuild, which bumps the rollup generation; the
+    # ETag carries both, so a client (or proxy) that sends If-None-Match
+    # with the current one gets a 304 and nothing else is read. It is read
+    # first, so it can only ever be older than the body it goes with.
+    service = current_app.extensions["analytics_service"]
+    etag = service.etag(current_user_id, params["granularity"])
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        analytics = service.get_analytics(current_user_id, **params)
+        response = jsonify(analytics)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@books_bp.route("/events", methods=["GET"])
+@require_auth
+def stream_events(current_user_id: int):
+    """
+    Server-Sent Events stream of this user's library changes.
+
+    Event ids are library versions. On reconnect the browser (or client)
+    sends Last-Event-ID and the gap is replayed as one `sync` event built
+    from the delta-sync feed; otherwise the stream opens with `ready`
+    carrying the current version. Live events are book_created,
+    book_updated, book_deleted and stats. Comment heartbeats keep proxies
+    from closing idle streams, and streams end after SSE_MAX_DURATION_SECONDS
+    so clients reconnect and spread across workers.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or None
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return jsonify({"error": "Last-Event-ID must be an integer."}), 400
+
+    config = current_app.config
+    try:
+        # Subscribe before reading the version so no write can fall in between.
+        subscription = current_app.extensions["event_bus"].subscribe(current_user_id)
+    except TooManySubscribers as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = str(config["SSE_RETRY_MS"] // 1000 or 1)
+        return response, 503
+
+    service = _get_service()
+
+    def generate():
+        with subscription:
+            yield f"retry: {config['SSE_RETRY_MS']}\n\n"
+
+            if last_event_id is None:
+                high_water = service.library_version(current_user_id)
+                yield _format_sse(Event("ready", {"version": high_water}, id=high_water))
+            else:
+                since = last_event_id
+                while True:
+                    changes = service.changes_since(current_user_id, since, limit=500)
+                    changes["upserted"] = [b.to_dict() for b in changes["upserted"]]
+                    yield _format_sse(Event("sync", changes, id=changes["version"]))
+                    since = changes["version"]
+                    if not changes["has_more"]:
+                        break
+                high_water = since
+                yield _format_sse(Event("stats", service.get_stats(current_user_id)))
+
+            deadline = time.monotonic() + config["SSE_MAX_DURATION_SECONDS"]
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=config["SSE_HEARTBEAT_SECONDS"])
+                if subscription.overflowed:
+                    return  # too far behind; the client resumes via Last-Event-ID
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                if event.id is not None and event.id <= high_water:
+                    continue  # already covered by ready/sync
+                yield _format_sse(event)
+
+    response = Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Also release the slot if the body is never iterated (client gone early).
+    response.call_on_close(subscription.close)
+    return response
+
+
 @books_bp.route("/<int:book_id>", methods=["GET"])
 @require_auth
 def get_book(current_user_id: int, book_id: int):
@@ -46,7 +288,12 @@ def get_book(current_user_id: int, book_id: int):
 
 @books_bp.route("", methods=["POST"])
 @require_auth
+@idempotent
 def create_book(current_user_id: int):
+    include, errors = validate_include(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
     data = request.get_json(silent=True)
     if data is None:
         return jsonify({"error": "Request body must be valid JSON."}), 400
@@ -56,8 +303,8 @@ def create_book(current_user_id: int):
         return jsonify({"errors": errors}), 400
 
     try:
-        book = _get_service().add_book(current_user_id, clean)
-        return jsonify(book.to_dict()), 201
+        book, stats = _write(current_user_id, include, lambda: _get_service().add_book(current_user_id, clean))
+        return jsonify(_book_body(book, stats)), 201
     except BookRuleViolation as e:
         return jsonify({"error": str(e)}), 422
     except ValueError as e:
@@ -67,9 +314,99 @@ def create_book(current_user_id: int):
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
+_OP_SUCCESS_STATUS = {"create": 201, "update": 200, "delete": 204}
+
+
+def _error_status(error: Exception) -> int:
+    """Same mapping as the single-book endpoints."""
+    if isinstance(error, BookNotFoundError):
+        return 404
+    if isinstance(error, BookRuleViolation):
+        return 422
+    return 409
+
+
+def _outcome_result(index: int, outcome: BatchOutcome, committed: bool) -> dict:
+    result = {"index": index, "op": outcome.op}
+    if outcome.error is not None:
+        result.update(status=_error_status(outcome.error), error=str(outcome.error))
+    elif not committed:
+        result.update(status=424, error="Not applied: another operation in the batch failed.")
+    else:
+        result["status"] = _OP_SUCCESS_STATUS[outcome.op]
+        if outcome.book is not None:
+            result["book"] = outcome.book.to_dict()
+        else:
+            result["id"] = outcome.book_id
+    return result
+
+
+@books_bp.route("/batch", methods=["POST"])
+@require_auth
+@idempotent
+def batch_books(current_user_id: int):
+    """
+    Apply up to BATCH_MAX_OPERATIONS creates, updates and deletes in one
+    transaction. With atomic (the default) any failure — including an
+    invalid operation — applies nothing and the response takes the failing
+    operation's status; otherwise every valid operation is attempted and
+    the response is 200 with a status per operation.
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({"error": "Request body must be valid JSON."}), 400
+
+    envelope, errors = validate_batch(data, current_app.config["BATCH_MAX_OPERATIONS"])
+    if errors:
+        return jsonify({"errors": errors}), 400
+    atomic = envelope["atomic"]
+
+    results: list = [None] * len(envelope["operations"])
+    valid = []
+    checked = validate_batch_operations(envelope["operations"])
+    for index, (raw, (clean, op_errors)) in enumerate(zip(envelope["operations"], checked)):
+        if op_errors:
+            op = raw.get("op") if isinstance(raw, dict) else None
+            results[index] = {"index": index, "op": op, "status": 400, "errors": op_errors}
+        else:
+            valid.append((index, clean))
+
+    if atomic and len(valid) < len(results):
+        for index, clean in valid:
+            results[index] = {
+                "index": index, "op": clean["op"], "status": 424,
+                "error": "Not applied: another operation in the batch failed.",
+            }
+        return jsonify({"atomic": True, "committed": False, "results": results}), 400
+
+    committed = True
+    if valid:
+        try:
+            outcomes, committed = _get_service().apply_batch(
+                current_user_id, [clean for _, clean in valid], atomic=atomic
+            )
+        except Exception:
+            logger.exception("Unexpected error applying batch")
+            return jsonify({"error": "An unexpected error occurred."}), 500
+
+        attempted = {outcome.index for outcome in outcomes}
+        for position, (index, clean) in enumerate(valid):
+            outcome = outcomes[position] if position in attempted else BatchOutcome(position, clean["op"])
+            results[index] = _outcome_result(index, outcome, committed)
+
+    status = 200
+    if not committed:
+        status = next(r["status"] for r in results if r["status"] != 424)
+    return jsonify({"atomic": atomic, "committed": committed, "results": results}), status
+
+
 @books_bp.route("/<int:book_id>", methods=["PATCH"])
 @require_auth
 def update_book(current_user_id: int, book_id: int):
+    include, errors = validate_include(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
     data = request.get_json(silent=True)
     if data is None:
         return jsonify({"error": "Request body must be valid JSON."}), 400
@@ -79,8 +416,10 @@ def update_book(current_user_id: int, book_id: int):
         return jsonify({"errors": errors}), 400
 
     try:
-        book = _get_service().update_book(book_id, current_user_id, clean)
-        return jsonify(book.to_dict()), 200
+        book, stats = _write(
+            current_user_id, include, lambda: _get_service().update_book(book_id, current_user_id, clean)
+        )
+        return jsonify(_book_body(book, stats)), 200
     except BookNotFoundError as e:
         return jsonify({"error": str(e)}), 404
     except BookRuleViolation as e:
@@ -92,11 +431,54 @@ def update_book(current_user_id: int, book_id: int):
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
+@books_bp.route("/<int:book_id>/progress", methods=["POST"])
+@require_auth
+def record_progress(current_user_id: int, book_id: int):
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({"error": "Request body must be valid JSON."}), 400
+
+    clean, errors = validate_progress(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    try:
+        book = _get_service().record_progress(book_id, current_user_id, **clean)
+        return jsonify(book.to_dict()), 200
+    except BookNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except BookRuleViolation as e:
+        return jsonify({"error": str(e)}), 422
+    except Exception:
+        logger.exception("Unexpected error recording progress")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
+@books_bp.route("/<int:book_id>/recommendations", methods=["GET"])
+@require_auth
+def get_recommendations(current_user_id: int, book_id: int):
+    params, errors = validate_recommendations_query(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    try:
+        service = current_app.extensions["recommendation_service"]
+        return jsonify(service.recommendations_for(book_id, current_user_id, **params)), 200
+    except BookNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+
+
 @books_bp.route("/<int:book_id>", methods=["DELETE"])
 @require_auth
 def delete_book(current_user_id: int, book_id: int):
+    include, errors = validate_include(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
     try:
-        _get_service().delete_book(book_id, current_user_id)
+        _, stats = _write(current_user_id, include, lambda: _get_service().delete_book(book_id, current_user_id))
+        if stats is not None:
+            return jsonify({"stats": stats}), 200
         return "", 204
     except BookNotFoundError as e:
         return jsonify({"error": str(e)}), 404
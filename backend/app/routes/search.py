@@ -5,7 +5,7 @@ Why proxy through Flask instead of calling from the frontend?
 - Keeps third-party API details server-side
 - Lets us transform/filter the response
 - Avoids CORS issues with the Open Library API
-- Easy to add caching or rate limiting later
+- Lets us cache and rate limit (each search costs an outbound call)
 
 Endpoint: GET /api/search?q=dune
 """
@@ -15,19 +15,22 @@ import logging
 import urllib.request
 import urllib.parse
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from app.utils.auth_decorator import require_auth
+from app.utils.rate_limit import rate_limit
 
 logger = logging.getLogger(__name__)
 search_bp = Blueprint("search", __name__, url_prefix="/api/search")
 
 
-def _fetch_open_library(query: str, limit: int = 8) -> list[dict]:
+def _fetch_open_library(
+    query: str, limit: int = 8, base_url: str = "https://openlibrary.org"
+) -> list[dict]:
     """Call Open Library search API and return normalised results."""
     encoded = urllib.parse.quote(query)
     url = (
-        f"https://openlibrary.org/search.json"
-        f"?q={encoded}&limit={limit}&fields=title,author_name,isbn,number_of_pages_median,cover_i"
+        f"{base_url.rstrip('/')}/search.json"
+        f"?q={encoded}&limit={limit}&fields=key,title,author_name,isbn,number_of_pages_median,cover_i"
     )
     req = urllib.request.Request(url, headers={"User-Agent": "BookLog/1.0"})
     with urllib.request.urlopen(req, timeout=5) as resp:
@@ -50,6 +53,7 @@ def _fetch_open_library(query: str, limit: int = 8) -> list[dict]:
             "isbn": isbn,
             "page_count": doc.get("number_of_pages_median"),
             "cover_url": cover_url,
+            "ol_work_id": (doc.get("key") or "").rsplit("/", 1)[-1] or None,
         })
 
     return results
@@ -57,6 +61,7 @@ def _fetch_open_library(query: str, limit: int = 8) -> list[dict]:
 
 @search_bp.route("", methods=["GET"])
 @require_auth
+@rate_limit("search")
 def search_books(current_user_id: int):
     query = request.args.get("q", "").strip()
     if not query:
@@ -65,8 +70,16 @@ def search_books(current_user_id: int):
         return jsonify({"error": "Query is too long."}), 400
 
     try:
-        results = _fetch_open_library(query)
-        return jsonify({"results": results}), 200
+        results = _fetch_open_library(
+            query, base_url=current_app.config["OPEN_LIBRARY_URL"]
+        )
     except Exception:
         logger.exception("Open Library search failed")
         return jsonify({"error": "Search is unavailable. Add the book manually."}), 503
+
+    try:
+        current_app.extensions["catalog_service"].record_search_results(results)
+    except Exception:
+        # The catalog is an optimisation; never fail a search over it.
+        logger.exception("Recording search results in the works catalog failed")
+    return jsonify({"results": results}), 200
@@ -1,13 +1,48 @@
+from .engine import Field, Schema
 from .schemas import (
+    CREATE_BOOK,
+    UPDATE_BOOK,
     validate_register,
     validate_login,
     validate_create_book,
     validate_update_book,
+    validate_list_books,
+    validate_list_format,
+    validate_book_ids,
+    validate_changes_query,
+    validate_analytics_query,
+    validate_authors_query,
+    validate_progress,
+    validate_recommendations_query,
+    validate_tag_books,
+    validate_include,
+    validate_idempotency_key,
+    validate_batch,
+    validate_batch_operation,
+    validate_batch_operations,
 )
 
 __all__ = [
+    "Field",
+    "Schema",
+    "CREATE_BOOK",
+    "UPDATE_BOOK",
     "validate_register",
     "validate_login",
     "validate_create_book",
     "validate_update_book",
+    "validate_list_books",
+    "validate_list_format",
+    "validate_book_ids",
+    "validate_changes_query",
+    "validate_analytics_query",
+    "validate_authors_query",
+    "validate_progress",
+    "validate_recommendations_query",
+    "validate_tag_books",
+    "validate_include",
+    "validate_idempotency_key",
+    "validate_batch",
+    "validate_batch_operation",
+    "validate_batch_operations",
 ]
@@ -7,25 +7,35 @@ Pure functions, no DB access, no side effects.
 """
 
 import re
-from datetime import date
 from typing import Any, Optional
 
 from app.models.book import RATABLE_STATUSES, RATING_MAX, RATING_MIN, ReadingStatus
+from app.schemas.engine import Field, Schema, choice, iso_date, text
+from app.utils.authors import author_key
+
+# ?author= matches authors with a name starting with it, or whose whole
+# normalized name equals it.
+AUTHOR_MATCHES = ("prefix", "exact")
+
+# ?tags= matches books carrying every listed tag, or any of them.
+TAG_MATCHES = ("all", "any")
+TAG_MAX_LEN = 50
+TAGS_MAX_FILTER = 20
+TAGS_MAX_BOOKS = 1000
+
+# Sort keys accepted by GET /api/books and their default direction.
+SORT_FIELDS = {
+    "title": "asc",
+    "author": "asc",
+    "rating": "desc",
+    "date_finished": "desc",
+    "date_added": "desc",
+}
 
 # ---------------------------------------------------------------------------
 # Primitives
 # ---------------------------------------------------------------------------
 
-def _require_str(value: Any, field: str, max_len: int = 500) -> Optional[str]:
-    if value is None or (isinstance(value, str) and not value.strip()):
-        return f"{field} is required and cannot be empty."
-    if not isinstance(value, str):
-        return f"{field} must be a string."
-    if len(value.strip()) > max_len:
-        return f"{field} must be {max_len} characters or fewer."
-    return None
-
-
 def _optional_str(value: Any, field: str, max_len: int = 2000) -> Optional[str]:
     if value is None:
         return None
@@ -36,11 +46,13 @@ def _optional_str(value: Any, field: str, max_len: int = 2000) -> Optional[str]:
     return None
 
 
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
 def _validate_email(value: Any) -> Optional[str]:
     if not value or not isinstance(value, str):
         return "email is required."
-    pattern = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
-    if not re.match(pattern, value.strip()):
+    if not _EMAIL.match(value.strip()):
         return "email must be a valid email address."
     return None
 
@@ -78,15 +90,22 @@ def _validate_page_count(value: Any) -> Optional[str]:
     return None
 
 
-def _validate_status(value: Any) -> Optional[str]:
-    if value is None:
-        return "status is required."
-    valid = [s.value for s in ReadingStatus]
-    if value not in valid:
-        return f"status must be one of: {', '.join(valid)}."
+def _validate_tag(value: Any) -> Optional[str]:
+    if not isinstance(value, str) or not value.strip():
+        return "tags must be non-empty strings."
+    if len(value.strip()) > TAG_MAX_LEN:
+        return f"tags must be {TAG_MAX_LEN} characters or fewer."
+    if "," in value:
+        return "tags cannot contain commas."
     return None
 
 
+_validate_status = choice("status", (s.value for s in ReadingStatus))
+
+_RATABLE_VALUES = frozenset(s.value for s in RATABLE_STATUSES)
+_NOT_RATABLE = f"rating can only be set when status is one of: {', '.join(sorted(_RATABLE_VALUES))}."
+
+
 def _validate_rating(rating: Any, status_str: Any) -> Optional[str]:
     if rating is None:
         return None
@@ -94,25 +113,13 @@ def _validate_rating(rating: Any, status_str: Any) -> Optional[str]:
         return "rating must be an integer."
     if rating < RATING_MIN or rating > RATING_MAX:
         return f"rating must be between {RATING_MIN} and {RATING_MAX}."
-    ratable_values = {s.value for s in RATABLE_STATUSES}
-    if status_str not in ratable_values:
-        return (
-            f"rating can only be set when status is one of: "
-            f"{', '.join(sorted(ratable_values))}."
-        )
+    if not isinstance(status_str, str) or status_str not in _RATABLE_VALUES:
+        return _NOT_RATABLE
     return None
 
 
-def _validate_date(value: Any, field: str) -> Optional[str]:
-    if value is None:
-        return None
-    if not isinstance(value, str):
-        return f"{field} must be an ISO date string (YYYY-MM-DD)."
-    try:
-        date.fromisoformat(value)
-    except ValueError:
-        return f"{field} must be a valid ISO date (YYYY-MM-DD)."
-    return None
+_FINISHED_AFTER = iso_date("finished_after")
+_FINISHED_BEFORE = iso_date("finished_before")
 
 
 # ---------------------------------------------------------------------------
@@ -167,80 +174,397 @@ def validate_login(data: dict) -> tuple[dict, list[str]]:
 # Book schemas
 # ---------------------------------------------------------------------------
 
+def _compact_isbn(isbn: str) -> str:
+    return isbn.replace("-", "").replace(" ", "")
+
+
+# Book fields, compiled once. Both schemas report errors in this order,
+# except that an update checks rating last.
+_TITLE = Field("title", text("title", max_len=300, required=True), clean=str.strip)
+_AUTHOR = Field("author", text("author", max_len=300, required=True), clean=str.strip)
+_STATUS = Field("status", _validate_status)
+_ISBN = Field("isbn", _validate_isbn, clean=_compact_isbn)
+_PAGE_COUNT = Field("page_count", _validate_page_count)
+_NOTES = Field("notes", text("notes", max_len=2000))
+_RATING = Field("rating", _validate_rating, depends_on="status")
+_DATE_ADDED = Field("date_added", iso_date("date_added"))
+_DATE_FINISHED = Field("date_finished", iso_date("date_finished"))
+_COVER_URL = Field("cover_url", text("cover_url", max_len=500))
+
+CREATE_BOOK = Schema([
+    _TITLE, _AUTHOR, _STATUS, _ISBN, _PAGE_COUNT, _NOTES, _RATING, _DATE_ADDED, _DATE_FINISHED, _COVER_URL,
+])
+UPDATE_BOOK = Schema([
+    _TITLE, _AUTHOR, _STATUS, _ISBN, _PAGE_COUNT, _NOTES, _COVER_URL, _DATE_ADDED, _DATE_FINISHED, _RATING,
+], partial=True)
+
+
 def validate_create_book(data: dict) -> tuple[dict, list[str]]:
+    return CREATE_BOOK.validate(data)
+
+
+def validate_update_book(data: dict) -> tuple[dict, list[str]]:
+    """Only the fields present are checked and returned. rating is checked against the status sent with it."""
+    return UPDATE_BOOK.validate(data)
+
+
+def validate_list_books(args: dict) -> tuple[dict, list[str]]:
+    """Validate GET /api/books query parameters (all optional strings)."""
     errors = []
 
-    for err in [
-        _require_str(data.get("title"), "title", max_len=300),
-        _require_str(data.get("author"), "author", max_len=300),
-        _validate_status(data.get("status")),
-        _validate_isbn(data.get("isbn")),
-        _validate_page_count(data.get("page_count")),
-        _optional_str(data.get("notes"), "notes"),
-        _validate_rating(data.get("rating"), data.get("status")),
-        _validate_date(data.get("date_added"), "date_added"),
-        _validate_date(data.get("date_finished"), "date_finished"),
-        _optional_str(data.get("cover_url"), "cover_url", max_len=500),
-    ]:
+    status = args.get("status") or None
+    if status is not None:
+        err = _validate_status(status)
+        if err:
+            errors.append(err)
+
+    author = args.get("author") or None
+    err = _optional_str(author, "author", max_len=300)
+    if err:
+        errors.append(err)
+    elif author and not author_key(author):
+        errors.append("author must contain a letter or digit.")
+
+    author_match = args.get("author_match") or "prefix"
+    if author_match not in AUTHOR_MATCHES:
+        errors.append(f"author_match must be one of: {', '.join(AUTHOR_MATCHES)}.")
+
+    sort = args.get("sort") or "date_added"
+    if sort not in SORT_FIELDS:
+        errors.append(f"sort must be one of: {', '.join(SORT_FIELDS)}.")
+
+    order = args.get("order") or SORT_FIELDS.get(sort, "desc")
+    if order not in ("asc", "desc"):
+        errors.append("order must be asc or desc.")
+
+    finished_after = args.get("finished_after") or None
+    finished_before = args.get("finished_before") or None
+    for check, value in ((_FINISHED_AFTER, finished_after), (_FINISHED_BEFORE, finished_before)):
+        err = check(value)
         if err:
             errors.append(err)
 
+    min_rating = args.get("min_rating") or None
+    if min_rating is not None:
+        try:
+            min_rating = int(min_rating)
+        except (TypeError, ValueError):
+            errors.append("min_rating must be an integer.")
+        else:
+            if min_rating < RATING_MIN or min_rating > RATING_MAX:
+                errors.append(f"min_rating must be between {RATING_MIN} and {RATING_MAX}.")
+
+    tags = tuple(part.strip() for part in (args.get("tags") or "").split(",") if part.strip())
+    if len(tags) > TAGS_MAX_FILTER:
+        errors.append(f"tags may list at most {TAGS_MAX_FILTER} tags.")
+    elif any(_validate_tag(t) for t in tags):
+        errors.append(f"tags must be {TAG_MAX_LEN} characters or fewer.")
+
+    tags_match = args.get("tags_match") or "all"
+    if tags_match not in TAG_MATCHES:
+        errors.append(f"tags_match must be one of: {', '.join(TAG_MATCHES)}.")
+
     if errors:
         return {}, errors
 
-    isbn_raw = data.get("isbn")
+    if finished_after and finished_before and finished_after > finished_before:
+        return {}, ["finished_after must not be later than finished_before."]
+
     return {
-        "title": data["title"].strip(),
-        "author": data["author"].strip(),
-        "status": data["status"],
-        "isbn": isbn_raw.replace("-", "").replace(" ", "") if isbn_raw else None,
-        "rating": data.get("rating"),
-        "page_count": data.get("page_count"),
-        "notes": data.get("notes"),
-        "cover_url": data.get("cover_url"),
-        "date_added": data.get("date_added"),
-        "date_finished": data.get("date_finished"),
+        "status": status,
+        "author": author.strip() if author else None,
+        "author_match": author_match,
+        "sort": sort,
+        "order": order,
+        "finished_after": finished_after,
+        "finished_before": finished_before,
+        "min_rating": min_rating,
+        "tags": tags or None,
+        "tags_match": tags_match,
     }, []
 
 
-def validate_update_book(data: dict) -> tuple[dict, list[str]]:
+MULTI_GET_MAX_IDS = 1000
+# Largest SQLite INTEGER; a bigger id can't be bound as a parameter.
+ID_MAX = 2 ** 63 - 1
+
+
+def validate_book_ids(value: Any) -> tuple[dict, list[str]]:
+    """
+    Validate the ids of a multi-get: GET /api/books?ids=1,2,3 (a
+    comma-separated string) or POST /api/books/lookup {"ids": [1, 2, 3]}.
+    """
+    if isinstance(value, str):
+        parts = [p.strip() for p in value.split(",") if p.strip()]
+        # isdigit() alone also accepts digits int() rejects, such as "²".
+        if not all(p.isascii() and p.isdigit() for p in parts):
+            return {}, ["ids must be a comma-separated list of positive integers."]
+        ids = [int(p) for p in parts]
+    elif isinstance(value, list):
+        if not all(isinstance(i, int) and not isinstance(i, bool) for i in value):
+            return {}, ["ids must be a list of positive integers."]
+        ids = value
+    else:
+        return {}, ["ids is required."]
+
+    if not ids:
+        return {}, ["ids cannot be empty."]
+    if len(ids) > MULTI_GET_MAX_IDS:
+        return {}, [f"ids may contain at most {MULTI_GET_MAX_IDS} ids."]
+    if any(i <= 0 or i > ID_MAX for i in ids):
+        return {}, [f"ids must be positive integers no greater than {ID_MAX}."]
+    return {"ids": ids}, []
+
+
+LIST_FORMATS = ("rows", "columnar")
+
+
+def validate_list_format(args: dict) -> tuple[dict, list[str]]:
+    """Validate the ?format= parameter of GET /api/books."""
+    fmt = args.get("format") or "rows"
+    if fmt not in LIST_FORMATS:
+        return {}, [f"format must be one of: {', '.join(LIST_FORMATS)}."]
+    return {"format": fmt}, []
+
+
+INCLUDE_OPTIONS = ("stats",)
+
+
+def validate_include(args: dict) -> tuple[dict, list[str]]:
+    """Validate the ?include= parameter of the book write endpoints (comma-separated)."""
+    requested = {part.strip() for part in (args.get("include") or "").split(",") if part.strip()}
+    unknown = sorted(requested - set(INCLUDE_OPTIONS))
+    if unknown:
+        return {}, [f"include must be a comma-separated list of: {', '.join(INCLUDE_OPTIONS)}."]
+    return {"stats": "stats" in requested}, []
+
+
+def validate_progress(data: Any) -> tuple[dict, list[str]]:
+    """Validate POST /api/books/<id>/progress: {"page": int}."""
+    if not isinstance(data, dict):
+        return {}, ["Request body must be a JSON object."]
+    page = data.get("page")
+    if page is None:
+        return {}, ["page is required."]
+    if not isinstance(page, int) or isinstance(page, bool) or page < 0:
+        return {}, ["page must be a non-negative integer."]
+    if page > 50000:
+        return {}, ["page seems unreasonably large."]
+    return {"page": page}, []
+
+
+ANALYTICS_GRANULARITIES = ("month", "year")
+
+
+def validate_analytics_query(args: dict) -> tuple[dict, list[str]]:
+    """Validate GET /api/books/analytics query parameters."""
+    granularity = args.get("granularity") or "month"
+    if granularity not in ANALYTICS_GRANULARITIES:
+        return {}, [f"granularity must be one of: {', '.join(ANALYTICS_GRANULARITIES)}."]
+    return {"granularity": granularity}, []
+
+
+RECOMMENDATIONS_DEFAULT_LIMIT = 10
+RECOMMENDATIONS_MAX_LIMIT = 20
+
+
+def validate_recommendations_query(args: dict) -> tuple[dict, list[str]]:
+    """Validate GET /api/books/<id>/recommendations query parameters."""
+    limit = RECOMMENDATIONS_DEFAULT_LIMIT
+    if args.get("limit"):
+        limit, err = _parse_int(args["limit"], "limit")
+        if err:
+            return {}, [err]
+        if limit < 1 or limit > RECOMMENDATIONS_MAX_LIMIT:
+            return {}, [f"limit must be between 1 and {RECOMMENDATIONS_MAX_LIMIT}."]
+    return {"limit": limit}, []
+
+
+AUTHORS_DEFAULT_LIMIT = 100
+AUTHORS_MAX_LIMIT = 1000
+
+
+def validate_authors_query(args: dict) -> tuple[dict, list[str]]:
+    """Validate GET /api/books/authors query parameters."""
     errors = []
-    clean: dict = {}
-
-    field_validators = {
-        "title": lambda v: _require_str(v, "title", max_len=300),
-        "author": lambda v: _require_str(v, "author", max_len=300),
-        "status": _validate_status,
-        "isbn": _validate_isbn,
-        "page_count": _validate_page_count,
-        "notes": lambda v: _optional_str(v, "notes"),
-        "cover_url": lambda v: _optional_str(v, "cover_url", max_len=500),
-        "date_added": lambda v: _validate_date(v, "date_added"),
-        "date_finished": lambda v: _validate_date(v, "date_finished"),
-    }
-
-    for field, validator in field_validators.items():
-        if field in data:
-            err = validator(data[field])
-            if err:
-                errors.append(err)
-            else:
-                val = data[field]
-                if field == "title" or field == "author":
-                    val = val.strip() if val else val
-                if field == "isbn" and val:
-                    val = val.replace("-", "").replace(" ", "")
-                clean[field] = val
-
-    if "rating" in data:
-        effective_status = data.get("status")
-        err = _validate_rating(data["rating"], effective_status)
+    prefix = args.get("prefix") or None
+    err = _optional_str(prefix, "prefix", max_len=300)
+    if err:
+        errors.append(err)
+    elif prefix and not author_key(prefix):
+        errors.append("prefix must contain a letter or digit.")
+
+    limit = AUTHORS_DEFAULT_LIMIT
+    if args.get("limit"):
+        limit, err = _parse_int(args["limit"], "limit")
+        if err:
+            errors.append(err)
+        elif limit < 1 or limit > AUTHORS_MAX_LIMIT:
+            errors.append(f"limit must be between 1 and {AUTHORS_MAX_LIMIT}.")
+
+    if errors:
+        return {}, errors
+    return {"prefix": author_key(prefix) if prefix else None, "limit": limit}, []
+
+
+def validate_tag_books(data: Any) -> tuple[dict, list[str]]:
+    """Validate POST /api/books/tag and /untag: {"tags": [str], "book_ids": [int]}."""
+    if not isinstance(data, dict):
+        return {}, ["Request body must be a JSON object."]
+
+    errors = []
+    tags = data.get("tags")
+    if not isinstance(tags, list) or not tags:
+        errors.append("tags must be a non-empty list.")
+    elif len(tags) > TAGS_MAX_FILTER:
+        errors.append(f"tags may contain at most {TAGS_MAX_FILTER} items.")
+    else:
+        err = next((e for e in map(_validate_tag, tags) if e), None)
         if err:
             errors.append(err)
-        else:
-            clean["rating"] = data["rating"]
+
+    book_ids = data.get("book_ids")
+    if not isinstance(book_ids, list) or not book_ids:
+        errors.append("book_ids must be a non-empty list.")
+    elif len(book_ids) > TAGS_MAX_BOOKS:
+        errors.append(f"book_ids may contain at most {TAGS_MAX_BOOKS} items.")
+    elif not all(isinstance(i, int) and not isinstance(i, bool) and i > 0 for i in book_ids):
+        errors.append("book_ids must be positive integers.")
 
     if errors:
         return {}, errors
+    return {"tags": [" ".join(t.split()) for t in tags], "book_ids": book_ids}, []
+
+
+IDEMPOTENCY_KEY_MAX_LEN = 255
+
+
+def validate_idempotency_key(value: Any) -> tuple[dict, list[str]]:
+    """Validate an Idempotency-Key header: 1-255 printable ASCII characters."""
+    if not isinstance(value, str) or not value.strip():
+        return {}, ["Idempotency-Key cannot be empty."]
+    key = value.strip()
+    if len(key) > IDEMPOTENCY_KEY_MAX_LEN:
+        return {}, [f"Idempotency-Key must be {IDEMPOTENCY_KEY_MAX_LEN} characters or fewer."]
+    if not all(" " <= c <= "~" for c in key):
+        return {}, ["Idempotency-Key must contain printable ASCII characters only."]
+    return {"key": key}, []
 
-    return clean, []
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 1000
+
+
+def _parse_int(value: Any, field: str) -> tuple[Optional[int], Optional[str]]:
+    """Parse an integer query parameter. Returns (value, error)."""
+    try:
+        return int(value), None
+    except (TypeError, ValueError):
+        return None, f"{field} must be an integer."
+
+
+def validate_changes_query(args: dict) -> tuple[dict, list[str]]:
+    """Validate GET /api/books/changes query parameters."""
+    errors = []
+
+    since, limit = None, CHANGES_DEFAULT_LIMIT
+    if not args.get("since"):
+        errors.append("since is required.")
+    else:
+        since, err = _parse_int(args["since"], "since")
+        if err:
+            errors.append(err)
+        elif since < 0:
+            errors.append("since must be zero or greater.")
+
+    if args.get("limit"):
+        limit, err = _parse_int(args["limit"], "limit")
+        if err:
+            errors.append(err)
+        elif limit < 1 or limit > CHANGES_MAX_LIMIT:
+            errors.append(f"limit must be between 1 and {CHANGES_MAX_LIMIT}.")
+
+    if errors:
+        return {}, errors
+    return {"since": since, "limit": limit}, []
+
+
+BATCH_MAX_OPERATIONS = 100
+BATCH_OPS = ("create", "update", "delete")
+
+
+def validate_batch(data: Any, max_operations: int = BATCH_MAX_OPERATIONS) -> tuple[dict, list[str]]:
+    """
+    Validate the POST /api/books/batch envelope. The operations themselves
+    are checked one by one with validate_batch_operation, so each result
+    can carry its own errors.
+    """
+    if not isinstance(data, dict):
+        return {}, ["Request body must be a JSON object."]
+
+    errors = []
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        errors.append("operations must be a non-empty list.")
+    elif len(operations) > max_operations:
+        errors.append(f"operations may contain at most {max_operations} items.")
+
+    atomic = data.get("atomic", True)
+    if not isinstance(atomic, bool):
+        errors.append("atomic must be true or false.")
+
+    if errors:
+        return {}, errors
+    return {"operations": operations, "atomic": atomic}, []
+
+
+def validate_batch_operation(op: Any) -> tuple[dict, list[str]]:
+    """
+    Validate one batch operation:
+        {"op": "create", "data": {...}}
+        {"op": "update", "id": 5, "data": {...}}
+        {"op": "delete", "id": 5}
+    data goes through the same schema as the single-book endpoint.
+    """
+    return validate_batch_operations([op])[0]
+
+
+def _batch_envelope(op: Any) -> tuple[dict, list[str], Optional[dict]]:
+    """An operation's op/id checks: (clean, errors, data to validate with the op's book schema)."""
+    if not isinstance(op, dict):
+        return {}, ["Each operation must be a JSON object."], None
+
+    kind = op.get("op")
+    if kind not in BATCH_OPS:
+        return {}, [f"op must be one of: {', '.join(BATCH_OPS)}."], None
+
+    clean: dict = {"op": kind}
+    errors = []
+    if kind in ("update", "delete"):
+        book_id = op.get("id")
+        if not isinstance(book_id, int) or isinstance(book_id, bool) or book_id <= 0:
+            errors.append("id must be a positive integer.")
+        else:
+            clean["id"] = book_id
+
+    data = None
+    if kind in ("create", "update"):
+        data = op.get("data")
+        if not isinstance(data, dict):
+            errors.append("data must be a JSON object.")
+            data = None
+    return clean, errors, data
+
+
+def validate_batch_operations(operations: list) -> list[tuple[dict, list[str]]]:
+    """
+    validate_batch_operation for every operation, in order. The creates'
+    and the updates' data are each checked in one validate_many pass.
+    """
+    envelopes = [_batch_envelope(op) for op in operations]
+    for kind, schema in (("create", CREATE_BOOK), ("update", UPDATE_BOOK)):
+        pending = [e for e in envelopes if e[2] is not None and e[0]["op"] == kind]
+        for (clean, errors, _), (data, data_errors) in zip(pending, schema.validate_many(e[2] for e in pending)):
+            clean["data"] = data
+            errors.extend(data_errors)
+    return [({}, errors) if errors else (clean, []) for clean, errors, _ in envelopes]
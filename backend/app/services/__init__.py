@@ -1,4 +1,22 @@
+from .analytics_service import AnalyticsService
 from .auth_service import AuthService, AuthError
 from .book_service import BookService, BookNotFoundError, BookRuleViolation
+from .catalog_service import CatalogService
+from .idempotency_service import IdempotencyService, IdempotencyInProgress, IdempotencyKeyReused
+from .progress_service import ProgressService
+from .recommendation_service import RecommendationService
 
-__all__ = ["AuthService", "AuthError", "BookService", "BookNotFoundError", "BookRuleViolation"]
+__all__ = [
+    "AnalyticsService",
+    "AuthService",
+    "AuthError",
+    "BookService",
+    "BookNotFoundError",
+    "BookRuleViolation",
+    "CatalogService",
+    "IdempotencyService",
+    "IdempotencyInProgress",
+    "IdempotencyKeyReused",
+    "ProgressService",
+    "RecommendationService",
+]
@@ -0,0 +1,34 @@
+"""
+AnalyticsService — reading activity over time.
+
+Served from the rollup tables that BookRepository maintains on every
+write, so the cost of a request depends on the number of periods and
+authors, not on the size of the library.
+"""
+
+from typing import Optional
+
+from app.repositories.analytics_repository import AnalyticsRepository
+
+TOP_AUTHORS = 10
+
+
+class AnalyticsService:
+    def __init__(self, repository: AnalyticsRepository):
+        self._repo = repository
+
+    def get_analytics(self, user_id: int, granularity: str) -> dict:
+        """granularity: 'month' or 'year' (the clean output of validate_analytics_query)."""
+        return {
+            "granularity": granularity,
+            "periods": self._repo.periods(user_id, granularity),
+            "authors": self._repo.authors(user_id, TOP_AUTHORS),
+        }
+
+    def etag(self, user_id: int, granularity: str) -> str:
+        """Changes whenever the response would: after a book write or a rebuild."""
+        version, generation = self._repo.versions(user_id)
+        return f"{version}.{generation}-{granularity}"
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        return self._repo.rebuild(user_id)
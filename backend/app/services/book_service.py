@@ -5,11 +5,28 @@ Receives clean validated data. Enforces business invariants.
 All queries are scoped to user_id.
 """
 
-from datetime import date
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Iterator, Optional, TypeVar
 
 from app.models.book import RATABLE_STATUSES, Book, ReadingStatus
 from app.repositories.book_repository import BookRepository
+from app.utils.event_bus import Event, EventBus
+from app.utils.trigrams import best_matches, group_pairs, min_title_dice, similar_pairs
+
+T = TypeVar("T")
+
+# Title/author similarity (0-1, see utils/trigrams.py) at which a book
+# counts as a likely duplicate of another.
+DUPLICATE_THRESHOLD = 0.8
+# Most likely duplicates reported when adding a book.
+DUPLICATE_WARNING_LIMIT = 5
+# Days a deletion tombstone is kept for delta sync. A client that last
+# synced before the newest purged one gets a full reset.
+TOMBSTONE_RETENTION_DAYS = 30
 
 
 class BookNotFoundError(Exception):
@@ -20,12 +37,91 @@ class BookRuleViolation(Exception):
     pass
 
 
+@dataclass
+class BatchOutcome:
+    """Result of one batch operation: the book written, or the error that stopped it."""
+    index: int
+    op: str
+    book: Optional[Book] = None
+    book_id: Optional[int] = None
+    error: Optional[Exception] = None
+
+
 class BookService:
-    def __init__(self, repository: BookRepository):
+    def __init__(self, repository: BookRepository, events: Optional[EventBus] = None,
+                 duplicate_threshold: float = DUPLICATE_THRESHOLD,
+                 tombstone_retention_days: int = TOMBSTONE_RETENTION_DAYS):
         self._repo = repository
+        self._events = events
+        self.duplicate_threshold = duplicate_threshold
+        self.tombstone_retention_days = tombstone_retention_days
+        # Events held back while a batch transaction is open on this thread.
+        self._local = threading.local()
+
+    def _publish(self, user_id: int, event_type: str, data: dict, change_seq: Optional[int]) -> None:
+        """Notify the user's open event streams, or queue the event if a transaction is open."""
+        event = Event(event_type, data, id=change_seq)
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append(event)
+        else:
+            self._flush(user_id, [event])
+
+    def _flush(self, user_id: int, events: list[Event], stats: Optional[dict] = None) -> None:
+        """Publish events then one stats event. Stats are only computed if someone is listening."""
+        if not events or self._events is None or not self._events.has_subscribers(user_id):
+            return
+        for event in events:
+            self._events.publish(user_id, event)
+        self._events.publish(user_id, Event("stats", stats if stats is not None else self._repo.stats(user_id)))
+
+    @contextmanager
+    def _transaction(self, user_id: int) -> Iterator[dict]:
+        """
+        Run the block in one repository transaction. Events it raises are
+        held back and published only after the commit; stats stored in the
+        yielded dict are reused for the trailing stats event.
+        """
+        deferred: dict = {"events": [], "stats": None}
+        self._local.pending = deferred["events"]
+        try:
+            with self._repo.transaction(user_id):
+                yield deferred
+        finally:
+            self._local.pending = None
+        self._flush(user_id, deferred["events"], deferred["stats"])
 
-    def list_books(self, user_id: int, status: Optional[str] = None, author: Optional[str] = None) -> list[Book]:
-        return self._repo.get_all(user_id, status=status, author=author)
+    def list_books(self, user_id: int, **filters) -> list[Book]:
+        """filters: the clean output of validate_list_books."""
+        return self._repo.get_all(user_id, **filters)
+
+    def list_book_columns(self, user_id: int, **filters) -> dict:
+        """list_books as one array per field (GET /api/books?format=columnar)."""
+        return self._repo.get_columns(user_id, **filters)
+
+    def list_authors(self, user_id: int, prefix: Optional[str], limit: int) -> list[dict]:
+        """Authors in the library with their book counts; co-authored books count for each author."""
+        return self._repo.authors(user_id, prefix, limit)
+
+    def list_tags(self, user_id: int) -> list[dict]:
+        return self._repo.tags(user_id)
+
+    def tag_books(self, user_id: int, tags: list[str], book_ids: list[int]) -> tuple[list[Book], list[int]]:
+        """Add tags to books (clean output of validate_tag_books). Returns (changed books, ids not found)."""
+        return self._set_tags(user_id, tags, book_ids, add=True)
+
+    def untag_books(self, user_id: int, tags: list[str], book_ids: list[int]) -> tuple[list[Book], list[int]]:
+        return self._set_tags(user_id, tags, book_ids, add=False)
+
+    def _set_tags(self, user_id: int, tags: list[str], book_ids: list[int], add: bool) -> tuple[list[Book], list[int]]:
+        changed, missing = self._repo.set_tags(user_id, tags, book_ids, add)
+        pending = getattr(self._local, "pending", None)
+        events = [Event("book_updated", book.to_dict(), id=book.change_seq) for book in changed]
+        if pending is not None:
+            pending.extend(events)
+        else:
+            self._flush(user_id, events)
+        return changed, missing
 
     def get_book(self, book_id: int, user_id: int) -> Book:
         book = self._repo.get_by_id(book_id, user_id)
@@ -33,9 +129,36 @@ class BookService:
             raise BookNotFoundError(f"Book {book_id} not found.")
         return book
 
+    def get_books(self, user_id: int, book_ids: list[int]) -> tuple[list[Book], list[int]]:
+        """The user's books in the order asked for (repeats dropped), and the ids not found."""
+        found = self._repo.get_many(user_id, book_ids)
+        ids = list(dict.fromkeys(book_ids))
+        return [found[i] for i in ids if i in found], [i for i in ids if i not in found]
+
     def get_stats(self, user_id: int) -> dict:
         return self._repo.stats(user_id)
 
+    def with_stats(self, user_id: int, write: Callable[[], T]) -> tuple[T, dict]:
+        """
+        Run one of the write methods below and read the user's stats in the
+        same transaction, so they reflect exactly that write.
+        """
+        with self._transaction(user_id) as deferred:
+            result = write()
+            deferred["stats"] = self._repo.stats(user_id)
+        return result, deferred["stats"]
+
+    def library_version(self, user_id: int) -> int:
+        return self._repo.library_version(user_id)
+
+    def changes_since(self, user_id: int, since: int, limit: int) -> dict:
+        return self._repo.changes_since(user_id, since, limit)
+
+    def purge_tombstones(self, now: Optional[datetime] = None) -> int:
+        """Drop tombstones past the retention window. Returns rows deleted."""
+        now = datetime.now(timezone.utc) if now is None else now
+        return self._repo.purge_tombstones((now - timedelta(days=self.tombstone_retention_days)).isoformat())
+
     def add_book(self, user_id: int, data: dict) -> Book:
         status = ReadingStatus(data["status"])
 
@@ -65,7 +188,39 @@ class BookService:
             date_added=date_added,
             date_finished=date_finished,
         )
-        return self._repo.create(book)
+        duplicates = self._possible_duplicates(user_id, book.title, book.author)
+        created = self._repo.create(book)
+        self._publish(user_id, "book_created", created.to_dict(), created.change_seq)
+        # A copy, so the warning never reaches the cached book.
+        return replace(created, possible_duplicates=duplicates)
+
+    def _possible_duplicates(self, user_id: int, title: str, author: str) -> list[dict]:
+        """Books already in the library that look like this one. A warning only: adding still succeeds."""
+        candidates = self._repo.similar_titles(user_id, title, min_title_dice(self.duplicate_threshold))
+        if not candidates:
+            return []
+        by_id = {b.id: b for b in candidates}
+        matches = best_matches(
+            title, author, ((b.id, b.title, b.author) for b in candidates),
+            self.duplicate_threshold, DUPLICATE_WARNING_LIMIT,
+        )
+        return [
+            {"id": book_id, "title": by_id[book_id].title, "author": by_id[book_id].author,
+             "isbn": by_id[book_id].isbn, "similarity": round(score, 2)}
+            for book_id, score in matches
+        ]
+
+    def find_duplicates(self, user_id: int) -> list[dict]:
+        """
+        Groups of books that look like the same title, most alike first.
+        Compares only books sharing rare title trigrams, never all pairs.
+        """
+        books = {b.id: b for b in self._repo.get_all(user_id)}
+        pairs = similar_pairs(((b.id, b.title, b.author) for b in books.values()), self.duplicate_threshold)
+        return [
+            {"similarity": round(score, 2), "books": [books[i].to_dict() for i in ids]}
+            for ids, score in group_pairs(pairs)
+        ]
 
     def update_book(self, book_id: int, user_id: int, data: dict) -> Book:
         existing = self._repo.get_by_id(book_id, user_id)
@@ -91,8 +246,66 @@ class BookService:
         ):
             data = {**data, "date_finished": date.today().isoformat()}
 
-        return self._repo.update(book_id, user_id, data)
+        updated = self._repo.update(book_id, user_id, data)
+        if updated is None:
+            raise BookNotFoundError(f"Book {book_id} not found.")
+        self._publish(user_id, "book_updated", updated.to_dict(), updated.change_seq)
+        return updated
 
     def delete_book(self, book_id: int, user_id: int) -> None:
-        if not self._repo.delete(book_id, user_id):
+        change_seq = self._repo.delete(book_id, user_id)
+        if change_seq is None:
+            raise BookNotFoundError(f"Book {book_id} not found.")
+        self._publish(user_id, "book_deleted", {"id": book_id}, change_seq)
+
+    def record_progress(self, book_id: int, user_id: int, page: int) -> Book:
+        """
+        Record the page reached in a book being read (clean output of
+        validate_progress). The repository applies the rules in the same
+        statement as the write; a refusal is explained from the row it saw.
+        """
+        updated, recorded = self._repo.record_progress(book_id, user_id, page, int(time.time()))
+        if updated is None:
             raise BookNotFoundError(f"Book {book_id} not found.")
+        if not recorded:
+            if updated.status != ReadingStatus.READING:
+                raise BookRuleViolation("Progress can only be recorded for books with status reading.")
+            raise BookRuleViolation(f"page cannot exceed the book's page_count ({updated.page_count}).")
+        self._publish(user_id, "book_updated", updated.to_dict(), updated.change_seq)
+        return updated
+
+    def apply_batch(self, user_id: int, operations: list[dict], atomic: bool = True) -> tuple[list[BatchOutcome], bool]:
+        """
+        Run create/update/delete operations in order, in one transaction,
+        through the same rules as the single-book methods.
+
+        operations: clean output of validate_batch_operation.
+        atomic: the first failure rolls everything back and the remaining
+        operations are not attempted. Otherwise each operation runs in its
+        own savepoint, failures are undone individually and the rest commit.
+
+        Returns (outcomes, committed). Events are published only once the
+        transaction has committed, followed by a single stats event.
+        """
+        outcomes: list[BatchOutcome] = []
+        try:
+            with self._transaction(user_id):
+                for index, op in enumerate(operations):
+                    outcome = BatchOutcome(index=index, op=op["op"], book_id=op.get("id"))
+                    outcomes.append(outcome)
+                    try:
+                        with self._repo.savepoint():
+                            if op["op"] == "create":
+                                outcome.book = self.add_book(user_id, op["data"])
+                                outcome.book_id = outcome.book.id
+                            elif op["op"] == "update":
+                                outcome.book = self.update_book(op["id"], user_id, op["data"])
+                            else:
+                                self.delete_book(op["id"], user_id)
+                    except (BookNotFoundError, BookRuleViolation, ValueError) as e:
+                        outcome.error = e
+                        if atomic:
+                            raise
+        except (BookNotFoundError, BookRuleViolation, ValueError):
+            return outcomes, False
+        return outcomes, True
@@ -0,0 +1,41 @@
+"""
+CatalogService — the shared works catalog.
+
+Search results feed it, so by the time a user adds a book from search its
+canonical cover and page count are already known. Book writes only link
+to an existing entry; they never add to or change the catalog.
+"""
+
+import logging
+from typing import Optional
+
+from app.models.work import Work
+from app.repositories.work_repository import WorkRepository
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogService:
+    def __init__(self, repository: WorkRepository):
+        self._repo = repository
+
+    def get_work(self, isbn: str) -> Optional[Work]:
+        return self._repo.get_by_isbn(isbn)
+
+    def record_search_results(self, results: list[dict]) -> int:
+        """Upsert every result that has an ISBN-13. Returns how many were recorded."""
+        works = [
+            Work(
+                isbn=r["isbn"],
+                ol_work_id=r.get("ol_work_id"),
+                title=r["title"],
+                author=r["author"],
+                cover_url=r.get("cover_url"),
+                page_count=r.get("page_count"),
+            )
+            for r in results
+            if r.get("isbn") and len(r["isbn"]) == 13 and r["isbn"].isdigit() and r.get("title")
+        ]
+        if works:
+            self._repo.upsert_many(works)
+        return len(works)
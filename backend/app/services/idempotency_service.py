@@ -0,0 +1,147 @@
+"""
+IdempotencyService — replay rules for Idempotency-Key requests.
+
+The first request with a key claims it and runs normally; its response
+is stored for IDEMPOTENCY_TTL_SECONDS. A retry with the same key and the
+same request gets the stored response back without running the write
+again. A duplicate that arrives while the first is still running waits
+for it (serialised on the claimed row), then replays its response.
+
+A claim is a lease of lease_seconds. While this process holds claims, a
+renewer thread extends them every third of a lease, so a slow original
+keeps its key however long it runs; only a crashed one lets it lapse.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Optional
+
+from app.repositories.idempotency_repository import IdempotencyRepository, StoredResponse
+from app.utils.periodic import PeriodicTask
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different request."""
+
+
+class IdempotencyInProgress(Exception):
+    """The original request is still running after the wait limit."""
+
+
+def fingerprint(method: str, path: str, body: bytes) -> bytes:
+    return hashlib.sha256(method.encode() + b" " + path.encode() + b"\n" + body).digest()
+
+
+class IdempotencyService:
+    def __init__(
+        self,
+        repository: IdempotencyRepository,
+        ttl_seconds: int = 86400,
+        lease_seconds: int = 60,
+        wait_seconds: float = 10.0,
+        poll_seconds: float = 0.05,
+    ):
+        self._repo = repository
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        # Duplicates within this process queue on a per-key lock instead of
+        # polling. Entries are [lock, users] and removed when nobody holds
+        # or waits on them, so the dict stays as small as the in-flight set.
+        self._locks: dict[tuple[int, str], list] = {}
+        self._locks_guard = threading.Lock()
+        # Claims this process holds, renewed by _renewer (started on the first claim).
+        self._held: set[tuple[int, str]] = set()
+        self._renewer: Optional[PeriodicTask] = None
+
+    def _acquire(self, user_id: int, key: str) -> bool:
+        with self._locks_guard:
+            entry = self._locks.setdefault((user_id, key), [threading.Lock(), 0])
+            entry[1] += 1
+        if entry[0].acquire(timeout=self.wait_seconds):
+            return True
+        self._forget(user_id, key)
+        return False
+
+    def _release(self, user_id: int, key: str) -> None:
+        self._locks[(user_id, key)][0].release()
+        self._forget(user_id, key)
+
+    def _forget(self, user_id: int, key: str) -> None:
+        with self._locks_guard:
+            entry = self._locks[(user_id, key)]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[(user_id, key)]
+
+    def _hold(self, user_id: int, key: str) -> None:
+        with self._locks_guard:
+            self._held.add((user_id, key))
+            if self._renewer is None:
+                self._renewer = PeriodicTask(
+                    "idempotency-lease-renewal", self.lease_seconds / 3, self.renew_leases
+                ).start()
+
+    def _unhold(self, user_id: int, key: str) -> None:
+        with self._locks_guard:
+            self._held.discard((user_id, key))
+
+    def renew_leases(self, now: Optional[int] = None) -> int:
+        """Extend the lease of every claim still running in this process. Returns claims renewed."""
+        with self._locks_guard:
+            held = list(self._held)
+        if not held:
+            return 0
+        now = int(time.time()) if now is None else now
+        return self._repo.renew(held, now + self.lease_seconds)
+
+    def begin(self, user_id: int, key: str, request_fingerprint: bytes) -> Optional[StoredResponse]:
+        """
+        Returns None if the caller should run the request (and then call
+        finish or abandon), or the stored response to replay.
+        Raises IdempotencyKeyReused or IdempotencyInProgress.
+        """
+        if not self._acquire(user_id, key):
+            raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress.")
+        claimed = False
+        try:
+            deadline = time.monotonic() + self.wait_seconds
+            while True:
+                stored = self._repo.claim(
+                    user_id, key, request_fingerprint, int(time.time()), self.lease_seconds
+                )
+                if stored is None:
+                    claimed = True  # lock stays held until finish/abandon
+                    self._hold(user_id, key)
+                    return None
+                if stored.fingerprint != request_fingerprint:
+                    raise IdempotencyKeyReused("Idempotency-Key was already used for a different request.")
+                if stored.status is not None:
+                    return stored
+                # Claimed by another process: wait for it to finish.
+                if time.monotonic() >= deadline:
+                    raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress.")
+                time.sleep(self.poll_seconds)
+        finally:
+            if not claimed:
+                self._release(user_id, key)
+
+    def finish(self, user_id: int, key: str, status: int, body: str) -> None:
+        self._unhold(user_id, key)
+        try:
+            self._repo.complete(user_id, key, status, body, int(time.time()) + self.ttl_seconds)
+        finally:
+            self._release(user_id, key)
+
+    def abandon(self, user_id: int, key: str) -> None:
+        """The request failed without a response worth replaying; free the key for a retry."""
+        self._unhold(user_id, key)
+        try:
+            self._repo.release(user_id, key)
+        finally:
+            self._release(user_id, key)
+
+    def purge_expired(self) -> int:
+        return self._repo.purge_expired(int(time.time()))
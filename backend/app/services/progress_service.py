@@ -0,0 +1,30 @@
+"""
+ProgressService — housekeeping for the reading progress log.
+
+Recording progress is a book write and lives in BookService. This service
+runs the compaction that keeps progress_events small: events older than
+the retention window are folded into one row per book per day.
+"""
+
+import time
+from typing import Optional
+
+from app.repositories.progress_repository import ProgressRepository
+
+_DAY = 86400
+
+
+class ProgressService:
+    def __init__(self, repository: ProgressRepository, retention_days: int = 7):
+        self._repo = repository
+        self._retention_days = retention_days
+
+    def compact(self, now: Optional[float] = None) -> dict:
+        """
+        Fold events from before the retention window. The cutoff is
+        aligned to a UTC midnight so each compacted day is complete.
+        Returns {"folded", "dropped"}.
+        """
+        now = time.time() if now is None else now
+        cutoff = int(now // _DAY - self._retention_days) * _DAY
+        return self._repo.compact(before=cutoff)
@@ -0,0 +1,170 @@
+"""
+Offline shard maintenance: move users between shard files and change the
+shard count. Run with the app stopped (`flask shard-rebalance`); nothing
+here coordinates with live writers or with other processes' routing caches.
+
+A user is moved in three commits — copy to the target (replacing any
+partial copy from an interrupted run), repoint the directory, delete from
+the source — so re-running after a crash finishes the job.
+"""
+
+import logging
+
+from app.database import SHARD_ID_BLOCK, ShardRouter, create_directory, get_db, stored_shard_count
+from app.models.work import Work
+from app.repositories.work_repository import upsert_work
+
+logger = logging.getLogger(__name__)
+
+# Per-user tables, children first (the order rows are deleted in).
+# progress_events has no user index (it is append-only and kept narrow),
+# so run `flask compact-progress` first to keep moves of big logs short.
+USER_TABLES = (
+    "progress_events",
+    "reading_progress_daily",
+    "author_rollups",
+    "reading_rollups",
+    "title_trigram_counts",
+    "title_trigrams",
+    "author_counts",
+    "book_author_suffixes",
+    "book_authors",
+    "book_tags",
+    "tags",
+    "idempotency_keys",
+    "book_tombstones",
+    "books",
+    "users",
+)
+
+
+def _user_column(table: str) -> str:
+    return "id" if table == "users" else "user_id"
+
+
+def _copy_rows(source, target, table: str, user_id: int, work_ids: dict[int, int]) -> None:
+    rows = source.execute(f"SELECT * FROM {table} WHERE {_user_column(table)} = ?", (user_id,)).fetchall()
+    if not rows:
+        return
+    columns = rows[0].keys()
+    placeholders = ", ".join("?" for _ in columns)
+    values = []
+    for row in rows:
+        row = dict(row)
+        if table == "books" and row["work_id"] is not None:
+            row["work_id"] = work_ids[row["work_id"]]
+        values.append(tuple(row[c] for c in columns))
+    target.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", values)
+
+
+def _copy_works(source, target, user_id: int) -> dict[int, int]:
+    """Make sure the target's catalog has the user's works; map source id -> target id."""
+    rows = source.execute(
+        "SELECT w.* FROM works w WHERE w.id IN (SELECT work_id FROM books WHERE user_id = ?)", (user_id,)
+    ).fetchall()
+    return {
+        row["id"]: upsert_work(target, Work(
+            isbn=row["isbn"],
+            title=row["title"],
+            author=row["author"],
+            ol_work_id=row["ol_work_id"],
+            cover_url=row["cover_url"],
+            page_count=row["page_count"],
+        )).id
+        for row in rows
+    }
+
+
+def move_user(router: ShardRouter, user_id: int, target: int) -> bool:
+    """Move one user's rows to another shard. Returns False if already there."""
+    current = router.shard_for(user_id)
+    if current == target:
+        return False
+
+    source = get_db(router.shard_path(current))
+    dest = get_db(router.shard_path(target))
+    try:
+        dest.execute("BEGIN IMMEDIATE")
+        for table in USER_TABLES:
+            dest.execute(f"DELETE FROM {table} WHERE {_user_column(table)} = ?", (user_id,))
+        # Moved-in books keep their ids; don't let them drag this shard's
+        # id counter into another shard's block.
+        seq = dest.execute("SELECT seq FROM sqlite_sequence WHERE name = 'books'").fetchone()
+        work_ids = _copy_works(source, dest, user_id)
+        for table in reversed(USER_TABLES):
+            _copy_rows(source, dest, table, user_id, work_ids)
+        dest.execute(
+            "UPDATE sqlite_sequence SET seq = ? WHERE name = 'books'",
+            (seq["seq"] if seq else target * SHARD_ID_BLOCK,),
+        )
+        dest.commit()
+
+        with get_db(router.directory_path) as directory:
+            directory.execute("UPDATE user_directory SET shard = ? WHERE id = ?", (target, user_id))
+            directory.commit()
+        router.assign(user_id, target)
+
+        source.execute("BEGIN IMMEDIATE")
+        for table in USER_TABLES:
+            source.execute(f"DELETE FROM {table} WHERE {_user_column(table)} = ?", (user_id,))
+        source.commit()
+    finally:
+        source.close()
+        dest.close()
+    return True
+
+
+def rebalance(db_path: str, shard_count: int) -> dict:
+    """
+    Change the number of shards: split an unsharded database, add or
+    remove shards, or fold everything back into db_path (shard_count 1).
+    Each user ends up on shard user_id % shard_count.
+
+    Shard files above the new count are left on disk, empty, for the
+    operator to delete. Returns {"from", "to", "moved"}.
+    """
+    old_count = stored_shard_count(db_path)
+    router = ShardRouter(db_path, max(old_count, shard_count, 2))
+    ShardRouter(db_path, max(old_count, shard_count)).init_shards()
+
+    with get_db(db_path) as conn:
+        create_directory(conn)
+        if old_count == 1:
+            # Unsharded: users are all in db_path. (Re)build the directory
+            # from them, allocating future ids above the existing ones.
+            conn.execute("DELETE FROM user_directory")
+            conn.execute("INSERT INTO user_directory (id, email, shard) SELECT id, email, 0 FROM users")
+        conn.commit()
+        users = [(r["id"], r["shard"]) for r in conn.execute("SELECT id, shard FROM user_directory ORDER BY id")]
+
+    moved = 0
+    for user_id, shard in users:
+        router.assign(user_id, shard)
+        if move_user(router, user_id, user_id % shard_count):
+            moved += 1
+    logger.info("Rebalanced %s from %d to %d shards (%d users moved)", db_path, old_count, shard_count, moved)
+
+    with get_db(db_path) as conn:
+        if shard_count == 1:
+            conn.execute("DROP TABLE user_directory")
+            conn.execute("DROP TABLE directory_meta")
+        else:
+            conn.execute(
+                "INSERT INTO directory_meta (key, value) VALUES ('shard_count', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (str(shard_count),),
+            )
+        conn.commit()
+    return {"from": old_count, "to": shard_count, "moved": moved}
+
+
+def shard_status(db_path: str) -> list[dict]:
+    """Users and books per shard, for `flask shard-status`."""
+    router = ShardRouter(db_path, stored_shard_count(db_path))
+    report = []
+    for shard, path in enumerate(router.shard_paths()):
+        with get_db(path) as conn:
+            users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            books = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        report.append({"shard": shard, "path": path, "users": users, "books": books})
+    return report
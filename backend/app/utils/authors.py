@@ -0,0 +1,55 @@
+"""
+Splitting free-text author fields into individual authors.
+
+Open Library search results join co-authors with ", " ("Neil Gaiman,
+Terry Pratchett"), and people type "A & B", "A and B" or "A; B". A comma
+between two parts is also how one name is written surname first
+("Tolkien, J.R.R.", "Le Guin, Ursula K."), so a comma only splits when
+every part looks like a full name: has a space and doesn't end in an
+initial. Each author gets a key (normalized text, given
+names first) that the author index is keyed on, so "J. R. R. Tolkien",
+"J.R.R. Tolkien" and "Tolkien, J.R.R." are the same author. The key's
+word suffixes ("frank herbert", "herbert") let a prefix match start at
+any name, so a surname alone finds the author.
+"""
+
+import re
+
+from app.utils.trigrams import normalize
+
+_SEPARATORS = re.compile(r"\s*;\s*|\s+&\s+|\s+and\s+", re.IGNORECASE)
+_ENDS_WITH_INITIAL = re.compile(r"(^|\s)\w\.?$")
+
+
+def _full_name(piece: str) -> bool:
+    return " " in piece and not _ENDS_WITH_INITIAL.search(piece)
+
+
+def author_key(name: str) -> str:
+    pieces = [p.strip() for p in name.split(",") if p.strip()]
+    if len(pieces) == 2:
+        name = f"{pieces[1]} {pieces[0]}"
+    return normalize(name)
+
+
+def key_suffixes(key: str) -> list[str]:
+    """The key and each tail of it that starts at a word."""
+    words = key.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def split_authors(author: str) -> dict[str, str]:
+    """author_key -> name as written, in order, one entry per distinct author."""
+    names = []
+    for part in _SEPARATORS.split(author or ""):
+        pieces = [p.strip() for p in part.split(",") if p.strip()]
+        if len(pieces) > 1 and all(_full_name(p) for p in pieces):
+            names.extend(pieces)
+        elif pieces:
+            names.append(part.strip())
+    authors = {}
+    for name in names:
+        key = author_key(name)
+        if key and key not in authors:
+            authors[key] = name
+    return authors
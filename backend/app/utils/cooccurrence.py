@@ -0,0 +1,142 @@
+"""
+Item-item cosine similarity over a sparse user × item matrix.
+
+Stdlib only: the matrix is stored twice in compressed sparse row form
+(by user and by item) in flat `array` buffers, which pickle compactly
+for the worker processes. For each item the similarity row is the
+sparse product of its column with the whole matrix — walk the users who
+have the item, then their items — so cost grows with co-occurrences, not
+with users × items. Items are split round-robin over a process pool.
+"""
+
+import heapq
+import math
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Hashable, Iterable, Optional
+
+
+@dataclass
+class SparseMatrix:
+    items: list                # item label per column index
+    user_ptr: array            # CSR by user: items of user u are user_items[user_ptr[u]:user_ptr[u+1]]
+    user_items: array
+    user_weights: array
+    item_ptr: array            # CSR by item (the transpose)
+    item_users: array
+    item_weights: array
+    norms: array               # L2 norm of each item column
+
+    @property
+    def item_count(self) -> int:
+        return len(self.items)
+
+
+def build_matrix(entries: Iterable[tuple[Hashable, Hashable, float]],
+                 max_items_per_user: Optional[int] = None) -> SparseMatrix:
+    """
+    entries: (user, item, weight). A repeated (user, item) keeps the
+    larger weight. Users with more than max_items_per_user items keep
+    their heaviest ones, bounding the quadratic per-user cost.
+    """
+    index: dict = {}
+    items: list = []
+    by_user: dict = {}
+    for user, item, weight in entries:
+        if weight <= 0:
+            continue
+        col = index.get(item)
+        if col is None:
+            col = index[item] = len(items)
+            items.append(item)
+        row = by_user.setdefault(user, {})
+        if weight > row.get(col, 0.0):
+            row[col] = weight
+
+    user_ptr, user_items, user_weights = array("l", [0]), array("l"), array("d")
+    columns: list[list] = [[] for _ in items]
+    for u, row in enumerate(by_user.values()):
+        pairs = sorted(row.items())
+        if max_items_per_user and len(pairs) > max_items_per_user:
+            pairs = sorted(heapq.nlargest(max_items_per_user, pairs, key=lambda p: p[1]))
+        for col, weight in pairs:
+            user_items.append(col)
+            user_weights.append(weight)
+            columns[col].append((u, weight))
+        user_ptr.append(len(user_items))
+
+    item_ptr, item_users, item_weights = array("l", [0]), array("l"), array("d")
+    norms = array("d")
+    for column in columns:
+        for u, weight in column:
+            item_users.append(u)
+            item_weights.append(weight)
+        item_ptr.append(len(item_users))
+        norms.append(math.sqrt(sum(w * w for _, w in column)))
+
+    return SparseMatrix(items, user_ptr, user_items, user_weights, item_ptr, item_users, item_weights, norms)
+
+
+def _neighbors_of(m: SparseMatrix, i: int, k: int, min_support: int) -> list[tuple[int, float, int]]:
+    """Top-k (item, cosine, co-occurrences) for column i."""
+    dots: dict[int, float] = {}
+    support: dict[int, int] = {}
+    user_ptr, user_items, user_weights = m.user_ptr, m.user_items, m.user_weights
+    for p in range(m.item_ptr[i], m.item_ptr[i + 1]):
+        u, wi = m.item_users[p], m.item_weights[p]
+        start, end = user_ptr[u], user_ptr[u + 1]
+        for j, wj in zip(user_items[start:end], user_weights[start:end]):
+            dots[j] = dots.get(j, 0.0) + wi * wj
+            support[j] = support.get(j, 0) + 1
+    del dots[i]
+    norm_i = m.norms[i]
+    norms = m.norms
+    scored = (
+        (j, dot / (norm_i * norms[j]), support[j])
+        for j, dot in dots.items()
+        if support[j] >= min_support
+    )
+    return heapq.nlargest(k, scored, key=lambda s: (s[1], s[2], -s[0]))
+
+
+# Worker-process state, set once per process by _init_worker.
+_matrix: Optional[SparseMatrix] = None
+
+
+def _init_worker(matrix: SparseMatrix) -> None:
+    global _matrix
+    _matrix = matrix
+
+
+def _shard(args: tuple) -> list[tuple[int, list]]:
+    shard, shards, k, min_support = args
+    m = _matrix
+    out = []
+    for i in range(shard, m.item_count, shards):
+        neighbors = _neighbors_of(m, i, k, min_support)
+        if neighbors:
+            out.append((i, neighbors))
+    return out
+
+
+def top_neighbors(matrix: SparseMatrix, k: int, min_support: int = 1,
+                  workers: int = 1) -> dict[Hashable, list[tuple[Hashable, float, int]]]:
+    """
+    item -> up to k (neighbor, cosine similarity, co-occurrence count),
+    best first. Items with no neighbor meeting min_support are omitted.
+    workers > 1 splits the items over a process pool.
+    """
+    if workers <= 1 or matrix.item_count < 2:
+        results = [[(i, n) for i in range(matrix.item_count) if (n := _neighbors_of(matrix, i, k, min_support))]]
+    else:
+        # Several shards per worker keeps the pool busy when shards are uneven.
+        shards = workers * 4
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(matrix,)) as pool:
+            results = list(pool.map(_shard, [(s, shards, k, min_support) for s in range(shards)]))
+    labels = matrix.items
+    return {
+        labels[i]: [(labels[j], score, support) for j, score, support in neighbors]
+        for shard in results
+        for i, neighbors in shard
+    }
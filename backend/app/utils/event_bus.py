@@ -0,0 +1,107 @@
+"""
+In-process publish/subscribe for live library updates.
+
+BookService publishes after every successful mutation; each open
+GET /api/books/events stream holds one Subscription. Fan-out is per user,
+so a publish only touches that user's subscribers.
+
+Every subscriber gets a bounded queue. A consumer that falls behind is
+closed instead of letting memory grow; its client reconnects with
+Last-Event-ID and replays the gap from the delta-sync feed.
+
+Uses only threading primitives and queue.Queue, so it works under
+threaded workers and under gevent once the stdlib is monkey-patched.
+Events never cross processes: with several workers each stream sees the
+writes made by its own worker live, and the rest on reconnect/replay.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+@dataclass
+class Event:
+    type: str
+    data: dict
+    id: Optional[int] = None
+
+
+class Subscription:
+    def __init__(self, user_id: int, bus: "EventBus", queue_size: int):
+        self.user_id = user_id
+        self.overflowed = False
+        self._bus = bus
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    def get(self, timeout: float) -> Optional[Event]:
+        """Next event, or None if none arrived within timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _offer(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventBus:
+    def __init__(self, max_connections: int = 100, max_per_user: int = 5, queue_size: int = 256):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._count = 0
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Register a stream. Raises TooManySubscribers if a cap is reached."""
+        with self._lock:
+            user_subs = self._subscribers.get(user_id, set())
+            if self._count >= self.max_connections:
+                raise TooManySubscribers("Too many open event streams.")
+            if len(user_subs) >= self.max_per_user:
+                raise TooManySubscribers("Too many open event streams for this account.")
+            sub = Subscription(user_id, self, self.queue_size)
+            self._subscribers[user_id] = user_subs | {sub}
+            self._count += 1
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            user_subs = self._subscribers.get(sub.user_id)
+            if user_subs and sub in user_subs:
+                self._count -= 1
+                if len(user_subs) == 1:
+                    del self._subscribers[sub.user_id]
+                else:
+                    self._subscribers[sub.user_id] = user_subs - {sub}
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return user_id in self._subscribers
+
+    def publish(self, user_id: int, event: Event) -> None:
+        # Sets are replaced, never mutated, so a snapshot read needs no lock.
+        for sub in self._subscribers.get(user_id, ()):
+            sub._offer(event)
+
+    @property
+    def connection_count(self) -> int:
+        return self._count
@@ -0,0 +1,71 @@
+"""
+Idempotency-Key support for write routes.
+
+Usage:
+    @books_bp.route("", methods=["POST"])
+    @require_auth
+    @idempotent
+    def create_book(current_user_id: int):
+        ...
+
+Without the header the route runs as before. With it, the first request
+runs and its response (anything below 500) is stored; retries with the
+same key and body get that response back with Idempotent-Replayed: true,
+without the route — or BookService — running again.
+"""
+
+import logging
+from functools import wraps
+
+from flask import Response, current_app, jsonify, make_response, request
+
+from app.schemas import validate_idempotency_key
+from app.services.idempotency_service import (
+    IdempotencyInProgress,
+    IdempotencyKeyReused,
+    fingerprint,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def idempotent(f):
+    @wraps(f)
+    def decorated(current_user_id: int, *args, **kwargs):
+        raw_key = request.headers.get("Idempotency-Key")
+        if raw_key is None:
+            return f(current_user_id, *args, **kwargs)
+
+        clean, errors = validate_idempotency_key(raw_key)
+        if errors:
+            return jsonify({"errors": errors}), 400
+        key = clean["key"]
+
+        service = current_app.extensions["idempotency_service"]
+        request_fingerprint = fingerprint(request.method, request.full_path, request.get_data())
+        try:
+            stored = service.begin(current_user_id, key, request_fingerprint)
+        except IdempotencyKeyReused as e:
+            return jsonify({"error": str(e)}), 422
+        except IdempotencyInProgress as e:
+            response = jsonify({"error": str(e)})
+            response.headers["Retry-After"] = "1"
+            return response, 409
+
+        if stored is not None:
+            response = Response(stored.body, status=stored.status, mimetype="application/json")
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            response = make_response(f(current_user_id, *args, **kwargs))
+        except Exception:
+            service.abandon(current_user_id, key)
+            raise
+        if response.status_code >= 500:
+            service.abandon(current_user_id, key)
+        else:
+            service.finish(current_user_id, key, response.status_code, response.get_data(as_text=True))
+        return response
+
+    return decorated
@@ -0,0 +1,160 @@
+"""
+Adaptive concurrency limits per endpoint class.
+
+Requests are sorted into classes by what they cost (endpoint_class):
+"search" waits on Open Library, "auth" hashes a password with PBKDF2,
+"reads" and "writes" hit SQLite. Each class has its own limiter, so a
+pile-up of slow searches can only take search's slots and cheap reads
+keep theirs. Health, metrics, CORS preflights and the long-lived event
+stream are never limited.
+
+A limiter admits up to `limit` requests at once. Past that a request
+waits in a bounded queue for up to queue_timeout; when the queue is full
+or the wait runs out it is shed with 503 and Retry-After, before any
+work is done for it. The limit adapts by AIMD on observed latency: a
+request that finishes within the class's target latency adds 1/limit
+(about +1 per limit's worth of completions) while the limit is in use,
+and one that overruns cuts it by `backoff`, at most once per target
+period so a single slow burst isn't counted many times over.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class ClassLimits:
+    initial: int
+    min_limit: int
+    max_limit: int
+    max_queue: int
+    target_latency: float    # seconds
+    backoff: float = 0.9
+
+
+# Per process. PBKDF2 is CPU-bound, so auth starts low; search is mostly
+# waiting on the network and can have more in flight.
+DEFAULT_CLASSES = {
+    "search": ClassLimits(initial=8, min_limit=2, max_limit=32, max_queue=8, target_latency=2.0),
+    "auth": ClassLimits(initial=4, min_limit=1, max_limit=16, max_queue=16, target_latency=1.0),
+    "reads": ClassLimits(initial=32, min_limit=8, max_limit=128, max_queue=64, target_latency=0.25),
+    "writes": ClassLimits(initial=16, min_limit=4, max_limit=64, max_queue=32, target_latency=0.5),
+}
+
+# Endpoints outside the classes: liveness and metrics must answer during
+# overload, and an event stream would hold a slot for as long as it is open.
+_UNLIMITED = frozenset({"health", "metrics", "handle_options", "books.stream_events"})
+_AUTH = frozenset({"auth.login", "auth.register"})
+# POSTs that only read (the body carries the query).
+_POST_READS = frozenset({"books.lookup_books"})
+
+
+def endpoint_class(endpoint: Optional[str], method: str) -> Optional[str]:
+    """The class a request belongs to, or None if it is never limited."""
+    if endpoint is None or endpoint in _UNLIMITED or method == "OPTIONS":
+        return None
+    blueprint = endpoint.partition(".")[0]
+    if blueprint == "search":
+        return "search"
+    if endpoint in _AUTH:
+        return "auth"
+    if method in ("GET", "HEAD") or endpoint in _POST_READS:
+        return "reads"
+    return "writes"
+
+
+class AdaptiveLimiter:
+    def __init__(self, name: str, limits: ClassLimits, queue_timeout: float, clock=time.monotonic):
+        self.name = name
+        self.limits = limits
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._limit = float(limits.initial)
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = float("-inf")
+        self._admitted = 0
+        self._queued = 0
+        self._shed = 0
+        self._slow = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if need be. False means shed."""
+        with self._cond:
+            if self._in_flight < int(self._limit):
+                self._in_flight += 1
+                self._admitted += 1
+                return True
+            if self._waiting >= self.limits.max_queue:
+                self._shed += 1
+                return False
+            self._waiting += 1
+            self._queued += 1
+            try:
+                deadline = self._clock() + self.queue_timeout
+                while self._in_flight >= int(self._limit):
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self._shed += 1
+                        return False
+                    self._cond.wait(remaining)
+                self._in_flight += 1
+                self._admitted += 1
+                return True
+            finally:
+                self._waiting -= 1
+
+    def release(self, latency: float) -> None:
+        """Give the slot back, adjusting the limit by how long the request took."""
+        limits = self.limits
+        with self._cond:
+            busy = self._in_flight * 2 >= self._limit
+            self._in_flight -= 1
+            if latency > limits.target_latency:
+                self._slow += 1
+                now = self._clock()
+                if now - self._last_decrease >= limits.target_latency:
+                    self._limit = max(limits.min_limit, self._limit * limits.backoff)
+                    self._last_decrease = now
+            elif busy:
+                # Don't grow a limit that isn't being used: it would say nothing about capacity.
+                self._limit = min(limits.max_limit, self._limit + 1 / self._limit)
+            free = int(self._limit) - self._in_flight
+            if free > 0 and self._waiting:
+                self._cond.notify(free)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.limits.target_latency))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "admitted": self._admitted,
+                "queued": self._queued,
+                "shed": self._shed,
+                "slow": self._slow,
+            }
+
+
+class LoadShedder:
+    """One AdaptiveLimiter per endpoint class."""
+
+    def __init__(self, classes: dict[str, ClassLimits], queue_timeout: float):
+        self.limiters = {name: AdaptiveLimiter(name, limits, queue_timeout) for name, limits in classes.items()}
+
+    def limiter_for(self, endpoint: Optional[str], method: str) -> Optional[AdaptiveLimiter]:
+        return self.limiters.get(endpoint_class(endpoint, method))
+
+    def stats(self) -> dict:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
@@ -0,0 +1,45 @@
+"""
+Background housekeeping on a daemon thread.
+
+Runs a callable every `interval` seconds until stopped. Exceptions are
+logged and the task keeps its schedule; a failed run is simply retried
+on the next tick. Each process runs its own copy, so the work must be
+safe to repeat concurrently (e.g. deleting expired rows).
+"""
+
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(self, name: str, interval: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self._fn = fn
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+
+    def start(self) -> "PeriodicTask":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def run_once(self) -> object:
+        try:
+            result = self._fn()
+            logger.debug("%s: %s", self.name, result)
+            return result
+        except Exception:
+            logger.exception("Periodic task %s failed", self.name)
+            return None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
@@ -0,0 +1,177 @@
+"""
+Token-bucket rate limiting for routes.
+
+Usage:
+    @search_bp.route("", methods=["GET"])
+    @require_auth
+    @rate_limit("search")            # one bucket per user
+    def search_books(current_user_id: int):
+        ...
+
+    @auth_bp.route("/login", methods=["POST"])
+    @rate_limit("login", per="ip")   # one bucket per client address
+    def login():
+        ...
+
+Each (limit, key) has a bucket of `capacity` tokens that refills at
+capacity / period per second. A request takes one token or gets 429 with
+Retry-After. Refill is lazy: a bucket stores its tokens and when they
+were counted, and is topped up from the elapsed time when next touched,
+so idle keys cost nothing. Responses carry RateLimit-Limit,
+RateLimit-Remaining and RateLimit-Reset (seconds until the bucket is
+full again), as in the IETF RateLimit header fields draft.
+
+Buckets live in memory per process (MemoryBuckets, bounded by LRU
+eviction of keys) or, for several workers, in one SQLite file they all
+share (repositories/rate_limit_repository.py).
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Optional, Protocol
+
+from flask import current_app, jsonify, make_response, request
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class Limit:
+    capacity: int      # burst size
+    period: float      # seconds to refill from empty
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second."""
+        return self.capacity / self.period
+
+
+def parse_limit(spec: str) -> Limit:
+    """'10/minute' -> Limit(10, 60). Units: second, minute, hour, day."""
+    count, _, unit = spec.partition("/")
+    if unit not in _PERIODS or not count.strip().isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid rate limit {spec!r}: expected N/second|minute|hour|day.")
+    return Limit(int(count), _PERIODS[unit])
+
+
+def refill(tokens: float, updated_at: float, now: float, limit: Limit) -> float:
+    return min(limit.capacity, tokens + max(0.0, now - updated_at) * limit.rate)
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int           # seconds until the bucket is full
+    retry_after: int     # seconds until a token is available (0 if allowed)
+
+
+class BucketStore(Protocol):
+    def take(self, key: str, limit: Limit, now: float) -> tuple[bool, float]:
+        """Refill key's bucket, take one token if there is one: (taken, tokens left)."""
+        ...
+
+
+class MemoryBuckets:
+    """Buckets for one process. Past max_keys the least recently used key is forgotten (its bucket starts full)."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def take(self, key: str, limit: Limit, now: float) -> tuple[bool, float]:
+        with self._lock:
+            state = self._buckets.get(key)
+            tokens = limit.capacity if state is None else refill(state[0], state[1], now, limit)
+            taken = tokens >= 1
+            if taken:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            return taken, tokens
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    def __init__(self, limits: dict[str, Limit], store: BucketStore, clock=time.time):
+        self.limits = limits
+        self._store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counts: dict[str, list[int]] = {name: [0, 0] for name in limits}  # [allowed, limited]
+
+    def check(self, name: str, key: str) -> Optional[Decision]:
+        """Take a token from name's bucket for key. None if name has no limit configured."""
+        limit = self.limits.get(name)
+        if limit is None:
+            return None
+        taken, tokens = self._store.take(f"{name}:{key}", limit, self._clock())
+        with self._lock:
+            self._counts[name][0 if taken else 1] += 1
+        return Decision(
+            allowed=taken,
+            limit=limit.capacity,
+            remaining=int(tokens),
+            reset=math.ceil((limit.capacity - tokens) / limit.rate),
+            retry_after=0 if taken else max(1, math.ceil((1 - tokens) / limit.rate)),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {name: {"allowed": a, "limited": n} for name, (a, n) in self._counts.items()}
+        if isinstance(self._store, MemoryBuckets):
+            counts["keys"] = len(self._store)
+            counts["evictions"] = self._store.evictions
+        return counts
+
+
+def _headers(response, decision: Decision) -> None:
+    response.headers["RateLimit-Limit"] = str(decision.limit)
+    response.headers["RateLimit-Remaining"] = str(decision.remaining)
+    response.headers["RateLimit-Reset"] = str(decision.reset)
+    if not decision.allowed:
+        response.headers["Retry-After"] = str(decision.retry_after)
+
+
+def rate_limit(name: str, per: str = "user"):
+    """
+    Limit a route with the limit configured under name. per="user" keys
+    on the current_user_id that @require_auth passes in, so put it below
+    @require_auth; per="ip" keys on the client address.
+    """
+    if per not in ("user", "ip"):
+        raise ValueError("per must be 'user' or 'ip'")
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            limiter = current_app.extensions.get("rate_limiter")
+            if limiter is None:
+                return f(*args, **kwargs)
+            key = f"user:{args[0]}" if per == "user" else f"ip:{request.remote_addr}"
+            decision = limiter.check(name, key)
+            if decision is None:
+                return f(*args, **kwargs)
+            if not decision.allowed:
+                response = jsonify({"error": "Too many requests. Try again later."})
+                response.status_code = 429
+            else:
+                response = make_response(f(*args, **kwargs))
+            _headers(response, decision)
+            return response
+
+        return decorated
+
+    return decorator
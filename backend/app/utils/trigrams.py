@@ -0,0 +1,161 @@
+"""
+Trigram similarity for spotting duplicate books.
+
+Titles and authors are normalized (accents, case, punctuation, a leading
+article, and subtitles or bracketed edition notes are dropped) and split
+into word trigrams padded like PostgreSQL's pg_trgm, so word order and
+small typos barely matter: "The Hobit (2nd ed.)" and "Hobbit" share most
+of their trigrams. Two books are compared by the Dice coefficient of
+their title trigrams, and of their author trigrams, weighted 3:1.
+
+similar_pairs() finds every pair above a threshold without comparing all
+pairs: with trigrams ordered rarest first, two sets that overlap enough
+must share one of the first few trigrams of each (prefix filtering), so
+only books sharing a rare trigram are ever compared.
+"""
+
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Hashable, Iterable, Optional
+
+TITLE_WEIGHT = 0.75
+
+_ARTICLE = re.compile(r"^(the|a|an) ")
+_SUBTITLE = re.compile(r"\s*(:|\s-\s|\(|\[).*$")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: str, strip_subtitle: bool = False) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    if strip_subtitle:
+        text = _SUBTITLE.sub("", text) or text
+    text = _NON_WORD.sub(" ", text).strip()
+    return _ARTICLE.sub("", text) if strip_subtitle else text
+
+
+def trigrams(text: str) -> frozenset:
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def title_trigrams(title: str) -> frozenset:
+    return trigrams(normalize(title, strip_subtitle=True))
+
+
+def author_trigrams(author: str) -> frozenset:
+    return trigrams(normalize(author))
+
+
+def dice(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def similarity(title_a: frozenset, author_a: frozenset, title_b: frozenset, author_b: frozenset) -> float:
+    return TITLE_WEIGHT * dice(title_a, title_b) + (1 - TITLE_WEIGHT) * dice(author_a, author_b)
+
+
+def min_title_dice(threshold: float) -> float:
+    """The title similarity a pair needs to reach threshold even if the authors match exactly."""
+    return max(0.0, (threshold - (1 - TITLE_WEIGHT)) / TITLE_WEIGHT)
+
+
+def min_overlap(size: int, min_dice: float) -> int:
+    """Trigrams a set of this size must share with another to reach min_dice."""
+    return max(1, math.ceil(min_dice * size / (2 - min_dice) - 1e-9))
+
+
+def prefix_length(size: int, min_dice: float) -> int:
+    """
+    How many of a set's trigrams (rarest first) to probe: any
+    min_overlap() of them include one of the first size - overlap + 1.
+    """
+    return max(0, size - min_overlap(size, min_dice) + 1)
+
+
+def _size_bounds(size: int, min_dice: float) -> tuple[float, float]:
+    """Sizes another set can have and still reach min_dice with this one."""
+    if min_dice <= 0:
+        return 0, math.inf
+    return min_dice * size / (2 - min_dice) - 1e-9, (2 - min_dice) * size / min_dice + 1e-9
+
+
+def similar_pairs(books: Iterable[tuple[Hashable, str, str]], threshold: float) -> list[tuple[Hashable, Hashable, float]]:
+    """
+    (id, title, author) records -> (id_a, id_b, similarity) for every pair
+    scoring at least threshold, best first.
+    """
+    records = [(key, title_trigrams(title), author_trigrams(author)) for key, title, author in books]
+    frequency: dict[str, int] = defaultdict(int)
+    for _, grams, _ in records:
+        for g in grams:
+            frequency[g] += 1
+
+    needed = min_title_dice(threshold)
+    index: dict[str, list[int]] = defaultdict(list)  # trigram -> records whose prefix holds it
+    pairs = []
+    for i, (key, grams, author) in enumerate(records):
+        ordered = sorted(grams, key=lambda g: (frequency[g], g))
+        candidates: set[int] = set()
+        prefix = ordered[:prefix_length(len(ordered), needed)]
+        for g in prefix:
+            candidates.update(index[g])
+            index[g].append(i)
+        low, high = _size_bounds(len(grams), needed)
+        for j in candidates:
+            other_key, other_grams, other_author = records[j]
+            if not low <= len(other_grams) <= high:
+                continue
+            title_score = dice(grams, other_grams)
+            if title_score < needed:
+                continue
+            score = TITLE_WEIGHT * title_score + (1 - TITLE_WEIGHT) * dice(author, other_author)
+            if score >= threshold:
+                pairs.append((other_key, key, score))
+    pairs.sort(key=lambda p: -p[2])
+    return pairs
+
+
+def group_pairs(pairs: Iterable[tuple[Hashable, Hashable, float]]) -> list[tuple[list, float]]:
+    """Connected components of the pairs: ([ids], best pair score), best group first."""
+    parent: dict = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    best: dict = {}
+    for a, b, score in pairs:
+        parent[find(a)] = find(b)
+    for a, b, score in pairs:
+        root = find(a)
+        best[root] = max(best.get(root, 0.0), score)
+    members: dict = defaultdict(list)
+    for x in parent:
+        members[find(x)].append(x)
+    groups = [(sorted(ids), best[root]) for root, ids in members.items()]
+    groups.sort(key=lambda g: (-g[1], g[0][0]))
+    return groups
+
+
+def best_matches(
+    title: str, author: str, candidates: Iterable[tuple[Hashable, str, str]], threshold: float,
+    limit: Optional[int] = None,
+) -> list[tuple[Hashable, float]]:
+    """Score (id, title, author) candidates against one book: (id, similarity) above threshold, best first."""
+    grams, author_grams = title_trigrams(title), author_trigrams(author)
+    scored = [
+        (key, similarity(grams, author_grams, title_trigrams(t), author_trigrams(a)))
+        for key, t, a in candidates
+    ]
+    scored = sorted((s for s in scored if s[1] >= threshold), key=lambda s: -s[1])
+    return scored[:limit] if limit else scored
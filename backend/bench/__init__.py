@@ -0,0 +1,6 @@
+"""
+Benchmarking and load-testing tools.
+
+Not imported by the application. Run modules directly, e.g.
+    python -m bench.loadtest --spawn --duration 30
+"""
@@ -0,0 +1,96 @@
+"""
+Online snapshot duration and its effect on request latency.
+
+Loads N books into a temp database, then keeps a reader (GET one book)
+and a writer (PATCH one book) busy through Flask's test client while a
+snapshot runs, and compares their latency with a quiet period of the
+same length. Runs once with the default step size and once copying the
+whole file in one step.
+
+Example:
+    python -m bench.backup_latency --books 50000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.backups import BackupManager
+from app.database import ShardRouter
+from bench.columnar_listing import _client, _load
+from bench.loadtest import percentile
+
+
+def _traffic(client, headers, ids: list[int], stop: threading.Event, latencies: dict) -> list[threading.Thread]:
+    rng = random.Random(2)
+
+    def read():
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get(f"/api/books/{rng.choice(ids)}", headers=headers)
+            latencies["read"].append((time.perf_counter() - started) * 1000)
+
+    def write():
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.patch(
+                f"/api/books/{rng.choice(ids)}", data=json.dumps({"notes": f"n{rng.random()}"}),
+                content_type="application/json", headers=headers,
+            )
+            latencies["write"].append((time.perf_counter() - started) * 1000)
+            time.sleep(0.005)
+
+    return [threading.Thread(target=read), threading.Thread(target=write)]
+
+
+def _measure(client, headers, ids, during) -> tuple[dict, object]:
+    latencies = {"read": [], "write": []}
+    stop = threading.Event()
+    threads = _traffic(client, headers, ids, stop, latencies)
+    for t in threads:
+        t.start()
+    try:
+        result = during()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    return latencies, result
+
+
+def _summary(values: list[float]) -> str:
+    values = sorted(values)
+    return f"{len(values):>6} reqs  p50 {percentile(values, 50):>7.1f}  p99 {percentile(values, 99):>7.1f}  max {values[-1]:>7.1f} ms"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Snapshot duration and request latency")
+    parser.add_argument("--books", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    db_path = tempfile.mktemp(suffix=".db")
+    client, headers, user_id = _client(db_path)
+    _load(db_path, user_id, args.books)
+    ids = [b["id"] for b in client.get("/api/books", headers=headers).get_json()]
+    _measure(client, headers, ids, lambda: time.sleep(1))  # fill the book cache before timing
+    backup_dir = Path(tempfile.mkdtemp())
+
+    for label, pages in (("stepwise (1024 pages/step)", 1024), ("one step", -1)):
+        manager = BackupManager(ShardRouter(db_path), backup_dir, pages_per_step=pages)
+        during, manifest = _measure(client, headers, ids, manager.snapshot)
+        quiet, _ = _measure(client, headers, ids, lambda: time.sleep(manifest["duration_seconds"]))
+        [entry] = manifest["files"]
+        print(f"{label}: {manifest['duration_seconds']}s (copy {entry['copy_seconds']}s, "
+              f"{entry['restarts']} restarts; compress {entry['compress_seconds']}s), "
+              f"{entry['bytes'] / 2**20:.1f} MiB -> {entry['compressed_bytes'] / 2**20:.1f} MiB")
+        for kind in ("read", "write"):
+            print(f"  {kind:<5} quiet    {_summary(quiet[kind])}")
+            print(f"  {kind:<5} snapshot {_summary(during[kind])}")
+
+
+if __name__ == "__main__":
+    main()
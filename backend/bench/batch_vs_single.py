@@ -0,0 +1,76 @@
+"""
+Compare POST /api/books/batch with the same writes sent one at a time.
+
+Runs in-process against a temp database through Flask's test client, so
+the numbers isolate request handling and SQLite commit cost from network
+latency (which only widens the gap in the batch's favour).
+
+Example:
+    python -m bench.batch_vs_single --books 500 --batch-size 50
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+
+def _client():
+    from app import create_app
+
+    app = create_app(config={
+        "DB_PATH": tempfile.mktemp(suffix=".db"),
+        "JWT_SECRET": "bench-secret-key-32-chars-long-ok",
+        "TESTING": True,
+    })
+    client = app.test_client()
+    resp = client.post(
+        "/api/auth/register",
+        data=json.dumps({"email": "bench@example.com", "password": "password123"}),
+        content_type="application/json",
+    )
+    headers = {"Authorization": f"Bearer {resp.get_json()['token']}"}
+    return client, headers
+
+
+def _book(i: int) -> dict:
+    return {"title": f"Book {i}", "author": f"Author {i % 50}", "status": "reading"}
+
+
+def run_single(n: int) -> float:
+    client, headers = _client()
+    started = time.perf_counter()
+    for i in range(n):
+        resp = client.post("/api/books", data=json.dumps(_book(i)),
+                           content_type="application/json", headers=headers)
+        assert resp.status_code == 201, resp.get_json()
+    return time.perf_counter() - started
+
+
+def run_batched(n: int, batch_size: int) -> float:
+    client, headers = _client()
+    started = time.perf_counter()
+    for start in range(0, n, batch_size):
+        ops = [{"op": "create", "data": _book(i)} for i in range(start, min(n, start + batch_size))]
+        resp = client.post("/api/books/batch", data=json.dumps({"operations": ops}),
+                           content_type="application/json", headers=headers)
+        assert resp.status_code == 200, resp.get_json()
+    return time.perf_counter() - started
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Batch endpoint vs one request per write")
+    parser.add_argument("--books", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    single = run_single(args.books)
+    batched = run_batched(args.books, args.batch_size)
+    print(f"{args.books} creates")
+    print(f"  one at a time : {single * 1000:8.0f} ms  ({args.books / single:7.0f} books/s)")
+    print(f"  batches of {args.batch_size:<3}: {batched * 1000:8.0f} ms  ({args.books / batched:7.0f} books/s)")
+    print(f"  speedup       : {single / batched:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
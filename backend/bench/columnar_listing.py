@@ -0,0 +1,86 @@
+"""
+GET /api/books as rows vs ?format=columnar on a large library.
+
+Loads N books into one library in a temp database, then times both
+formats through Flask's test client (query, encoding and JSON
+serialization; the row format's Book cache is warm after the first
+request) and reports the response size, raw and gzipped.
+
+Example:
+    python -m bench.columnar_listing --books 10000
+"""
+
+import argparse
+import gzip
+import json
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+
+
+def _client(db_path: str):
+    from app import create_app
+
+    app = create_app(config={
+        "DB_PATH": db_path,
+        "JWT_SECRET": "bench-secret-key-32-chars-long-ok",
+        "TESTING": True,
+    })
+    client = app.test_client()
+    resp = client.post(
+        "/api/auth/register",
+        data=json.dumps({"email": "bench@example.com", "password": "password123"}),
+        content_type="application/json",
+    )
+    body = resp.get_json()
+    return client, {"Authorization": f"Bearer {body['token']}"}, body["user"]["id"]
+
+
+def _load(db_path: str, user_id: int, count: int) -> None:
+    rng = random.Random(1)
+    repo = BookRepository(db_path)
+    statuses = list(ReadingStatus)
+    with repo.transaction(user_id):
+        for i in range(count):
+            status = rng.choice(statuses)
+            added = date(2015, 1, 1) + timedelta(days=rng.randrange(3000))
+            finished = status in (ReadingStatus.FINISHED, ReadingStatus.ABANDONED)
+            repo.create(Book(
+                user_id=user_id, title=f"Book title number {i}", author=f"Author {i % 700}",
+                isbn=f"978{rng.randrange(10**10):010d}", status=status,
+                rating=rng.randint(1, 5) if finished else None, page_count=rng.randint(80, 900),
+                date_added=added, date_finished=added + timedelta(days=30) if finished else None,
+            ))
+
+
+def _time(client, headers, path: str, repeat: int) -> tuple[float, bytes]:
+    body = client.get(path, headers=headers).data  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        resp = client.get(path, headers=headers)
+        assert resp.status_code == 200
+    return (time.perf_counter() - started) / repeat, body
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Row vs columnar listing responses")
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    db_path = tempfile.mktemp(suffix=".db")
+    client, headers, user_id = _client(db_path)
+    _load(db_path, user_id, args.books)
+
+    for label, path in (("rows", "/api/books?sort=title"), ("columnar", "/api/books?sort=title&format=columnar")):
+        seconds, body = _time(client, headers, path, args.repeat)
+        print(f"{label:<9} {seconds * 1000:>8.1f} ms/request  {len(body) / 1024:>8.0f} KiB  "
+              f"{len(gzip.compress(body)) / 1024:>6.0f} KiB gzipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Fuzzy duplicate detection on large libraries.
+
+Builds one library of N synthetic books (titles of 1-4 words from a
+2,000-word vocabulary, with near-duplicates mixed in), then times the
+candidate lookup behind the add-time warning and the full
+GET /api/books/duplicates report, against the all-pairs comparison they
+replace.
+
+Example:
+    python -m bench.duplicate_check --books 20000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+from app.database import init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.user_repository import UserRepository
+from app.services.book_service import BookService
+from app.utils.trigrams import author_trigrams, similarity, title_trigrams
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Fuzzy duplicate detection at scale")
+    parser.add_argument("--books", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    vocabulary = [_word(rng) for _ in range(2000)]
+    authors = [f"{_word(rng).title()} {_word(rng).title()}" for _ in range(args.books // 5)]
+    library = []
+    for _ in range(args.books):
+        if library and rng.random() < 0.05:
+            title, author = rng.choice(library)
+            library.append((title + " (Reissue)", author))
+        else:
+            library.append((" ".join(rng.sample(vocabulary, rng.randint(1, 4))).title(), rng.choice(authors)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        init_db(db_path)
+        user_id = UserRepository(db_path).create("bench@example.com", "password123").id
+        repo = BookRepository(db_path)
+        service = BookService(repo)
+
+        t = time.perf_counter()
+        with repo.transaction(user_id):
+            for title, author in library:
+                repo.create(Book(user_id=user_id, title=title, author=author,
+                                 status=ReadingStatus.WANT_TO_READ, date_added=date.today()))
+        print(f"{args.books:,} books inserted (with index upkeep) in {time.perf_counter() - t:.1f}s")
+
+        probes = rng.sample(library, 200)
+        t = time.perf_counter()
+        for title, author in probes:
+            service._possible_duplicates(user_id, title, author)
+        print(f"add-time check: {(time.perf_counter() - t) / len(probes) * 1000:.2f} ms per book")
+
+        t = time.perf_counter()
+        groups = service.find_duplicates(user_id)
+        print(f"duplicates report: {time.perf_counter() - t:.2f}s, {len(groups):,} groups")
+
+        books = repo.get_all(user_id)[:2000]
+        grams = [(title_trigrams(b.title), author_trigrams(b.author)) for b in books]
+        t = time.perf_counter()
+        for i, (ti, ai) in enumerate(grams):
+            for tj, aj in grams[i + 1:]:
+                similarity(ti, ai, tj, aj)
+        pairs = len(grams) * (len(grams) - 1) / 2
+        estimate = (time.perf_counter() - t) / pairs * args.books * (args.books - 1) / 2
+        print(f"all-pairs comparison (extrapolated from 2,000 books): {estimate:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
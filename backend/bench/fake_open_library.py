@@ -0,0 +1,175 @@
+"""
+Local fake of the Open Library search API.
+
+Serves GET /search.json with the same shape the real API returns for the
+fields BookLog requests, so routes/search.py can be exercised without
+network access. Latency and failures are injectable:
+
+    python -m bench.fake_open_library --port 8081 --latency-ms 120 --jitter-ms 40 --error-rate 0.05
+
+Then start the backend with OPEN_LIBRARY_URL=http://127.0.0.1:8081.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TITLES = [
+    "Dune", "Hyperion", "Foundation", "Neuromancer", "Solaris", "Ubik",
+    "The Left Hand of Darkness", "A Fire Upon the Deep", "Blindsight",
+    "The Dispossessed", "Anathem", "Snow Crash", "Gideon the Ninth",
+]
+_AUTHORS = [
+    "Frank Herbert", "Dan Simmons", "Isaac Asimov", "William Gibson",
+    "Stanislaw Lem", "Philip K. Dick", "Ursula K. Le Guin", "Vernor Vinge",
+    "Peter Watts", "Neal Stephenson", "Tamsyn Muir",
+]
+
+
+def _make_docs(query: str, limit: int) -> list[dict]:
+    """Deterministic fake results for a query."""
+    rng = random.Random(query)
+    docs = []
+    for i in range(limit):
+        isbn13 = "978" + "".join(str(rng.randint(0, 9)) for _ in range(10))
+        docs.append({
+            "key": f"/works/OL{rng.randint(1, 9_999_999)}W",
+            "title": f"{rng.choice(_TITLES)} ({query} #{i + 1})",
+            "author_name": rng.sample(_AUTHORS, k=rng.randint(1, 2)),
+            "isbn": [isbn13[3:], isbn13],
+            "number_of_pages_median": rng.randint(120, 900),
+            "cover_i": rng.randint(1, 10_000_000),
+        })
+    return docs
+
+
+class FakeOpenLibraryServer:
+    """
+    Threaded HTTP server with configurable latency and error injection.
+
+    latency_ms / jitter_ms: each response is delayed by
+        latency_ms + uniform(-jitter_ms, jitter_ms), floored at zero.
+    error_rate: fraction of requests answered with HTTP 500.
+    timeout_rate: fraction of requests that stall for stall_s seconds
+        (longer than the backend's urlopen timeout) before answering.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        stall_s: float = 6.0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.stall_s = stall_s
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # keep benchmark output clean
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+
+                parsed = urllib.parse.urlparse(self.path)
+                if parsed.path != "/search.json":
+                    self._send(404, {"error": "not found"})
+                    return
+
+                roll = random.random()
+                if roll < server.timeout_rate:
+                    time.sleep(server.stall_s)
+                else:
+                    delay = server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms)
+                    if delay > 0:
+                        time.sleep(delay / 1000)
+
+                if random.random() < server.error_rate:
+                    self._send(500, {"error": "injected failure"})
+                    return
+
+                params = urllib.parse.parse_qs(parsed.query)
+                query = params.get("q", [""])[0]
+                limit = int(params.get("limit", ["8"])[0])
+                docs = _make_docs(query, limit)
+                self._send(200, {"numFound": len(docs), "start": 0, "docs": docs})
+
+            def _send(self, status: int, body: dict):
+                raw = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        return Handler
+
+    def start(self) -> "FakeOpenLibraryServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server = FakeOpenLibraryServer(
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+    )
+    print(f"Fake Open Library listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Book writes with and without the group-commit write queue.
+
+N writer threads (one user each) add books through BookRepository for a
+fixed time. "direct" is the default path: every write opens its own
+transaction and commits, so writers contend for the SQLite write lock.
+"queued" hands each write to a WriteQueue, which commits whatever has
+piled up in one transaction. Reports writes/s and p50/p99 latency.
+
+Example:
+    python -m bench.group_commit --writers 1 8 32 --seconds 3 --max-delay-ms 0
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+
+from app.database import init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.user_repository import UserRepository
+from app.repositories.write_queue import WriteQueue
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run(writers: int, seconds: float, queue: WriteQueue | None) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        init_db(db_path)
+        users = UserRepository(db_path)
+        repo = BookRepository(db_path, write_queue=queue)
+        user_ids = [users.create(f"writer{i}@example.com", "password123").id for i in range(writers)]
+
+        latencies: list[list[float]] = [[] for _ in range(writers)]
+        errors = [0] * writers
+        stop = threading.Event()
+
+        def writer(slot: int) -> None:
+            while not stop.is_set():
+                book = Book(user_id=user_ids[slot], title=f"Book {len(latencies[slot])}", author="Bench",
+                            status=ReadingStatus.WANT_TO_READ, date_added=date.today())
+                started = time.perf_counter()
+                try:
+                    repo.create(book)
+                except Exception:  # "database is locked" after the busy timeout
+                    errors[slot] += 1
+                    continue
+                latencies[slot].append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        if queue is not None:
+            queue.close()
+
+    samples = [s for per_writer in latencies for s in per_writer]
+    return {
+        "rate": len(samples) / elapsed,
+        "p50": statistics.median(samples) * 1000,
+        "p99": _percentile(samples, 0.99) * 1000,
+        "errors": sum(errors),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Group commit vs one commit per write")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--max-delay-ms", type=float, default=0.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    print(f"{'writers':>7}  {'mode':<7} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for writers in args.writers:
+        for mode in ("direct", "queued"):
+            queue = WriteQueue(args.max_delay_ms / 1000, args.max_batch) if mode == "queued" else None
+            r = run(writers, args.seconds, queue)
+            batch = f"  avg batch {queue.stats()['avg_batch']}" if queue else ""
+            print(f"{writers:>7}  {mode:<7} {r['rate']:9.0f} {r['p50']:8.2f} {r['p99']:8.2f} {r['errors']:6d}{batch}")
+
+
+if __name__ == "__main__":
+    main()
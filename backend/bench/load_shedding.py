@@ -0,0 +1,82 @@
+"""
+Cheap reads during an auth flood, with and without load shedding.
+
+Starts BookLog in-process (as bench.loadtest --spawn does), then runs
+closed-loop login workers (PBKDF2, CPU-bound) alongside a few workers
+listing books, and reports both routes' latency and status codes. With
+shedding on, logins past the auth class's limit are answered 503 at once
+instead of queueing for the CPU, so listings keep their latency.
+
+Example:
+    python -m bench.load_shedding --login-workers 32 --read-workers 4 --duration 10
+"""
+
+import argparse
+import threading
+import time
+
+from bench.loadtest import Client, Recorder, SpawnedServer, format_report
+
+_EMAIL = "shed@example.com"
+_PASSWORD = "password123"
+
+
+def run(shedding: bool, login_workers: int, read_workers: int, duration: float) -> dict:
+    server = SpawnedServer(0, 0, 0, LOAD_SHEDDING_ENABLED=shedding)
+    try:
+        client = Client(server.url)
+        status, body = client.request("POST", "/api/auth/register", {"email": _EMAIL, "password": _PASSWORD})
+        if status != 201:
+            raise RuntimeError(f"Could not register: HTTP {status} {body}")
+        token = body["token"]
+        for i in range(20):
+            client.request("POST", "/api/books", {"title": f"Book {i}", "author": "A", "status": "reading"}, token)
+
+        recorder = Recorder()
+        stop = threading.Event()
+
+        def login():
+            while not stop.is_set():
+                started = time.perf_counter()
+                status, _ = client.request("POST", "/api/auth/login", {"email": _EMAIL, "password": _PASSWORD})
+                recorder.record("login", (time.perf_counter() - started) * 1000, status)
+                if status == 503:
+                    time.sleep(0.05)  # a client honouring Retry-After would wait longer
+
+        def read():
+            while not stop.is_set():
+                started = time.perf_counter()
+                status, _ = client.request("GET", "/api/books", token=token)
+                recorder.record("list", (time.perf_counter() - started) * 1000, status)
+
+        threads = [threading.Thread(target=login, daemon=True) for _ in range(login_workers)]
+        threads += [threading.Thread(target=read, daemon=True) for _ in range(read_workers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        return recorder.report(time.perf_counter() - start)
+    finally:
+        server.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--login-workers", type=int, default=32)
+    parser.add_argument("--read-workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    for shedding in (False, True):
+        report = run(shedding, args.login_workers, args.read_workers, args.duration)
+        print(f"load shedding {'on' if shedding else 'off'}")
+        print(format_report(report))
+        print({route: r["status"] for route, r in report["routes"].items()})
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+HTTP load generator for a running BookLog server.
+
+Drives a weighted mix of realistic calls — login, list, stats, create,
+patch, delete, search — from a pool of pre-registered users and reports
+throughput and latency percentiles per route.
+
+Two arrival models:
+- open loop (--rate N): requests are scheduled as a Poisson process at N
+  req/s regardless of how fast the server answers. Latency is measured
+  from the *scheduled* start, so queueing behind a slow server is counted
+  instead of hidden (no coordinated omission).
+- closed loop (--rate 0): each of --concurrency workers sends its next
+  request as soon as the previous one completes.
+
+Examples:
+    # Against a server you started yourself
+    python -m bench.loadtest --url http://localhost:5000 --rate 200 --duration 30
+
+    # Fully local: temp DB, in-process server, fake Open Library
+    python -m bench.loadtest --spawn --ol-latency-ms 150 --ol-error-rate 0.02
+"""
+
+import argparse
+import http.client
+import json
+import math
+import queue
+import random
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+ROUTES = ("login", "list", "stats", "create", "patch", "delete", "search")
+
+DEFAULT_MIX = {
+    "list": 40,
+    "stats": 15,
+    "create": 12,
+    "patch": 12,
+    "delete": 6,
+    "search": 10,
+    "login": 5,
+}
+
+_SEARCH_TERMS = ["dune", "foundation", "le guin", "hyperion", "gibson", "solaris", "lem"]
+_STATUSES = ["want_to_read", "reading", "finished", "abandoned"]
+_PASSWORD = "loadtest-password"
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class RouteStats:
+    latencies_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+    status_counts: dict = field(default_factory=lambda: defaultdict(int))
+
+    def summary(self, elapsed_s: float) -> dict:
+        lat = sorted(self.latencies_ms)
+        return {
+            "requests": len(lat),
+            "errors": self.errors,
+            "throughput_rps": round(len(lat) / elapsed_s, 2) if elapsed_s else 0.0,
+            "p50_ms": round(percentile(lat, 50), 2),
+            "p90_ms": round(percentile(lat, 90), 2),
+            "p99_ms": round(percentile(lat, 99), 2),
+            "max_ms": round(lat[-1], 2) if lat else 0.0,
+            "status": dict(self.status_counts),
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[str, RouteStats] = defaultdict(RouteStats)
+
+    def record(self, route: str, latency_ms: float, status: int) -> None:
+        with self._lock:
+            stats = self.routes[route]
+            stats.latencies_ms.append(latency_ms)
+            stats.status_counts[status] += 1
+            if status == 0 or status >= 500:
+                stats.errors += 1
+
+    def report(self, elapsed_s: float) -> dict:
+        with self._lock:
+            routes = {name: s.summary(elapsed_s) for name, s in sorted(self.routes.items())}
+            total = RouteStats()
+            for s in self.routes.values():
+                total.latencies_ms.extend(s.latencies_ms)
+                total.errors += s.errors
+        return {
+            "elapsed_s": round(elapsed_s, 2),
+            "total": total.summary(elapsed_s),
+            "routes": routes,
+        }
+
+
+# ---------------------------------------------------------------------------
+# HTTP client
+# ---------------------------------------------------------------------------
+
+class Client:
+    """One keep-alive connection per worker thread; reconnects on failure."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        parsed = urllib.parse.urlparse(base_url)
+        self._host = parsed.hostname
+        self._port = parsed.port or 80
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+            self._local.conn = conn
+        return conn
+
+    def request(self, method: str, path: str, body=None, token: str | None = None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+
+        for attempt in range(2):
+            conn = self._conn()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+                if resp.getheader("Connection", "").lower() == "close":
+                    conn.close()
+                    self._local.conn = None
+                try:
+                    data = json.loads(raw) if raw else None
+                except ValueError:
+                    data = None
+                return resp.status, data
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    return 0, None
+        return 0, None
+
+
+# ---------------------------------------------------------------------------
+# Virtual users
+# ---------------------------------------------------------------------------
+
+class VirtualUser:
+    def __init__(self, email: str, token: str):
+        self.email = email
+        self.token = token
+        self.book_ids: list[int] = []
+        self.lock = threading.Lock()
+
+    def take_id(self, remove: bool = False) -> int | None:
+        with self.lock:
+            if not self.book_ids:
+                return None
+            idx = random.randrange(len(self.book_ids))
+            return self.book_ids.pop(idx) if remove else self.book_ids[idx]
+
+    def add_id(self, book_id: int) -> None:
+        with self.lock:
+            self.book_ids.append(book_id)
+
+
+def _random_book() -> dict:
+    status = random.choice(_STATUSES)
+    book = {
+        "title": f"Load Test Book {random.randrange(10**9)}",
+        "author": random.choice(["Frank Herbert", "Ursula K. Le Guin", "Iain M. Banks"]),
+        "status": status,
+        "page_count": random.randint(80, 1200),
+    }
+    if status in ("finished", "abandoned"):
+        book["rating"] = random.randint(1, 5)
+    return book
+
+
+def setup_users(client: Client, count: int, seed_books: int) -> list[VirtualUser]:
+    run_id = f"{int(time.time())}{random.randrange(1000):03d}"
+    users = []
+    for i in range(count):
+        email = f"loadtest-{run_id}-{i}@example.com"
+        status, data = client.request(
+            "POST", "/api/auth/register", {"email": email, "password": _PASSWORD}
+        )
+        if status != 201:
+            raise RuntimeError(f"Could not register {email}: HTTP {status} {data}")
+        user = VirtualUser(email, data["token"])
+        for _ in range(seed_books):
+            status, book = client.request("POST", "/api/books", _random_book(), user.token)
+            if status == 201:
+                user.add_id(book["id"])
+        users.append(user)
+    return users
+
+
+def run_operation(client: Client, route: str, user: VirtualUser) -> tuple[str, int]:
+    """Execute one operation. Returns (route actually executed, HTTP status)."""
+    if route in ("patch", "delete"):
+        book_id = user.take_id(remove=route == "delete")
+        if book_id is None:
+            route = "create"
+        elif route == "patch":
+            status, _ = client.request(
+                "PATCH", f"/api/books/{book_id}",
+                {"notes": f"note {random.randrange(10**6)}"}, user.token,
+            )
+            return route, status
+        else:
+            status, _ = client.request("DELETE", f"/api/books/{book_id}", token=user.token)
+            return route, status
+
+    if route == "create":
+        status, book = client.request("POST", "/api/books", _random_book(), user.token)
+        if status == 201:
+            user.add_id(book["id"])
+        return route, status
+    if route == "list":
+        return route, client.request("GET", "/api/books", token=user.token)[0]
+    if route == "stats":
+        return route, client.request("GET", "/api/books/stats", token=user.token)[0]
+    if route == "search":
+        q = urllib.parse.quote(random.choice(_SEARCH_TERMS))
+        return route, client.request("GET", f"/api/search?q={q}", token=user.token)[0]
+    if route == "login":
+        status, data = client.request(
+            "POST", "/api/auth/login", {"email": user.email, "password": _PASSWORD}
+        )
+        if status == 200:
+            user.token = data["token"]
+        return route, status
+    raise ValueError(f"Unknown route {route!r}")
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """Parse 'list=40,create=10' into a weight dict."""
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route in mix: {name!r}. Choose from {', '.join(ROUTES)}.")
+        mix[name] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Traffic mix must have at least one positive weight.")
+    return mix
+
+
+def run_load(
+    base_url: str,
+    duration: float = 10.0,
+    concurrency: int = 8,
+    rate: float = 0.0,
+    users: int = 4,
+    seed_books: int = 20,
+    mix: dict[str, float] | None = None,
+) -> dict:
+    """Run a load test and return the report dict."""
+    mix = mix or DEFAULT_MIX
+    routes, weights = zip(*mix.items())
+    client = Client(base_url)
+    vusers = setup_users(client, users, seed_books)
+    recorder = Recorder()
+
+    stop = threading.Event()
+    work: queue.Queue = queue.Queue()
+
+    def execute(scheduled: float) -> None:
+        route = random.choices(routes, weights)[0]
+        executed, status = run_operation(client, route, random.choice(vusers))
+        recorder.record(executed, (time.perf_counter() - scheduled) * 1000, status)
+
+    def open_loop_worker() -> None:
+        while True:
+            scheduled = work.get()
+            if scheduled is None:
+                return
+            execute(scheduled)
+
+    def closed_loop_worker() -> None:
+        while not stop.is_set():
+            execute(time.perf_counter())
+
+    target = open_loop_worker if rate > 0 else closed_loop_worker
+    threads = [threading.Thread(target=target, daemon=True) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    late = 0
+    if rate > 0:
+        next_at = start
+        deadline = start + duration
+        while next_at < deadline:
+            now = time.perf_counter()
+            if next_at > now:
+                time.sleep(next_at - now)
+            elif now - next_at > 0.1:
+                late += 1
+            work.put(next_at)
+            next_at += random.expovariate(rate)
+        for _ in threads:
+            work.put(None)
+    else:
+        time.sleep(duration)
+        stop.set()
+
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    report = recorder.report(elapsed)
+    report["config"] = {
+        "url": base_url,
+        "duration_s": duration,
+        "concurrency": concurrency,
+        "rate": rate,
+        "users": users,
+        "mix": dict(mix),
+        "late_dispatches": late,
+    }
+    return report
+
+
+def format_report(report: dict) -> str:
+    header = f"{'route':<8} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}"
+    lines = [header, "-" * len(header)]
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for name, r in rows:
+        lines.append(
+            f"{name:<8} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p90_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}"
+        )
+    lines.append(f"elapsed {report['elapsed_s']}s, latencies in ms")
+    return "\n".join(lines)
+
+
+class SpawnedServer:
+    """BookLog on a temp DB in a background thread, wired to a fake Open Library."""
+
+    def __init__(self, ol_latency_ms: float, ol_jitter_ms: float, ol_error_rate: float, **config):
+        from werkzeug.serving import make_server
+
+        from app import create_app
+        from bench.fake_open_library import FakeOpenLibraryServer
+
+        self.fake_ol = FakeOpenLibraryServer(
+            latency_ms=ol_latency_ms, jitter_ms=ol_jitter_ms, error_rate=ol_error_rate
+        ).start()
+        app = create_app(config={
+            "DB_PATH": tempfile.mktemp(suffix=".db"),
+            "JWT_SECRET": "loadtest-secret",
+            "OPEN_LIBRARY_URL": self.fake_ol.url,
+            # Every virtual user shares one address; measure capacity, not the limiter.
+            "RATE_LIMIT_ENABLED": False,
+            **config,
+        })
+        self._server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self.fake_ol.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="BookLog HTTP load generator")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start an in-process server on a temp DB with a fake Open Library")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="open-loop arrival rate in req/s (0 = closed loop)")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--seed-books", type=int, default=20)
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    parser.add_argument("--ol-latency-ms", type=float, default=100.0)
+    parser.add_argument("--ol-jitter-ms", type=float, default=30.0)
+    parser.add_argument("--ol-error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    spawned = None
+    url = args.url
+    if args.spawn:
+        spawned = SpawnedServer(args.ol_latency_ms, args.ol_jitter_ms, args.ol_error_rate)
+        url = spawned.url
+    try:
+        report = run_load(
+            url,
+            duration=args.duration,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            users=args.users,
+            seed_books=args.seed_books,
+            mix=parse_mix(args.mix),
+        )
+    finally:
+        if spawned:
+            spawned.stop()
+
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Reading-progress log at scale.
+
+Fills progress_events with N events spread over 500 books and 60 days,
+then reports bytes per event, the cost of one more append through
+BookRepository.record_progress, the cost of reading current_page (which
+never touches the log), and how long compaction takes to fold everything
+older than a week into daily rows.
+
+Example:
+    python -m bench.progress_events --events 2000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+from app.database import get_db, init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.progress_repository import ProgressRepository
+from app.repositories.user_repository import UserRepository
+
+DAY = 86400
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Progress event log at scale")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--books", type=int, default=500)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        init_db(db_path)
+        user_id = UserRepository(db_path).create("bench@example.com", "password123").id
+        repo = BookRepository(db_path)
+        book_ids = [
+            repo.create(Book(user_id=user_id, title=f"Book {i}", author="Bench", page_count=500,
+                             status=ReadingStatus.READING, date_added=date.today())).id
+            for i in range(args.books)
+        ]
+
+        now = int(time.time())
+        start = now - args.days * DAY
+        step = args.days * DAY / args.events
+        t = time.perf_counter()
+        with get_db(db_path) as conn:
+            conn.executemany(
+                "INSERT INTO progress_events (user_id, book_id, page, recorded_at) VALUES (?, ?, ?, ?)",
+                ((user_id, rng.choice(book_ids), rng.randrange(500), int(start + i * step)) for i in range(args.events)),
+            )
+            conn.commit()
+            size = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'progress_events'").fetchone()[0]
+        print(f"{args.events:,} events loaded in {time.perf_counter() - t:.1f}s, {size / args.events:.1f} bytes/event")
+
+        t = time.perf_counter()
+        for _ in range(1000):
+            repo.record_progress(rng.choice(book_ids), user_id, rng.randrange(500), now)
+        print(f"append via record_progress : {(time.perf_counter() - t):.3f} ms/event")
+
+        t = time.perf_counter()
+        for _ in range(1000):
+            repo.get_by_id(rng.choice(book_ids), user_id).percent_complete
+        print(f"read current_page/percent  : {(time.perf_counter() - t):.3f} ms/read")
+
+        t = time.perf_counter()
+        result = ProgressRepository(db_path).compact(before=now - 7 * DAY)
+        elapsed = time.perf_counter() - t
+        with get_db(db_path) as conn:
+            left = conn.execute("SELECT COUNT(*) FROM progress_events").fetchone()[0]
+            daily = conn.execute("SELECT COUNT(*) FROM reading_progress_daily").fetchone()[0]
+        print(f"compaction                 : {result['folded']:,} events -> {daily:,} daily rows "
+              f"in {elapsed:.1f}s ({result['folded'] / elapsed:,.0f} events/s); {left:,} recent events kept")
+
+
+if __name__ == "__main__":
+    main()
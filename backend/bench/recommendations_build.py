@@ -0,0 +1,97 @@
+"""
+Recommendations rebuild at scale.
+
+Fills a database with synthetic libraries — --rows books spread over
+users with 5-150 books each, ISBNs drawn from a skewed (Zipf-like)
+popularity curve so a few titles are in many libraries — then times
+`RecommendationService.rebuild` with one worker process and with
+--workers, and one recommendations lookup.
+
+Example:
+    python -m bench.recommendations_build --rows 1000000 --workers 4
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.database import get_db, init_db
+from app.repositories.book_repository import BookRepository
+from app.repositories.recommendation_repository import RecommendationRepository
+from app.services.recommendation_service import RecommendationService
+
+STATUSES = ("finished", "finished", "finished", "reading", "want_to_read", "abandoned")
+
+
+def _isbn(n: int) -> str:
+    return f"978{n:010d}"
+
+
+def _populate(db_path: str, rows: int, isbns: int, rng: random.Random) -> int:
+    # Popularity ~ 1/rank: inverse-CDF sampling of a continuous Zipf(1) curve.
+    def draw() -> int:
+        return min(int(isbns ** rng.random()), isbns) - 1
+
+    users = 0
+    with get_db(db_path) as conn:
+        written = 0
+        while written < rows:
+            users += 1
+            conn.execute(
+                "INSERT INTO users (id, email, password_hash, created_at) VALUES (?, ?, 'x', '2024-01-01')",
+                (users, f"reader{users}@example.com"),
+            )
+            size = min(rng.randint(5, 150), rows - written)
+            picks = set()
+            while len(picks) < size:
+                picks.add(draw())
+            conn.executemany(
+                "INSERT INTO books (user_id, title, author, isbn, status, rating, date_added) "
+                "VALUES (?, ?, 'Bench', ?, ?, ?, '2024-01-01')",
+                (
+                    (users, f"Book {n}", _isbn(n), rng.choice(STATUSES), rng.choice((None, 3, 4, 5)))
+                    for n in picks
+                ),
+            )
+            written += size
+        conn.commit()
+    return users
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Recommendations rebuild at scale")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="library entries (books rows)")
+    parser.add_argument("--isbns", type=int, default=200_000, help="distinct ISBNs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        init_db(db_path)
+        t = time.perf_counter()
+        users = _populate(db_path, args.rows, args.isbns, random.Random(1))
+        print(f"{args.rows:,} library entries for {users:,} users loaded in {time.perf_counter() - t:.1f}s")
+
+        books = BookRepository(db_path)
+        service = RecommendationService(RecommendationRepository(db_path), books)
+        for workers in sorted({1, args.workers}):
+            t = time.perf_counter()
+            result = service.rebuild(workers)
+            print(
+                f"workers={workers}: {time.perf_counter() - t:.1f}s total "
+                f"(load {result['load_seconds']}s, similarity {result['similarity_seconds']}s, "
+                f"store {result['store_seconds']}s); {result['rows']:,} neighbors for "
+                f"{result['isbns_with_neighbors']:,} of {result['isbns']:,} ISBNs"
+            )
+
+        book = books.get_all(1)[0]
+        t = time.perf_counter()
+        for _ in range(1000):
+            service.recommendations_for(book.id, 1, 10)
+        print(f"lookup: {time.perf_counter() - t:.2f} ms per request (1000 requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Write throughput against the number of shards.
+
+Each writer process owns one user and adds books one at a time through
+BookRepository (one transaction and one fsync per write, like POST
+/api/books). With one file every writer queues on the same SQLite write
+lock; with N shards the users are spread over N files and N writes can
+commit at once. Gains need spare cores or a disk where commits wait on
+fsync; on a single core the writers are CPU-bound and the curve is flat.
+
+Example:
+    python -m bench.shard_writes --writers 8 --seconds 3 --shards 1 2 4 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import date
+
+from app.database import ShardRouter, init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.user_repository import UserRepository
+
+
+def _writer(args: tuple) -> int:
+    db_path, shards, user_id, start_at, stop_at = args
+    repo = BookRepository(ShardRouter(db_path, shards))
+    written = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    while time.time() < stop_at:
+        repo.create(Book(user_id=user_id, title=f"Book {written}", author="Bench",
+                         status=ReadingStatus.WANT_TO_READ, date_added=date.today()))
+        written += 1
+    return written
+
+
+def run(shards: int, writers: int, seconds: float) -> float:
+    """Books written per second."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        users = UserRepository(init_db(db_path, shard_count=shards))
+        user_ids = [users.create(f"writer{i}@example.com", "password123").id for i in range(writers)]
+
+        with multiprocessing.Pool(writers) as pool:
+            start_at = time.time() + 1.0  # let every process start first
+            counts = pool.map(_writer, [(db_path, shards, u, start_at, start_at + seconds) for u in user_ids])
+        return sum(counts) / seconds
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Book writes/s by shard count")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+
+    baseline = None
+    print(f"{args.writers} writers, {args.seconds:.0f}s each")
+    for shards in args.shards:
+        rate = run(shards, args.writers, args.seconds)
+        baseline = baseline or rate
+        print(f"  {shards:>2} shard(s): {rate:8.0f} writes/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Tag filters and bulk tagging on a large library.
+
+Builds one library of N books and T tags (tag sizes skewed, so a few
+shelves hold most books), then times GET /api/books?tags=... listings
+for "all" and "any" matches of 1-3 tags, and a bulk tag/untag of 1,000
+books.
+
+Example:
+    python -m bench.tag_filter --books 10000 --tags 60
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+from app.database import init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.user_repository import UserRepository
+
+
+def _ms(seconds: float, count: int) -> str:
+    return f"{seconds / count * 1000:.2f} ms"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Tag filters at scale")
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--tags", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    tags = [f"shelf {i}" for i in range(args.tags)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        init_db(db_path)
+        user_id = UserRepository(db_path).create("bench@example.com", "password123").id
+        repo = BookRepository(db_path)
+
+        t = time.perf_counter()
+        with repo.transaction(user_id):
+            ids = [
+                repo.create(Book(user_id=user_id, title=f"Book {i}", author="Author",
+                                 status=ReadingStatus.WANT_TO_READ, date_added=date.today())).id
+                for i in range(args.books)
+            ]
+            for rank, tag in enumerate(tags):
+                # Shelf i holds about 1/(i+1) of the library, capped at half.
+                share = min(0.5, 1 / (rank + 1))
+                repo.set_tags(user_id, [tag], rng.sample(ids, int(len(ids) * share)), add=True)
+        print(f"{args.books:,} books, {args.tags} tags built in {time.perf_counter() - t:.1f}s")
+
+        for match in ("all", "any"):
+            for width in (1, 2, 3):
+                queries = [tuple(rng.sample(tags, width)) for _ in range(50)]
+                t = time.perf_counter()
+                found = sum(len(repo.get_all(user_id, sort="title", tags=q, tags_match=match)) for q in queries)
+                print(f"tags_match={match}, {width} tag(s): {_ms(time.perf_counter() - t, len(queries))} "
+                      f"per listing, {found // len(queries):,} books on average")
+
+        batch = rng.sample(ids, 1000)
+        t = time.perf_counter()
+        repo.set_tags(user_id, ["bulk"], batch, add=True)
+        print(f"tag 1,000 books: {_ms(time.perf_counter() - t, 1)}")
+        t = time.perf_counter()
+        repo.set_tags(user_id, ["bulk"], batch, add=False)
+        print(f"untag 1,000 books: {_ms(time.perf_counter() - t, 1)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Validations per second for the book schemas.
+
+Generates N book payloads (about 10% invalid) and times
+validate_create_book and validate_update_book one row at a time, then
+CREATE_BOOK.validate_many and validate_batch_operations over the whole
+set, as an import or a batch request would. Every result is kept, as
+callers keep them.
+
+Example:
+    python -m bench.validation --rows 100000
+"""
+
+import argparse
+import random
+import time
+
+from app.schemas import CREATE_BOOK, validate_batch_operations, validate_create_book, validate_update_book
+
+STATUSES = ("want_to_read", "reading", "finished", "abandoned")
+
+
+def _payloads(count: int, rng: random.Random) -> list[dict]:
+    rows = []
+    for i in range(count):
+        row = {
+            "title": f"Book {i}", "author": "A. Writer", "status": rng.choice(STATUSES),
+            "isbn": "978-0-7564-0407-9", "page_count": rng.randint(80, 900), "notes": "Borrowed",
+            "date_added": "2024-01-02",
+        }
+        if row["status"] in ("finished", "abandoned"):
+            row["rating"] = rng.randint(1, 5)
+            row["date_finished"] = "2024-03-04"
+        if rng.random() < 0.1:
+            row["rating"] = 9
+        rows.append(row)
+    return rows
+
+
+def _report(label: str, count: int, seconds: float) -> None:
+    print(f"{label:<32} {count / seconds:>12,.0f} rows/s")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Schema validation throughput")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    rows = _payloads(args.rows, random.Random(1))
+
+    for label, validate in (("validate_create_book", validate_create_book),
+                            ("validate_update_book", validate_update_book)):
+        t = time.perf_counter()
+        [validate(row) for row in rows]
+        _report(label, len(rows), time.perf_counter() - t)
+
+    t = time.perf_counter()
+    CREATE_BOOK.validate_many(rows)
+    _report("CREATE_BOOK.validate_many", len(rows), time.perf_counter() - t)
+
+    operations = [{"op": "create", "data": row} for row in rows]
+    t = time.perf_counter()
+    validate_batch_operations(operations)
+    _report("validate_batch_operations", len(rows), time.perf_counter() - t)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measure the space the works catalog saves on a realistic library mix.
+
+Builds a database at schema version 4 (before the catalog) where many
+users log books drawn from a smaller pool of popular ISBNs, measures the
+on-disk size of the book data, applies migration v0005 (which moves the
+shared cover_url/page_count into works), VACUUMs and measures again.
+
+Example:
+    python -m bench.works_space --users 2000 --books-per-user 40 --distinct-isbns 5000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+
+from app.migrations import discover, migrate
+
+
+def _table_bytes(conn: sqlite3.Connection) -> dict[str, int]:
+    """Bytes used per table, indexes included (via the dbstat virtual table)."""
+    owners = {
+        r[0]: r[1]
+        for r in conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')")
+    }
+    usage: dict[str, int] = {}
+    for name, size in conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"):
+        table = owners.get(name, name)
+        usage[table] = usage.get(table, 0) + size
+    return usage
+
+
+def build(db_path: str, users: int, books_per_user: int, distinct_isbns: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    migrate(db_path, migrations=discover()[:4])
+    catalog = [
+        (
+            f"978{rng.randrange(10**10):010d}",
+            f"https://covers.openlibrary.org/b/id/{rng.randrange(10**7, 10**8)}-M.jpg",
+            rng.randint(120, 900),
+        )
+        for _ in range(distinct_isbns)
+    ]
+    # Popularity is heavily skewed, as in real reading logs.
+    weights = [1 / (rank + 1) for rank in range(distinct_isbns)]
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO users (email, password_hash, created_at) VALUES (?, 'x', '2024-01-01')",
+        [(f"user{u}@example.com",) for u in range(users)],
+    )
+    for user_id in range(1, users + 1):
+        picks = {catalog.index(c): c for c in rng.choices(catalog, weights=weights, k=books_per_user)}
+        conn.executemany(
+            "INSERT INTO books (user_id, title, author, isbn, status, cover_url, page_count, date_added, change_seq) "
+            "VALUES (?, ?, ?, ?, 'reading', ?, ?, '2024-01-01', 1)",
+            [(user_id, f"Title {i}", f"Author {i % 997}", isbn, cover, pages) for i, (isbn, cover, pages) in picks.items()],
+        )
+    conn.commit()
+    conn.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Space saved by the shared works catalog")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--books-per-user", type=int, default=40)
+    parser.add_argument("--distinct-isbns", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    db = tempfile.mktemp(suffix=".db")
+    try:
+        build(db, args.users, args.books_per_user, args.distinct_isbns)
+        conn = sqlite3.connect(db)
+        conn.execute("VACUUM")
+        before = _table_bytes(conn)
+        conn.close()
+
+        # Only v0005: v0013 unshares works that, like these, came from user data.
+        migrate(db, migrations=discover()[:5])
+        conn = sqlite3.connect(db)
+        conn.execute("VACUUM")
+        after = _table_bytes(conn)
+        books = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        works = conn.execute("SELECT COUNT(*) FROM works").fetchone()[0]
+        conn.close()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db + suffix):
+                os.remove(db + suffix)
+
+    b, a = before.get("books", 0), after.get("books", 0) + after.get("works", 0)
+    print(f"{books} book rows, {works} works")
+    print(f"  books before          : {b / 1024:10.0f} KiB")
+    print(f"  books + works after   : {a / 1024:10.0f} KiB  (works {after.get('works', 0) / 1024:.0f} KiB)")
+    print(f"  saved                 : {(b - a) / 1024:10.0f} KiB  ({(b - a) / b:.1%})")
+
+
+if __name__ == "__main__":
+    main()
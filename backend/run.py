@@ -1,6 +1,12 @@
-from app import create_app
+import os
+
+from app import create_app, start_background_jobs
 
 app = create_app()
 
 if __name__ == "__main__":
+    # With the reloader, this file also runs in the watcher process; only
+    # the child that serves requests should run the periodic jobs.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_jobs(app)
     app.run(host="0.0.0.0", port=5000, debug=True)
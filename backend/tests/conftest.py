@@ -1,7 +1,9 @@
 import sys, os, tempfile
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-def make_app(tmp_path=None):
+METRICS_AUTH = {"Authorization": "Bearer test-metrics-token"}
+
+def make_app(tmp_path=None, **config):
     from app import create_app
     if tmp_path is None:
         tmp_path = tempfile.mktemp(suffix=".db")
@@ -9,4 +11,6 @@ def make_app(tmp_path=None):
         "DB_PATH": tmp_path,
         "JWT_SECRET": "test-secret-key-32-chars-long-ok",
         "TESTING": True,
+        "METRICS_TOKEN": "test-metrics-token",
+        **config,
     })
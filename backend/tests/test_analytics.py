@@ -0,0 +1,103 @@
+import sys, os, json, random, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.client = self.app.test_client()
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        self.user_id = resp.get_json()["user"]["id"]
+        self.headers = {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+    def _add(self, **fields):
+        book = {"title": "T", "author": "Herbert", "status": "finished", **fields}
+        resp = self.client.post("/api/books", data=json.dumps(book), content_type="application/json", headers=self.headers)
+        self.assertEqual(resp.status_code, 201, resp.get_json())
+        return resp.get_json()["id"]
+
+    def _patch(self, book_id, **fields):
+        resp = self.client.patch(f"/api/books/{book_id}", data=json.dumps(fields),
+                                 content_type="application/json", headers=self.headers)
+        self.assertEqual(resp.status_code, 200, resp.get_json())
+
+    def _analytics(self, granularity="month"):
+        resp = self.client.get(f"/api/books/analytics?granularity={granularity}", headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        return resp.get_json()
+
+    def test_finished_books_roll_up_by_month_year_and_author(self):
+        self._add(date_finished="2024-03-02", rating=4, page_count=300)
+        self._add(date_finished="2024-03-20", rating=5, page_count=200)
+        self._add(date_finished="2024-07-01", author="Le Guin", page_count=100)
+        self._add(status="reading")
+
+        months = self._analytics()["periods"]
+        self.assertEqual(months, [
+            {"period": "2024-03", "books_finished": 2, "pages_finished": 500, "avg_rating": 4.5},
+            {"period": "2024-07", "books_finished": 1, "pages_finished": 100, "avg_rating": None},
+        ])
+        data = self._analytics("year")
+        self.assertEqual([(p["period"], p["books_finished"]) for p in data["periods"]], [("2024", 3)])
+        self.assertEqual([(a["author"], a["books_finished"]) for a in data["authors"]], [("Herbert", 2), ("Le Guin", 1)])
+
+    def test_status_rating_and_date_changes_move_the_book(self):
+        book_id = self._add(date_finished="2024-03-02", rating=3, page_count=100)
+        self._patch(book_id, status="finished", rating=5)
+        self.assertEqual(self._analytics()["periods"][0]["avg_rating"], 5.0)
+        self._patch(book_id, status="finished", date_finished="2024-04-10")
+        self.assertEqual([p["period"] for p in self._analytics()["periods"]], ["2024-04"])
+        self._patch(book_id, status="reading", date_finished=None, rating=None)
+        self.assertEqual(self._analytics(), {"granularity": "month", "periods": [], "authors": []})
+
+    def test_incremental_rollups_match_a_full_rebuild(self):
+        rng = random.Random(7)
+        ids = []
+        for i in range(30):
+            ids.append(self._add(
+                author=rng.choice(["A", "B", "b "]),
+                date_finished=f"202{rng.randint(3, 4)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                rating=rng.choice([None, 1, 5]),
+                page_count=rng.choice([None, 150]),
+            ))
+        for book_id in rng.sample(ids, 10):
+            self._patch(book_id, status=rng.choice(["finished", "abandoned"]), rating=rng.choice([None, 2]))
+        for book_id in rng.sample(ids, 5):
+            self.client.delete(f"/api/books/{book_id}", headers=self.headers)
+
+        incremental = (self._analytics("month"), self._analytics("year"))
+        self.app.extensions["analytics_service"].rebuild(self.user_id)
+        self.assertEqual((self._analytics("month"), self._analytics("year")), incremental)
+
+    def test_etag_revalidates_until_the_next_write(self):
+        self._add(date_finished="2024-03-02")
+        first = self.client.get("/api/books/analytics", headers=self.headers)
+        etag = first.headers["ETag"]
+        again = self.client.get("/api/books/analytics", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+        self._add(date_finished="2024-03-05")
+        changed = self.client.get("/api/books/analytics", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.get_json()["periods"][0]["books_finished"], 2)
+
+    def test_rebuild_invalidates_the_etag(self):
+        self._add(date_finished="2024-03-02")
+        etag = self.client.get("/api/books/analytics", headers=self.headers).headers["ETag"]
+        result = self.app.test_cli_runner().invoke(args=["rebuild-analytics", "--user-id", str(self.user_id)])
+        self.assertEqual(result.exit_code, 0, result.output)
+        after = self.client.get("/api/books/analytics", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after.headers["ETag"], etag)
+
+    def test_rejects_unknown_granularity(self):
+        resp = self.client.get("/api/books/analytics?granularity=week", headers=self.headers)
+        self.assertEqual(resp.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
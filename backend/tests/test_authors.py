@@ -0,0 +1,121 @@
+import sys, os, json, tempfile, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from app.database import get_db
+from app.utils.authors import author_key, split_authors
+
+
+class TestSplitAuthors(unittest.TestCase):
+    def test_splits_co_authors(self):
+        self.assertEqual(list(split_authors("Neil Gaiman, Terry Pratchett")), ["neil gaiman", "terry pratchett"])
+        self.assertEqual(list(split_authors("Frank Herbert & Brian Herbert")), ["frank herbert", "brian herbert"])
+        self.assertEqual(list(split_authors("Stephen King; Peter Straub")), ["stephen king", "peter straub"])
+
+    def test_surname_first_is_one_author(self):
+        self.assertEqual(split_authors("Tolkien, J.R.R."), {"j r r tolkien": "Tolkien, J.R.R."})
+        self.assertEqual(list(split_authors("Le Guin, Ursula K.")), ["ursula k le guin"])
+        self.assertEqual(author_key("J. R. R. Tolkien"), author_key("Tolkien, J.R.R."))
+
+    def test_repeats_and_blanks(self):
+        self.assertEqual(list(split_authors("Herbert; herbert")), ["herbert"])
+        self.assertEqual(split_authors(" ; "), {})
+
+
+class TestAuthorRoutes(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        self.app = make_app(self.db)
+        self.client = self.app.test_client()
+        self.headers = self._register("test@example.com")
+
+    def _register(self, email):
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": email, "password": "password123"}),
+            content_type="application/json",
+        )
+        return {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+    def _add(self, title, author, headers=None):
+        book = {"title": title, "author": author, "status": "want_to_read"}
+        resp = self.client.post("/api/books", data=json.dumps(book), content_type="application/json",
+                                headers=headers or self.headers)
+        return resp.get_json()["id"]
+
+    def _titles(self, query):
+        resp = self.client.get(f"/api/books?sort=title&{query}", headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        return [b["title"] for b in resp.get_json()]
+
+    def _seed(self):
+        self._add("Good Omens", "Neil Gaiman, Terry Pratchett")
+        self._add("Coraline", "Neil Gaiman")
+        self._add("Mort", "Terry Pratchett")
+        self._add("The Hobbit", "Tolkien, J.R.R.")
+        self._add("Silmarillion", "J. R. R. Tolkien")
+        self._add("Norse Mythology", "Neil Gaimann")
+
+    def test_prefix_and_exact_filters(self):
+        self._seed()
+        self.assertEqual(self._titles("author=neil%20gaiman"), ["Coraline", "Good Omens", "Norse Mythology"])
+        self.assertEqual(self._titles("author=Neil%20Gaiman&author_match=exact"), ["Coraline", "Good Omens"])
+        self.assertEqual(self._titles("author=terry"), ["Good Omens", "Mort"])
+        self.assertEqual(self._titles("author=J.R.R.%20Tolkien&author_match=exact"), ["Silmarillion", "The Hobbit"])
+        self.assertEqual(self._titles("author=nobody"), [])
+
+    def test_prefix_matches_a_surname(self):
+        self._seed()
+        self._add("Dune", "Frank Herbert & Brian Herbert")
+        self.assertEqual(self._titles("author=herbert"), ["Dune"])
+        self.assertEqual(self._titles("author=tolk"), ["Silmarillion", "The Hobbit"])
+        self.assertEqual(self._titles("author=gaiman"), ["Coraline", "Good Omens", "Norse Mythology"])
+        self.assertEqual(self._titles("author=herbert&author_match=exact"), [])
+
+    def test_filter_validation(self):
+        for query in ("author=...", "author=neil&author_match=fuzzy"):
+            self.assertEqual(self.client.get(f"/api/books?{query}", headers=self.headers).status_code, 400)
+
+    def test_authors_lists_counts(self):
+        self._seed()
+        resp = self.client.get("/api/books/authors", headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        authors = {a["name"]: a["books"] for a in resp.get_json()["authors"]}
+        self.assertEqual(authors, {
+            "J. R. R. Tolkien": 2, "Neil Gaiman": 2, "Neil Gaimann": 1, "Terry Pratchett": 2,
+        })
+        prefixed = self.client.get("/api/books/authors?prefix=Neil&limit=1", headers=self.headers).get_json()
+        self.assertEqual(prefixed["authors"], [{"name": "Neil Gaiman", "key": "neil gaiman", "books": 2}])
+        surname = self.client.get("/api/books/authors?prefix=Tolk", headers=self.headers).get_json()
+        self.assertEqual([a["name"] for a in surname["authors"]], ["J. R. R. Tolkien"])
+        # "rr" is inside a name, not the start of one.
+        self.assertEqual(self.client.get("/api/books/authors?prefix=rr", headers=self.headers).get_json()["authors"], [])
+        for query in ("limit=0", "prefix=!!!"):
+            self.assertEqual(self.client.get(f"/api/books/authors?{query}", headers=self.headers).status_code, 400)
+
+    def test_counts_follow_updates_and_deletes(self):
+        book_id = self._add("Good Omens", "Neil Gaiman, Terry Pratchett")
+        self.client.patch(f"/api/books/{book_id}", data=json.dumps({"author": "Terry Pratchett"}),
+                          content_type="application/json", headers=self.headers)
+        authors = self.client.get("/api/books/authors", headers=self.headers).get_json()["authors"]
+        self.assertEqual([(a["key"], a["books"]) for a in authors], [("terry pratchett", 1)])
+        self.assertEqual(self._titles("author=neil"), [])
+        self.assertEqual(self._titles("author=gaiman"), [])
+        self.assertEqual(self._titles("author=pratchett"), ["Good Omens"])
+        self.client.delete(f"/api/books/{book_id}", headers=self.headers)
+        self.assertEqual(self.client.get("/api/books/authors", headers=self.headers).get_json()["authors"], [])
+        with get_db(self.db) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM book_authors").fetchone()[0], 0)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM book_author_suffixes").fetchone()[0], 0)
+
+    def test_users_only_see_their_own_authors(self):
+        self._seed()
+        other = self._register("other@example.com")
+        self._add("Mort", "Terry Pratchett", headers=other)
+        authors = self.client.get("/api/books/authors", headers=other).get_json()["authors"]
+        self.assertEqual([(a["name"], a["books"]) for a in authors], [("Terry Pratchett", 1)])
+        resp = self.client.get("/api/books?author=neil", headers=other)
+        self.assertEqual(resp.get_json(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
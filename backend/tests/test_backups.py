@@ -0,0 +1,163 @@
+import sys, os, gzip, json, tempfile, threading, unittest
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import METRICS_AUTH, make_app
+from app.backups import BackupError, BackupManager, read_manifest, restore_snapshot, verify_snapshot
+from app.database import ShardRouter
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+
+
+def _register(client, email="test@example.com"):
+    resp = client.post(
+        "/api/auth/register",
+        data=json.dumps({"email": email, "password": "password123"}),
+        content_type="application/json",
+    )
+    return {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+
+def _add_books(client, headers, count):
+    for i in range(count):
+        client.post(
+            "/api/books",
+            data=json.dumps({"title": f"Book {i}", "author": "A", "status": "reading"}),
+            content_type="application/json",
+            headers=headers,
+        )
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, "lib.db")
+        self.app = make_app(self.db, BACKUP_RETAIN=2)
+        self.backups = self.app.extensions["backups"]
+        self.client = self.app.test_client()
+        self.headers = _register(self.client)
+        _add_books(self.client, self.headers, 5)
+
+    def test_snapshot_verify_and_restore(self):
+        manifest = self.backups.snapshot()
+        path = self.backups.resolve()
+        self.assertEqual(path.name, manifest["name"])
+        self.assertEqual(path.parent, self.backups.backup_dir)
+        self.assertEqual(str(self.backups.backup_dir), os.path.join(self.dir, "backups"))
+        [entry] = manifest["files"]
+        self.assertEqual(entry["file"], "lib.db.gz")
+        self.assertLess(entry["compressed_bytes"], entry["bytes"])
+        self.assertGreater(entry["schema_version"], 0)
+
+        report = verify_snapshot(path)
+        self.assertTrue(report["ok"])
+        self.assertEqual((report["files"][0]["users"], report["files"][0]["books"]), (1, 5))
+
+        # Writes after the snapshot aren't in it.
+        _add_books(self.client, self.headers, 1)
+        restored = os.path.join(self.dir, "restored", "lib.db")
+        self.assertEqual(restore_snapshot(path, restored), [restored])
+        client = make_app(restored).test_client()
+        resp = client.get("/api/books", headers=_register(client, "other@example.com"))
+        self.assertEqual(resp.get_json(), [])
+        resp = client.post(
+            "/api/auth/login",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        books = client.get("/api/books", headers={"Authorization": f"Bearer {resp.get_json()['token']}"}).get_json()
+        self.assertEqual(len(books), 5)
+
+        with self.assertRaises(BackupError):
+            restore_snapshot(path, restored)
+
+    def test_retention_keeps_the_newest(self):
+        names = [self.backups.snapshot()["name"] for _ in range(3)]
+        self.assertEqual([p.name for p in self.backups.snapshots()], names[1:])
+        stats = self.client.get("/api/metrics", headers=METRICS_AUTH).get_json()["backups"]
+        self.assertEqual(stats["snapshots"], 2)
+        self.assertEqual(stats["last"]["name"], names[-1])
+
+    def test_skips_while_another_snapshot_is_in_progress(self):
+        lock = self.backups.backup_dir / ".snapshot-in-progress"
+        lock.mkdir(parents=True)
+        self.assertIsNone(self.backups.snapshot())
+        self.assertEqual(self.backups.snapshots(), [])
+
+    def test_verify_detects_a_damaged_snapshot(self):
+        path = self.backups.resolve(self.backups.snapshot()["name"])
+        with gzip.open(path / "lib.db.gz", "wb") as f:
+            f.write(b"not a database" * 100)
+        report = verify_snapshot(path)
+        self.assertFalse(report["ok"])
+        self.assertIn("checksum mismatch", report["files"][0]["problems"])
+        with self.assertRaises(BackupError):
+            restore_snapshot(path, os.path.join(self.dir, "restored.db"))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "restored.db")))
+
+    def test_snapshot_during_writes(self):
+        user_id = self.client.get("/api/auth/me", headers=self.headers).get_json()["user"]["id"]
+        repo = BookRepository(self.db)
+        stop = threading.Event()
+
+        def write():
+            while not stop.is_set():
+                repo.create(Book(user_id=user_id, title="Concurrent", author="A",
+                                 status=ReadingStatus.READING, date_added=date.today()))
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            # One page per step: the writer makes the copy restart, then it finishes in one step.
+            manager = BackupManager(ShardRouter(self.db), self.backups.backup_dir, pages_per_step=1, max_restarts=2)
+            manifest = manager.snapshot()
+        finally:
+            stop.set()
+            writer.join()
+        self.assertTrue(verify_snapshot(manager.resolve())["ok"])
+        self.assertLessEqual(manifest["files"][0]["restarts"], 3)
+
+    def test_cli(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=["backup"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        name = self.backups.resolve().name
+        self.assertIn(name, runner.invoke(args=["list-backups"]).output)
+        result = runner.invoke(args=["verify-backup"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("1 users, 5 books  ok", result.output)
+        self.assertNotEqual(runner.invoke(args=["verify-backup", "missing"]).exit_code, 0)
+        target = os.path.join(self.dir, "cli-restore.db")
+        result = runner.invoke(args=["restore-backup", name, "--to", target])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue(os.path.exists(target))
+
+
+class TestShardedSnapshots(unittest.TestCase):
+    def test_every_shard_is_captured(self):
+        db = tempfile.mktemp(suffix=".db")
+        app = make_app(db, SHARD_COUNT=2)
+        client = app.test_client()
+        for i in range(4):
+            _add_books(client, _register(client, f"u{i}@example.com"), 2)
+        backups = app.extensions["backups"]
+        manifest = backups.snapshot()
+        self.assertEqual([f["shard"] for f in manifest["files"]], [0, 1])
+        report = verify_snapshot(backups.resolve())
+        self.assertTrue(report["ok"])
+        self.assertEqual(sum(f["books"] for f in report["files"]), 8)
+
+        restored = tempfile.mktemp(suffix=".db")
+        restore_snapshot(backups.resolve(), restored)
+        self.assertEqual(read_manifest(backups.resolve())["shard_count"], 2)
+        client = make_app(restored, SHARD_COUNT=2).test_client()
+        resp = client.post(
+            "/api/auth/login",
+            data=json.dumps({"email": "u3@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        books = client.get("/api/books", headers={"Authorization": f"Bearer {resp.get_json()['token']}"}).get_json()
+        self.assertEqual(len(books), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import sys, os, json, tempfile, unittest
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import METRICS_AUTH, make_app
+from app.database import get_db, init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.cache import CachedBookRepository, CachedUserRepository, LibraryCache
+from app.repositories.user_repository import UserRepository
+from app.repositories.work_repository import WorkRepository
+from app.models.work import Work
+
+
+def _book(user_id, title):
+    return Book(user_id=user_id, title=title, author="A", status=ReadingStatus.READING, date_added=date.today())
+
+
+class TestLibraryCache(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        init_db(self.db)
+        self.cache = LibraryCache()
+        self.repo = CachedBookRepository(self.db, self.cache)
+        self.users = CachedUserRepository(self.db, self.cache)
+        self.user_id = UserRepository(self.db).create("a@b.com", "password123").id
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.repo.create(_book(self.user_id, "A"))
+        self.repo.get_all(self.user_id)
+        self.repo.get_all(self.user_id)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertGreater(stats["bytes"], 0)
+
+    def test_own_write_patches_by_id_map_and_drops_lists(self):
+        book = self.repo.create(_book(self.user_id, "A"))
+        self.repo.get_all(self.user_id)
+        self.repo.update(book.id, self.user_id, {"title": "A2"})
+        self.assertEqual(self.repo.get_by_id(book.id, self.user_id).title, "A2")
+        self.assertEqual(self.cache.stats()["hits"], 1)  # by-id served from the patched entry
+        self.assertEqual([b.title for b in self.repo.get_all(self.user_id)], ["A2"])
+
+    def test_write_from_another_process_is_seen_on_next_read(self):
+        book = self.repo.create(_book(self.user_id, "A"))
+        self.repo.get_all(self.user_id)
+        self.repo.get_by_id(book.id, self.user_id)
+        other = BookRepository(self.db)  # shares the file, not the cache
+        other.update(book.id, self.user_id, {"title": "Changed"})
+        other.create(_book(self.user_id, "B"))
+        self.assertEqual(self.repo.get_by_id(book.id, self.user_id).title, "Changed")
+        self.assertEqual(len(self.repo.get_all(self.user_id)), 2)
+
+    def test_catalog_gap_fill_is_seen_on_next_read(self):
+        works = WorkRepository(self.db)
+        works.upsert_many([Work(isbn="9780441013593", ol_work_id="OL1W", title="Dune", author="A")])
+        book = self.repo.create(Book(
+            user_id=self.user_id, title="Dune", author="A", isbn="9780441013593",
+            status=ReadingStatus.READING, date_added=date.today(),
+        ))
+        self.assertIsNone(self.repo.get_by_id(book.id, self.user_id).page_count)
+        self.assertIsNone(self.repo.get_all(self.user_id)[0].page_count)
+        works.upsert_many([Work(isbn="9780441013593", ol_work_id="OL1W", title="Dune", author="A", page_count=412)])
+        self.assertEqual(self.repo.get_by_id(book.id, self.user_id).page_count, 412)
+        self.assertEqual(self.repo.get_all(self.user_id)[0].page_count, 412)
+
+    def test_multi_get_reads_only_the_books_not_cached(self):
+        a, b = self.repo.create(_book(self.user_id, "A")), self.repo.create(_book(self.user_id, "B"))
+        self.cache.invalidate(self.user_id)
+        self.repo.get_by_id(a.id, self.user_id)
+        found = self.repo.get_many(self.user_id, [b.id, a.id, 999])
+        self.assertEqual(sorted(found), [a.id, b.id])
+        self.assertEqual(self.cache.stats()["hits"], 1)  # a; b and 999 went to the database
+        self.repo.get_many(self.user_id, [a.id, b.id])
+        self.assertEqual(self.cache.stats()["hits"], 3)
+
+    def test_rolled_back_transaction_never_reaches_the_cache(self):
+        self.repo.get_all(self.user_id)
+        with self.assertRaises(RuntimeError):
+            with self.repo.transaction(self.user_id):
+                self.repo.create(_book(self.user_id, "Ghost"))
+                raise RuntimeError
+        self.assertEqual(self.repo.get_all(self.user_id), [])
+
+    def test_least_recently_used_user_is_evicted_first(self):
+        second = UserRepository(self.db).create("c@d.com", "password123").id
+        for user_id in (self.user_id, second):
+            self.repo.create(_book(user_id, "x" * 1000))
+        self.repo.get_all(self.user_id)
+        self.repo.get_all(second)
+        self.cache.max_bytes = self.cache.stats()["bytes"] - 1
+        self.repo.get_all(second)  # touch, then force eviction with a new entry
+        self.users.get_by_id(second)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.assertNotIn(self.user_id, self.cache._entries)
+        self.assertIn(second, self.cache._entries)
+
+    def test_users_are_cached(self):
+        self.assertEqual(self.users.get_by_id(self.user_id).email, "a@b.com")
+        self.users.get_by_id(self.user_id)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_cached_user_expires(self):
+        clock = [1000.0]
+        self.cache = LibraryCache(user_ttl=60, clock=lambda: clock[0])
+        self.users = CachedUserRepository(self.db, self.cache)
+        self.users.get_by_id(self.user_id)
+        with get_db(self.db) as conn:
+            conn.execute("DELETE FROM users WHERE id = ?", (self.user_id,))
+            conn.commit()
+        clock[0] += 59
+        self.assertIsNotNone(self.users.get_by_id(self.user_id))
+        clock[0] += 1
+        self.assertIsNone(self.users.get_by_id(self.user_id))
+
+
+class TestMetricsRoute(unittest.TestCase):
+    def test_metrics_report_cache_counters(self):
+        app = make_app()
+        client = app.test_client()
+        token = client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        ).get_json()["token"]
+        for _ in range(3):
+            client.get("/api/books", headers={"Authorization": f"Bearer {token}"})
+        cache = client.get("/api/metrics", headers=METRICS_AUTH).get_json()["library_cache"]
+        self.assertEqual(cache["hits"], 2)
+        self.assertIsNotNone(cache["hit_ratio"])
+
+    def test_metrics_require_the_ops_token(self):
+        client = make_app().test_client()
+        self.assertEqual(client.get("/api/metrics").status_code, 401)
+        self.assertEqual(client.get("/api/metrics", headers={"Authorization": "Bearer nope"}).status_code, 401)
+        self.assertEqual(make_app(METRICS_TOKEN="").test_client().get("/api/metrics", headers=METRICS_AUTH).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import sys, os, json, random, tempfile, unittest
+from itertools import combinations
+from unittest.mock import patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from app.database import get_db
+from app.utils.trigrams import (
+    author_trigrams, group_pairs, normalize, similar_pairs, similarity, title_trigrams,
+)
+
+
+class TestTrigrams(unittest.TestCase):
+    def test_normalize_drops_accents_articles_and_subtitles(self):
+        self.assertEqual(normalize("The Hobbit: There and Back Again", strip_subtitle=True), "hobbit")
+        self.assertEqual(normalize("Les Misérables (Penguin Classics)", strip_subtitle=True), "les miserables")
+        self.assertEqual(normalize("Tolkien, J.R.R."), "tolkien j r r")
+
+    def test_similarity(self):
+        def score(a, b):
+            return similarity(title_trigrams(a[0]), author_trigrams(a[1]), title_trigrams(b[0]), author_trigrams(b[1]))
+
+        self.assertGreater(score(("The Hobbit", "J.R.R. Tolkien"), ("Hobit", "Tolkien, J. R. R.")), 0.8)
+        self.assertLess(score(("Dune", "Frank Herbert"), ("Dune Messiah", "Frank Herbert")), 0.8)
+        self.assertLess(score(("Emma", "Jane Austen"), ("Emma", "Someone Else")), 0.8)
+
+    def test_prefix_filtering_finds_every_pair_brute_force_does(self):
+        rng = random.Random(3)
+        words = ["dune", "hobbit", "emma", "war", "peace", "night", "circus", "sea", "of", "glass", "house"]
+        books = []
+        for i in range(150):
+            title = " ".join(rng.sample(words, rng.randint(1, 3)))
+            if rng.random() < 0.3:  # a typo
+                pos = rng.randrange(len(title))
+                title = title[:pos] + title[pos + 1:]
+            books.append((i, title, rng.choice(["Ann Lee", "Bo Chan", "Cy Young"])))
+        for threshold in (0.6, 0.8, 0.95):
+            brute = {
+                (a[0], b[0])
+                for a, b in combinations(books, 2)
+                if similarity(title_trigrams(a[1]), author_trigrams(a[2]),
+                              title_trigrams(b[1]), author_trigrams(b[2])) >= threshold
+            }
+            self.assertEqual({(a, b) for a, b, _ in similar_pairs(books, threshold)}, brute)
+
+    def test_group_pairs(self):
+        groups = group_pairs([(1, 2, 0.9), (2, 3, 0.85), (4, 5, 0.95)])
+        self.assertEqual(groups, [([4, 5], 0.95), ([1, 2, 3], 0.9)])
+
+
+class TestDuplicateRoutes(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        self.app = make_app(self.db)
+        self.client = self.app.test_client()
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        self.headers = {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db + suffix):
+                os.remove(self.db + suffix)
+
+    def _add(self, title, author="J.R.R. Tolkien", **fields):
+        book = {"title": title, "author": author, "status": "want_to_read", **fields}
+        return self.client.post("/api/books", data=json.dumps(book), content_type="application/json",
+                                headers=self.headers)
+
+    def test_add_warns_about_likely_duplicates_but_succeeds(self):
+        first = self._add("The Hobbit").get_json()
+        self.assertEqual(first["possible_duplicates"], [])
+        resp = self._add("Hobbit (Illustrated Edition)", author="Tolkien, J. R. R.", isbn="9780547928227")
+        self.assertEqual(resp.status_code, 201)
+        warning = resp.get_json()["possible_duplicates"]
+        self.assertEqual([(d["id"], d["title"]) for d in warning], [(first["id"], "The Hobbit")])
+        self.assertGreaterEqual(warning[0]["similarity"], 0.8)
+        self.assertEqual(len(self.client.get("/api/books", headers=self.headers).get_json()), 2)
+        # The warning is part of the create response only.
+        book = self.client.get(f"/api/books/{first['id']}", headers=self.headers).get_json()
+        self.assertNotIn("possible_duplicates", book)
+
+    def test_unrelated_books_are_not_flagged(self):
+        self._add("The Hobbit")
+        self.assertEqual(self._add("The Silmarillion").get_json()["possible_duplicates"], [])
+        self.assertEqual(self._add("Hobbit", author="Someone Else").get_json()["possible_duplicates"], [])
+
+    def test_many_candidates_are_read_in_chunks(self):
+        ids = [self._add("The Hobbit").get_json()["id"] for _ in range(5)]
+        with patch("app.repositories.book_repository.IN_CHUNK", 2):
+            warning = self._add("Hobbit").get_json()["possible_duplicates"]
+        self.assertEqual(sorted(d["id"] for d in warning), ids)
+
+    def test_index_follows_title_updates_and_deletes(self):
+        book_id = self._add("The Hobbit").get_json()["id"]
+        self.client.patch(f"/api/books/{book_id}", data=json.dumps({"title": "Beowulf"}),
+                          content_type="application/json", headers=self.headers)
+        self.assertEqual(self._add("Hobbit").get_json()["possible_duplicates"], [])
+        self.assertEqual(len(self._add("Beowulf").get_json()["possible_duplicates"]), 1)
+        for book in self.client.get("/api/books", headers=self.headers).get_json():
+            self.client.delete(f"/api/books/{book['id']}", headers=self.headers)
+        with get_db(self.db) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM title_trigrams").fetchone()[0], 0)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM title_trigram_counts").fetchone()[0], 0)
+
+    def test_batch_import_sees_books_added_earlier_in_the_batch(self):
+        resp = self.client.post(
+            "/api/books/batch",
+            data=json.dumps({"operations": [
+                {"op": "create", "data": {"title": "Dune", "author": "Frank Herbert", "status": "reading"}},
+                {"op": "create", "data": {"title": "Dune: Deluxe Edition", "author": "Herbert, Frank",
+                                          "status": "want_to_read"}},
+            ]}),
+            content_type="application/json",
+            headers=self.headers,
+        )
+        results = resp.get_json()["results"]
+        self.assertEqual(results[1]["book"]["possible_duplicates"][0]["id"], results[0]["book"]["id"])
+
+    def test_duplicates_report_groups_similar_books(self):
+        ids = [self._add(t).get_json()["id"] for t in ("The Hobbit", "Hobbit", "Hobit: Annotated")]
+        self._add("The Silmarillion")
+        self._add("Dune", author="Frank Herbert")
+        dune = self._add("Dune", author="Frank Herbert").get_json()["id"]
+        resp = self.client.get("/api/books/duplicates", headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        groups = resp.get_json()["groups"]
+        self.assertEqual([[b["id"] for b in g["books"]] for g in groups], [ids, [dune - 1, dune]])
+        self.assertEqual([g["similarity"] for g in groups], [1.0, 1.0])
+        self.assertEqual(self.client.get("/api/books/duplicates").status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
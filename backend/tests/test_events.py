@@ -0,0 +1,126 @@
+import sys, os, json, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from app.utils.event_bus import Event, EventBus, TooManySubscribers
+
+
+class TestEventBus(unittest.TestCase):
+
+    def test_publish_fans_out_to_that_user_only(self):
+        bus = EventBus()
+        a1, a2, b = bus.subscribe(1), bus.subscribe(1), bus.subscribe(2)
+        bus.publish(1, Event("book_created", {"id": 7}, id=1))
+        self.assertEqual(a1.get(timeout=0.1).data, {"id": 7})
+        self.assertEqual(a2.get(timeout=0.1).data, {"id": 7})
+        self.assertIsNone(b.get(timeout=0.01))
+
+    def test_connection_caps(self):
+        bus = EventBus(max_connections=3, max_per_user=2)
+        bus.subscribe(1)
+        second = bus.subscribe(1)
+        with self.assertRaises(TooManySubscribers):
+            bus.subscribe(1)
+        bus.subscribe(2)
+        with self.assertRaises(TooManySubscribers):
+            bus.subscribe(3)
+        second.close()
+        bus.subscribe(3)
+        self.assertEqual(bus.connection_count, 3)
+
+    def test_close_removes_subscriber(self):
+        bus = EventBus()
+        with bus.subscribe(1):
+            self.assertTrue(bus.has_subscribers(1))
+        self.assertFalse(bus.has_subscribers(1))
+
+    def test_slow_consumer_is_marked_overflowed(self):
+        bus = EventBus(queue_size=2)
+        sub = bus.subscribe(1)
+        for i in range(3):
+            bus.publish(1, Event("book_updated", {"id": i}, id=i))
+        self.assertTrue(sub.overflowed)
+
+
+class TestEventStream(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.app.config.update(SSE_HEARTBEAT_SECONDS=0.05, SSE_MAX_DURATION_SECONDS=2)
+        self.client = self.app.test_client()
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        self.token = resp.get_json()["token"]
+
+    def _auth(self, **extra):
+        return {"Authorization": f"Bearer {self.token}", **extra}
+
+    def _post_book(self, title="Dune"):
+        return self.client.post(
+            "/api/books",
+            data=json.dumps({"title": title, "author": "Herbert", "status": "reading"}),
+            content_type="application/json",
+            headers=self._auth(),
+        ).get_json()
+
+    def _open(self, **headers):
+        resp = self.client.get("/api/books/events", headers=self._auth(**headers), buffered=False)
+        self.addCleanup(resp.close)
+        return resp, iter(resp.response)
+
+    def _next_event(self, chunks):
+        """Skip retry/keepalive lines and parse the next event block."""
+        for chunk in chunks:
+            text = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if text.startswith(("retry:", ":")):
+                continue
+            fields = dict(line.split(": ", 1) for line in text.strip().split("\n"))
+            return fields.get("event"), json.loads(fields["data"]), fields.get("id")
+        return None
+
+    def test_stream_opens_with_ready_then_pushes_live_changes(self):
+        resp, chunks = self._open()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.mimetype, "text/event-stream")
+        self.assertEqual(self._next_event(chunks), ("ready", {"version": 0}, "0"))
+
+        book = self._post_book()
+        event_type, data, event_id = self._next_event(chunks)
+        self.assertEqual((event_type, data["id"], event_id), ("book_created", book["id"], "1"))
+        event_type, data, _ = self._next_event(chunks)
+        self.assertEqual(event_type, "stats")
+        self.assertEqual(data["total"], 1)
+
+    def test_reconnect_replays_missed_changes(self):
+        first = self._post_book("A")
+        self._post_book("B")
+        self.client.delete(f"/api/books/{first['id']}", headers=self._auth())
+
+        _, chunks = self._open(**{"Last-Event-ID": "1"})
+        event_type, data, event_id = self._next_event(chunks)
+        self.assertEqual(event_type, "sync")
+        self.assertEqual([b["title"] for b in data["upserted"]], ["B"])
+        self.assertEqual(data["deleted"], [first["id"]])
+        self.assertEqual(event_id, "3")
+        self.assertEqual(self._next_event(chunks)[0], "stats")
+
+    def test_per_user_cap_returns_503(self):
+        self.app.extensions["event_bus"].max_per_user = 1
+        self._open()
+        resp = self.client.get("/api/books/events", headers=self._auth())
+        self.assertEqual(resp.status_code, 503)
+        self.assertIn("Retry-After", resp.headers)
+
+    def test_closing_an_unread_stream_frees_its_slot(self):
+        resp, _ = self._open()
+        resp.close()
+        self.assertEqual(self.app.extensions["event_bus"].connection_count, 0)
+
+    def test_stream_requires_auth(self):
+        resp = self.client.get("/api/books/events")
+        self.assertEqual(resp.status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
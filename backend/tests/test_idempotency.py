@@ -0,0 +1,158 @@
+import sys, os, json, tempfile, threading, time, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from app.database import get_db, init_db
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.user_repository import UserRepository
+from app.services.idempotency_service import (
+    IdempotencyInProgress,
+    IdempotencyKeyReused,
+    IdempotencyService,
+    fingerprint,
+)
+
+BOOK = {"title": "Dune", "author": "Herbert", "status": "reading"}
+
+
+class TestIdempotentRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.client = self.app.test_client()
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        self.token = resp.get_json()["token"]
+
+    def _post(self, path, body, key=None):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if key is not None:
+            headers["Idempotency-Key"] = key
+        return self.client.post(path, data=json.dumps(body), content_type="application/json", headers=headers)
+
+    def _count(self):
+        return len(self.client.get("/api/books", headers={"Authorization": f"Bearer {self.token}"}).get_json())
+
+    def test_retry_replays_the_stored_response(self):
+        first = self._post("/api/books", BOOK, key="abc")
+        retry = self._post("/api/books", BOOK, key="abc")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.get_json(), first.get_json())
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertNotIn("Idempotent-Replayed", first.headers)
+        self.assertEqual(self._count(), 1)
+
+    def test_error_responses_are_replayed_too(self):
+        bad = {**BOOK, "status": "want_to_read", "rating": 4}
+        self.assertEqual(self._post("/api/books", bad, key="k").status_code, 400)
+        self.assertEqual(self._post("/api/books", bad, key="k").status_code, 400)
+
+    def test_key_reused_for_a_different_body_is_rejected(self):
+        self._post("/api/books", BOOK, key="abc")
+        resp = self._post("/api/books", {**BOOK, "title": "Other"}, key="abc")
+        self.assertEqual(resp.status_code, 422)
+        self.assertEqual(self._count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        self._post("/api/books", BOOK, key="abc")
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "other@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        self.token = resp.get_json()["token"]
+        resp = self._post("/api/books", BOOK, key="abc")
+        self.assertNotIn("Idempotent-Replayed", resp.headers)
+        self.assertEqual(self._count(), 1)
+
+    def test_without_header_every_request_runs(self):
+        self._post("/api/books", BOOK)
+        self._post("/api/books", BOOK)
+        self.assertEqual(self._count(), 2)
+
+    def test_batch_is_idempotent(self):
+        body = {"operations": [{"op": "create", "data": BOOK}, {"op": "create", "data": {**BOOK, "title": "B"}}]}
+        self._post("/api/books/batch", body, key="batch-1")
+        resp = self._post("/api/books/batch", body, key="batch-1")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(self._count(), 2)
+
+    def test_invalid_key_returns_400(self):
+        self.assertEqual(self._post("/api/books", BOOK, key="x" * 300).status_code, 400)
+
+
+class TestIdempotencyService(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        init_db(self.db)
+        self.user_id = UserRepository(db_path=self.db).create("a@b.com", "password123").id
+        self.repo = IdempotencyRepository(db_path=self.db)
+        self.svc = IdempotencyService(self.repo, wait_seconds=2, poll_seconds=0.01)
+        self.fp = fingerprint("POST", "/api/books?", b"{}")
+
+    def test_concurrent_duplicate_waits_and_replays(self):
+        self.assertIsNone(self.svc.begin(self.user_id, "k", self.fp))
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(self.svc.begin(self.user_id, "k", self.fp)))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(results, [])  # still blocked behind the first request
+        self.svc.finish(self.user_id, "k", 201, '{"id": 1}')
+        waiter.join(timeout=2)
+        self.assertEqual((results[0].status, results[0].body), (201, '{"id": 1}'))
+        self.assertEqual(self.svc._locks, {})
+
+    def test_duplicate_of_request_running_elsewhere_polls_the_row(self):
+        # Claimed directly in the table, as another process would.
+        self.repo.claim(self.user_id, "k", self.fp, int(time.time()), 60)
+        threading.Timer(0.05, self.repo.complete, (self.user_id, "k", 201, "{}", int(time.time()) + 60)).start()
+        self.assertEqual(self.svc.begin(self.user_id, "k", self.fp).status, 201)
+
+    def test_gives_up_when_the_original_never_finishes(self):
+        self.svc.wait_seconds = 0.05
+        self.repo.claim(self.user_id, "k", self.fp, int(time.time()), 60)
+        with self.assertRaises(IdempotencyInProgress):
+            self.svc.begin(self.user_id, "k", self.fp)
+
+    def test_slow_original_keeps_its_lease(self):
+        self.assertIsNone(self.svc.begin(self.user_id, "k", self.fp))
+        self.assertIsNotNone(self.svc._renewer)
+        start = int(time.time())
+        self.assertEqual(self.svc.renew_leases(now=start + 50), 1)
+        # Another process past the original lease still finds the claim in flight.
+        stored = self.repo.claim(self.user_id, "k", self.fp, start + 70, 60)
+        self.assertIsNotNone(stored)
+        self.assertIsNone(stored.status)
+        self.svc.finish(self.user_id, "k", 201, "{}")
+        self.assertEqual(self.svc.renew_leases(), 0)
+
+    def test_unrenewed_lease_lapses(self):
+        # Claimed by a process that crashed: nobody renews it.
+        self.repo.claim(self.user_id, "k", self.fp, int(time.time()), 60)
+        self.assertIsNone(self.repo.claim(self.user_id, "k", self.fp, int(time.time()) + 70, 60))
+
+    def test_abandoned_key_can_be_retried(self):
+        self.svc.begin(self.user_id, "k", self.fp)
+        self.svc.abandon(self.user_id, "k")
+        self.assertIsNone(self.svc.begin(self.user_id, "k", self.fp))
+
+    def test_reused_key_with_different_request(self):
+        self.svc.begin(self.user_id, "k", self.fp)
+        self.svc.finish(self.user_id, "k", 201, "{}")
+        with self.assertRaises(IdempotencyKeyReused):
+            self.svc.begin(self.user_id, "k", fingerprint("POST", "/api/books?", b"{ }"))
+
+    def test_purge_removes_only_expired_keys(self):
+        now = int(time.time())
+        self.repo.claim(self.user_id, "old", self.fp, now - 120, 60)
+        self.repo.claim(self.user_id, "new", self.fp, now, 60)
+        self.assertEqual(self.repo.purge_expired(now, batch_size=1), 1)
+        with get_db(self.db) as conn:
+            keys = [r["key"] for r in conn.execute("SELECT key FROM idempotency_keys")]
+        self.assertEqual(keys, ["new"])
+
+
+if __name__ == "__main__":
+    unittest.main()
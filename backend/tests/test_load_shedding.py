@@ -0,0 +1,164 @@
+import sys, os, json, threading, time, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import METRICS_AUTH, make_app
+from bench.fake_open_library import FakeOpenLibraryServer
+from app.utils.load_shedding import (
+    _AUTH,
+    _POST_READS,
+    _UNLIMITED,
+    DEFAULT_CLASSES,
+    AdaptiveLimiter,
+    ClassLimits,
+    endpoint_class,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEndpointClass(unittest.TestCase):
+    def test_classes(self):
+        self.assertEqual(endpoint_class("search.search_books", "GET"), "search")
+        self.assertEqual(endpoint_class("auth.login", "POST"), "auth")
+        self.assertEqual(endpoint_class("auth.register", "POST"), "auth")
+        self.assertEqual(endpoint_class("auth.me", "GET"), "reads")
+        self.assertEqual(endpoint_class("books.list_books", "GET"), "reads")
+        self.assertEqual(endpoint_class("books.lookup_books", "POST"), "reads")
+        self.assertEqual(endpoint_class("books.create_book", "POST"), "writes")
+        self.assertEqual(endpoint_class("books.delete_book", "DELETE"), "writes")
+
+    def test_unlimited(self):
+        for endpoint in ("health", "metrics", "books.stream_events", None):
+            self.assertIsNone(endpoint_class(endpoint, "GET"))
+        self.assertIsNone(endpoint_class("books.create_book", "OPTIONS"))
+
+    def test_rules_name_real_endpoints(self):
+        # A renamed view would otherwise silently fall into the wrong class.
+        endpoints = {rule.endpoint for rule in make_app().url_map.iter_rules()}
+        for endpoint in _UNLIMITED | _AUTH | _POST_READS:
+            self.assertIn(endpoint, endpoints)
+        self.assertTrue(any(e.startswith("search.") for e in endpoints))
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def _limiter(self, clock=time.monotonic, queue_timeout=0.05, **limits):
+        spec = dict(initial=2, min_limit=1, max_limit=4, max_queue=1, target_latency=1.0)
+        spec.update(limits)
+        return AdaptiveLimiter("test", ClassLimits(**spec), queue_timeout, clock=clock)
+
+    def test_sheds_when_queue_is_full_or_wait_times_out(self):
+        limiter = self._limiter(max_queue=0)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+
+        limiter = self._limiter()
+        limiter.acquire(), limiter.acquire()
+        started = time.monotonic()
+        self.assertFalse(limiter.acquire())   # waited queue_timeout, no slot freed
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        self.assertEqual(limiter.stats()["shed"], 1)
+
+    def test_queued_request_gets_the_released_slot(self):
+        limiter = self._limiter(queue_timeout=5.0)
+        limiter.acquire(), limiter.acquire()
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+        waiter.start()
+        while limiter.stats()["waiting"] == 0:
+            time.sleep(0.001)
+        limiter.release(0.01)
+        waiter.join(5)
+        self.assertEqual(results, [True])
+        self.assertEqual(limiter.stats()["queued"], 1)
+        self.assertEqual(limiter.stats()["in_flight"], 2)
+
+    def test_additive_increase_only_while_busy(self):
+        limiter = self._limiter()
+        limiter.acquire()
+        limiter.release(0.01)   # one of two slots in use counts as busy
+        self.assertAlmostEqual(limiter._limit, 2.5)
+        limiter._limit = 4.0
+        limiter.acquire()
+        limiter.release(0.01)   # one of four: idle, no growth
+        self.assertEqual(limiter.limit, 4)
+
+        for _ in range(20):
+            limiter.acquire(), limiter.acquire(), limiter.acquire()
+            for _ in range(3):
+                limiter.release(0.01)
+        self.assertEqual(limiter.limit, 4)  # capped at max_limit
+
+    def test_multiplicative_decrease_once_per_target_period(self):
+        clock = FakeClock()
+        limiter = self._limiter(clock=clock, initial=4, max_limit=8)
+        for _ in range(4):
+            limiter.acquire()
+        for _ in range(4):
+            limiter.release(2.0)   # a burst of slow requests cuts once
+        self.assertAlmostEqual(limiter._limit, 3.6)
+        clock.now += 1.0
+        limiter.acquire()
+        limiter.release(2.0)
+        self.assertAlmostEqual(limiter._limit, 3.24)
+        for _ in range(20):
+            clock.now += 1.0
+            limiter.acquire()
+            limiter.release(2.0)
+        self.assertEqual(limiter.limit, 1)   # floored at min_limit
+        self.assertEqual(limiter.stats()["slow"], 25)
+
+
+class TestLoadSheddingRoutes(unittest.TestCase):
+    def setUp(self):
+        self.fake_ol = FakeOpenLibraryServer(latency_ms=400).start()
+        self.addCleanup(self.fake_ol.stop)
+        classes = dict(DEFAULT_CLASSES)
+        classes["search"] = ClassLimits(initial=1, min_limit=1, max_limit=1, max_queue=0, target_latency=2.0)
+        self.app = make_app(OPEN_LIBRARY_URL=self.fake_ol.url, LOAD_SHEDDING_CLASSES=classes)
+        resp = self.app.test_client().post(
+            "/api/auth/register",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        self.headers = {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+    def test_overloaded_class_sheds_while_others_keep_serving(self):
+        slow = []
+        search = threading.Thread(
+            target=lambda: slow.append(self.app.test_client().get("/api/search?q=dune", headers=self.headers))
+        )
+        search.start()
+        limiter = self.app.extensions["load_shedder"].limiters["search"]
+        while limiter.stats()["in_flight"] == 0:
+            time.sleep(0.001)
+
+        client = self.app.test_client()
+        shed = client.get("/api/search?q=dune", headers=self.headers)
+        self.assertEqual(shed.status_code, 503)
+        self.assertEqual(shed.get_json(), {"error": "Server is busy. Try again shortly."})
+        self.assertEqual(shed.headers["Retry-After"], "2")
+        self.assertEqual(client.get("/api/books", headers=self.headers).status_code, 200)
+        self.assertEqual(client.get("/api/health").status_code, 200)
+
+        search.join(10)
+        self.assertEqual(slow[0].status_code, 200)
+        self.assertEqual(self.fake_ol.requests, 1)   # the shed search never went upstream
+        stats = client.get("/api/metrics", headers=METRICS_AUTH).get_json()["load_shedding"]
+        self.assertEqual(stats["search"]["shed"], 1)
+        self.assertEqual(stats["search"]["in_flight"], 0)
+        self.assertEqual(stats["reads"]["in_flight"], 0)
+
+    def test_disabled(self):
+        app = make_app(LOAD_SHEDDING_ENABLED=False)
+        self.assertNotIn("load_shedder", app.extensions)
+        self.assertNotIn("load_shedding", app.test_client().get("/api/metrics", headers=METRICS_AUTH).get_json())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import sys, os, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench.loadtest import SpawnedServer, parse_mix, percentile, run_load
+
+
+class TestLoadtestHelpers(unittest.TestCase):
+
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile(values, 100), 100.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("list=3,create=1"), {"list": 3.0, "create": 1.0})
+
+    def test_parse_mix_rejects_unknown_route(self):
+        with self.assertRaises(ValueError):
+            parse_mix("list=1,explode=2")
+
+
+class TestLoadtestRun(unittest.TestCase):
+
+    def test_short_open_loop_run_reports_every_route(self):
+        server = SpawnedServer(ol_latency_ms=0, ol_jitter_ms=0, ol_error_rate=0)
+        self.addCleanup(server.stop)
+        report = run_load(
+            server.url,
+            duration=1.0,
+            concurrency=4,
+            rate=60,
+            users=1,
+            seed_books=3,
+            mix={"list": 1, "stats": 1, "create": 1, "patch": 1, "search": 1},
+        )
+        self.assertGreater(report["total"]["requests"], 0)
+        self.assertEqual(report["total"]["errors"], 0)
+        for route in ("list", "stats", "search"):
+            self.assertIn(route, report["routes"])
+            self.assertGreaterEqual(report["routes"][route]["p99_ms"], report["routes"][route]["p50_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
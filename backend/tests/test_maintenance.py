@@ -0,0 +1,170 @@
+import sys, os, sqlite3, tempfile, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import METRICS_AUTH, make_app
+from app.database import DatabaseMaintenance, enable_incremental_vacuum, get_db, init_db
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fill(path, rows=2000):
+    with get_db(path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS scratch (id INTEGER PRIMARY KEY, body TEXT)")
+        conn.executemany("INSERT INTO scratch (body) VALUES (?)", [("x" * 1000,)] * rows)
+        conn.commit()
+
+
+class TestDatabaseMaintenance(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        self.router = init_db(self.db)
+        self.clock = FakeClock()
+
+    def _maintenance(self, **kwargs):
+        kwargs.setdefault("step_sleep", 0)
+        return DatabaseMaintenance(self.router, clock=self.clock, **kwargs)
+
+    def test_new_files_use_incremental_vacuum(self):
+        with get_db(self.db) as conn:
+            self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_analyze_waits_for_idle_and_its_interval(self):
+        m = self._maintenance(analyze_interval=3600, idle_seconds=5)
+        m.touch()
+        self.assertFalse(m.run()["shards"][0]["analyzed"])   # busy: PRAGMA optimize only
+        self.clock.now += 5
+        self.assertTrue(m.run()["shards"][0]["analyzed"])
+        with get_db(self.db) as conn:
+            self.assertIsNotNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone())
+        self.clock.now += 60
+        self.assertFalse(m.run()["shards"][0]["analyzed"])
+        self.clock.now += 3600
+        self.assertTrue(m.run()["shards"][0]["analyzed"])
+        self.assertEqual(m.stats()["analyzes"], 2)
+        self.assertEqual(m.stats()["runs"], 4)
+
+    def test_busy_run_analyzes_tables_without_statistics(self):
+        with get_db(self.db) as conn:
+            conn.execute("INSERT INTO users (email, password_hash, created_at) VALUES ('a@b.com', 'x', '2024-01-01')")
+            conn.executemany(
+                "INSERT INTO books (user_id, title, author, status, date_added) VALUES (1, ?, 'A', 'reading', '2024-01-01')",
+                [(f"B{i}",) for i in range(50)],
+            )
+            conn.commit()
+        m = self._maintenance(idle_seconds=5)
+        m.touch()
+        self.assertFalse(m.run()["shards"][0]["analyzed"])
+        with get_db(self.db) as conn:
+            analyzed = {r[0] for r in conn.execute("SELECT tbl FROM sqlite_stat1")}
+        self.assertIn("books", analyzed)
+
+    def test_wal_checkpoints(self):
+        _fill(self.db)
+        wal = os.path.getsize(self.db + "-wal")
+        m = self._maintenance(wal_checkpoint_bytes=1024, wal_truncate_bytes=1 << 20)
+        self.assertGreater(wal, 1 << 20)
+
+        m.touch()
+        shard = m.run()["shards"][0]
+        self.assertEqual(shard["checkpoint"]["mode"], "PASSIVE")
+        self.assertFalse(shard["checkpoint"]["busy"])
+        # Copied back, file kept for reuse (PRAGMA optimize may have appended its statistics).
+        self.assertGreaterEqual(shard["wal_bytes_after"], wal)
+
+        self.clock.now += 10
+        shard = m.run()["shards"][0]
+        self.assertEqual(shard["checkpoint"]["mode"], "TRUNCATE")
+        self.assertEqual(shard["wal_bytes_after"], 0)
+
+        # Below the threshold nothing is checkpointed.
+        self.assertIsNone(m.run()["shards"][0]["checkpoint"])
+
+    def test_incremental_vacuum_only_when_idle(self):
+        _fill(self.db)
+        with get_db(self.db) as conn:
+            conn.execute("DELETE FROM scratch")
+            conn.commit()
+        m = self._maintenance(vacuum_step=100)
+        m.touch()
+        busy = m.run()["shards"][0]
+        self.assertEqual(busy["vacuumed_pages"], 0)
+        self.assertGreater(busy["freelist_pages"], 100)
+
+        self.clock.now += 10
+        idle = m.run()["shards"][0]
+        self.assertGreater(idle["vacuumed_pages"], 100)
+        self.assertEqual(idle["freelist_pages"], 0)
+        self.assertEqual(m.stats()["vacuumed_pages"], idle["vacuumed_pages"])
+
+    def test_locked_file_is_skipped_not_waited_on(self):
+        blocker = sqlite3.connect(self.db, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            report = self._maintenance(busy_timeout_ms=10).run(force=True)
+        finally:
+            blocker.execute("ROLLBACK")
+            blocker.close()
+        self.assertIn("locked", report["shards"][0]["error"])
+        self.assertEqual(self._maintenance().stats()["errors"], 0)
+
+    def test_enable_incremental_vacuum_on_an_old_file(self):
+        path = tempfile.mktemp(suffix=".db")
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("CREATE TABLE t (x)")
+        conn.commit()
+        conn.close()
+        enable_incremental_vacuum(path)
+        with get_db(path) as conn:
+            self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+
+class TestMaintenanceInApp(unittest.TestCase):
+    def test_requests_count_as_activity_and_metrics_report_runs(self):
+        app = make_app()
+        client = app.test_client()
+        maintenance = app.extensions["db_maintenance"]
+        self.assertTrue(maintenance.idle())
+        client.get("/api/health")
+        self.assertFalse(maintenance.idle())
+
+        maintenance.run()
+        stats = client.get("/api/metrics", headers=METRICS_AUTH).get_json()["db_maintenance"]
+        self.assertEqual(stats["runs"], 1)
+        self.assertFalse(stats["last"]["idle"])
+
+    def test_cli(self):
+        db = tempfile.mktemp(suffix=".db")
+        app = make_app(db)
+        # SQLite checkpoints and deletes the WAL when the last connection closes.
+        reader = get_db(db)
+        self.addCleanup(reader.close)
+        _fill(db)
+        result = app.test_cli_runner().invoke(args=["db-maintenance"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("analyzed, truncate checkpoint", result.output)
+        self.assertIn("-> 0 bytes", result.output)
+
+    def test_background_jobs_start_only_when_asked(self):
+        from app import start_background_jobs
+        app = make_app(TESTING=False)
+        jobs = app.extensions["background_jobs"]
+        self.assertIn("db_maintenance", jobs)
+        self.assertFalse(any(task._thread.is_alive() for task in jobs.values()))
+
+        start_background_jobs(app)
+        start_background_jobs(app)
+        for task in jobs.values():
+            self.addCleanup(task.stop)
+            self.assertTrue(task._thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+import sys, os, sqlite3, tempfile, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.migrations import Migration, MigrationError, current_version, discover, migrate, v0001_initial
+
+
+def _tables(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+
+    def test_fresh_database_reaches_latest_version(self):
+        applied = migrate(self.db)
+        self.assertEqual(applied, len(discover()))
+        self.assertEqual(current_version(self.db), discover()[-1].version)
+        self.assertTrue({"users", "books", "schema_version"} <= _tables(self.db))
+
+    def test_second_run_is_a_no_op(self):
+        migrate(self.db)
+        self.assertEqual(migrate(self.db), 0)
+
+    def test_legacy_database_without_version_table_is_adopted(self):
+        # Databases created before migrations existed have the tables but no schema_version.
+        conn = sqlite3.connect(self.db)
+        conn.executescript(v0001_initial.SQL)
+        conn.execute(
+            "INSERT INTO users (email, password_hash, created_at) VALUES ('a@b.com', 'x', '2024-01-01')"
+        )
+        conn.commit()
+        conn.close()
+        migrate(self.db)
+        conn = sqlite3.connect(self.db)
+        users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        conn.close()
+        self.assertEqual(users, 1)
+        self.assertEqual(current_version(self.db), discover()[-1].version)
+
+    def test_legacy_books_are_given_change_sequence_numbers(self):
+        conn = sqlite3.connect(self.db)
+        conn.executescript(v0001_initial.SQL)
+        conn.execute("INSERT INTO users (email, password_hash, created_at) VALUES ('a@b.com', 'x', '2024-01-01')")
+        conn.executemany(
+            "INSERT INTO books (user_id, title, author, status, date_added) VALUES (1, ?, 'A', 'reading', '2024-01-01')",
+            [("One",), ("Two",)],
+        )
+        conn.commit()
+        conn.close()
+        migrate(self.db)
+        conn = sqlite3.connect(self.db)
+        seqs = [r[0] for r in conn.execute("SELECT change_seq FROM books ORDER BY id")]
+        user_seq = conn.execute("SELECT change_seq FROM users").fetchone()[0]
+        conn.close()
+        self.assertEqual(seqs, [1, 2])
+        self.assertEqual(user_seq, 2)
+
+    def _books_with_isbn(self):
+        conn = sqlite3.connect(self.db)
+        conn.executemany(
+            "INSERT INTO users (email, password_hash, created_at) VALUES (?, 'x', '2024-01-01')",
+            [("a@b.com",), ("c@d.com",)],
+        )
+        conn.executemany(
+            "INSERT INTO books (user_id, title, author, isbn, status, cover_url, page_count, date_added) "
+            "VALUES (?, 'Dune', 'Herbert', '9780441013593', 'reading', ?, 412, '2024-01-01')",
+            [(1, "https://covers/1.jpg"), (2, "https://covers/2.jpg")],
+        )
+        conn.commit()
+        conn.close()
+
+    def test_existing_isbn_books_are_linked_to_shared_works(self):
+        migrate(self.db, migrations=discover()[:4])
+        self._books_with_isbn()
+        migrate(self.db, migrations=discover()[:5])
+        conn = sqlite3.connect(self.db)
+        works = conn.execute("SELECT COUNT(*) FROM works").fetchone()[0]
+        rows = conn.execute("SELECT work_id, cover_url, page_count FROM books ORDER BY id").fetchall()
+        conn.close()
+        self.assertEqual(works, 1)
+        # First-seen values become canonical; the second user's cover stays as an override.
+        self.assertEqual(rows, [(1, None, None), (1, "https://covers/2.jpg", None)])
+
+    def test_works_seeded_from_user_data_are_unshared(self):
+        migrate(self.db, migrations=discover()[:4])
+        self._books_with_isbn()
+        migrate(self.db)
+        conn = sqlite3.connect(self.db)
+        works = conn.execute("SELECT COUNT(*) FROM works").fetchone()[0]
+        rows = conn.execute("SELECT work_id, cover_url, page_count FROM books ORDER BY id").fetchall()
+        conn.close()
+        self.assertEqual(works, 0)
+        self.assertEqual(rows, [(None, "https://covers/1.jpg", 412), (None, "https://covers/2.jpg", 412)])
+
+    def test_reading_rollups_are_built_for_existing_books(self):
+        migrate(self.db, migrations=discover()[:5])
+        conn = sqlite3.connect(self.db)
+        conn.execute("INSERT INTO users (email, password_hash, created_at) VALUES ('a@b.com', 'x', '2024-01-01')")
+        conn.executemany(
+            "INSERT INTO books (user_id, title, author, status, rating, page_count, date_added, date_finished) "
+            "VALUES (1, ?, 'Herbert', ?, ?, 100, '2024-01-01', ?)",
+            [("A", "finished", 4, "2024-03-02"), ("B", "finished", None, "2024-03-20"), ("C", "reading", None, None)],
+        )
+        conn.commit()
+        conn.close()
+        migrate(self.db)
+        conn = sqlite3.connect(self.db)
+        rollups = conn.execute(
+            "SELECT granularity, period, books_finished, pages_finished, rating_sum, rating_count "
+            "FROM reading_rollups ORDER BY granularity"
+        ).fetchall()
+        authors = conn.execute("SELECT author, books_finished FROM author_rollups").fetchall()
+        conn.close()
+        self.assertEqual(rollups, [("month", "2024-03", 2, 200, 4, 1), ("year", "2024", 2, 200, 4, 1)])
+        self.assertEqual(authors, [("Herbert", 2)])
+
+    def test_title_trigrams_are_built_for_existing_books(self):
+        migrate(self.db, migrations=discover()[:8])
+        conn = sqlite3.connect(self.db)
+        conn.execute("INSERT INTO users (email, password_hash, created_at) VALUES ('a@b.com', 'x', '2024-01-01')")
+        conn.executemany(
+            "INSERT INTO books (user_id, title, author, status, date_added) VALUES (1, ?, 'Herbert', 'reading', '2024-01-01')",
+            [("Dune",), ("Dune Messiah",)],
+        )
+        conn.commit()
+        conn.close()
+        migrate(self.db)
+        conn = sqlite3.connect(self.db)
+        postings = conn.execute("SELECT book_id FROM title_trigrams WHERE trigram = 'dun' ORDER BY book_id").fetchall()
+        counts = dict(conn.execute("SELECT trigram, books FROM title_trigram_counts").fetchall())
+        conn.close()
+        self.assertEqual(postings, [(1,), (2,)])
+        self.assertEqual((counts["dun"], counts["mes"]), (2, 1))
+
+    def test_author_index_is_built_for_existing_books(self):
+        migrate(self.db, migrations=discover()[:9])
+        conn = sqlite3.connect(self.db)
+        conn.execute("INSERT INTO users (email, password_hash, created_at) VALUES ('a@b.com', 'x', '2024-01-01')")
+        conn.executemany(
+            "INSERT INTO books (user_id, title, author, status, date_added) VALUES (1, ?, ?, 'reading', '2024-01-01')",
+            [("Good Omens", "Terry Pratchett, Neil Gaiman"), ("Mort", "Terry Pratchett"), ("Mort 2", "terry pratchett")],
+        )
+        conn.commit()
+        conn.close()
+        migrate(self.db)
+        conn = sqlite3.connect(self.db)
+        counts = conn.execute("SELECT author_key, name, books FROM author_counts ORDER BY author_key").fetchall()
+        surnamed = conn.execute("SELECT book_id FROM book_author_suffixes WHERE suffix = 'pratchett'").fetchall()
+        conn.close()
+        self.assertEqual(counts, [("neil gaiman", "Neil Gaiman", 1), ("terry pratchett", "Terry Pratchett", 3)])
+        self.assertEqual(surnamed, [(1,), (2,), (3,)])
+
+    def test_failed_migration_rolls_back(self):
+        def boom(conn):
+            conn.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError("boom")
+
+        migrations = discover() + [Migration(len(discover()) + 1, "vXXXX_boom", "boom", boom)]
+        with self.assertRaises(MigrationError):
+            migrate(self.db, migrations=migrations)
+        self.assertNotIn("half_done", _tables(self.db))
+        self.assertEqual(current_version(self.db), discover()[-1].version)
+
+    def test_backfill_runs_in_batches_and_is_recorded(self):
+        migrate(self.db)
+        conn = sqlite3.connect(self.db)
+        conn.execute(
+            "INSERT INTO users (email, password_hash, created_at) VALUES ('a@b.com', 'x', '2024-01-01')"
+        )
+        conn.executemany(
+            "INSERT INTO books (user_id, title, author, status, date_added) VALUES (1, ?, 'A', 'reading', '2024-01-01')",
+            [(f"Book {i}",) for i in range(25)],
+        )
+        conn.commit()
+        conn.close()
+
+        batch_sizes = []
+
+        def upgrade(conn):
+            conn.execute("ALTER TABLE books ADD COLUMN title_upper TEXT")
+
+        def backfill(batches):
+            def apply(conn, rows):
+                batch_sizes.append(len(rows))
+                conn.executemany(
+                    "UPDATE books SET title_upper = ? WHERE id = ?",
+                    [(r["title"].upper(), r["id"]) for r in rows],
+                )
+            batches.run(
+                "SELECT id, title FROM books WHERE id > ? AND title_upper IS NULL ORDER BY id LIMIT ?",
+                apply,
+            )
+
+        version = len(discover()) + 1
+        migrations = discover() + [Migration(version, "vXXXX_upper", "upper", upgrade, backfill)]
+        migrate(self.db, migrations=migrations, batch_size=10)
+
+        self.assertEqual(batch_sizes, [10, 10, 5])
+        conn = sqlite3.connect(self.db)
+        missing = conn.execute("SELECT COUNT(*) FROM books WHERE title_upper IS NULL").fetchone()[0]
+        done = conn.execute("SELECT backfill_done FROM schema_version WHERE version = ?", (version,)).fetchone()[0]
+        conn.close()
+        self.assertEqual(missing, 0)
+        self.assertEqual(done, 1)
+        self.assertEqual(migrate(self.db, migrations=migrations), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import sys, os, json, tempfile, unittest
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from app.database import get_db, init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.progress_repository import ProgressRepository
+from app.repositories.user_repository import UserRepository
+from app.services.progress_service import ProgressService
+
+DAY = 86400
+
+
+class TestProgressRoute(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.client = self.app.test_client()
+        self.headers = self._register("test@example.com")
+
+    def _register(self, email):
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": email, "password": "password123"}),
+            content_type="application/json",
+        )
+        return {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+    def _add(self, headers=None, **fields):
+        book = {"title": "Dune", "author": "Herbert", "status": "reading", "page_count": 400, **fields}
+        resp = self.client.post("/api/books", data=json.dumps(book), content_type="application/json",
+                                headers=headers or self.headers)
+        return resp.get_json()["id"]
+
+    def _progress(self, book_id, body, headers=None):
+        return self.client.post(f"/api/books/{book_id}/progress", data=json.dumps(body),
+                                content_type="application/json", headers=headers or self.headers)
+
+    def test_progress_updates_current_page_and_percent(self):
+        book_id = self._add()
+        self._progress(book_id, {"page": 50})
+        resp = self._progress(book_id, {"page": 100})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.get_json()["current_page"], resp.get_json()["percent_complete"]), (100, 25.0))
+        listed = self.client.get("/api/books", headers=self.headers).get_json()[0]
+        self.assertEqual((listed["current_page"], listed["percent_complete"]), (100, 25.0))
+
+    def test_progress_without_page_count_has_no_percent(self):
+        book_id = self._add(page_count=None)
+        resp = self._progress(book_id, {"page": 10})
+        self.assertEqual((resp.get_json()["current_page"], resp.get_json()["percent_complete"]), (10, None))
+
+    def test_rules(self):
+        book_id = self._add()
+        self.assertEqual(self._progress(book_id, {"page": 401}).status_code, 422)
+        self.assertEqual(self._progress(book_id, {"page": -1}).status_code, 400)
+        self.assertEqual(self._progress(book_id, {}).status_code, 400)
+        finished = self._add(status="want_to_read")
+        self.assertEqual(self._progress(finished, {"page": 1}).status_code, 422)
+        other = self._register("other@example.com")
+        self.assertEqual(self._progress(book_id, {"page": 1}, headers=other).status_code, 404)
+
+
+class TestProgressCompaction(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        init_db(self.db)
+        self.user_id = UserRepository(self.db).create("a@b.com", "password123").id
+        self.books = BookRepository(self.db)
+        self.book = self.books.create(Book(user_id=self.user_id, title="Dune", author="H",
+                                           status=ReadingStatus.READING, page_count=400, date_added=date.today()))
+        self.service = ProgressService(ProgressRepository(self.db), retention_days=7)
+        self.now = 100 * DAY + 3600
+
+    def _events(self):
+        with get_db(self.db) as conn:
+            return conn.execute("SELECT page FROM progress_events ORDER BY id").fetchall()
+
+    def _daily(self):
+        with get_db(self.db) as conn:
+            return [tuple(r) for r in conn.execute(
+                "SELECT book_id, day, start_page, end_page, updates FROM reading_progress_daily ORDER BY day"
+            )]
+
+    def test_rules_are_checked_by_the_write_itself(self):
+        book, recorded = self.books.record_progress(self.book.id, self.user_id, 401, self.now)
+        self.assertEqual((book.current_page, recorded), (None, False))
+        # A status change committed since the caller last read the book still counts.
+        self.books.update(self.book.id, self.user_id, {"status": "finished"})
+        book, recorded = self.books.record_progress(self.book.id, self.user_id, 10, self.now)
+        self.assertFalse(recorded)
+        self.assertEqual(book.status, ReadingStatus.FINISHED)
+        self.assertEqual(self._events(), [])
+        self.assertEqual(self.books.record_progress(999, self.user_id, 10, self.now), (None, False))
+
+    def test_old_events_fold_into_daily_rows(self):
+        day_80 = 80 * DAY
+        for offset, page in ((100, 10), (200, 30), (DAY + 5, 60), (DAY + 9, 80)):
+            self.books.record_progress(self.book.id, self.user_id, page, day_80 + offset)
+        self.books.record_progress(self.book.id, self.user_id, 120, self.now - DAY)  # inside retention
+
+        result = self.service.compact(now=self.now)
+        self.assertEqual(result, {"folded": 4, "dropped": 0})
+        self.assertEqual(self._daily(), [
+            (self.book.id, "1970-03-22", 10, 30, 2),
+            (self.book.id, "1970-03-23", 60, 80, 2),
+        ])
+        self.assertEqual([r[0] for r in self._events()], [120])
+        self.assertEqual(self.books.get_by_id(self.book.id, self.user_id).current_page, 120)
+
+    def test_compaction_resumes_a_partly_folded_day_and_drops_deleted_books(self):
+        repo = ProgressRepository(self.db)
+        for i, page in enumerate((5, 15, 25)):
+            self.books.record_progress(self.book.id, self.user_id, page, 80 * DAY + i)
+        gone = self.books.create(Book(user_id=self.user_id, title="Gone", author="H",
+                                      status=ReadingStatus.READING, date_added=date.today()))
+        self.books.record_progress(gone.id, self.user_id, 3, 80 * DAY + 10)
+        self.books.delete(gone.id, self.user_id)
+
+        self.assertEqual(repo.compact(before=90 * DAY, batch_size=2), {"folded": 3, "dropped": 1})
+        self.assertEqual(self._daily(), [(self.book.id, "1970-03-22", 5, 25, 3)])
+        self.assertEqual(self._events(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import sys, os, json, tempfile, threading, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from bench.fake_open_library import FakeOpenLibraryServer
+from app.repositories.rate_limit_repository import RateLimitRepository
+from app.utils.rate_limit import Limit, MemoryBuckets, RateLimiter, parse_limit, refill
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBuckets(unittest.TestCase):
+    def test_parse_limit(self):
+        self.assertEqual(parse_limit("10/minute"), Limit(10, 60))
+        self.assertEqual(parse_limit("1/day").period, 86400)
+        for bad in ("10", "ten/minute", "0/minute", "10/fortnight", "-1/second"):
+            with self.assertRaises(ValueError):
+                parse_limit(bad)
+
+    def test_refill_is_lazy_and_capped(self):
+        limit = Limit(10, 60)
+        self.assertAlmostEqual(refill(0, 0, 6, limit), 1.0)
+        self.assertEqual(refill(5, 0, 3600, limit), 10)
+        self.assertEqual(refill(5, 10, 5, limit), 5)  # clock went backwards
+
+    def test_bucket_spends_burst_then_refills(self):
+        clock = FakeClock()
+        limiter = RateLimiter({"search": Limit(3, 60)}, MemoryBuckets(), clock=clock)
+        decisions = [limiter.check("search", "user:1") for _ in range(4)]
+        self.assertEqual([d.allowed for d in decisions], [True, True, True, False])
+        self.assertEqual([d.remaining for d in decisions], [2, 1, 0, 0])
+        self.assertEqual(decisions[-1].retry_after, 20)
+        self.assertEqual(decisions[-1].reset, 60)
+
+        # Another key has its own bucket.
+        self.assertTrue(limiter.check("search", "user:2").allowed)
+
+        clock.now += 20
+        self.assertTrue(limiter.check("search", "user:1").allowed)
+        self.assertFalse(limiter.check("search", "user:1").allowed)
+        self.assertEqual(limiter.stats()["search"], {"allowed": 5, "limited": 2})
+
+    def test_unconfigured_limit_is_not_checked(self):
+        limiter = RateLimiter({}, MemoryBuckets())
+        self.assertIsNone(limiter.check("search", "user:1"))
+
+    def test_memory_buckets_evict_least_recently_used(self):
+        store = MemoryBuckets(max_keys=2)
+        limit = Limit(1, 60)
+        store.take("a", limit, 0)
+        store.take("b", limit, 0)
+        store.take("a", limit, 1)   # a is now the most recent
+        store.take("c", limit, 2)   # evicts b
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.evictions, 1)
+        self.assertTrue(store.take("b", limit, 3)[0])   # forgotten, starts full
+        self.assertFalse(store.take("c", limit, 3)[0])
+
+
+class TestSqliteBuckets(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mktemp(suffix=".ratelimit.db")
+        self.store = RateLimitRepository(self.path)
+
+    def test_matches_memory_buckets(self):
+        memory = MemoryBuckets()
+        limit = Limit(3, 30)
+        for now in (0, 0, 0, 0, 5, 9, 10, 10, 100, 100):
+            taken, tokens = self.store.take("k", limit, now)
+            expected_taken, expected_tokens = memory.take("k", limit, now)
+            self.assertEqual(taken, expected_taken)
+            self.assertAlmostEqual(tokens, expected_tokens)
+
+    def test_concurrent_takes_never_overspend(self):
+        limit = Limit(20, 3600)
+        taken = []
+
+        def worker():
+            for _ in range(10):
+                taken.append(self.store.take("shared", limit, 1000.0)[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(taken), 50)
+        self.assertEqual(sum(taken), 20)
+
+    def test_purge_drops_idle_buckets(self):
+        limit = Limit(1, 60)
+        self.store.take("old", limit, 0)
+        self.store.take("new", limit, 100)
+        self.assertEqual(self.store.purge(100, 60), 1)
+        self.assertFalse(self.store.take("new", limit, 100)[0])
+
+
+class TestRateLimitedRoutes(unittest.TestCase):
+    def _login(self, client, password="password123"):
+        return client.post(
+            "/api/auth/login",
+            data=json.dumps({"email": "test@example.com", "password": password}),
+            content_type="application/json",
+        )
+
+    def _register(self, client, email="test@example.com"):
+        return client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": email, "password": "password123"}),
+            content_type="application/json",
+        ).get_json()["token"]
+
+    def test_login_is_limited_per_address(self):
+        app = make_app(RATE_LIMIT_LOGIN="2/minute")
+        client = app.test_client()
+        self._register(client)
+
+        first = self._login(client)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers["RateLimit-Limit"], "2")
+        self.assertEqual(first.headers["RateLimit-Remaining"], "1")
+        self.assertEqual(self._login(client, password="wrong-password").status_code, 401)
+
+        limited = self._login(client)
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(limited.get_json(), {"error": "Too many requests. Try again later."})
+        self.assertEqual(limited.headers["Retry-After"], "30")
+        self.assertEqual(limited.headers["RateLimit-Remaining"], "0")
+        self.assertIn("Retry-After", limited.headers["Access-Control-Expose-Headers"])
+
+        other = client.post(
+            "/api/auth/login",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+            environ_base={"REMOTE_ADDR": "10.0.0.2"},
+        )
+        self.assertEqual(other.status_code, 200)
+        self.assertEqual(app.extensions["metrics"]["rate_limit"]()["login"], {"allowed": 3, "limited": 1})
+
+    def test_search_is_limited_per_user(self):
+        fake_ol = FakeOpenLibraryServer().start()
+        self.addCleanup(fake_ol.stop)
+        app = make_app(RATE_LIMIT_SEARCH="1/hour", OPEN_LIBRARY_URL=fake_ol.url)
+        client = app.test_client()
+        alice = self._register(client, "alice@example.com")
+        bob = self._register(client, "bob@example.com")
+
+        def search(token):
+            return client.get("/api/search?q=dune", headers={"Authorization": f"Bearer {token}"})
+
+        self.assertEqual(search(alice).status_code, 200)
+        limited = search(alice)
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(limited.headers["Retry-After"], "3600")
+        self.assertEqual(fake_ol.requests, 1)  # the limited search never went upstream
+        self.assertEqual(search(bob).status_code, 200)
+
+        # Unauthenticated requests are rejected before they take a token.
+        self.assertEqual(client.get("/api/search?q=dune").status_code, 401)
+
+    def test_shared_sqlite_storage(self):
+        db_path = tempfile.mktemp(suffix=".db")
+        app = make_app(db_path, RATE_LIMIT_LOGIN="1/minute", RATE_LIMIT_STORAGE="sqlite")
+        other_worker = make_app(db_path, RATE_LIMIT_LOGIN="1/minute", RATE_LIMIT_STORAGE="sqlite")
+        self._register(app.test_client())
+        self.assertTrue(os.path.exists(db_path.replace(".db", ".ratelimit.db")))
+        self.assertEqual(self._login(app.test_client()).status_code, 200)
+        self.assertEqual(self._login(other_worker.test_client()).status_code, 429)
+
+    def test_disabled(self):
+        app = make_app(RATE_LIMIT_ENABLED=False, RATE_LIMIT_LOGIN="1/minute")
+        client = app.test_client()
+        self._register(client)
+        self.assertNotIn("rate_limiter", app.extensions)
+        for _ in range(3):
+            resp = self._login(client)
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotIn("RateLimit-Limit", resp.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
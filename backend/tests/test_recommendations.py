@@ -0,0 +1,139 @@
+import sys, os, json, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from app.services.recommendation_service import weight
+from app.utils.cooccurrence import build_matrix, top_neighbors
+
+DUNE, HOBBIT, EMMA, NEURO = "9780441013593", "9780547928227", "9780141439587", "9780441569595"
+
+
+class TestCooccurrence(unittest.TestCase):
+    def setUp(self):
+        entries = [
+            ("u1", "a", 1.0), ("u1", "b", 1.0),
+            ("u2", "a", 1.0), ("u2", "b", 1.0), ("u2", "c", 1.0),
+            ("u3", "a", 1.0), ("u3", "c", 0.5),
+            ("u4", "d", 1.0),
+        ]
+        self.matrix = build_matrix(entries)
+
+    def test_cosine_scores_and_support(self):
+        neighbors = top_neighbors(self.matrix, k=5)
+        (b, score_b, support_b), (c, score_c, support_c) = neighbors["a"]
+        self.assertEqual((b, support_b, c, support_c), ("b", 2, "c", 2))
+        self.assertAlmostEqual(score_b, 2 / (3 ** 0.5 * 2 ** 0.5))
+        self.assertAlmostEqual(score_c, 1.5 / (3 ** 0.5 * 1.25 ** 0.5))
+        self.assertNotIn("d", neighbors)  # nobody else read it
+
+    def test_min_support_and_k(self):
+        neighbors = top_neighbors(self.matrix, k=1, min_support=2)
+        self.assertEqual([n for n, _, _ in neighbors["a"]], ["b"])
+        self.assertEqual([n for n, _, _ in top_neighbors(self.matrix, k=5, min_support=2)["b"]], ["a"])
+
+    def test_process_pool_matches_single_process(self):
+        self.assertEqual(top_neighbors(self.matrix, k=5, workers=2), top_neighbors(self.matrix, k=5))
+
+    def test_max_items_per_user_keeps_heaviest(self):
+        m = build_matrix([("u", "a", 0.1), ("u", "b", 1.0), ("u", "c", 0.5)], max_items_per_user=2)
+        self.assertEqual(sorted(m.items[i] for i in m.user_items), ["b", "c"])
+
+    def test_weight(self):
+        self.assertEqual(weight("finished", None), 1.0)
+        self.assertAlmostEqual(weight("finished", 5), 5 / 3)
+        self.assertLess(weight("abandoned", None), weight("want_to_read", None))
+
+
+class TestRecommendationsRoute(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.client = self.app.test_client()
+        self.service = self.app.extensions["recommendation_service"]
+
+    def _register(self, email):
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": email, "password": "password123"}),
+            content_type="application/json",
+        )
+        return {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+    def _add(self, headers, isbn, title, status="finished", **fields):
+        book = {"title": title, "author": "Someone", "status": status, "isbn": isbn, **fields}
+        resp = self.client.post("/api/books", data=json.dumps(book), content_type="application/json", headers=headers)
+        return resp.get_json()["id"]
+
+    def _seed(self):
+        for n in range(3):
+            h = self._register(f"reader{n}@example.com")
+            self._add(h, DUNE, "Dune")
+            self._add(h, HOBBIT, "The Hobbit")
+            if n < 2:
+                self._add(h, NEURO, "Neuromancer", status="reading")
+        h = self._register("loner@example.com")
+        self._add(h, DUNE, "Dune")
+        self._add(h, EMMA, "Emma")  # one co-reader: below min_support
+
+    def test_rebuild_and_lookup(self):
+        self.app.extensions["catalog_service"].record_search_results(
+            [{"isbn": HOBBIT, "ol_work_id": "OL27482W", "title": "The Hobbit", "author": "J.R.R. Tolkien"}]
+        )
+        self._seed()
+        result = self.service.rebuild(workers=1)
+        self.assertEqual((result["library_entries"], result["isbns"]), (10, 4))
+
+        me = self._register("me@example.com")
+        book_id = self._add(me, DUNE, "Dune")
+        resp = self.client.get(f"/api/books/{book_id}/recommendations", headers=me)
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual((body["book_id"], body["isbn"]), (book_id, DUNE))
+        recs = body["recommendations"]
+        self.assertEqual([r["isbn"] for r in recs], [HOBBIT, NEURO])
+        self.assertEqual((recs[0]["title"], recs[0]["co_readers"]), ("The Hobbit", 3))
+        # Display fields come from the catalog only, never from what readers typed.
+        self.assertEqual((recs[1]["title"], recs[1]["author"]), (None, None))
+        self.assertGreater(recs[0]["score"], recs[1]["score"])
+
+        # Books already in the library are filtered out at request time.
+        self._add(me, HOBBIT, "The Hobbit")
+        recs = self.client.get(f"/api/books/{book_id}/recommendations?limit=5", headers=me).get_json()
+        self.assertEqual([r["isbn"] for r in recs["recommendations"]], [NEURO])
+
+    def test_rebuild_replaces_previous_neighbors(self):
+        self._seed()
+        self.service.rebuild(workers=1)
+        self.service.min_support = 10
+        self.assertEqual(self.service.rebuild(workers=1)["rows"], 0)
+
+    def test_sharded_rebuild_writes_every_shard(self):
+        self.app = make_app(SHARD_COUNT=2)
+        self.client = self.app.test_client()
+        self.service = self.app.extensions["recommendation_service"]
+        self._seed()
+        self.assertEqual(self.service.rebuild(workers=1)["library_entries"], 10)
+        for n in range(2):  # consecutive user ids land on different shards
+            me = self._register(f"me{n}@example.com")
+            book_id = self._add(me, HOBBIT, "The Hobbit")
+            recs = self.client.get(f"/api/books/{book_id}/recommendations", headers=me).get_json()
+            self.assertEqual(recs["recommendations"][0]["isbn"], DUNE)
+
+    def test_book_without_isbn_has_no_recommendations(self):
+        me = self._register("me@example.com")
+        resp = self.client.post("/api/books", data=json.dumps({"title": "Notes", "author": "Me", "status": "reading"}),
+                                content_type="application/json", headers=me)
+        body = self.client.get(f"/api/books/{resp.get_json()['id']}/recommendations", headers=me).get_json()
+        self.assertEqual((body["isbn"], body["recommendations"]), (None, []))
+
+    def test_errors(self):
+        me = self._register("me@example.com")
+        self.assertEqual(self.client.get("/api/books/999/recommendations", headers=me).status_code, 404)
+        book_id = self._add(me, DUNE, "Dune")
+        self.assertEqual(self.client.get(f"/api/books/{book_id}/recommendations?limit=0", headers=me).status_code, 400)
+        self.assertEqual(self.client.get(f"/api/books/{book_id}/recommendations?limit=x", headers=me).status_code, 400)
+        other = self._register("other@example.com")
+        self.assertEqual(self.client.get(f"/api/books/{book_id}/recommendations", headers=other).status_code, 404)
+        self.assertEqual(self.client.get(f"/api/books/{book_id}/recommendations").status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,6 @@
 import sys, os, json, unittest
+from datetime import date, timedelta
+from unittest.mock import patch
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 from tests.conftest import make_app
 
@@ -139,6 +141,294 @@ class TestBookRoutes(unittest.TestCase):
         self.assertEqual(len(books), 1)
         self.assertEqual(books[0]["status"], "reading")
 
+    def test_sort_by_title(self):
+        for title in ["banana", "Apple", "cherry"]:
+            self._post_book({"title": title, "author": "X", "status": "reading"})
+        resp = self.client.get("/api/books?sort=title", headers=self._auth())
+        self.assertEqual([b["title"] for b in resp.get_json()], ["Apple", "banana", "cherry"])
+        resp = self.client.get("/api/books?sort=title&order=desc", headers=self._auth())
+        self.assertEqual([b["title"] for b in resp.get_json()], ["cherry", "banana", "Apple"])
+
+    def test_filter_by_min_rating_and_finish_range(self):
+        self._post_book({"title": "A", "author": "X", "status": "finished", "rating": 5, "date_finished": "2024-03-01"})
+        self._post_book({"title": "B", "author": "X", "status": "finished", "rating": 2, "date_finished": "2024-05-01"})
+        self._post_book({"title": "C", "author": "X", "status": "finished", "rating": 4, "date_finished": "2023-12-01"})
+        resp = self.client.get("/api/books?min_rating=4&sort=rating", headers=self._auth())
+        self.assertEqual([b["title"] for b in resp.get_json()], ["A", "C"])
+        resp = self.client.get(
+            "/api/books?finished_after=2024-01-01&finished_before=2024-12-31&sort=date_finished&order=asc",
+            headers=self._auth(),
+        )
+        self.assertEqual([b["title"] for b in resp.get_json()], ["A", "B"])
+
+    def test_invalid_sort_returns_400(self):
+        resp = self.client.get("/api/books?sort=pages", headers=self._auth())
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("errors", resp.get_json())
+
+    # ── Columnar listing ──────────────────────────────────────────
+
+    @staticmethod
+    def _decode_columnar(body):
+        """The frontend's decodeColumnar, in Python."""
+        epoch = date.fromisoformat(body["date_epoch"])
+        columns = dict(body["columns"])
+        columns["status"] = [body["dictionaries"]["status"][code] for code in columns["status"]]
+        for field in ("date_added", "date_finished"):
+            columns[field] = [None if d is None else (epoch + timedelta(days=d)).isoformat() for d in columns[field]]
+        return [{name: values[i] for name, values in columns.items()} for i in range(body["count"])]
+
+    def test_columnar_listing_decodes_to_the_rows(self):
+        dune = self._post_book({"title": "Dune", "author": "Herbert", "status": "finished", "rating": 5,
+                                "date_added": "1969-07-20", "date_finished": "2024-02-29", "isbn": "9780441172719"})
+        reading = self._post_book({"title": "Emma", "author": "Austen", "status": "reading", "page_count": 300}).get_json()
+        self.client.post(f"/api/books/{reading['id']}/progress", data=json.dumps({"page": 100}),
+                         content_type="application/json", headers=self._auth())
+        self.client.post("/api/books/tag", data=json.dumps({"tags": ["Classics", "owned"], "book_ids": [reading["id"]]}),
+                         content_type="application/json", headers=self._auth())
+        self.client.post("/api/books/tag", data=json.dumps({"tags": ["owned"], "book_ids": [dune.get_json()["id"]]}),
+                         content_type="application/json", headers=self._auth())
+        self._post_book({"title": "Mort", "author": "Pratchett", "status": "abandoned"})
+
+        for query in ("sort=title", "status=reading", "sort=date_finished&order=asc", "tags=owned"):
+            rows = self.client.get(f"/api/books?{query}", headers=self._auth())
+            # Tags are read for the listed ids, in chunks.
+            with patch("app.repositories.book_repository.IN_CHUNK", 1):
+                columnar = self.client.get(f"/api/books?{query}&format=columnar", headers=self._auth())
+            self.assertEqual(columnar.status_code, 200)
+            self.assertEqual(self._decode_columnar(columnar.get_json()), rows.get_json(), query)
+            self.assertEqual(columnar.headers["X-Library-Version"], rows.headers["X-Library-Version"])
+
+        body = self.client.get("/api/books?sort=title&format=columnar", headers=self._auth()).get_json()
+        self.assertEqual(body["columns"]["status"], [2, 1, 3])
+        self.assertEqual(body["columns"]["date_added"][0], -165)
+
+    def test_columnar_listing_when_empty_and_bad_format(self):
+        body = self.client.get("/api/books?format=columnar", headers=self._auth()).get_json()
+        self.assertEqual(body["count"], 0)
+        self.assertEqual(body["columns"]["id"], [])
+        self.assertEqual(self.client.get("/api/books?format=csv", headers=self._auth()).status_code, 400)
+
+    # ── Multi-get ─────────────────────────────────────────────────
+
+    def test_multi_get_keeps_requested_order_and_reports_missing(self):
+        ids = [self._post_book({"title": t, "author": "X", "status": "reading"}).get_json()["id"] for t in "ABC"]
+        resp = self.client.get(f"/api/books?ids={ids[2]},9999,{ids[0]},{ids[2]}", headers=self._auth())
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual([b["title"] for b in body["books"]], ["C", "A"])
+        self.assertEqual(body["not_found"], [9999])
+
+    def test_multi_get_never_returns_another_users_books(self):
+        mine = self._post_book().get_json()["id"]
+        other = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "other@example.com", "password": "password123"}),
+            content_type="application/json",
+        ).get_json()["token"]
+        resp = self.client.get(f"/api/books?ids={mine}", headers={"Authorization": f"Bearer {other}"})
+        self.assertEqual(resp.get_json(), {"books": [], "not_found": [mine]})
+
+    def test_multi_get_post_variant_chunks_long_lists(self):
+        ids = [self._post_book({"title": f"B{i}", "author": "X", "status": "reading"}).get_json()["id"] for i in range(5)]
+        with patch("app.repositories.book_repository.IN_CHUNK", 2):
+            resp = self.client.post("/api/books/lookup", data=json.dumps({"ids": ids[::-1] + [0xFFFF]}),
+                                    content_type="application/json", headers=self._auth())
+        body = resp.get_json()
+        self.assertEqual([b["id"] for b in body["books"]], ids[::-1])
+        self.assertEqual(body["not_found"], [0xFFFF])
+
+    def test_multi_get_validation(self):
+        for query in ("ids=", "ids=1,x", "ids=0", "ids=" + ",".join(str(i) for i in range(1, 1002)),
+                      "ids=%C2%B2", "ids=99999999999999999999", "ids=1&status=reading", "ids=1&format=columnar"):
+            self.assertEqual(self.client.get(f"/api/books?{query}", headers=self._auth()).status_code, 400, query)
+        for body in ({"ids": "1,2"}, {"ids": [1, True]}, {}, [], {"ids": [2 ** 70]}, {"ids": [2 ** 63]}):
+            resp = self.client.post("/api/books/lookup", data=json.dumps(body),
+                                    content_type="application/json", headers=self._auth())
+            self.assertEqual(resp.status_code, 400, body)
+
+    # ── Delta sync ────────────────────────────────────────────────
+
+    def _changes(self, since):
+        return self.client.get(f"/api/books/changes?since={since}", headers=self._auth())
+
+    def test_list_reports_library_version(self):
+        self._post_book()
+        resp = self.client.get("/api/books", headers=self._auth())
+        self.assertEqual(resp.headers["X-Library-Version"], "1")
+
+    def test_changes_since_zero_returns_everything(self):
+        self._post_book()
+        self._post_book({"title": "B", "author": "Y", "status": "reading"})
+        body = self._changes(0).get_json()
+        self.assertEqual(len(body["upserted"]), 2)
+        self.assertEqual(body["deleted"], [])
+        self.assertEqual(body["version"], 2)
+
+    def test_changes_only_returns_what_changed(self):
+        a = self._post_book().get_json()
+        b = self._post_book({"title": "B", "author": "Y", "status": "reading"}).get_json()
+        self._post_book({"title": "C", "author": "Z", "status": "reading"})
+        version = self._changes(0).get_json()["version"]
+
+        self.client.patch(
+            f"/api/books/{a['id']}", data=json.dumps({"notes": "x"}),
+            content_type="application/json", headers=self._auth(),
+        )
+        self.client.delete(f"/api/books/{b['id']}", headers=self._auth())
+
+        body = self._changes(version).get_json()
+        self.assertEqual([book["id"] for book in body["upserted"]], [a["id"]])
+        self.assertEqual(body["deleted"], [b["id"]])
+        self.assertEqual(body["version"], version + 2)
+        self.assertEqual(self._changes(body["version"]).get_json()["upserted"], [])
+
+    def test_changes_are_isolated_per_user(self):
+        self._post_book()
+        resp2 = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "other@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        token2 = resp2.get_json()["token"]
+        body = self.client.get("/api/books/changes?since=0", headers={"Authorization": f"Bearer {token2}"}).get_json()
+        self.assertEqual(body["upserted"], [])
+        self.assertEqual(body["version"], 0)
+
+    def test_changes_requires_since(self):
+        resp = self.client.get("/api/books/changes", headers=self._auth())
+        self.assertEqual(resp.status_code, 400)
+
+    def test_changes_past_purged_tombstones_reset(self):
+        from datetime import datetime, timezone
+        kept = self._post_book().get_json()
+        gone = self._post_book({"title": "B", "author": "Y", "status": "reading"}).get_json()
+        version = self._changes(0).get_json()["version"]
+        self.client.delete(f"/api/books/{gone['id']}", headers=self._auth())
+        after_delete = self._changes(version).get_json()["version"]
+
+        service = self.app.extensions["book_service"]
+        self.assertEqual(service.purge_tombstones(datetime.now(timezone.utc)), 0)
+        self.assertEqual(service.purge_tombstones(datetime.now(timezone.utc) + timedelta(days=31)), 1)
+
+        body = self._changes(version).get_json()
+        self.assertTrue(body["reset"])
+        self.assertEqual([book["id"] for book in body["upserted"]], [kept["id"]])
+        # Clients that synced after the purged delete are unaffected.
+        self.assertFalse(self._changes(after_delete).get_json()["reset"])
+
+    def test_purge_tombstones_command(self):
+        gone = self._post_book().get_json()
+        self.client.delete(f"/api/books/{gone['id']}", headers=self._auth())
+        self.app.extensions["book_service"].tombstone_retention_days = 0
+        result = self.app.test_cli_runner().invoke(args=["purge-tombstones"])
+        self.assertIn("Deleted 1 tombstones.", result.output)
+
+    # ── include=stats ─────────────────────────────────────────────
+
+    def test_create_with_stats_returns_book_and_stats(self):
+        resp = self.client.post(
+            "/api/books?include=stats",
+            data=json.dumps({"title": "Dune", "author": "Herbert", "status": "finished", "rating": 4}),
+            content_type="application/json",
+            headers=self._auth(),
+        )
+        self.assertEqual(resp.status_code, 201)
+        body = resp.get_json()
+        self.assertEqual(body["book"]["title"], "Dune")
+        self.assertEqual(body["stats"]["total"], 1)
+        self.assertEqual(body["stats"]["finished"], 1)
+
+    def test_update_and_delete_with_stats(self):
+        created = self._post_book().get_json()
+        resp = self.client.patch(
+            f"/api/books/{created['id']}?include=stats",
+            data=json.dumps({"status": "reading"}),
+            content_type="application/json",
+            headers=self._auth(),
+        )
+        self.assertEqual(resp.get_json()["stats"]["reading"], 1)
+
+        resp = self.client.delete(f"/api/books/{created['id']}?include=stats", headers=self._auth())
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()["stats"]["total"], 0)
+
+    def test_failed_write_with_stats_keeps_error_status(self):
+        resp = self.client.delete("/api/books/9999?include=stats", headers=self._auth())
+        self.assertEqual(resp.status_code, 404)
+
+    def test_unknown_include_returns_400(self):
+        resp = self.client.delete("/api/books/1?include=everything", headers=self._auth())
+        self.assertEqual(resp.status_code, 400)
+
+    # ── Batch ─────────────────────────────────────────────────────
+
+    def _batch(self, operations, **envelope):
+        return self.client.post(
+            "/api/books/batch",
+            data=json.dumps({"operations": operations, **envelope}),
+            content_type="application/json",
+            headers=self._auth(),
+        )
+
+    def test_batch_applies_operations_in_order(self):
+        existing = self._post_book().get_json()
+        resp = self._batch([
+            {"op": "create", "data": {"title": "A", "author": "X", "status": "reading"}},
+            {"op": "update", "id": existing["id"], "data": {"status": "finished", "rating": 5}},
+            {"op": "delete", "id": existing["id"]},
+        ])
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertTrue(body["committed"])
+        self.assertEqual([r["status"] for r in body["results"]], [201, 200, 204])
+        self.assertEqual(body["results"][1]["book"]["rating"], 5)
+        titles = [b["title"] for b in self.client.get("/api/books", headers=self._auth()).get_json()]
+        self.assertEqual(titles, ["A"])
+
+    def test_atomic_batch_rolls_back_on_failure(self):
+        resp = self._batch([
+            {"op": "create", "data": {"title": "A", "author": "X", "status": "reading"}},
+            {"op": "delete", "id": 9999},
+            {"op": "create", "data": {"title": "B", "author": "Y", "status": "reading"}},
+        ])
+        self.assertEqual(resp.status_code, 404)
+        body = resp.get_json()
+        self.assertFalse(body["committed"])
+        self.assertEqual([r["status"] for r in body["results"]], [424, 404, 424])
+        self.assertEqual(self.client.get("/api/books", headers=self._auth()).get_json(), [])
+        self.assertEqual(self.client.get("/api/books/changes?since=0", headers=self._auth()).get_json()["version"], 0)
+
+    def test_atomic_batch_with_invalid_operation_applies_nothing(self):
+        resp = self._batch([
+            {"op": "create", "data": {"title": "A", "author": "X", "status": "reading"}},
+            {"op": "create", "data": {"title": "", "author": "Y", "status": "reading"}},
+        ])
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual([r["status"] for r in resp.get_json()["results"]], [424, 400])
+        self.assertEqual(self.client.get("/api/books", headers=self._auth()).get_json(), [])
+
+    def test_best_effort_batch_keeps_successful_operations(self):
+        self._post_book({"title": "Dup", "author": "X", "status": "reading", "isbn": "9780441013593"})
+        resp = self._batch([
+            {"op": "create", "data": {"title": "A", "author": "X", "status": "reading"}},
+            {"op": "create", "data": {"title": "B", "author": "Y", "status": "reading", "isbn": "9780441013593"}},
+            {"op": "bogus"},
+            {"op": "create", "data": {"title": "C", "author": "Z", "status": "want_to_read", "rating": 3}},
+            {"op": "create", "data": {"title": "D", "author": "W", "status": "reading"}},
+        ], atomic=False)
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertTrue(body["committed"])
+        self.assertEqual([r["status"] for r in body["results"]], [201, 409, 400, 400, 201])
+        titles = {b["title"] for b in self.client.get("/api/books", headers=self._auth()).get_json()}
+        self.assertEqual(titles, {"Dup", "A", "D"})
+
+    def test_batch_size_is_bounded(self):
+        self.app.config["BATCH_MAX_OPERATIONS"] = 2
+        resp = self._batch([{"op": "delete", "id": 1}] * 3)
+        self.assertEqual(resp.status_code, 400)
+
 
 if __name__ == "__main__":
     unittest.main()
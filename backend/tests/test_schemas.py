@@ -1,6 +1,8 @@
 import sys, os, unittest
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-from app.schemas.schemas import validate_create_book, validate_update_book, validate_register, validate_login
+from app.schemas.schemas import validate_create_book, validate_update_book, validate_register, validate_login, validate_list_books
+from app.schemas import CREATE_BOOK, Field, Schema, validate_batch_operation, validate_batch_operations
+from app.schemas.engine import choice, text
 
 
 class TestValidateCreateBook(unittest.TestCase):
@@ -86,6 +88,86 @@ class TestValidateUpdateBook(unittest.TestCase):
         self.assertTrue(any("rating" in e.lower() for e in errors))
 
 
+class TestValidateListBooks(unittest.TestCase):
+
+    def test_defaults(self):
+        clean, errors = validate_list_books({})
+        self.assertEqual(errors, [])
+        self.assertEqual(clean["sort"], "date_added")
+        self.assertEqual(clean["order"], "desc")
+
+    def test_title_sort_defaults_to_ascending(self):
+        clean, errors = validate_list_books({"sort": "title"})
+        self.assertEqual(errors, [])
+        self.assertEqual(clean["order"], "asc")
+
+    def test_invalid_sort_and_order(self):
+        _, errors = validate_list_books({"sort": "pages", "order": "sideways"})
+        self.assertTrue(any("sort" in e for e in errors))
+        self.assertTrue(any("order" in e for e in errors))
+
+    def test_min_rating_parsed_and_bounded(self):
+        clean, errors = validate_list_books({"min_rating": "4"})
+        self.assertEqual(errors, [])
+        self.assertEqual(clean["min_rating"], 4)
+        _, errors = validate_list_books({"min_rating": "9"})
+        self.assertTrue(any("min_rating" in e for e in errors))
+        _, errors = validate_list_books({"min_rating": "high"})
+        self.assertTrue(any("min_rating" in e for e in errors))
+
+    def test_inverted_finish_range_rejected(self):
+        _, errors = validate_list_books({"finished_after": "2024-06-01", "finished_before": "2024-01-01"})
+        self.assertTrue(any("finished_after" in e for e in errors))
+
+    def test_invalid_status_rejected(self):
+        _, errors = validate_list_books({"status": "later"})
+        self.assertTrue(any("status" in e for e in errors))
+
+
+class TestSchemaEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = Schema([
+            Field("name", text("name", max_len=5, required=True), clean=str.strip),
+            Field("kind", choice("kind", ("a", "b"))),
+            Field("note", lambda v, kind: "note needs kind b." if v and kind != "b" else None, depends_on="kind"),
+        ])
+
+    def test_full_schema_returns_every_field(self):
+        self.assertEqual(self.schema.validate({"name": " Ann ", "kind": "a"}),
+                         ({"name": "Ann", "kind": "a", "note": None}, []))
+
+    def test_all_errors_reported_in_field_order(self):
+        clean, errors = self.schema.validate({"name": "toolong", "kind": ["a"], "note": "x"})
+        self.assertEqual(clean, {})
+        self.assertEqual(errors, ["name must be 5 characters or fewer.", "kind must be one of: a, b.",
+                                  "note needs kind b."])
+
+    def test_partial_schema_checks_only_present_fields(self):
+        partial = Schema(self.schema.fields, partial=True)
+        self.assertEqual(partial.validate({"kind": "b", "note": "x"}), ({"kind": "b", "note": "x"}, []))
+        self.assertEqual(partial.validate({}), ({}, []))
+
+    def test_validate_many_keeps_row_order(self):
+        rows = [{"title": "Dune", "author": "Herbert", "status": "reading"}, {"title": "X"}, "not a dict"]
+        results = CREATE_BOOK.validate_many(rows)
+        self.assertEqual([bool(errors) for _, errors in results], [False, True, True])
+        self.assertEqual(results[0], validate_create_book(rows[0]))
+        self.assertEqual(results[2], ({}, ["Request body must be a JSON object."]))
+
+    def test_batch_operations_match_one_at_a_time(self):
+        ops = [
+            {"op": "create", "data": {"title": "Dune", "author": "Herbert", "status": "finished", "rating": 5}},
+            {"op": "update", "id": 3, "data": {"rating": 4}},
+            {"op": "update", "id": 0, "data": {"title": " New "}},
+            {"op": "delete", "id": 7},
+            {"op": "create", "data": "nope"},
+            ["not", "an", "object"],
+        ]
+        self.assertEqual(validate_batch_operations(ops), [validate_batch_operation(op) for op in ops])
+        self.assertEqual(validate_batch_operations(ops)[3], ({"op": "delete", "id": 7}, []))
+
+
 class TestValidateAuth(unittest.TestCase):
 
     def test_valid_register(self):
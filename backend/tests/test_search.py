@@ -0,0 +1,67 @@
+import sys, os, json, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from bench.fake_open_library import FakeOpenLibraryServer
+
+
+class TestSearchRoute(unittest.TestCase):
+    def setUp(self):
+        self.fake_ol = FakeOpenLibraryServer().start()
+        self.addCleanup(self.fake_ol.stop)
+        self.app = make_app()
+        self.app.config["OPEN_LIBRARY_URL"] = self.fake_ol.url
+        self.client = self.app.test_client()
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        )
+        self.token = resp.get_json()["token"]
+
+    def _search(self, q):
+        return self.client.get(f"/api/search?q={q}", headers={"Authorization": f"Bearer {self.token}"})
+
+    def test_search_returns_normalised_results(self):
+        resp = self._search("dune")
+        self.assertEqual(resp.status_code, 200)
+        results = resp.get_json()["results"]
+        self.assertEqual(len(results), 8)
+        first = results[0]
+        self.assertEqual(len(first["isbn"]), 13)
+        self.assertTrue(first["cover_url"].startswith("https://covers.openlibrary.org/"))
+        self.assertEqual(self.fake_ol.requests, 1)
+
+    def test_search_results_seed_the_works_catalog(self):
+        first = self._search("dune").get_json()["results"][0]
+        work = self.app.extensions["catalog_service"].get_work(first["isbn"])
+        self.assertEqual(work.cover_url, first["cover_url"])
+        self.assertTrue(work.ol_work_id.startswith("OL"))
+
+        # Adding the book by ISBN alone picks up the canonical metadata.
+        resp = self.client.post(
+            "/api/books",
+            data=json.dumps({"title": first["title"], "author": "Someone", "status": "reading", "isbn": first["isbn"]}),
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        self.assertEqual(resp.get_json()["cover_url"], first["cover_url"])
+        self.assertEqual(resp.get_json()["page_count"], first["page_count"])
+        self.assertEqual(resp.get_json()["work_id"], work.id)
+
+    def test_search_upstream_failure_returns_503(self):
+        self.fake_ol.error_rate = 1.0
+        resp = self._search("dune")
+        self.assertEqual(resp.status_code, 503)
+
+    def test_search_missing_query_returns_400(self):
+        resp = self._search("")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.fake_ol.requests, 0)
+
+    def test_search_without_token_returns_401(self):
+        resp = self.client.get("/api/search?q=dune")
+        self.assertEqual(resp.status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
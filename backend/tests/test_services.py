@@ -1,11 +1,16 @@
-import sys, os, tempfile, unittest
+import sys, os, sqlite3, tempfile, unittest
 from datetime import date
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 from app.database import init_db
 from app.repositories.book_repository import BookRepository
 from app.repositories.user_repository import UserRepository
+from app.repositories.work_repository import WorkRepository
+from app.models.work import Work
 from app.services.book_service import BookService, BookNotFoundError, BookRuleViolation
+from app.services.catalog_service import CatalogService
 from app.services.auth_service import AuthService, AuthError
+from app.schemas.schemas import SORT_FIELDS
+from app.utils.event_bus import EventBus
 
 
 def make_services():
@@ -124,6 +129,54 @@ class TestBookService(unittest.TestCase):
         self.assertEqual(stats["finished"], 1)
         self.assertEqual(stats["total_pages"], 500)
 
+    def test_changes_paginate_in_sequence_order(self):
+        books = [self.svc.add_book(self.user_id, {**BOOK, "title": f"B{i}"}) for i in range(5)]
+        self.svc.delete_book(books[1].id, self.user_id)
+
+        page = self.svc.changes_since(self.user_id, since=0, limit=3)
+        self.assertTrue(page["has_more"])
+        # seq 2 (B1) was superseded by its tombstone at seq 6, so the first page is B0, B2, B3.
+        self.assertEqual([b.title for b in page["upserted"]], ["B0", "B2", "B3"])
+        self.assertEqual(page["version"], 4)
+
+        rest = self.svc.changes_since(self.user_id, since=page["version"], limit=3)
+        self.assertFalse(rest["has_more"])
+        self.assertEqual([b.title for b in rest["upserted"]], ["B4"])
+        self.assertEqual(rest["deleted"], [books[1].id])
+        self.assertEqual(rest["version"], 6)
+
+    def test_changes_from_the_future_force_a_reset(self):
+        self.svc.add_book(self.user_id, BOOK)
+        changes = self.svc.changes_since(self.user_id, since=99, limit=100)
+        self.assertTrue(changes["reset"])
+        self.assertEqual(len(changes["upserted"]), 1)
+
+    def test_failed_update_does_not_advance_version(self):
+        before = self.svc.library_version(self.user_id)
+        with self.assertRaises(BookNotFoundError):
+            self.svc.delete_book(999, self.user_id)
+        self.assertEqual(self.svc.library_version(self.user_id), before)
+
+    def test_batch_publishes_only_after_commit(self):
+        bus = EventBus()
+        svc = BookService(BookRepository(db_path=self.user_repo._router.db_path), events=bus)
+        sub = bus.subscribe(self.user_id)
+        ops = [
+            {"op": "create", "data": {**BOOK, "title": "A"}},
+            {"op": "delete", "id": 999},
+        ]
+        outcomes, committed = svc.apply_batch(self.user_id, ops, atomic=True)
+        self.assertFalse(committed)
+        self.assertIsInstance(outcomes[1].error, BookNotFoundError)
+        self.assertIsNone(sub.get(timeout=0.01))
+        self.assertEqual(svc.list_books(self.user_id), [])
+
+        outcomes, committed = svc.apply_batch(self.user_id, ops, atomic=False)
+        self.assertTrue(committed)
+        events = [sub.get(timeout=0.1) for _ in range(2)]
+        self.assertEqual([e.type for e in events], ["book_created", "stats"])
+        self.assertEqual(events[0].id, outcomes[0].book.change_seq)
+
     def test_stats_isolated_per_user(self):
         user2, _ = self.auth.register("other@example.com", "password123")
         self.svc.add_book(self.user_id, BOOK)
@@ -131,5 +184,155 @@ class TestBookService(unittest.TestCase):
         self.assertEqual(stats["total"], 0)
 
 
+class TestWorksCatalog(unittest.TestCase):
+    ISBN = "9780441013593"
+    COVER = "https://covers.openlibrary.org/b/id/1-M.jpg"
+
+    def setUp(self):
+        self.auth, self.svc, self.user_repo = make_services()
+        self.db = self.user_repo._router.db_path
+        self.alice = self.auth.register("alice@example.com", "password123")[0].id
+        self.bob = self.auth.register("bob@example.com", "password123")[0].id
+        # As a search result would have recorded it.
+        self.work = WorkRepository(self.db).upsert_many([Work(
+            isbn=self.ISBN, ol_work_id="OL893415W", title="Dune", author="Frank Herbert",
+            cover_url=self.COVER, page_count=412,
+        )])[0]
+
+    def _stored(self, book_id):
+        conn = sqlite3.connect(self.db)
+        try:
+            return conn.execute("SELECT cover_url, page_count, work_id FROM books WHERE id = ?", (book_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def test_same_isbn_shares_one_work_and_stores_no_copies(self):
+        data = {**BOOK, "isbn": self.ISBN, "cover_url": self.COVER, "page_count": 412}
+        a = self.svc.add_book(self.alice, data)
+        b = self.svc.add_book(self.bob, {**BOOK, "isbn": self.ISBN})
+        self.assertEqual(a.work_id, b.work_id)
+        self.assertEqual((b.cover_url, b.page_count), (self.COVER, 412))
+        self.assertEqual(self._stored(a.id), (None, None, a.work_id))
+        self.assertEqual(self._stored(b.id), (None, None, b.work_id))
+        self.assertEqual(self.svc.get_stats(self.bob)["total_pages"], 412)
+
+    def test_per_user_override_is_kept(self):
+        self.svc.add_book(self.alice, {**BOOK, "isbn": self.ISBN, "cover_url": self.COVER})
+        mine = self.svc.add_book(self.bob, {**BOOK, "isbn": self.ISBN, "cover_url": "https://example.com/c.jpg"})
+        self.assertEqual(mine.cover_url, "https://example.com/c.jpg")
+        updated = self.svc.update_book(mine.id, self.bob, {"cover_url": self.COVER})
+        self.assertEqual(updated.cover_url, self.COVER)
+        self.assertIsNone(self._stored(mine.id)[0])
+
+    def test_one_users_values_never_reach_another(self):
+        other = "9780000000002"
+        a = self.svc.add_book(self.alice, {**BOOK, "isbn": other, "cover_url": "https://example.com/a.jpg", "page_count": 99})
+        b = self.svc.add_book(self.bob, {**BOOK, "isbn": other})
+        self.assertIsNone(a.work_id)
+        self.assertEqual((b.cover_url, b.page_count), (None, None))
+
+        mine = self.svc.add_book(self.alice, {**BOOK, "isbn": self.ISBN})
+        theirs = self.svc.add_book(self.bob, {**BOOK, "isbn": self.ISBN})
+        self.svc.update_book(mine.id, self.alice, {"cover_url": "https://example.com/a.jpg", "page_count": 99})
+        seen = self.svc.get_book(theirs.id, self.bob)
+        self.assertEqual((seen.cover_url, seen.page_count), (self.COVER, 412))
+        self.assertEqual(self.svc.get_stats(self.bob)["total_pages"], 412)
+
+    def test_filling_a_catalog_gap_versions_the_books_that_inherit_it(self):
+        other = "9780000000002"
+        WorkRepository(self.db).upsert_many([Work(isbn=other, ol_work_id="OL1W", title="Dune", author="X")])
+        mine = self.svc.add_book(self.alice, {**BOOK, "isbn": other})
+        own = self.svc.add_book(self.bob, {**BOOK, "isbn": other, "cover_url": "https://example.com/b.jpg"})
+        versions = (self.svc.library_version(self.alice), self.svc.library_version(self.bob))
+        CatalogService(WorkRepository(self.db)).record_search_results(
+            [{"isbn": other, "title": "Dune", "author": "X", "cover_url": self.COVER}]
+        )
+        self.assertEqual(self.svc.library_version(self.alice), versions[0] + 1)
+        changed = self.svc.changes_since(self.alice, versions[0], 10)["upserted"]
+        self.assertEqual([(b.id, b.cover_url) for b in changed], [(mine.id, self.COVER)])
+        # Bob's own cover hides the catalog's, so nothing he sees changed.
+        self.assertEqual(self.svc.library_version(self.bob), versions[1])
+        self.assertEqual(self.svc.get_book(own.id, self.bob).cover_url, "https://example.com/b.jpg")
+
+    def test_clearing_a_field_hides_the_catalog_value(self):
+        mine = self.svc.add_book(self.alice, {**BOOK, "isbn": self.ISBN})
+        theirs = self.svc.add_book(self.bob, {**BOOK, "isbn": self.ISBN})
+        cleared = self.svc.update_book(mine.id, self.alice, {"cover_url": None, "page_count": None})
+        self.assertEqual((cleared.cover_url, cleared.page_count), (None, None))
+        self.assertEqual(self._stored(mine.id), ("", 0, self.work.id))
+        self.assertEqual(self.svc.get_stats(self.alice)["total_pages"], 0)
+        self.assertEqual(self.svc.get_book(theirs.id, self.bob).cover_url, self.COVER)
+
+        restored = self.svc.update_book(mine.id, self.alice, {"cover_url": self.COVER})
+        self.assertEqual(restored.cover_url, self.COVER)
+        self.assertIsNone(self._stored(mine.id)[0])
+
+    def test_changing_isbn_relinks_the_work(self):
+        book = self.svc.add_book(self.alice, {**BOOK, "page_count": 300})
+        self.assertIsNone(book.work_id)
+        updated = self.svc.update_book(book.id, self.alice, {"isbn": self.ISBN})
+        self.assertIsNotNone(updated.work_id)
+        self.assertEqual(updated.page_count, 300)
+        cleared = self.svc.update_book(book.id, self.alice, {"isbn": None})
+        self.assertIsNone(cleared.work_id)
+
+
+class TestListingQueryPlans(unittest.TestCase):
+    """Every supported sort/filter combination must be served by an index, never a temp B-tree sort."""
+
+    def setUp(self):
+        self.tmp = tempfile.mktemp(suffix=".db")
+        init_db(self.tmp)
+        self.repo = BookRepository(db_path=self.tmp)
+
+    def _plan(self, **filters):
+        query, params = self.repo._list_query(1, **filters)
+        conn = sqlite3.connect(self.tmp)
+        try:
+            return " | ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+        finally:
+            conn.close()
+
+    def _assert_indexed(self, **filters):
+        plan = self._plan(**filters)
+        self.assertNotIn("TEMP B-TREE", plan, filters)
+        self.assertIn("USING", plan, filters)
+
+    def test_every_sort_and_order_uses_an_index(self):
+        for sort in SORT_FIELDS:
+            for order in ("asc", "desc"):
+                self._assert_indexed(sort=sort, order=order)
+                self._assert_indexed(sort=sort, order=order, status="finished")
+                self._assert_indexed(sort=sort, order=order, author="herbert")
+
+    def test_listing_has_no_per_row_subquery(self):
+        # Tags are read for the whole result afterwards (BookRepository._to_books).
+        self.assertNotIn("CORRELATED", self._plan(sort="title", tags=("owned",)))
+
+    def test_author_filters_read_the_author_index(self):
+        for match, index in (("prefix", "book_author_suffixes USING PRIMARY KEY (user_id=? AND suffix"),
+                             ("exact", "book_authors USING PRIMARY KEY (user_id=? AND author_key")):
+            plan = self._plan(author="herbert", author_match=match)
+            self.assertIn("LIST SUBQUERY", plan)
+            self.assertIn(index, plan)
+
+    def test_tag_filters_read_the_tag_index(self):
+        for match in ("all", "any"):
+            for sort in SORT_FIELDS:
+                self._assert_indexed(sort=sort, tags=("sci-fi", "classics", "owned"), tags_match=match)
+            plan = self._plan(tags=("sci-fi", "classics"), tags_match=match)
+            self.assertIn("book_tags USING PRIMARY KEY (user_id=? AND tag_key=?)", plan)
+            self.assertIn("LIST SUBQUERY", plan)
+
+    def test_range_filters_on_their_sort_column_use_an_index(self):
+        for order in ("asc", "desc"):
+            self._assert_indexed(sort="date_finished", order=order, finished_after="2024-01-01")
+            self._assert_indexed(
+                sort="date_finished", order=order, finished_after="2024-01-01", finished_before="2024-12-31"
+            )
+            self._assert_indexed(sort="rating", order=order, min_rating=4)
+            self._assert_indexed(sort="rating", order=order, min_rating=4, status="finished")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,106 @@
+import sys, os, json, tempfile, unittest
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from app.database import SHARD_ID_BLOCK, ShardConfigError, get_db, init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.user_repository import UserRepository
+from app.repositories.work_repository import WorkRepository
+from app.models.work import Work
+from app.sharding import rebalance, shard_status
+
+BOOK = {"title": "Dune", "author": "Herbert", "status": "reading", "isbn": "9780441013593"}
+
+
+def _book(user_id, title, isbn=None):
+    return Book(user_id=user_id, title=title, author="A", isbn=isbn, status=ReadingStatus.READING, date_added=date.today())
+
+
+def _register(client, email):
+    resp = client.post(
+        "/api/auth/register",
+        data=json.dumps({"email": email, "password": "password123"}),
+        content_type="application/json",
+    )
+    return {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+
+class TestShardedApp(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        self.app = make_app(self.db, SHARD_COUNT=3)
+        self.client = self.app.test_client()
+
+    def test_users_are_spread_over_shards_and_see_only_their_books(self):
+        headers = [_register(self.client, f"u{i}@example.com") for i in range(3)]
+        ids = []
+        for i, h in enumerate(headers):
+            resp = self.client.post("/api/books", data=json.dumps({**BOOK, "title": f"Book {i}"}),
+                                    content_type="application/json", headers=h)
+            self.assertEqual(resp.status_code, 201)
+            ids.append(resp.get_json()["id"])
+        self.assertEqual(len(set(ids)), 3)  # ids unique across shards
+        self.assertEqual([s["users"] for s in shard_status(self.db)], [1, 1, 1])
+        for i, h in enumerate(headers):
+            books = self.client.get("/api/books", headers=h).get_json()
+            self.assertEqual([b["title"] for b in books], [f"Book {i}"])
+
+    def test_login_and_duplicate_email_go_through_the_directory(self):
+        _register(self.client, "a@example.com")
+        _register(self.client, "b@example.com")
+        resp = self.client.post("/api/auth/login", data=json.dumps({"email": "b@example.com", "password": "password123"}),
+                                content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+        resp = self.client.post("/api/auth/register", data=json.dumps({"email": "b@example.com", "password": "password123"}),
+                                content_type="application/json")
+        self.assertEqual(resp.status_code, 409)
+
+    def test_shard_count_must_match_the_layout(self):
+        with self.assertRaises(ShardConfigError):
+            init_db(self.db, shard_count=2)
+        with self.assertRaises(ShardConfigError):
+            init_db(self.db)
+
+
+class TestRebalance(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        init_db(self.db)
+        users = UserRepository(self.db)
+        books = BookRepository(self.db)
+        WorkRepository(self.db).upsert_many([Work(isbn="9780441013593", ol_work_id="OL893415W", title="Dune", author="Herbert")])
+        self.user_ids = [users.create(f"u{i}@example.com", "password123").id for i in range(4)]
+        self.book_ids = {}
+        for user_id in self.user_ids:
+            book = books.create(_book(user_id, f"Book {user_id}", isbn="9780441013593"))
+            books.delete(books.create(_book(user_id, "Gone")).id, user_id)
+            self.book_ids[user_id] = book.id
+
+    def test_split_and_fold_back_preserve_every_library(self):
+        self.assertEqual(rebalance(self.db, 2)["moved"], 2)
+        router = init_db(self.db, shard_count=2)
+        repo = BookRepository(router)
+        users = UserRepository(router)
+        for user_id in self.user_ids:
+            self.assertEqual(router.shard_for(user_id), user_id % 2)
+            self.assertEqual([b.id for b in repo.get_all(user_id)], [self.book_ids[user_id]])
+            self.assertEqual(len(repo.changes_since(user_id, 0, 10)["deleted"]), 1)
+            self.assertIsNotNone(users.verify_credentials(f"u{self.user_ids.index(user_id)}@example.com", "password123"))
+
+        # New users and books on the new shard don't collide with moved ones.
+        new_user = users.create("new@example.com", "password123")
+        self.assertGreater(new_user.id, max(self.user_ids))
+        book = repo.create(_book(self.user_ids[0], "After split"))
+        self.assertGreaterEqual(book.id, SHARD_ID_BLOCK * (self.user_ids[0] % 2))
+
+        rebalance(self.db, 1)
+        repo = BookRepository(init_db(self.db))
+        self.assertEqual(len(repo.get_all(self.user_ids[0])), 2)
+        self.assertEqual(sum(s["users"] for s in shard_status(self.db)), 5)
+        with get_db(self.db) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM works").fetchone()[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
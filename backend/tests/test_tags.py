@@ -0,0 +1,111 @@
+import sys, os, json, tempfile, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import make_app
+from app.database import get_db
+
+
+class TestTagRoutes(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        self.app = make_app(self.db)
+        self.client = self.app.test_client()
+        self.headers = self._register("test@example.com")
+
+    def _register(self, email):
+        resp = self.client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": email, "password": "password123"}),
+            content_type="application/json",
+        )
+        return {"Authorization": f"Bearer {resp.get_json()['token']}"}
+
+    def _add(self, title, headers=None):
+        book = {"title": title, "author": "Someone", "status": "want_to_read"}
+        resp = self.client.post("/api/books", data=json.dumps(book), content_type="application/json",
+                                headers=headers or self.headers)
+        return resp.get_json()["id"]
+
+    def _post(self, path, tags, book_ids, headers=None):
+        return self.client.post(path, data=json.dumps({"tags": tags, "book_ids": book_ids}),
+                                content_type="application/json", headers=headers or self.headers)
+
+    def _titles(self, query):
+        resp = self.client.get(f"/api/books?sort=title&{query}", headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        return [b["title"] for b in resp.get_json()]
+
+    def _tags(self):
+        return {t["name"]: t["books"] for t in self.client.get("/api/books/tags", headers=self.headers).get_json()["tags"]}
+
+    def _seed(self):
+        dune, hobbit, emma = self._add("Dune"), self._add("The Hobbit"), self._add("Emma")
+        self._post("/api/books/tag", ["Sci-Fi", "owned"], [dune])
+        self._post("/api/books/tag", ["Classics"], [hobbit, emma])
+        self._post("/api/books/tag", ["owned"], [hobbit])
+        return dune, hobbit, emma
+
+    def test_tag_returns_books_with_their_tags(self):
+        dune, hobbit = self._add("Dune"), self._add("The Hobbit")
+        resp = self._post("/api/books/tag", ["Sci-Fi", "favourites"], [dune, hobbit, 999999])
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual([b["id"] for b in body["updated"]], [dune, hobbit])
+        self.assertEqual(body["updated"][0]["tags"], ["favourites", "Sci-Fi"])
+        self.assertEqual(body["not_found"], [999999])
+        self.assertEqual(self.client.get(f"/api/books/{dune}", headers=self.headers).get_json()["tags"],
+                         ["favourites", "Sci-Fi"])
+
+    def test_filters_all_and_any(self):
+        self._seed()
+        self.assertEqual(self._titles("tags=owned"), ["Dune", "The Hobbit"])
+        self.assertEqual(self._titles("tags=owned,classics"), ["The Hobbit"])
+        self.assertEqual(self._titles("tags=sci-fi,classics&tags_match=any"), ["Dune", "Emma", "The Hobbit"])
+        self.assertEqual(self._titles("tags=owned&status=want_to_read&sort=title"), ["Dune", "The Hobbit"])
+        self.assertEqual(self._titles("tags=unknown"), [])
+
+    def test_counts_follow_tag_untag_and_delete(self):
+        dune, hobbit, emma = self._seed()
+        self.assertEqual(self._tags(), {"Classics": 2, "owned": 2, "Sci-Fi": 1})
+
+        # Re-tagging is a no-op; tag names match case-insensitively.
+        self.assertEqual(self._post("/api/books/tag", ["OWNED"], [dune]).get_json()["updated"], [])
+        resp = self._post("/api/books/untag", ["owned", "sci-fi"], [dune, emma])
+        self.assertEqual([b["tags"] for b in resp.get_json()["updated"]], [[]])
+        self.assertEqual(self._tags(), {"Classics": 2, "owned": 1})
+
+        self.client.delete(f"/api/books/{hobbit}", headers=self.headers)
+        self.assertEqual(self._tags(), {"Classics": 1})
+        with get_db(self.db) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM book_tags").fetchone()[0], 1)
+
+    def test_each_changed_book_gets_its_own_change_seq(self):
+        ids = [self._add(f"Book {i}") for i in range(3)]
+        before = self.client.get("/api/books/changes?since=0", headers=self.headers).get_json()["version"]
+        self._post("/api/books/tag", ["owned"], ids)
+        # Paging one change at a time walks the books one sequence number each.
+        seen, since = [], before
+        for _ in ids:
+            page = self.client.get(f"/api/books/changes?since={since}&limit=1", headers=self.headers).get_json()
+            self.assertEqual(page["version"], since + 1)
+            seen += [b["id"] for b in page["upserted"]]
+            since = page["version"]
+        self.assertEqual(seen, ids)
+
+    def test_other_users_books_are_not_tagged(self):
+        bob = self._register("bob@example.com")
+        theirs = self._add("Bob's book", headers=bob)
+        body = self._post("/api/books/tag", ["owned"], [theirs]).get_json()
+        self.assertEqual(body, {"updated": [], "not_found": [theirs]})
+        self.assertEqual(self._tags(), {})
+
+    def test_validation(self):
+        book = self._add("Dune")
+        for tags, ids in (([], [book]), (["a,b"], [book]), (["x" * 51], [book]), (["ok"], []),
+                          (["ok"], ["1"]), (["ok"], list(range(1, 1002)))):
+            self.assertEqual(self._post("/api/books/tag", tags, ids).status_code, 400, (tags, ids))
+        for query in ("tags=a&tags_match=some", "tags=" + ",".join(str(i) for i in range(21))):
+            self.assertEqual(self.client.get(f"/api/books?{query}", headers=self.headers).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import sys, os, json, sqlite3, tempfile, threading, unittest
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tests.conftest import METRICS_AUTH, make_app
+from app.database import get_db, init_db
+from app.models.book import Book, ReadingStatus
+from app.repositories.book_repository import BookRepository
+from app.repositories.user_repository import UserRepository
+from app.repositories.write_queue import WriteQueue
+
+
+def _book(user_id, title):
+    return Book(user_id=user_id, title=title, author="A", status=ReadingStatus.READING, date_added=date.today())
+
+
+class TestWriteQueue(unittest.TestCase):
+    def setUp(self):
+        self.db = tempfile.mktemp(suffix=".db")
+        init_db(self.db)
+        self.queue = WriteQueue(max_delay=0.05, max_batch=16)
+        self.addCleanup(self.queue.close)
+
+    def _insert(self, email):
+        return lambda conn: conn.execute(
+            "INSERT INTO users (email, password_hash, created_at) VALUES (?, 'x', '2024-01-01')", (email,)
+        ).lastrowid
+
+    def test_concurrent_jobs_share_one_commit(self):
+        futures = [self.queue.submit(self.db, self._insert(f"u{i}@example.com")) for i in range(10)]
+        self.assertEqual(sorted(f.result() for f in futures), list(range(1, 11)))
+        stats = self.queue.stats()
+        self.assertEqual((stats["jobs"], stats["batches"]), (10, 1))
+
+    def test_failing_job_is_rolled_back_alone(self):
+        ok = self.queue.submit(self.db, self._insert("a@example.com"))
+        dup = self.queue.submit(self.db, self._insert("a@example.com"))
+        other = self.queue.submit(self.db, self._insert("b@example.com"))
+        self.assertEqual(ok.result(), 1)
+        with self.assertRaises(sqlite3.IntegrityError):
+            dup.result()
+        self.assertEqual(other.result(), 2)
+        with get_db(self.db) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 2)
+
+    def test_repository_writes_go_through_the_queue(self):
+        users = UserRepository(self.db, write_queue=self.queue)
+        books = BookRepository(self.db, write_queue=self.queue)
+        user_id = users.create("a@example.com", "password123").id
+        created = []
+
+        def add(i):
+            created.append(books.create(_book(user_id, f"Book {i}")))
+
+        threads = [threading.Thread(target=add, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len({b.id for b in created}), 8)
+        self.assertEqual(sorted(b.change_seq for b in created), list(range(1, 9)))
+        self.assertEqual(books.update(created[0].id, user_id, {"title": "New"}).title, "New")
+        self.assertEqual(books.delete(created[0].id, user_id), 10)
+        self.assertLess(self.queue.stats()["batches"], self.queue.stats()["jobs"])
+
+
+class TestWriteQueueApp(unittest.TestCase):
+    def test_routes_work_with_group_commit_enabled(self):
+        app = make_app(WRITE_QUEUE_ENABLED=True)
+        client = app.test_client()
+        token = client.post(
+            "/api/auth/register",
+            data=json.dumps({"email": "test@example.com", "password": "password123"}),
+            content_type="application/json",
+        ).get_json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        book = {"title": "Dune", "author": "Herbert", "status": "reading", "isbn": "9780441013593"}
+        resp = client.post("/api/books", data=json.dumps(book), content_type="application/json", headers=headers)
+        self.assertEqual(resp.status_code, 201)
+        resp = client.post("/api/books", data=json.dumps(book), content_type="application/json", headers=headers)
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(client.get("/api/metrics", headers=METRICS_AUTH).get_json()["write_queue"]["jobs"], 2)  # register + create
+        app.extensions["write_queue"].close()
+
+
+if __name__ == "__main__":
+    unittest.main()
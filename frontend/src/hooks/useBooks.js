@@ -1,50 +1,148 @@
-import { useState, useEffect, useCallback } from "react";
-import { bookApi } from "../services/api";
+import { useState, useEffect, useCallback, useRef } from "react";
+import { bookApi, streamEvents } from "../services/api";
 
 export function useBooks(filters = {}) {
   const [books, setBooks] = useState([]);
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  // Library version the current list reflects; delta syncs start from here.
+  const versionRef = useRef(null);
+
+  const advanceVersion = (version) => {
+    if (version != null && (versionRef.current == null || version > versionRef.current)) {
+      versionRef.current = version;
+    }
+  };
 
   const load = useCallback(async () => {
     setLoading(true);
     setError(null);
     const [booksRes, statsRes] = await Promise.all([bookApi.list(filters), bookApi.stats()]);
     if (booksRes.error) setError(booksRes.error);
-    else setBooks(booksRes.data || []);
+    else {
+      setBooks(booksRes.data || []);
+      const version = booksRes.headers?.get("X-Library-Version");
+      versionRef.current = version != null ? Number(version) : null;
+    }
     if (statsRes.data) setStats(statsRes.data);
     setLoading(false);
   }, [JSON.stringify(filters)]); // eslint-disable-line
 
   useEffect(() => { load(); }, [load]);
 
+  // Merge upserted books and deleted ids into the list, respecting the status filter.
+  const applyChanges = useCallback((upserted, deleted) => {
+    const matches = (b) => !filters.status || b.status === filters.status;
+    const gone = new Set(deleted);
+    const updated = new Map(upserted.map((b) => [b.id, b]));
+    setBooks((prev) => {
+      const known = new Set(prev.map((b) => b.id));
+      const kept = prev
+        .filter((b) => !gone.has(b.id))
+        .map((b) => updated.get(b.id) || b)
+        .filter(matches);
+      const added = upserted.filter((b) => !known.has(b.id) && matches(b));
+      return [...added, ...kept];
+    });
+  }, [JSON.stringify(filters)]); // eslint-disable-line
+
+  // Pull only what changed elsewhere (other tabs/devices) since the last sync.
+  const sync = useCallback(async () => {
+    if (versionRef.current == null) return;
+    let changed = false;
+    for (;;) {
+      const { data, error } = await bookApi.changes(versionRef.current);
+      if (error || !data) return;
+      if (data.reset) return load();
+      if (data.upserted.length || data.deleted.length) {
+        changed = true;
+        applyChanges(data.upserted, data.deleted);
+      }
+      versionRef.current = data.version;
+      if (!data.has_more) break;
+    }
+    if (changed) await refreshStats();
+  }, [load, applyChanges]); // eslint-disable-line
+
+  useEffect(() => {
+    const onVisible = () => { if (document.visibilityState === "visible") sync(); };
+    window.addEventListener("focus", sync);
+    document.addEventListener("visibilitychange", onVisible);
+    return () => {
+      window.removeEventListener("focus", sync);
+      document.removeEventListener("visibilitychange", onVisible);
+    };
+  }, [sync]);
+
+  // Live updates pushed by the server; reconnects resume from the last seen version.
+  const handleEvent = useCallback((event) => {
+    switch (event.type) {
+      case "book_created":
+      case "book_updated":
+        applyChanges([event.data], []);
+        break;
+      case "book_deleted":
+        applyChanges([], [event.data.id]);
+        break;
+      case "sync":
+        if (event.data.reset) { load(); return; }
+        applyChanges(event.data.upserted, event.data.deleted);
+        break;
+      case "stats":
+        setStats(event.data);
+        break;
+      default:
+        break;
+    }
+    advanceVersion(event.id);
+  }, [load, applyChanges]);
+
+  useEffect(() => {
+    const controller = new AbortController();
+    let delay = 1000;
+    (async () => {
+      while (!controller.signal.aborted) {
+        try {
+          await streamEvents({ lastEventId: versionRef.current, onEvent: handleEvent, signal: controller.signal });
+          delay = 1000;
+        } catch {
+          if (controller.signal.aborted) return;
+          delay = Math.min(delay * 2, 30000);
+        }
+        await new Promise((r) => setTimeout(r, delay));
+      }
+    })();
+    return () => controller.abort();
+  }, [handleEvent]);
+
   const refreshStats = async () => {
     const { data } = await bookApi.stats();
     if (data) setStats(data);
   };
 
   const addBook = async (data) => {
-    const { data: book, error } = await bookApi.create(data);
+    const { data: res, error } = await bookApi.create(data);
     if (error) return { error };
-    setBooks((p) => [book, ...p]);
-    await refreshStats();
-    return { data: book };
+    // The live stream may already have delivered this book.
+    setBooks((p) => [res.book, ...p.filter((b) => b.id !== res.book.id)]);
+    setStats(res.stats);
+    return { data: res.book };
   };
 
   const updateBook = async (id, data) => {
-    const { data: book, error } = await bookApi.update(id, data);
+    const { data: res, error } = await bookApi.update(id, data);
     if (error) return { error };
-    setBooks((p) => p.map((b) => (b.id === id ? book : b)));
-    await refreshStats();
-    return { data: book };
+    setBooks((p) => p.map((b) => (b.id === id ? res.book : b)));
+    setStats(res.stats);
+    return { data: res.book };
   };
 
   const deleteBook = async (id) => {
-    const { error } = await bookApi.delete(id);
+    const { data: res, error } = await bookApi.delete(id);
     if (error) return { error };
     setBooks((p) => p.filter((b) => b.id !== id));
-    await refreshStats();
+    setStats(res.stats);
     return {};
   };
 
@@ -8,14 +8,21 @@
 const BASE = "http://localhost:5000/api";
 
 async function request(path, options = {}, auth = true) {
-  const headers = { "Content-Type": "application/json" };
+  const headers = { "Content-Type": "application/json", ...options.headers };
   if (auth) {
     const token = localStorage.getItem("token");
     if (token) headers["Authorization"] = `Bearer ${token}`;
   }
 
   try {
-    const res = await fetch(`${BASE}${path}`, { ...options, headers });
+    let res;
+    try {
+      res = await fetch(`${BASE}${path}`, { ...options, headers });
+    } catch (err) {
+      // A keyed write is safe to resend: the server replays the first response.
+      if (!headers["Idempotency-Key"]) throw err;
+      res = await fetch(`${BASE}${path}`, { ...options, headers });
+    }
     if (res.status === 204) return { data: null, error: null };
 
     const body = await res.json();
@@ -23,7 +30,7 @@ async function request(path, options = {}, auth = true) {
       const message = body.errors ? body.errors.join(" • ") : body.error || `HTTP ${res.status}`;
       return { data: null, error: message };
     }
-    return { data: body, error: null };
+    return { data: body, error: null, headers: res.headers };
   } catch {
     return { data: null, error: "Cannot reach server. Is the backend running?" };
   }
@@ -35,18 +42,93 @@ export const authApi = {
   me: () => request("/auth/me"),
 };
 
+/**
+ * Turn a GET /books?format=columnar body back into the usual book objects:
+ * status codes index into dictionaries.status, dates are days since date_epoch.
+ */
+export function decodeColumnar({ count, columns, dictionaries, date_epoch }) {
+  const epoch = Date.parse(`${date_epoch}T00:00:00Z`);
+  const toDate = (days) => (days === null ? null : new Date(epoch + days * 86400000).toISOString().slice(0, 10));
+  const decoded = {
+    ...columns,
+    status: columns.status.map((code) => dictionaries.status[code]),
+    date_added: columns.date_added.map(toDate),
+    date_finished: columns.date_finished.map(toDate),
+  };
+  const names = Object.keys(decoded);
+  const books = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const book = {};
+    for (const name of names) book[name] = decoded[name][i];
+    books[i] = book;
+  }
+  return books;
+}
+
 export const bookApi = {
-  list: (params = {}) => {
-    const qs = new URLSearchParams(Object.fromEntries(Object.entries(params).filter(([, v]) => v))).toString();
-    return request(`/books${qs ? `?${qs}` : ""}`);
+  // Fetched columnar (no repeated key names) and decoded to rows here.
+  list: async (params = {}) => {
+    const query = { ...Object.fromEntries(Object.entries(params).filter(([, v]) => v)), format: "columnar" };
+    const res = await request(`/books?${new URLSearchParams(query).toString()}`);
+    return res.data ? { ...res, data: decodeColumnar(res.data) } : res;
   },
   get: (id) => request(`/books/${id}`),
+  // Several books in one request: {books (in the order asked), not_found}.
+  getMany: (ids) =>
+    ids.length <= 100
+      ? request(`/books?ids=${ids.join(",")}`)
+      : request("/books/lookup", { method: "POST", body: JSON.stringify({ ids }) }),
   stats: () => request("/books/stats"),
-  create: (data) => request("/books", { method: "POST", body: JSON.stringify(data) }),
-  update: (id, data) => request(`/books/${id}`, { method: "PATCH", body: JSON.stringify(data) }),
-  delete: (id) => request(`/books/${id}`, { method: "DELETE" }),
+  changes: (since, limit) => request(`/books/changes?since=${since}${limit ? `&limit=${limit}` : ""}`),
+  // Writes return {book?, stats}: the stats are read in the same transaction,
+  // so callers don't need a follow-up stats() request.
+  create: (data, key = crypto.randomUUID()) =>
+    request("/books?include=stats", { method: "POST", body: JSON.stringify(data), headers: { "Idempotency-Key": key } }),
+  update: (id, data) => request(`/books/${id}?include=stats`, { method: "PATCH", body: JSON.stringify(data) }),
+  delete: (id) => request(`/books/${id}?include=stats`, { method: "DELETE" }),
 };
 
 export const searchApi = {
   search: (q) => request(`/search?q=${encodeURIComponent(q)}`),
 };
+
+/**
+ * Open the live event stream (Server-Sent Events over fetch, so the JWT
+ * travels in a header rather than the URL). Resolves when the server ends
+ * the stream; rejects on network/HTTP errors. Callers reconnect, passing
+ * the last event id they saw so the server replays the gap.
+ */
+export async function streamEvents({ lastEventId, onEvent, signal }) {
+  const headers = {};
+  const token = localStorage.getItem("token");
+  if (token) headers["Authorization"] = `Bearer ${token}`;
+  if (lastEventId != null) headers["Last-Event-ID"] = String(lastEventId);
+
+  const res = await fetch(`${BASE}/books/events`, { headers, signal });
+  if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      const event = { type: "message", id: null, data: "" };
+      for (const line of block.split("\n")) {
+        if (!line || line.startsWith(":")) continue;
+        const colon = line.indexOf(":");
+        const field = line.slice(0, colon);
+        const val = line.slice(colon + 1).replace(/^ /, "");
+        if (field === "event") event.type = val;
+        else if (field === "id") event.id = Number(val);
+        else if (field === "data") event.data += val;
+      }
+      if (event.data) onEvent({ ...event, data: JSON.parse(event.data) });
+    }
+  }
+}